@@ -0,0 +1,27 @@
+"""Add occupied seat token
+
+Revision ID: 2d7b4e9a1c63
+Revises: 8e2a5c7f1d36
+Create Date: 2026-10-20 11:03:27.184905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d7b4e9a1c63'
+down_revision: Union[str, None] = '8e2a5c7f1d36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing reservations get no token, so only the admin can cancel them
+    op.add_column('occupied_seats', sa.Column('token', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('occupied_seats', 'token')
@@ -0,0 +1,27 @@
+"""Add session show date
+
+Revision ID: 5f9c3a7e2b14
+Revises: 2d7b4e9a1c63
+Create Date: 2026-10-20 12:41:53.902716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f9c3a7e2b14'
+down_revision: Union[str, None] = '2d7b4e9a1c63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing sessions get no show date, so their seats are never archived
+    op.add_column('sessions', sa.Column('show_date', sa.Date(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('sessions', 'show_date')
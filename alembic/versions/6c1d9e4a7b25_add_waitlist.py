@@ -0,0 +1,59 @@
+"""Add waitlist
+
+Revision ID: 6c1d9e4a7b25
+Revises: d4f8b2c6a913
+Create Date: 2026-10-19 18:21:07.503116
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c1d9e4a7b25'
+down_revision: Union[str, None] = 'd4f8b2c6a913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('waitlist_entries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('contact', sa.String(length=255), nullable=False),
+    sa.Column('token', sa.String(length=64), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('row', sa.Integer(), nullable=True),
+    sa.Column('column', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('offer_expires_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['session_id'], ['sessions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_waitlist_entries_id'), 'waitlist_entries', ['id'], unique=False)
+    op.create_index('ix_waitlist_entries_waiting', 'waitlist_entries', ['session_id', 'id'], unique=False,
+                    postgresql_where=sa.text("status = 'waiting'"))
+    op.create_index('ix_waitlist_entries_offered', 'waitlist_entries', ['offer_expires_at'], unique=False,
+                    postgresql_where=sa.text("status = 'offered'"))
+    # Per-session rollups, the sold-out signal; capacities are corrected from the room
+    # layouts by the next occupancy refresh
+    op.execute("""
+        INSERT INTO occupancy_rollups (dimension, key_id, capacity, occupied)
+        SELECT 'session', s.id,
+               COALESCE(r."row", 0) * COALESCE(r."column", 0),
+               COALESCE(o.occupied, 0)
+        FROM sessions s
+        JOIN cinema_rooms r ON r.id = s.cinema_room_id
+        LEFT JOIN (SELECT session_id, COUNT(*) AS occupied FROM occupied_seats GROUP BY session_id) o
+            ON o.session_id = s.id
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM occupancy_rollups WHERE dimension = 'session'")
+    op.drop_index('ix_waitlist_entries_offered', table_name='waitlist_entries')
+    op.drop_index('ix_waitlist_entries_waiting', table_name='waitlist_entries')
+    op.drop_index(op.f('ix_waitlist_entries_id'), table_name='waitlist_entries')
+    op.drop_table('waitlist_entries')
@@ -0,0 +1,102 @@
+"""Notify seat changes per statement
+
+Revision ID: 7a3e1c5b9d20
+Revises: 5f9c3a7e2b14
+Create Date: 2026-10-20 14:08:36.275019
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a3e1c5b9d20'
+down_revision: Union[str, None] = '5f9c3a7e2b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Transition table of each statement-level trigger on occupied_seats
+SEAT_TRIGGERS = {
+    'INSERT': 'NEW TABLE',
+    'UPDATE': 'NEW TABLE',
+    'DELETE': 'OLD TABLE',
+}
+
+
+def upgrade() -> None:
+    # Publishes "<table>:<key>:<operation>:<site_id>", so a worker can tell released
+    # seats from reserved ones and only evict the caches of the changed row's site
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_cache_invalidation() RETURNS trigger AS $$
+        DECLARE
+            new_key TEXT;
+            old_key TEXT;
+        BEGIN
+            IF TG_OP <> 'DELETE' THEN
+                new_key := to_jsonb(NEW) ->> TG_ARGV[0];
+                PERFORM pg_notify('cache_invalidation',
+                                  concat_ws(':', TG_TABLE_NAME, new_key, TG_OP, to_jsonb(NEW) ->> 'site_id'));
+            END IF;
+            IF TG_OP <> 'INSERT' THEN
+                old_key := to_jsonb(OLD) ->> TG_ARGV[0];
+                IF old_key IS DISTINCT FROM new_key THEN
+                    PERFORM pg_notify('cache_invalidation',
+                                      concat_ws(':', TG_TABLE_NAME, old_key, TG_OP, to_jsonb(OLD) ->> 'site_id'));
+                END IF;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    # One notification per session and statement instead of one per seat; identical
+    # ones of a transaction are sent once, so a booking notifies its session once
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_seat_cache_invalidation() RETURNS trigger AS $$
+        DECLARE
+            changed RECORD;
+        BEGIN
+            FOR changed IN
+                SELECT DISTINCT seats.session_id, sessions.site_id
+                FROM changed_seats seats LEFT JOIN sessions ON sessions.id = seats.session_id
+            LOOP
+                PERFORM pg_notify('cache_invalidation',
+                                  concat_ws(':', TG_TABLE_NAME, changed.session_id, TG_OP, changed.site_id));
+            END LOOP;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("DROP TRIGGER IF EXISTS occupied_seats_cache_invalidation ON occupied_seats")
+    for operation, transition in SEAT_TRIGGERS.items():
+        op.execute(f"CREATE TRIGGER occupied_seats_cache_invalidation_{operation.lower()} "
+                   f"AFTER {operation} ON occupied_seats REFERENCING {transition} AS changed_seats "
+                   f"FOR EACH STATEMENT EXECUTE FUNCTION notify_seat_cache_invalidation()")
+
+
+def downgrade() -> None:
+    for operation in SEAT_TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS occupied_seats_cache_invalidation_{operation.lower()} ON occupied_seats")
+    op.execute("DROP FUNCTION IF EXISTS notify_seat_cache_invalidation()")
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_cache_invalidation() RETURNS trigger AS $$
+        DECLARE
+            new_key TEXT;
+            old_key TEXT;
+        BEGIN
+            IF TG_OP <> 'DELETE' THEN
+                new_key := to_jsonb(NEW) ->> TG_ARGV[0];
+                PERFORM pg_notify('cache_invalidation', TG_TABLE_NAME || ':' || new_key);
+            END IF;
+            IF TG_OP <> 'INSERT' THEN
+                old_key := to_jsonb(OLD) ->> TG_ARGV[0];
+                IF old_key IS DISTINCT FROM new_key THEN
+                    PERFORM pg_notify('cache_invalidation', TG_TABLE_NAME || ':' || old_key);
+                END IF;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("CREATE TRIGGER occupied_seats_cache_invalidation AFTER INSERT OR UPDATE OR DELETE ON occupied_seats "
+               "FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation('session_id')")
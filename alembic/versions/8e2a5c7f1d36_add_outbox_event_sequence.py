@@ -0,0 +1,30 @@
+"""Add outbox event sequence
+
+Revision ID: 8e2a5c7f1d36
+Revises: 6c1d9e4a7b25
+Create Date: 2026-10-20 09:12:44.610327
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e2a5c7f1d36'
+down_revision: Union[str, None] = '6c1d9e4a7b25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('outbox_events', sa.Column('sequence', sa.Integer(), nullable=True))
+    # Events published so far keep their place in the feed; the publisher numbers the others
+    op.execute("UPDATE outbox_events SET sequence = id WHERE published_at IS NOT NULL")
+    op.create_unique_constraint('uq_outbox_events_sequence', 'outbox_events', ['sequence'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_outbox_events_sequence', 'outbox_events', type_='unique')
+    op.drop_column('outbox_events', 'sequence')
@@ -0,0 +1,46 @@
+"""Add occupancy rollups
+
+Revision ID: 9b2e7d4c1f08
+Revises: 3f1b6c2d9a47
+Create Date: 2026-10-19 11:04:52.118240
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b2e7d4c1f08'
+down_revision: Union[str, None] = '3f1b6c2d9a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('occupancy_rollups',
+    sa.Column('dimension', sa.String(length=16), nullable=False),
+    sa.Column('key_id', sa.Integer(), nullable=False),
+    sa.Column('capacity', sa.Integer(), nullable=False),
+    sa.Column('occupied', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('dimension', 'key_id')
+    )
+    # Backfill from the existing sessions and reservations
+    for dimension, column in (('move', 'move_id'), ('cinema_room', 'cinema_room_id'),
+                              ('move_time', 'move_time_id')):
+        op.execute(f"""
+            INSERT INTO occupancy_rollups (dimension, key_id, capacity, occupied)
+            SELECT '{dimension}', s.{column},
+                   SUM(COALESCE(r."row", 0) * COALESCE(r."column", 0)),
+                   COALESCE(SUM(o.occupied), 0)
+            FROM sessions s
+            JOIN cinema_rooms r ON r.id = s.cinema_room_id
+            LEFT JOIN (SELECT session_id, COUNT(*) AS occupied FROM occupied_seats GROUP BY session_id) o
+                ON o.session_id = s.id
+            GROUP BY s.{column}
+        """)
+
+
+def downgrade() -> None:
+    op.drop_table('occupancy_rollups')
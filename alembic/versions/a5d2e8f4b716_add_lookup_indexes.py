@@ -0,0 +1,42 @@
+"""Add lookup indexes
+
+Revision ID: a5d2e8f4b716
+Revises: f3a8c6d1e572
+Create Date: 2026-10-19 16:42:13.508291
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5d2e8f4b716'
+down_revision: Union[str, None] = 'f3a8c6d1e572'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# occupied_seats.session_id is the leading column of uq_occupied_seats_session_seat
+# and needs no index of its own.
+INDEXES = [
+    ('ix_sessions_room_move', 'sessions', ['cinema_room_id', 'move_id'], {'postgresql_include': ['id', 'move_time_id']}),
+    ('ix_sessions_move_id', 'sessions', ['move_id'], {}),
+    ('ix_sessions_move_time_id', 'sessions', ['move_time_id'], {}),
+    ('ix_cinema_rooms_name', 'cinema_rooms', ['name'], {}),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY does not block writes but cannot run in a transaction.
+    # A failed concurrent build leaves an invalid index behind, which IF NOT EXISTS
+    # would skip, so it is dropped before building again.
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, **options)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
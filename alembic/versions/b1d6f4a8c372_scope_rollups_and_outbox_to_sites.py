@@ -0,0 +1,68 @@
+"""Scope occupancy rollups and outbox events to sites
+
+Revision ID: b1d6f4a8c372
+Revises: 7a3e1c5b9d20
+Create Date: 2026-10-19 23:12:05.604318
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b1d6f4a8c372'
+down_revision: Union[str, None] = '7a3e1c5b9d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DEFAULT_SITE_ID = 1
+
+# Rollup dimension -> the site-scoped table its key refers to. Showtimes are
+# shared, their rollups stay with the default site until the reconciliation
+# splits them per site.
+ROLLUP_SOURCES = {'move': 'moves', 'cinema_room': 'cinema_rooms', 'session': 'sessions'}
+
+
+def upgrade() -> None:
+    # A constant default is kept in the catalog, the table is not rewritten
+    op.add_column('occupancy_rollups', sa.Column('site_id', sa.Integer(), nullable=False,
+                                                 server_default=str(DEFAULT_SITE_ID)))
+    for dimension, table in ROLLUP_SOURCES.items():
+        op.execute(f"""
+            UPDATE occupancy_rollups r SET site_id = t.site_id
+            FROM {table} t
+            WHERE r.dimension = '{dimension}' AND r.key_id = t.id AND t.site_id <> {DEFAULT_SITE_ID}
+        """)
+    # The table holds one row per movie, room, showtime and session, small enough to re-key in place
+    op.drop_constraint('occupancy_rollups_pkey', 'occupancy_rollups', type_='primary')
+    op.create_primary_key('occupancy_rollups_pkey', 'occupancy_rollups', ['site_id', 'dimension', 'key_id'])
+    op.create_foreign_key('occupancy_rollups_site_id_fkey', 'occupancy_rollups', 'sites', ['site_id'], ['id'])
+
+    op.add_column('outbox_events', sa.Column('site_id', sa.Integer(), nullable=False,
+                                             server_default=str(DEFAULT_SITE_ID)))
+    # NOT VALID skips the scan while the ACCESS EXCLUSIVE lock is held
+    op.execute('ALTER TABLE outbox_events ADD CONSTRAINT outbox_events_site_id_fkey '
+               'FOREIGN KEY (site_id) REFERENCES sites (id) NOT VALID')
+
+    with op.get_context().autocommit_block():
+        # Outside the transaction above, so the scan only takes a lock that does not block reads or writes
+        op.execute('ALTER TABLE outbox_events VALIDATE CONSTRAINT outbox_events_site_id_fkey')
+        # See a5d2e8f4b716 for why failed concurrent builds are dropped first
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_outbox_events_site_id')
+        op.create_index('ix_outbox_events_site_id', 'outbox_events', ['site_id'], unique=False,
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_outbox_events_site_id', table_name='outbox_events', postgresql_concurrently=True)
+    op.drop_column('outbox_events', 'site_id')
+
+    # Showtime rollups of several sites would collide, the reconciliation rebuilds them
+    op.execute("DELETE FROM occupancy_rollups WHERE dimension = 'move_time'")
+    op.drop_constraint('occupancy_rollups_site_id_fkey', 'occupancy_rollups', type_='foreignkey')
+    op.drop_constraint('occupancy_rollups_pkey', 'occupancy_rollups', type_='primary')
+    op.create_primary_key('occupancy_rollups_pkey', 'occupancy_rollups', ['dimension', 'key_id'])
+    op.drop_column('occupancy_rollups', 'site_id')
@@ -0,0 +1,99 @@
+"""Partition occupied seats by session
+
+Revision ID: b7c3f9a2d851
+Revises: a5d2e8f4b716
+Create Date: 2026-10-19 17:20:36.114825
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c3f9a2d851'
+down_revision: Union[str, None] = 'a5d2e8f4b716'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match app.repositories.partition_repository
+SESSIONS_PER_PARTITION = 10_000
+PARTITIONS_AHEAD = 2
+
+
+def upgrade() -> None:
+    # Rebuilds occupied_seats as a table range-partitioned by session_id and copies
+    # the seats over. The copy holds an exclusive lock on the seats, so run it in a
+    # maintenance window. The primary key has to include the partition key; the ORM
+    # keeps identifying seats by id alone.
+    op.execute('ALTER TABLE occupied_seats RENAME TO occupied_seats_unpartitioned')
+    op.execute('ALTER INDEX occupied_seats_pkey RENAME TO occupied_seats_unpartitioned_pkey')
+    op.execute('ALTER INDEX ix_occupied_seats_id RENAME TO ix_occupied_seats_unpartitioned_id')
+    op.execute('ALTER TABLE occupied_seats_unpartitioned '
+               'RENAME CONSTRAINT uq_occupied_seats_session_seat TO uq_occupied_seats_unpartitioned_session_seat')
+    op.execute('ALTER SEQUENCE occupied_seats_id_seq OWNED BY NONE')
+
+    op.execute(
+        "CREATE TABLE occupied_seats ("
+        "id INTEGER NOT NULL DEFAULT nextval('occupied_seats_id_seq'), "
+        "session_id INTEGER NOT NULL REFERENCES sessions (id), "
+        '"row" INTEGER NOT NULL, '
+        '"column" INTEGER NOT NULL, '
+        "CONSTRAINT occupied_seats_pkey PRIMARY KEY (id, session_id), "
+        'CONSTRAINT uq_occupied_seats_session_seat UNIQUE (session_id, "row", "column")'
+        ") PARTITION BY RANGE (session_id)"
+    )
+    op.execute('CREATE INDEX ix_occupied_seats_id ON occupied_seats (id)')
+    op.execute('ALTER SEQUENCE occupied_seats_id_seq OWNED BY occupied_seats.id')
+
+    # Partitions from the first session to PARTITIONS_AHEAD ranges past the last;
+    # the app creates further ones ahead of new sessions.
+    op.execute(f"""
+        DO $$
+        DECLARE
+            lower_bound INTEGER;
+        BEGIN
+            FOR lower_bound IN
+                SELECT generate_series(first_id - first_id % {SESSIONS_PER_PARTITION},
+                                       last_id - last_id % {SESSIONS_PER_PARTITION}
+                                           + {PARTITIONS_AHEAD * SESSIONS_PER_PARTITION},
+                                       {SESSIONS_PER_PARTITION})
+                FROM (SELECT COALESCE(MIN(id), 0) AS first_id, COALESCE(MAX(id), 0) AS last_id FROM sessions) bounds
+            LOOP
+                EXECUTE format('CREATE TABLE occupied_seats_p%s PARTITION OF occupied_seats '
+                               'FOR VALUES FROM (%s) TO (%s)',
+                               lower_bound, lower_bound, lower_bound + {SESSIONS_PER_PARTITION});
+            END LOOP;
+        END $$
+    """)
+
+    op.execute('INSERT INTO occupied_seats (id, session_id, "row", "column") '
+               'SELECT id, session_id, "row", "column" FROM occupied_seats_unpartitioned')
+    op.execute('DROP TABLE occupied_seats_unpartitioned')
+    op.execute('ANALYZE occupied_seats')
+
+
+def downgrade() -> None:
+    # Seats of detached (archived) partitions are not restored
+    op.execute('ALTER TABLE occupied_seats RENAME TO occupied_seats_partitioned')
+    op.execute('ALTER INDEX occupied_seats_pkey RENAME TO occupied_seats_partitioned_pkey')
+    op.execute('ALTER INDEX ix_occupied_seats_id RENAME TO ix_occupied_seats_partitioned_id')
+    op.execute('ALTER TABLE occupied_seats_partitioned '
+               'RENAME CONSTRAINT uq_occupied_seats_session_seat TO uq_occupied_seats_partitioned_session_seat')
+    op.execute('ALTER SEQUENCE occupied_seats_id_seq OWNED BY NONE')
+
+    op.execute(
+        "CREATE TABLE occupied_seats ("
+        "id INTEGER NOT NULL DEFAULT nextval('occupied_seats_id_seq'), "
+        "session_id INTEGER NOT NULL REFERENCES sessions (id), "
+        '"row" INTEGER NOT NULL, '
+        '"column" INTEGER NOT NULL, '
+        "CONSTRAINT occupied_seats_pkey PRIMARY KEY (id), "
+        'CONSTRAINT uq_occupied_seats_session_seat UNIQUE (session_id, "row", "column")'
+        ")"
+    )
+    op.execute('CREATE INDEX ix_occupied_seats_id ON occupied_seats (id)')
+    op.execute('ALTER SEQUENCE occupied_seats_id_seq OWNED BY occupied_seats.id')
+    op.execute('INSERT INTO occupied_seats (id, session_id, "row", "column") '
+               'SELECT id, session_id, "row", "column" FROM occupied_seats_partitioned')
+    op.execute('DROP TABLE occupied_seats_partitioned')
@@ -0,0 +1,26 @@
+"""Add cinema room layout
+
+Revision ID: c47a0e5d2b91
+Revises: 9b2e7d4c1f08
+Create Date: 2026-10-19 12:21:07.593310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47a0e5d2b91'
+down_revision: Union[str, None] = '9b2e7d4c1f08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('cinema_rooms', sa.Column('layout', sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('cinema_rooms', 'layout')
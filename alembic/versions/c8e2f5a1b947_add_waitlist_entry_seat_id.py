@@ -0,0 +1,33 @@
+"""Add the held seat to waitlist entries
+
+Revision ID: c8e2f5a1b947
+Revises: b1d6f4a8c372
+Create Date: 2026-10-19 23:48:31.270915
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e2f5a1b947'
+down_revision: Union[str, None] = 'b1d6f4a8c372'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('waitlist_entries', sa.Column('seat_id', sa.Integer(), nullable=True))
+    # Open offers hold the seat at their position
+    op.execute("""
+        UPDATE waitlist_entries w SET seat_id = o.id
+        FROM occupied_seats o
+        WHERE w.status = 'offered'
+          AND o.session_id = w.session_id AND o."row" = w."row" AND o."column" = w."column"
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('waitlist_entries', 'seat_id')
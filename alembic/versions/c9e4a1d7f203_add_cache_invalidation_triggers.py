@@ -0,0 +1,61 @@
+"""Add cache invalidation triggers
+
+Revision ID: c9e4a1d7f203
+Revises: b7c3f9a2d851
+Create Date: 2026-10-19 18:04:52.630117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9e4a1d7f203'
+down_revision: Union[str, None] = 'b7c3f9a2d851'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Table -> the column identifying the cached entry a change affects.
+# Must match app.events.invalidation.
+TRIGGERS = {
+    'cinema_rooms': 'id',
+    'moves': 'id',
+    'sessions': 'id',
+    'occupied_seats': 'session_id',
+}
+
+
+def upgrade() -> None:
+    # Publishes "<table>:<key>" on the cache_invalidation channel for every changed
+    # row. Notifications are delivered on commit, and identical ones of a
+    # transaction are sent once, so a multi-seat booking notifies its session once.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_cache_invalidation() RETURNS trigger AS $$
+        DECLARE
+            new_key TEXT;
+            old_key TEXT;
+        BEGIN
+            IF TG_OP <> 'DELETE' THEN
+                new_key := to_jsonb(NEW) ->> TG_ARGV[0];
+                PERFORM pg_notify('cache_invalidation', TG_TABLE_NAME || ':' || new_key);
+            END IF;
+            IF TG_OP <> 'INSERT' THEN
+                old_key := to_jsonb(OLD) ->> TG_ARGV[0];
+                IF old_key IS DISTINCT FROM new_key THEN
+                    PERFORM pg_notify('cache_invalidation', TG_TABLE_NAME || ':' || old_key);
+                END IF;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table, key in TRIGGERS.items():
+        op.execute(f"CREATE TRIGGER {table}_cache_invalidation AFTER INSERT OR UPDATE OR DELETE ON {table} "
+                   f"FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation('{key}')")
+
+
+def downgrade() -> None:
+    for table in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_cache_invalidation ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS notify_cache_invalidation()")
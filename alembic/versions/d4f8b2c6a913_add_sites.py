@@ -0,0 +1,67 @@
+"""Add sites
+
+Revision ID: d4f8b2c6a913
+Revises: c9e4a1d7f203
+Create Date: 2026-10-19 19:21:37.184562
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f8b2c6a913'
+down_revision: Union[str, None] = 'c9e4a1d7f203'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tables whose rows belong to one site; occupied_seats belong to the site of their session.
+# Must match app.models.cinema.SiteScoped.
+SCOPED_TABLES = ['cinema_rooms', 'moves', 'sessions']
+DEFAULT_SITE_ID = 1
+
+
+def upgrade() -> None:
+    op.create_table(
+        'sites',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('slug', sa.String(length=50), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('hostname', sa.String(length=255), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('slug'),
+        sa.UniqueConstraint('hostname'),
+    )
+    op.create_index('ix_sites_id', 'sites', ['id'], unique=False)
+    # Existing data becomes the default site
+    op.execute(f"INSERT INTO sites (id, slug, name) VALUES ({DEFAULT_SITE_ID}, 'default', 'Default')")
+    op.execute("SELECT setval(pg_get_serial_sequence('sites', 'id'), (SELECT max(id) FROM sites))")
+
+    for table in SCOPED_TABLES:
+        # A constant default is kept in the catalog, the table is not rewritten
+        op.add_column(table, sa.Column('site_id', sa.Integer(), nullable=False,
+                                       server_default=str(DEFAULT_SITE_ID)))
+        # NOT VALID skips the scan while the ACCESS EXCLUSIVE lock is held
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_site_id_fkey '
+                   f'FOREIGN KEY (site_id) REFERENCES sites (id) NOT VALID')
+
+    with op.get_context().autocommit_block():
+        for table in SCOPED_TABLES:
+            # Outside the transaction above, so the scan only takes a lock that does not block reads or writes
+            op.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {table}_site_id_fkey')
+        # See a5d2e8f4b716 for why failed concurrent builds are dropped first
+        for table in SCOPED_TABLES:
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS ix_{table}_site_id')
+            op.create_index(f'ix_{table}_site_id', table, ['site_id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table in reversed(SCOPED_TABLES):
+            op.drop_index(f'ix_{table}_site_id', table_name=table, postgresql_concurrently=True)
+    for table in reversed(SCOPED_TABLES):
+        op.drop_column(table, 'site_id')
+    op.drop_index('ix_sites_id', table_name='sites')
+    op.drop_table('sites')
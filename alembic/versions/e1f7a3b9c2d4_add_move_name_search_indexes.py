@@ -0,0 +1,31 @@
+"""Add move name search indexes
+
+Revision ID: e1f7a3b9c2d4
+Revises: c47a0e5d2b91
+Create Date: 2026-10-19 14:05:48.271904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f7a3b9c2d4'
+down_revision: Union[str, None] = 'c47a0e5d2b91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_moves_name_trgm', 'moves', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_moves_name_fts', 'moves', [sa.text("to_tsvector('simple', name)")], unique=False,
+                    postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_moves_name_fts', table_name='moves')
+    op.drop_index('ix_moves_name_trgm', table_name='moves')
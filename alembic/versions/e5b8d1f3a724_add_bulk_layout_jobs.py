@@ -0,0 +1,37 @@
+"""Add bulk layout jobs
+
+Revision ID: e5b8d1f3a724
+Revises: c8e2f5a1b947
+Create Date: 2026-10-20 10:12:44.381026
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b8d1f3a724'
+down_revision: Union[str, None] = 'c8e2f5a1b947'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('bulk_layout_jobs',
+    sa.Column('id', sa.String(length=12), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('done', sa.Integer(), nullable=False),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.Float(), nullable=False),
+    sa.Column('finished_at', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_bulk_layout_jobs_created_at'), 'bulk_layout_jobs', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_bulk_layout_jobs_created_at'), table_name='bulk_layout_jobs')
+    op.drop_table('bulk_layout_jobs')
@@ -0,0 +1,60 @@
+"""Add occupied seat unique constraint
+
+Revision ID: f3a8c6d1e572
+Revises: e1f7a3b9c2d4
+Create Date: 2026-10-19 15:32:10.518337
+
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8c6d1e572'
+down_revision: Union[str, None] = 'e1f7a3b9c2d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+
+def upgrade() -> None:
+    # Seats double-booked before the constraint existed keep their first reservation. The
+    # later ones are moved to an audit table and logged, so the customers can be contacted.
+    op.create_table('occupied_seat_duplicates',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('row', sa.Integer(), nullable=False),
+    sa.Column('column', sa.Integer(), nullable=False),
+    sa.Column('kept_id', sa.Integer(), nullable=False),
+    sa.Column('moved_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(
+        'INSERT INTO occupied_seat_duplicates (id, session_id, "row", "column", kept_id) '
+        'SELECT a.id, a.session_id, a."row", a."column", MIN(b.id) '
+        'FROM occupied_seats a JOIN occupied_seats b '
+        'ON a.session_id = b.session_id AND a."row" = b."row" AND a."column" = b."column" AND a.id > b.id '
+        'GROUP BY a.id, a.session_id, a."row", a."column"'
+    )
+    duplicates = op.get_bind().execute(sa.text(
+        'SELECT id, session_id, "row", "column", kept_id FROM occupied_seat_duplicates ORDER BY id'
+    )).all()
+    for seat_id, session_id, row, column, kept_id in duplicates:
+        logger.warning("Moved duplicate reservation %s of session %s, row %s, column %s to "
+                       "occupied_seat_duplicates; reservation %s keeps the seat",
+                       seat_id, session_id, row, column, kept_id)
+    op.execute('DELETE FROM occupied_seats WHERE id IN (SELECT id FROM occupied_seat_duplicates)')
+    op.create_unique_constraint('uq_occupied_seats_session_seat', 'occupied_seats', ['session_id', 'row', 'column'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_occupied_seats_session_seat', 'occupied_seats', type_='unique')
+    op.execute(
+        'INSERT INTO occupied_seats (id, session_id, "row", "column") '
+        'SELECT id, session_id, "row", "column" FROM occupied_seat_duplicates'
+    )
+    op.drop_table('occupied_seat_duplicates')
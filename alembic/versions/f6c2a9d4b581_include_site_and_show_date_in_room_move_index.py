@@ -0,0 +1,38 @@
+"""Include the site and show date in ix_sessions_room_move
+
+Revision ID: f6c2a9d4b581
+Revises: e5b8d1f3a724
+Create Date: 2026-10-20 10:41:27.906153
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6c2a9d4b581'
+down_revision: Union[str, None] = 'e5b8d1f3a724'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ['cinema_room_id', 'move_id']
+
+
+def _rebuild(include) -> None:
+    # Built under a temporary name and swapped in, so lookups keep an index throughout.
+    # A failed concurrent build leaves an invalid index behind, which is dropped first.
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_sessions_room_move_rebuild')
+        op.create_index('ix_sessions_room_move_rebuild', 'sessions', COLUMNS, unique=False,
+                        postgresql_concurrently=True, postgresql_include=include)
+        op.drop_index('ix_sessions_room_move', table_name='sessions', postgresql_concurrently=True)
+        op.execute('ALTER INDEX ix_sessions_room_move_rebuild RENAME TO ix_sessions_room_move')
+
+
+def upgrade() -> None:
+    _rebuild(['id', 'move_time_id', 'site_id', 'show_date'])
+
+
+def downgrade() -> None:
+    _rebuild(['id', 'move_time_id'])
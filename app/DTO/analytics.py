@@ -0,0 +1,18 @@
+from enum import Enum
+
+from pydantic import BaseModel
+
+
+class OccupancyDimension(str, Enum):
+    move = "move"
+    cinema_room = "cinema_room"
+    move_time = "move_time"
+    session = "session"
+
+
+class OccupancyDTO(BaseModel):
+    dimension: OccupancyDimension
+    key_id: int
+    capacity: int
+    occupied: int
+    fill_rate: float
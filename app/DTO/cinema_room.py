@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from pydantic import BaseModel
 
@@ -22,7 +22,30 @@ class CinemaRoomResponseDTO(BaseModel):
     film: MoveDTO
     data: List[dict]
     session_id: int
+    sold_out: bool = False
 
 class ReservationResponseDTO(BaseModel):
     message: str
-    reservation: dict
\ No newline at end of file
+    reservation: dict
+    # Proves ownership of the seat when cancelling it
+    token: Optional[str] = None
+
+
+class SeatDTO(BaseModel):
+    row: int
+    column: int
+
+
+class BookedSeatDTO(SeatDTO):
+    token: Optional[str] = None
+
+
+class BookingCancellationDTO(BaseModel):
+    session_id: int
+    seats: List[BookedSeatDTO]
+
+
+class CancellationResponseDTO(BaseModel):
+    message: str
+    released: int
+    seats: List[SeatDTO] = []
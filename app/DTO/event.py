@@ -0,0 +1,12 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class OutboxEventDTO(BaseModel):
+    id: int
+    sequence: int
+    event_type: str
+    payload: dict
+    created_at: Optional[datetime]
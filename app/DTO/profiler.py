@@ -0,0 +1,21 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ProfileDTO(BaseModel):
+    path: str
+    samples: int
+    started_at: float
+    duration: float
+    route: Optional[str]
+
+
+class ProfilerStatusDTO(BaseModel):
+    running: bool
+    pid: int
+    route: Optional[str]
+    started_at: Optional[float]
+    duration: Optional[float]
+    samples: Optional[int]
+    last_profile: Optional[ProfileDTO]
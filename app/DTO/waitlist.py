@@ -0,0 +1,22 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class WaitlistJoinDTO(BaseModel):
+    contact: str = Field(..., min_length=1, max_length=255)
+
+
+class WaitlistEntryDTO(BaseModel):
+    id: int
+    session_id: int
+    status: str
+    # Place among the waiting entries, while waiting
+    position: Optional[int] = None
+    # The offered seat and the deadline to accept it, once offered
+    row: Optional[int] = None
+    column: Optional[int] = None
+    offer_expires_at: Optional[datetime] = None
+    # Only returned when joining; required by the other waitlist routes
+    token: Optional[str] = None
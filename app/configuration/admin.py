@@ -1,17 +1,31 @@
-import json
-from flask import Flask
-from flask_admin import Admin
+import asyncio
+from datetime import timedelta
+
+import anyio
+from flask import Flask, abort, flash, jsonify, redirect, request, url_for
+from flask_admin import Admin, BaseView, expose
+from flask_admin.actions import action
 from flask_admin.contrib.sqla import ModelView
-from flask_admin.form import FileUploadField
+from flask_admin.form import BaseForm, FileUploadField
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import scoped_session
+from wtforms import IntegerField, SelectField, StringField, TextAreaField, ValidationError, validators
 
-from app.configuration.database import SyncSessionLocal
+from app.configuration.database import get_engine, get_session_factory, get_sync_session_factory
 from app.configuration.settings import settings
-from app.models.cinema import CinemaRoom, Move, MoveTime, Session, OccupiedSeat
-from app.utils.constands import MEDIA_FOLDER
+from app.models.cinema import DEFAULT_SITE_ID, CinemaRoom, Move, MoveTime, Session, OccupiedSeat, Site, WaitlistEntry
+from app.repositories.cinema_room_repository import release_occupied_seats_by_id
+from app.repositories.partition_repository import ensure_session_partition
+from app.utils.bulk_layouts import create_rooms, get_bulk_layout_runner
+from app.utils.constands import MEDIA_FOLDER, ensure_media_folder
+from app.utils.room_layout import RoomLayout, layout_cache
+from app.utils.search_index import movie_search_indexes
+from app.utils.seat_grid import SeatGrid
+from app.utils.tenancy import clear_current_site, site_scope
 
 
 class MoveModelView(ModelView):
-    column_list = ['name', 'move_time_length', 'movie_cover', ]
+    column_list = ['site', 'name', 'move_time_length', 'movie_cover', ]
 
     form_overrides = {
         'movie_cover': FileUploadField
@@ -25,26 +39,125 @@ class MoveModelView(ModelView):
         }
     }
 
+    def after_model_change(self, form, model, is_created):
+        movie_search_indexes.get(model.site_id).add(model)
+        return super().after_model_change(form, model, is_created)
+
+    def after_model_delete(self, model):
+        movie_search_indexes.get(model.site_id).remove(model.id)
+        return super().after_model_delete(model)
+
 
 class CinemaRoomModelView(ModelView):
-    column_list = ['name', 'column', 'row']
+    column_list = ['site', 'name', 'column', 'row']
+    form_excluded_columns = ['layout']
+    form_extra_fields = {
+        'layout_text': TextAreaField(
+            'Layout',
+            description='One line per row, one symbol per seat: S standard, V VIP, W wheelchair, '
+                        'C companion, . no seat (aisle). Lowercase marks a blocked seat. '
+                        'Leave empty for a full room of standard seats.'
+        )
+    }
+
+    def edit_form(self, obj=None):
+        form = super().edit_form(obj)
+        if obj is not None and not form.layout_text.data:
+            form.layout_text.data = RoomLayout.from_bytes(obj.layout, obj.row or 0, obj.column or 0).to_text()
+        return form
 
     def on_model_change(self, form, model, is_created):
-        if is_created or form.row.data != model.row or form.column.data != model.column:
-            seating_matrix = [[False] * form.column.data for _ in range(form.row.data)]
-            model.seating = json.dumps(seating_matrix)
+        # The form has already been applied to the model, so compare against the loaded values
+        state = inspect(model).attrs
+        resized = is_created or state.row.history.has_changes() or state.column.history.has_changes()
+        if resized:
+            model.seating = SeatGrid.empty(form.row.data, form.column.data).to_json()
+
+        text = (form.layout_text.data or '').strip()
+        try:
+            layout = RoomLayout.from_text(text) if text else None
+        except ValueError as e:
+            raise ValidationError(str(e))
+
+        if layout is not None and layout.shape == (form.row.data, form.column.data):
+            model.layout = layout.to_bytes()
+        elif layout is not None and not resized:
+            raise ValidationError(f"The layout must have {form.row.data} rows of {form.column.data} seats.")
+        elif resized or layout is None:
+            # Resized rooms start over as a full rectangle of standard seats
+            model.layout = None
+
+        if model.id is not None:
+            layout_cache.invalidate(model.id)
         return super().on_model_change(form, model, is_created)
 
+    @action('bulk_layout', 'Change layouts', 'Open the bulk layout form for the selected rooms?')
+    def action_bulk_layout(self, ids):
+        return redirect(url_for('bulk_layouts.index', rooms=','.join(ids)))
+
 
 class SessionModelView(ModelView):
-    column_list = ['cinema_room', 'move', 'move_time']
-    form_columns = ['cinema_room', 'move', 'move_time']
+    column_list = ['cinema_room', 'move', 'move_time', 'show_date']
+    form_columns = ['cinema_room', 'move', 'move_time', 'show_date']
     column_labels = {
         'cinema_room': 'Cinema Room',
         'move': 'Movie',
-        'move_time': 'Show Time'
+        'move_time': 'Show Time',
+        'show_date': 'Show Date'
     }
 
+    def on_model_change(self, form, model, is_created):
+        # A session belongs to the site of its room
+        model.site_id = model.cinema_room.site_id
+        return super().on_model_change(form, model, is_created)
+
+    def after_model_change(self, form, model, is_created):
+        if is_created:
+            # So its seats can be reserved before the partition maintenance runs
+            run_async(create_session_partition, model.id)
+        return super().after_model_change(form, model, is_created)
+
+
+async def create_session_partition(session_id: int) -> None:
+    async with get_session_factory()() as db:
+        await ensure_session_partition(db, session_id)
+        await db.commit()
+
+
+async def release_seat(session_id: int, seat_id: int) -> bool:
+    """
+    Releases a reserved seat through the API's path, which writes its event, offers
+    it to the session's waitlist and updates the occupancy rollups.
+    """
+    # The admin manages every site of the default database, where it read the seat, see create_admin_app
+    with site_scope(None):
+        async with get_session_factory()() as db:
+            session = await db.get(Session, session_id)
+            if session is None:
+                return False
+            offer_ttl = timedelta(seconds=settings.waitlist_settings.WAITLIST_OFFER_TTL)
+            return bool(await release_occupied_seats_by_id(db, session, [seat_id], offer_ttl))
+
+
+def run_async(fn, *args):
+    """
+    Runs a coroutine function from an admin request.
+
+    Mounted in the API, the admin serves requests on worker threads of the API's
+    event loop, which runs the coroutine. Served on its own, the coroutine gets a
+    loop of its own, and the pooled connections bound to that loop are closed.
+    """
+    try:
+        anyio.from_thread.run_sync(lambda: None)
+    except RuntimeError:
+        async def run_once():
+            try:
+                return await fn(*args)
+            finally:
+                await get_engine().dispose()
+        return asyncio.run(run_once())
+    return anyio.from_thread.run(fn, *args)
+
 
 class OccupiedSeatModelView(ModelView):
     column_list = ['session', 'row', 'column']
@@ -55,19 +168,147 @@ class OccupiedSeatModelView(ModelView):
         'column': 'Column'
     }
 
-    def get_query(self):
-        return super().get_query()
+    def delete_model(self, model):
+        # Released like a cancellation through the API, so the seat is offered to the session's waitlist
+        try:
+            self.on_model_delete(model)
+            run_async(release_seat, model.session_id, model.id)
+        except Exception as ex:
+            if not self.handle_view_exception(ex):
+                flash(f'Failed to release the seat. {ex}', 'error')
+            return False
+        self.after_model_delete(model)
+        return True
+
+
+class WaitlistEntryModelView(ModelView):
+    # Entries are created by users joining a waitlist; the token they authenticate with is not shown.
+    # Read-only: ending an offer here would not release the seat held for it, see leave_waitlist.
+    can_create = False
+    can_edit = False
+    can_delete = False
+    column_list = ['session', 'contact', 'status', 'row', 'column', 'created_at', 'offer_expires_at']
+    column_filters = ['status']
+    column_labels = {
+        'session': 'Session',
+        'offer_expires_at': 'Offer Expires At'
+    }
+
+
+MAX_NEW_ROOMS = 500
+
+
+class BulkLayoutForm(BaseForm):
+    rooms = StringField('Rooms', description='Comma-separated ids of existing rooms to change.')
+    new_rooms = IntegerField('New rooms', [validators.Optional(), validators.NumberRange(1, MAX_NEW_ROOMS)],
+                             description='Or the number of rooms to create, named "<Name prefix> 1" and so on.')
+    name_prefix = StringField('Name prefix', [validators.Optional(), validators.Length(max=40)], default='Room')
+    site_id = SelectField('Site', coerce=int, default=DEFAULT_SITE_ID)
+    row = IntegerField('Rows', [validators.Optional(), validators.NumberRange(1, 1000)])
+    column = IntegerField('Columns', [validators.Optional(), validators.NumberRange(1, 1000)])
+    layout_text = CinemaRoomModelView.form_extra_fields['layout_text']
+
+
+class BulkLayoutView(BaseView):
+    """
+    Creates or resizes many rooms at once, generating their seat maps in the
+    background (see app.utils.bulk_layouts) and showing the progress of recent jobs.
+    """
+
+    def __init__(self, session, **kwargs):
+        self.session = session
+        super().__init__(**kwargs)
+
+    @expose('/', methods=('GET', 'POST'))
+    def index(self):
+        runner = get_bulk_layout_runner()
+        form = BulkLayoutForm(request.form)
+        form.site_id.choices = [(site.id, site.name) for site in self.session.scalars(select(Site).order_by(Site.id))]
+        if request.method == 'GET':
+            form.rooms.data = request.args.get('rooms', '')
+        elif form.validate():
+            try:
+                job = self._submit(form)
+            except ValueError as e:
+                flash(str(e), 'error')
+            else:
+                flash(f'Generating the seat maps of {job.total} rooms (job {job.id}).', 'success')
+                return redirect(url_for('.index'))
+        jobs = runner.jobs()
+        return self.render('admin/bulk_layouts.html', form=form, jobs=jobs,
+                           refresh=any(not job.finished for job in jobs))
+
+    @expose('/jobs/<job_id>')
+    def job(self, job_id):
+        job = get_bulk_layout_runner().get(job_id)
+        if job is None:
+            abort(404)
+        return jsonify(job.to_dict())
+
+    def _submit(self, form: BulkLayoutForm):
+        text = (form.layout_text.data or '').strip()
+        layout = RoomLayout.from_text(text) if text else None
+        rows, columns = form.row.data, form.column.data
+        if (rows is None) != (columns is None):
+            raise ValueError('Give both the number of rows and of columns, or neither.')
+        if layout is not None and rows is not None and layout.shape != (rows, columns):
+            raise ValueError(f"The layout must have {rows} rows of {columns} seats.")
+
+        if form.new_rooms.data:
+            if rows is None and layout is None:
+                raise ValueError('New rooms need a number of rows and columns, or a layout.')
+            rows, columns = (rows, columns) if rows is not None else layout.shape
+            room_ids = create_rooms(self.session, form.name_prefix.data or 'Room', form.new_rooms.data,
+                                    rows, columns, site_id=form.site_id.data)
+            self.session.commit()
+        else:
+            try:
+                room_ids = [int(room_id) for room_id in form.rooms.data.split(',') if room_id.strip()]
+            except ValueError:
+                raise ValueError('Rooms must be a comma-separated list of ids.')
+            if not room_ids:
+                raise ValueError('Select rooms to change or give a number of new rooms.')
+        return get_bulk_layout_runner().submit(room_ids, rows, columns, layout)
+
+
+def create_admin_app() -> Flask:
+    """
+    Builds the Flask admin application.
+
+    All views share one thread-local scoped session which is removed at the end
+    of every request, so the admin does not hold a session per view open for
+    the lifetime of the process.
+
+    The admin works on the default database only: the rows of sites with a
+    database of their own (SITE_DATABASE_URLS) are not shown in it.
+
+    Returns:
+        Flask: The configured Flask application serving the admin panel.
+    """
+    ensure_media_folder()
+    db_session = scoped_session(get_sync_session_factory())
+
+    flask_app = Flask(__name__)
+    flask_app.config['SECRET_KEY'] = settings.app_settings.SECRET_KEY
+
+    # The admin manages every site, while requests reach it scoped to the site of their host
+    flask_app.before_request(clear_current_site)
 
+    @flask_app.teardown_appcontext
+    def remove_db_session(exception=None):
+        db_session.remove()
 
-flask_app = Flask(__name__)
-flask_app.config['SECRET_KEY'] = settings.app_settings.SECRET_KEY
+    admin = Admin(app=flask_app, name='Cinema Admin', template_mode='bootstrap3')
+    admin.add_view(ModelView(Site, session=db_session))
+    admin.add_view(CinemaRoomModelView(CinemaRoom, session=db_session))
+    admin.add_view(BulkLayoutView(db_session, name='Bulk Layouts', endpoint='bulk_layouts'))
+    admin.add_view(MoveModelView(Move, session=db_session))
+    admin.add_view(ModelView(MoveTime, session=db_session))
+    admin.add_view(SessionModelView(Session, session=db_session))
+    admin.add_view(OccupiedSeatModelView(OccupiedSeat, session=db_session))
+    admin.add_view(WaitlistEntryModelView(WaitlistEntry, session=db_session))
+    return flask_app
 
-admin = Admin(app=flask_app, name='Cinema Admin', template_mode='bootstrap3')
-admin.add_view(CinemaRoomModelView(CinemaRoom, session=SyncSessionLocal()))
-admin.add_view(MoveModelView(Move, session=SyncSessionLocal()))
-admin.add_view(ModelView(MoveTime, session=SyncSessionLocal()))
-admin.add_view(SessionModelView(Session, session=SyncSessionLocal()))
-admin.add_view(OccupiedSeatModelView(OccupiedSeat, session=SyncSessionLocal()))
 
 if __name__ == "__main__":
-    flask_app.run(debug=True)
+    create_admin_app().run(debug=True)
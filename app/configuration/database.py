@@ -1,16 +1,93 @@
+from functools import lru_cache
+from typing import List, Optional
+
 from sqlalchemy import create_engine
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from app.utils.tenancy import current_site
 from .settings import settings
 
-engine = create_async_engine(settings.db_settings.db_url, echo=True)
+# Engines are built on first use instead of at import time, so importing the
+# application (workers, alembic, tests) does not pay for driver imports and
+# pool construction until a database is actually needed.
+
+# Engines of sites with a database of their own, see get_engine
+_site_engines: List[AsyncEngine] = []
+
+
+@lru_cache(maxsize=None)
+def get_engine(database_url: Optional[str] = None):
+    """
+    Returns the engine of the default database, or of a site's own database.
+
+    Every site database gets its own, smaller, connection pool, so a busy site
+    cannot take the connections of the others.
+    """
+    db_settings = settings.db_settings
+    if database_url is None:
+        return create_async_engine(
+            db_settings.db_url,
+            echo=True,
+            pool_size=db_settings.DB_POOL_SIZE,
+            max_overflow=db_settings.DB_MAX_OVERFLOW,
+            pool_timeout=db_settings.DB_POOL_TIMEOUT,
+        )
+    site_settings = settings.site_settings
+    engine = create_async_engine(
+        database_url,
+        echo=True,
+        pool_size=site_settings.SITE_DB_POOL_SIZE,
+        max_overflow=site_settings.SITE_DB_MAX_OVERFLOW,
+        pool_timeout=db_settings.DB_POOL_TIMEOUT,
+    )
+    _site_engines.append(engine)
+    return engine
+
+
+@lru_cache(maxsize=None)
+def get_session_factory(database_url: Optional[str] = None) -> sessionmaker:
+    return sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=get_engine(database_url),
+        class_=AsyncSession
+    )
+
+
+def get_site_session_factory() -> sessionmaker:
+    """
+    Returns the session factory of the current site's database.
+    """
+    site = current_site()
+    return get_session_factory(site.database_url if site is not None else None)
+
+
+@lru_cache(maxsize=None)
+def get_sync_engine():
+    db_settings = settings.db_settings
+    return create_engine(
+        db_settings.db_url_sync,
+        echo=True,
+        pool_size=db_settings.DB_ADMIN_POOL_SIZE,
+        max_overflow=db_settings.DB_ADMIN_MAX_OVERFLOW,
+        pool_timeout=db_settings.DB_POOL_TIMEOUT,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_sync_session_factory() -> sessionmaker:
+    return sessionmaker(bind=get_sync_engine())
 
-SessionLocal = sessionmaker(
-    autocommit=False,
-    autoflush=False,
-    bind=engine,
-    class_=AsyncSession
-)
 
-sinc_engine = create_engine(settings.db_settings.db_url_sync, echo=True)
-SyncSessionLocal = sessionmaker(bind=sinc_engine)
\ No newline at end of file
+async def dispose_engines() -> None:
+    """
+    Disposes of any engines that were created and resets the lazy factories.
+    """
+    if get_engine.cache_info().currsize:
+        await get_engine().dispose()
+    while _site_engines:
+        await _site_engines.pop().dispose()
+    if get_sync_engine.cache_info().currsize:
+        get_sync_engine().dispose()
+    for factory in (get_session_factory, get_engine, get_sync_session_factory, get_sync_engine):
+        factory.cache_clear()
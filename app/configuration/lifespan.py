@@ -0,0 +1,268 @@
+import asyncio
+import logging
+import os
+import threading
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import Awaitable, Callable, List, Optional
+
+from fastapi import FastAPI
+from sqlalchemy.engine import make_url
+
+from app.configuration.database import get_engine, get_session_factory, get_site_session_factory, dispose_engines
+from app.configuration.settings import settings
+from app.events.invalidation import CacheInvalidator, InvalidationListener
+from app.events.publisher import OutboxPublisher
+from app.events.sinks import create_sink
+from app.repositories.analytics_repository import refresh_occupancy_rollups
+from app.repositories.partition_repository import (
+    ensure_occupied_seat_partitions, detach_expired_occupied_seat_partitions
+)
+from app.repositories.site_repository import get_all_sites
+from app.repositories.waitlist_repository import expire_waitlist_offers
+from app.utils.query_diagnostics import QueryDiagnostics
+from app.utils.schedule import schedule_stores
+from app.utils.tasks import PeriodicTask
+from app.utils.bulk_layouts import get_bulk_layout_runner
+from app.utils.constands import ensure_media_folder
+from app.utils.load_shedding import load_monitor, seat_map_snapshots
+from app.utils.profiler import profiler
+from app.utils.search_index import MovieSearchIndex
+from app.utils.tenancy import SiteRegistry, site_registry, site_scope
+
+logger = logging.getLogger(__name__)
+
+
+class LazyAdminApp:
+    """
+    WSGI callable that imports and builds the Flask admin on first use.
+
+    Flask, Flask-Admin and WTForms are only imported when the admin is loaded,
+    either by the lifespan warm-up or by the first admin request.
+    """
+
+    def __init__(self):
+        self._app = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._app is not None
+
+    def load(self):
+        if self._app is None:
+            with self._lock:
+                if self._app is None:
+                    from app.configuration.admin import create_admin_app
+                    self._app = create_admin_app()
+        return self._app
+
+    def __call__(self, environ, start_response):
+        return self.load()(environ, start_response)
+
+
+admin_app = LazyAdminApp()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Initializes subsystems after the worker has imported the application.
+
+    The async engine is built before the first request is accepted; the admin
+    panel is warmed up in a background thread so it does not delay serving.
+    """
+    ensure_media_folder()
+    get_engine()
+    warmup = asyncio.get_running_loop().run_in_executor(None, admin_app.load)
+    warmup.add_done_callback(_log_warmup_failure)
+
+    site_settings = settings.site_settings
+    if site_settings.SITES_ENABLED:
+        site_registry.database_urls = SiteRegistry.parse_database_urls(site_settings.SITE_DATABASE_URLS)
+        try:
+            await _refresh_sites()
+        except Exception:
+            # Requests resolve to the default site until the next refresh succeeds
+            logger.exception("Loading the sites failed")
+
+    # Every database, the default one and those of sites with their own, has its own
+    # outbox, change notifications and background maintenance
+    outbox_settings = settings.outbox_settings
+    app.state.outbox_publishers = []
+    if outbox_settings.OUTBOX_PUBLISHER_ENABLED:
+        sink = create_sink(outbox_settings.OUTBOX_SINK)
+        for database_url in _database_urls():
+            app.state.outbox_publishers.append(OutboxPublisher(
+                get_session_factory(database_url),
+                sink,
+                batch_size=outbox_settings.OUTBOX_BATCH_SIZE,
+                poll_interval=outbox_settings.OUTBOX_POLL_INTERVAL,
+                publish_timeout=outbox_settings.OUTBOX_PUBLISH_TIMEOUT,
+            ))
+    for publisher in app.state.outbox_publishers:
+        publisher.start()
+
+    cache_invalidation_settings = settings.cache_invalidation_settings
+    app.state.invalidation_listeners = []
+    if cache_invalidation_settings.CACHE_INVALIDATION_ENABLED:
+        for database_url in _database_urls():
+            app.state.invalidation_listeners.append(InvalidationListener(
+                _asyncpg_dsn(database_url),
+                CacheInvalidator(get_session_factory(database_url)),
+                keepalive=cache_invalidation_settings.CACHE_INVALIDATION_KEEPALIVE,
+            ))
+    for listener in app.state.invalidation_listeners:
+        listener.start()
+
+    load_shedding_settings = settings.load_shedding_settings
+    seat_map_snapshots.max_age = load_shedding_settings.SEAT_MAP_MAX_STALENESS
+    seat_map_snapshots.max_entries = load_shedding_settings.SEAT_MAP_SNAPSHOTS
+    if load_shedding_settings.LOAD_SHEDDING_ENABLED:
+        load_monitor.interval = load_shedding_settings.LOAD_SHEDDING_PROBE_INTERVAL
+        load_monitor.pool_wait_threshold = load_shedding_settings.LOAD_SHEDDING_POOL_WAIT_MS / 1000
+        load_monitor.latency_threshold = load_shedding_settings.LOAD_SHEDDING_DB_LATENCY_MS / 1000
+        load_monitor.recover_after = load_shedding_settings.LOAD_SHEDDING_RECOVERY_PROBES
+        load_monitor.start(get_engine())
+
+    profiler_settings = settings.profiler_settings
+    profiler.output_dir = profiler_settings.PROFILER_OUTPUT_DIR
+    profiler.interval = profiler_settings.PROFILER_INTERVAL_MS / 1000
+    profiler.max_duration = profiler_settings.PROFILER_MAX_DURATION
+
+    background_tasks = []
+    diagnostics_settings = settings.diagnostics_settings
+    app.state.query_diagnostics = None
+    if diagnostics_settings.QUERY_DIAGNOSTICS_ENABLED:
+        diagnostics = app.state.query_diagnostics = QueryDiagnostics(slow_ms=diagnostics_settings.QUERY_DIAGNOSTICS_SLOW_MS)
+        diagnostics.install(get_engine())
+        background_tasks.append(PeriodicTask("query-diagnostics", _flush_query_diagnostics(diagnostics),
+                                             diagnostics_settings.QUERY_DIAGNOSTICS_INTERVAL))
+    refresh_interval = settings.analytics_settings.OCCUPANCY_REFRESH_INTERVAL
+    if refresh_interval > 0:
+        background_tasks.append(PeriodicTask("occupancy-refresh", _refresh_occupancy, refresh_interval))
+    # Search indexes are rebuilt on their first lookup after the interval, so idle sites cost nothing
+    search_refresh_interval = settings.search_settings.SEARCH_INDEX_REFRESH_INTERVAL
+    MovieSearchIndex.max_age = search_refresh_interval if search_refresh_interval > 0 else None
+    if site_settings.SITES_ENABLED and site_settings.SITE_REGISTRY_REFRESH_INTERVAL > 0:
+        background_tasks.append(PeriodicTask("site-registry-refresh", _refresh_sites,
+                                             site_settings.SITE_REGISTRY_REFRESH_INTERVAL))
+    partition_interval = settings.partition_settings.PARTITION_MAINTENANCE_INTERVAL
+    if partition_interval > 0:
+        background_tasks.append(PeriodicTask("partition-maintenance", _maintain_partitions, partition_interval))
+    waitlist_expiry_interval = settings.waitlist_settings.WAITLIST_EXPIRY_INTERVAL
+    if waitlist_expiry_interval > 0:
+        background_tasks.append(PeriodicTask("waitlist-expiry", _expire_waitlist_offers, waitlist_expiry_interval))
+    for task in background_tasks:
+        task.start()
+    schedule_settings = settings.schedule_settings
+    if schedule_settings.SCHEDULE_REFRESH_INTERVAL > 0:
+        schedule_stores.interval = schedule_settings.SCHEDULE_REFRESH_INTERVAL
+        schedule_stores.min_interval = schedule_settings.SCHEDULE_MIN_REFRESH_INTERVAL
+        # The other sites' refreshers start with their first request
+        with site_scope(site_registry.default if site_settings.SITES_ENABLED else None):
+            schedule_stores.start(get_site_session_factory)
+
+    yield
+
+    await schedule_stores.stop()
+    await load_monitor.stop()
+    if profiler.running:
+        # Writes what was captured before the shutdown
+        await asyncio.to_thread(profiler.stop)
+    for task in background_tasks:
+        await task.stop()
+    for publisher in app.state.outbox_publishers:
+        await publisher.stop()
+    for listener in app.state.invalidation_listeners:
+        await listener.stop()
+    if app.state.query_diagnostics is not None:
+        await _flush_query_diagnostics(app.state.query_diagnostics)()
+    if get_bulk_layout_runner.cache_info().currsize:
+        # Finishes the running bulk layout job, dropping queued ones, and stops its worker processes
+        await asyncio.to_thread(get_bulk_layout_runner().shutdown)
+    await dispose_engines()
+
+
+def _database_urls() -> List[Optional[str]]:
+    """
+    The default database (None) and the distinct databases of sites listed in SITE_DATABASE_URLS.
+    """
+    return [None, *dict.fromkeys(site_registry.database_urls.values())]
+
+
+def _asyncpg_dsn(database_url: Optional[str]) -> str:
+    if database_url is None:
+        return settings.db_settings.db_dsn
+    # asyncpg takes a plain postgresql:// DSN, without the SQLAlchemy driver
+    return make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+async def _for_each_database(job: Callable[[Optional[str]], Awaitable[None]]) -> None:
+    for index, database_url in enumerate(_database_urls()):
+        try:
+            await job(database_url)
+        except Exception:
+            # An unreachable site database does not hold up the others
+            logger.exception("%s failed on database %d", job.__name__, index)
+
+
+async def _refresh_occupancy() -> None:
+    await _for_each_database(_refresh_database_occupancy)
+
+
+async def _refresh_database_occupancy(database_url: Optional[str]) -> None:
+    async with get_session_factory(database_url)() as db:
+        await refresh_occupancy_rollups(db)
+
+
+async def _refresh_sites() -> None:
+    async with get_session_factory()() as db:
+        site_registry.load(await get_all_sites(db))
+
+
+async def _maintain_partitions() -> None:
+    await _for_each_database(_maintain_database_partitions)
+
+
+async def _maintain_database_partitions(database_url: Optional[str]) -> None:
+    partition_settings = settings.partition_settings
+    session_factory = get_session_factory(database_url)
+    async with session_factory() as db:
+        created = await ensure_occupied_seat_partitions(db, partition_settings.OCCUPIED_SEATS_PARTITIONS_AHEAD)
+        await db.commit()
+    detached = []
+    if partition_settings.OCCUPIED_SEATS_RETENTION_DAYS > 0:
+        # Detached outside of a transaction, in a session of its own
+        async with session_factory() as db:
+            detached = await detach_expired_occupied_seat_partitions(
+                db, timedelta(days=partition_settings.OCCUPIED_SEATS_RETENTION_DAYS))
+    if created or detached:
+        logger.info("Created occupied seat partitions %s, detached %s", created, detached)
+
+
+async def _expire_waitlist_offers() -> None:
+    await _for_each_database(_expire_database_waitlist_offers)
+
+
+async def _expire_database_waitlist_offers(database_url: Optional[str]) -> None:
+    offer_ttl = timedelta(seconds=settings.waitlist_settings.WAITLIST_OFFER_TTL)
+    async with get_session_factory(database_url)() as db:
+        expired = await expire_waitlist_offers(db, offer_ttl)
+    if expired:
+        logger.info("Expired %d waitlist offers", expired)
+
+
+def _flush_query_diagnostics(diagnostics: QueryDiagnostics):
+    root, extension = os.path.splitext(settings.diagnostics_settings.QUERY_DIAGNOSTICS_REPORT)
+    # Workers keep separate statistics, so each writes its own report
+    path = f"{root}.{os.getpid()}{extension or '.json'}"
+
+    async def flush() -> None:
+        await diagnostics.flush(get_engine(), path)
+    return flush
+
+
+def _log_warmup_failure(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Admin warm-up failed", exc_info=future.exception())
@@ -47,4 +47,9 @@ LOGGING_CONFIG = {
     },
 }
 
-dictConfig(LOGGING_CONFIG)
+
+def configure_logging() -> None:
+    """
+    Applies LOGGING_CONFIG. Called once by the application entry point.
+    """
+    dictConfig(LOGGING_CONFIG)
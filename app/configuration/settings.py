@@ -8,11 +8,23 @@ class DBSettings(BaseSettings):
     DB_PASSWORD: str = os.environ.get("DB_PASSWORD", "your_password")
     DB_HOST: str = os.environ.get("DB_HOST", "localhost")
     DB_PORT: str = os.environ.get("DB_PORT", "5432")
+    DB_POOL_SIZE: int = int(os.environ.get("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+    DB_ADMIN_POOL_SIZE: int = int(os.environ.get("DB_ADMIN_POOL_SIZE", "2"))
+    DB_ADMIN_MAX_OVERFLOW: int = int(os.environ.get("DB_ADMIN_MAX_OVERFLOW", "2"))
+    # Total connections all workers of one instance may open, split by app.server.
+    DB_MAX_CONNECTIONS: int = int(os.environ.get("DB_MAX_CONNECTIONS", "60"))
 
     @property
     def db_url(self):
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+    @property
+    def db_dsn(self):
+        # For connections made with asyncpg directly, outside SQLAlchemy
+        return f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+
     @property
     def db_url_sync(self):
         return f"postgresql+psycopg2://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
@@ -23,12 +35,189 @@ class AppSettings(BaseSettings):
     PORT: int = int(os.environ.get("PORT", "8000"))
     RELOAD: bool = bool(os.environ.get("RELOAD_SERVER", "1"))
     SECRET_KEY: str = os.environ.get("SECRET_KEY", "your_secret_key")
+    # Sent as X-Admin-Token to the /internal endpoints; they are refused while it is empty
+    ADMIN_TOKEN: str = os.environ.get("ADMIN_TOKEN", "")
     DOMAIN: str = os.environ.get("DOMAIN", "127.0.0.1:8000")
+    # 0 sizes the worker count to the available CPUs.
+    WORKERS: int = int(os.environ.get("WEB_CONCURRENCY", "0"))
+    GRACEFUL_SHUTDOWN_TIMEOUT: int = int(os.environ.get("GRACEFUL_SHUTDOWN_TIMEOUT", "30"))
+    REDIS_URL: str = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+    # "uvicorn" (HTTP/1.1) or "hypercorn" (HTTP/2 over TLS, or cleartext h2c, and HTTP/1.1)
+    SERVER: str = os.environ.get("SERVER", "uvicorn")
+    TLS_CERTFILE: str = os.environ.get("TLS_CERTFILE", "")
+    TLS_KEYFILE: str = os.environ.get("TLS_KEYFILE", "")
+
+
+class OutboxSettings(BaseSettings):
+    # The change feed only lists the events numbered by a publisher
+    OUTBOX_PUBLISHER_ENABLED: bool = os.environ.get("OUTBOX_PUBLISHER_ENABLED", "1") == "1"
+    # "queue" for an in-process queue, "file:<path>" for a JSON lines file
+    OUTBOX_SINK: str = os.environ.get("OUTBOX_SINK", "queue")
+    OUTBOX_BATCH_SIZE: int = int(os.environ.get("OUTBOX_BATCH_SIZE", "100"))
+    OUTBOX_POLL_INTERVAL: float = float(os.environ.get("OUTBOX_POLL_INTERVAL", "1.0"))
+    # Seconds a sink gets to accept a batch, while the publishers wait on the numbering lock
+    OUTBOX_PUBLISH_TIMEOUT: float = float(os.environ.get("OUTBOX_PUBLISH_TIMEOUT", "10"))
+
+
+class AnalyticsSettings(BaseSettings):
+    # Seconds between full rebuilds of the occupancy rollups; 0 disables the job.
+    OCCUPANCY_REFRESH_INTERVAL: float = float(os.environ.get("OCCUPANCY_REFRESH_INTERVAL", "300"))
+
+
+class IdempotencySettings(BaseSettings):
+    # "memory" keeps keys per worker, "redis" shares them between workers and nodes
+    IDEMPOTENCY_BACKEND: str = os.environ.get("IDEMPOTENCY_BACKEND", "memory")
+    IDEMPOTENCY_TTL_SECONDS: float = float(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    IDEMPOTENCY_MAX_KEYS: int = int(os.environ.get("IDEMPOTENCY_MAX_KEYS", "100000"))
+    # How long a key stays claimed by a request that has not completed, about the request timeout
+    IDEMPOTENCY_PENDING_TTL_SECONDS: float = float(os.environ.get("IDEMPOTENCY_PENDING_TTL_SECONDS", "30"))
+
+
+class CacheInvalidationSettings(BaseSettings):
+    # LISTEN for the change notifications of the cache_invalidation triggers (PostgreSQL only)
+    CACHE_INVALIDATION_ENABLED: bool = os.environ.get("CACHE_INVALIDATION_ENABLED", "1") == "1"
+    # Seconds between checks that the listening connection is still alive
+    CACHE_INVALIDATION_KEEPALIVE: float = float(os.environ.get("CACHE_INVALIDATION_KEEPALIVE", "30"))
+
+
+class PricingSettings(BaseSettings):
+    # Include seat prices in the seat maps
+    PRICING_ENABLED: bool = os.environ.get("PRICING_ENABLED", "1") == "1"
+    # JSON pricing rules, see app.utils.pricing.DEFAULT_RULES for the format; empty uses the defaults.
+    PRICING_RULES: str = os.environ.get("PRICING_RULES", "")
+    # Sessions whose compiled prices each worker keeps
+    PRICING_CACHE_SESSIONS: int = int(os.environ.get("PRICING_CACHE_SESSIONS", "4096"))
+
+
+class SiteSettings(BaseSettings):
+    # Resolve every request to a site by its X-Site header or host name; off, all data is one site.
+    SITES_ENABLED: bool = os.environ.get("SITES_ENABLED", "0") == "1"
+    # JSON object of site slug to the database URL of sites with a database of their own
+    SITE_DATABASE_URLS: str = os.environ.get("SITE_DATABASE_URLS", "")
+    # Connection pool of each site database, per worker
+    SITE_DB_POOL_SIZE: int = int(os.environ.get("SITE_DB_POOL_SIZE", "2"))
+    SITE_DB_MAX_OVERFLOW: int = int(os.environ.get("SITE_DB_MAX_OVERFLOW", "3"))
+    # Seconds between reloads of the sites table
+    SITE_REGISTRY_REFRESH_INTERVAL: float = float(os.environ.get("SITE_REGISTRY_REFRESH_INTERVAL", "60"))
+
+
+class LoadSheddingSettings(BaseSettings):
+    # Probe the database and degrade when it is saturated: stale seat maps, low-priority routes shed
+    LOAD_SHEDDING_ENABLED: bool = os.environ.get("LOAD_SHEDDING_ENABLED", "1") == "1"
+    LOAD_SHEDDING_PROBE_INTERVAL: float = float(os.environ.get("LOAD_SHEDDING_PROBE_INTERVAL", "1"))
+    # Degraded when checking a connection out of the pool or SELECT 1 takes longer than this
+    LOAD_SHEDDING_POOL_WAIT_MS: float = float(os.environ.get("LOAD_SHEDDING_POOL_WAIT_MS", "200"))
+    LOAD_SHEDDING_DB_LATENCY_MS: float = float(os.environ.get("LOAD_SHEDDING_DB_LATENCY_MS", "250"))
+    # Consecutive probes under half the thresholds before leaving degraded mode
+    LOAD_SHEDDING_RECOVERY_PROBES: int = int(os.environ.get("LOAD_SHEDDING_RECOVERY_PROBES", "5"))
+    # Oldest seat map served while degraded, in seconds, and seat maps kept per worker
+    SEAT_MAP_MAX_STALENESS: float = float(os.environ.get("SEAT_MAP_MAX_STALENESS", "60"))
+    SEAT_MAP_SNAPSHOTS: int = int(os.environ.get("SEAT_MAP_SNAPSHOTS", "10000"))
+
+
+class BulkLayoutSettings(BaseSettings):
+    # Worker processes generating seat maps for bulk layout changes in the admin; 0 generates them in-process
+    BULK_LAYOUT_PROCESSES: int = int(os.environ.get("BULK_LAYOUT_PROCESSES", "2"))
+    # Rooms per chunk sent to a worker process and written back in one batch
+    BULK_LAYOUT_CHUNK_SIZE: int = int(os.environ.get("BULK_LAYOUT_CHUNK_SIZE", "50"))
+
+
+class ProfilerSettings(BaseSettings):
+    # Lets /internal/profiler capture stack samples of a worker; off unless set
+    PROFILER_ENABLED: bool = os.environ.get("PROFILER_ENABLED", "0") == "1"
+    PROFILER_OUTPUT_DIR: str = os.environ.get("PROFILER_OUTPUT_DIR", "profiles")
+    PROFILER_INTERVAL_MS: float = float(os.environ.get("PROFILER_INTERVAL_MS", "10"))
+    # Longest capture, in seconds
+    PROFILER_MAX_DURATION: float = float(os.environ.get("PROFILER_MAX_DURATION", "60"))
+
+
+class WaitlistSettings(BaseSettings):
+    # Seconds a waitlisted user has to accept an offered seat before it passes to the next one
+    WAITLIST_OFFER_TTL: float = float(os.environ.get("WAITLIST_OFFER_TTL", "600"))
+    # Seconds between passes releasing expired offers
+    WAITLIST_EXPIRY_INTERVAL: float = float(os.environ.get("WAITLIST_EXPIRY_INTERVAL", "30"))
+    # Longest a worker treats a session as sold out without seeing it full again
+    SOLD_OUT_CACHE_SECONDS: float = float(os.environ.get("SOLD_OUT_CACHE_SECONDS", "10"))
+
+
+class ScheduleSettings(BaseSettings):
+    # Seconds between rebuilds of the schedule snapshot; 0 disables the refresher.
+    SCHEDULE_REFRESH_INTERVAL: float = float(os.environ.get("SCHEDULE_REFRESH_INTERVAL", "5"))
+    # Rebuilds triggered by reservations wait until they pause for this many seconds
+    SCHEDULE_MIN_REFRESH_INTERVAL: float = float(os.environ.get("SCHEDULE_MIN_REFRESH_INTERVAL", "0.5"))
+
+
+class CompressionSettings(BaseSettings):
+    COMPRESSION_ENABLED: bool = os.environ.get("COMPRESSION_ENABLED", "1") == "1"
+    # Smaller bodies are sent as is; compressing them costs more than it saves
+    COMPRESSION_MINIMUM_SIZE: int = int(os.environ.get("COMPRESSION_MINIMUM_SIZE", "1024"))
+    COMPRESSION_GZIP_LEVEL: int = int(os.environ.get("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", "5"))
+    # Total size of the compressed bodies cached per worker; 0 disables the cache.
+    COMPRESSION_CACHE_BYTES: int = int(os.environ.get("COMPRESSION_CACHE_BYTES", str(16 * 1024 * 1024)))
+    # Larger bodies are compressed in a thread instead of on the event loop
+    COMPRESSION_OFFLOAD_SIZE: int = int(os.environ.get("COMPRESSION_OFFLOAD_SIZE", str(64 * 1024)))
+
+
+class PartitionSettings(BaseSettings):
+    # Seconds between maintenance runs of the occupied_seats partitions; 0 disables the job.
+    PARTITION_MAINTENANCE_INTERVAL: float = float(os.environ.get("PARTITION_MAINTENANCE_INTERVAL", "3600"))
+    # Empty partitions of 10 000 session IDs each kept ready ahead of the newest session
+    OCCUPIED_SEATS_PARTITIONS_AHEAD: int = int(os.environ.get("OCCUPIED_SEATS_PARTITIONS_AHEAD", "2"))
+    # Seats of sessions shown more than this many days ago are detached into archive tables; 0 keeps everything.
+    OCCUPIED_SEATS_RETENTION_DAYS: int = int(os.environ.get("OCCUPIED_SEATS_RETENTION_DAYS", "0"))
+
+
+class SearchSettings(BaseSettings):
+    # Seconds after which the typeahead index is rebuilt from the database on its next lookup; 0 keeps it
+    # until it is invalidated.
+    SEARCH_INDEX_REFRESH_INTERVAL: float = float(os.environ.get("SEARCH_INDEX_REFRESH_INTERVAL", "300"))
+
+
+class RateLimitSettings(BaseSettings):
+    RATE_LIMIT_ENABLED: bool = os.environ.get("RATE_LIMIT_ENABLED", "1") == "1"
+    # "memory" limits per worker, "redis" shares the buckets between workers and nodes
+    RATE_LIMIT_BACKEND: str = os.environ.get("RATE_LIMIT_BACKEND", "memory")
+    # Requests per client and RATE_LIMIT_PERIOD seconds, also the allowed burst
+    RATE_LIMIT_BROWSE: int = int(os.environ.get("RATE_LIMIT_BROWSE", "120"))
+    RATE_LIMIT_RESERVE: int = int(os.environ.get("RATE_LIMIT_RESERVE", "10"))
+    RATE_LIMIT_PERIOD: float = float(os.environ.get("RATE_LIMIT_PERIOD", "60"))
+    RATE_LIMIT_SHARDS: int = int(os.environ.get("RATE_LIMIT_SHARDS", "16"))
+    RATE_LIMIT_MAX_KEYS_PER_SHARD: int = int(os.environ.get("RATE_LIMIT_MAX_KEYS_PER_SHARD", "10000"))
+    # Comma-separated partner API keys, each limited on its own; other clients are limited by IP address
+    RATE_LIMIT_API_KEYS: str = os.environ.get("RATE_LIMIT_API_KEYS", "")
+
+
+class DiagnosticsSettings(BaseSettings):
+    # Records every statement with its repository function and duration; adds overhead, off by default.
+    QUERY_DIAGNOSTICS_ENABLED: bool = os.environ.get("QUERY_DIAGNOSTICS_ENABLED", "0") == "1"
+    # Statements slower than this many milliseconds get their plan captured
+    QUERY_DIAGNOSTICS_SLOW_MS: float = float(os.environ.get("QUERY_DIAGNOSTICS_SLOW_MS", "100"))
+    # Each worker writes <name>.<pid>.json next to this path
+    QUERY_DIAGNOSTICS_REPORT: str = os.environ.get("QUERY_DIAGNOSTICS_REPORT", "slow_queries.json")
+    # Seconds between plan captures and report writes
+    QUERY_DIAGNOSTICS_INTERVAL: float = float(os.environ.get("QUERY_DIAGNOSTICS_INTERVAL", "60"))
 
 
 class Settings(BaseSettings):
     db_settings: DBSettings = DBSettings()
     app_settings: AppSettings = AppSettings()
+    outbox_settings: OutboxSettings = OutboxSettings()
+    analytics_settings: AnalyticsSettings = AnalyticsSettings()
+    idempotency_settings: IdempotencySettings = IdempotencySettings()
+    rate_limit_settings: RateLimitSettings = RateLimitSettings()
+    search_settings: SearchSettings = SearchSettings()
+    partition_settings: PartitionSettings = PartitionSettings()
+    compression_settings: CompressionSettings = CompressionSettings()
+    schedule_settings: ScheduleSettings = ScheduleSettings()
+    pricing_settings: PricingSettings = PricingSettings()
+    site_settings: SiteSettings = SiteSettings()
+    load_shedding_settings: LoadSheddingSettings = LoadSheddingSettings()
+    bulk_layout_settings: BulkLayoutSettings = BulkLayoutSettings()
+    profiler_settings: ProfilerSettings = ProfilerSettings()
+    waitlist_settings: WaitlistSettings = WaitlistSettings()
+    cache_invalidation_settings: CacheInvalidationSettings = CacheInvalidationSettings()
+    diagnostics_settings: DiagnosticsSettings = DiagnosticsSettings()
 
 
 settings = Settings()
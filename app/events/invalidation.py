@@ -0,0 +1,205 @@
+import asyncio
+import logging
+from typing import List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy.orm import sessionmaker
+
+from app.repositories.move_repository import get_moves_by_ids
+from app.utils.room_layout import layout_cache
+from app.utils.schedule import schedule_stores
+from app.utils.search_index import movie_search_indexes
+from app.utils.sold_out import sold_out_sessions
+from app.utils.tenancy import SiteLocal
+
+logger = logging.getLogger(__name__)
+
+# The channel the cache invalidation triggers publish on (migrations c9e4a1d7f203 and 7a3e1c5b9d20)
+CHANNEL = "cache_invalidation"
+
+
+class Notification(NamedTuple):
+    table: str
+    key: int
+    # INSERT, UPDATE or DELETE; None from triggers older than migration 7a3e1c5b9d20
+    operation: Optional[str] = None
+    # The site of the changed row, None if it is not known
+    site_id: Optional[int] = None
+
+
+def parse_notification(payload: str) -> Optional[Notification]:
+    """
+    Parses a "<table>:<key>[:<operation>[:<site_id>]]" notification.
+
+    Returns:
+        Optional[Notification]: The notification, or None if the payload is malformed.
+    """
+    table, key, operation, site_id = (payload.split(":", 3) + [None] * 3)[:4]
+    try:
+        return Notification(table, int(key or ""), operation or None, int(site_id) if site_id else None)
+    except ValueError:
+        return None
+
+
+class CacheInvalidator:
+    """
+    Evicts the per-worker cache entries affected by a database change.
+
+    Room edits evict the room's decoded layout; movie edits re-read just the
+    changed movies into the search index of their site; released seats unmark
+    the session as sold out in its site; any change to rooms, movies, sessions
+    or seats asks the site of the change (every site if it is not known) for a
+    schedule rebuild. Movie reloads are batched: the IDs of a burst of
+    notifications are fetched with one query. `session_factory` must not be
+    scoped to a site.
+    """
+
+    def __init__(self, session_factory: sessionmaker):
+        self.session_factory = session_factory
+        self._changed_movies: Set[int] = set()
+        self._movies_changed = asyncio.Event()
+
+    def handle(self, table: str, key: int, operation: Optional[str] = None, site_id: Optional[int] = None) -> None:
+        if table == "cinema_rooms":
+            layout_cache.invalidate(key)
+        elif table == "moves":
+            self._changed_movies.add(key)
+            self._movies_changed.set()
+        elif table == "occupied_seats":
+            # Only released seats can make a sold-out session bookable again
+            if operation == "DELETE":
+                for _, sold_out in self._site_items(sold_out_sessions, site_id):
+                    sold_out.discard(key)
+        elif table != "sessions":
+            return
+        for _, store in self._site_items(schedule_stores, site_id):
+            store.notify()
+
+    @staticmethod
+    def _site_items(caches: SiteLocal, site_id: Optional[int]) -> List[Tuple[int, object]]:
+        items = caches.items()
+        return items if site_id is None else [(item_site, cache) for item_site, cache in items if item_site == site_id]
+
+    def reset(self) -> None:
+        """
+        Drops every cached entry, for when notifications may have been missed.
+        """
+        layout_cache.clear()
+        for _, sold_out in sold_out_sessions.items():
+            sold_out.clear()
+        for _, index in movie_search_indexes.items():
+            index.invalidate()
+        self._changed_movies.clear()
+        schedule_stores.notify_all()
+
+    async def reload_movies(self) -> int:
+        """
+        Re-reads the movies changed since the last call into the search index.
+
+        Returns:
+            int: The number of changed movies.
+        """
+        changed, self._changed_movies = self._changed_movies, set()
+        self._movies_changed.clear()
+        indexes = [(site_id, index) for site_id, index in movie_search_indexes.items() if index.loaded]
+        if not changed or not indexes:
+            return len(changed)
+        async with self.session_factory() as db:
+            movies = {movie.id: movie for movie in await get_moves_by_ids(db, changed)}
+        for site_id, index in indexes:
+            for movie_id in changed:
+                movie = movies.get(movie_id)
+                if movie is not None and movie.site_id == site_id:
+                    index.add(movie)
+                else:
+                    # Deleted, or moved to another site
+                    index.remove(movie_id)
+        return len(changed)
+
+    async def run(self) -> None:
+        while True:
+            await self._movies_changed.wait()
+            try:
+                await self.reload_movies()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Reloading changed movies failed, rebuilding the search indexes")
+                for _, index in movie_search_indexes.items():
+                    index.invalidate()
+
+
+class InvalidationListener:
+    """
+    Per-worker LISTEN connection on the cache invalidation channel.
+
+    Uses a dedicated asyncpg connection outside the pool. A lost connection
+    means notifications may have been missed, so every cache is reset before
+    listening again; the connection is also checked every `keepalive` seconds
+    so a silently dropped one does not go unnoticed.
+    """
+
+    def __init__(self, dsn: str, invalidator: CacheInvalidator, channel: str = CHANNEL,
+                 keepalive: float = 30.0, reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0):
+        self.dsn = dsn
+        self.invalidator = invalidator
+        self.channel = channel
+        self.keepalive = keepalive
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._tasks = []
+
+    def _on_notification(self, connection, pid, channel, payload) -> None:
+        parsed = parse_notification(payload)
+        if parsed is None:
+            logger.warning("Ignoring malformed cache invalidation %r", payload)
+            return
+        self.invalidator.handle(*parsed)
+
+    async def listen(self) -> None:
+        """
+        Listens until the connection is lost.
+        """
+        import asyncpg
+
+        connection = await asyncpg.connect(self.dsn)
+        terminated = asyncio.Event()
+        connection.add_termination_listener(lambda _: terminated.set())
+        try:
+            await connection.add_listener(self.channel, self._on_notification)
+            # Changes made while not listening were missed
+            self.invalidator.reset()
+            while not terminated.is_set():
+                try:
+                    await asyncio.wait_for(terminated.wait(), timeout=self.keepalive)
+                except asyncio.TimeoutError:
+                    await connection.execute("SELECT 1")
+        finally:
+            if not connection.is_closed():
+                await connection.close(timeout=5)
+
+    async def run(self) -> None:
+        delay = self.reconnect_delay
+        while True:
+            try:
+                await self.listen()
+                delay = self.reconnect_delay
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Cache invalidation listener disconnected, retrying in %.0fs", delay, exc_info=True)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self.run(), name="cache-invalidation-listener"),
+                       asyncio.create_task(self.invalidator.run(), name="cache-invalidation-movies")]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
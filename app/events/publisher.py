@@ -0,0 +1,104 @@
+import asyncio
+import json
+import logging
+from typing import Optional
+
+from sqlalchemy.orm import sessionmaker
+
+from app.events.sinks import EventSink
+from app.models.cinema import OutboxEvent
+from app.repositories.outbox_repository import assign_event_sequence, get_unpublished_events, mark_events_published
+
+logger = logging.getLogger(__name__)
+
+# Payload fields delivered to the sinks, which notify users, but left out of the change feed
+PERSONAL_FIELDS = ("contact",)
+
+
+def serialize_event(event: OutboxEvent, redact: bool = False) -> dict:
+    """
+    Converts an outbox row into the message delivered to sinks and change feed consumers.
+
+    Args:
+        event (OutboxEvent): The outbox row.
+        redact (bool): Whether to leave out the personal data of the payload.
+    """
+    payload = json.loads(event.payload)
+    if redact:
+        for field in PERSONAL_FIELDS:
+            payload.pop(field, None)
+    return {
+        "id": event.id,
+        "sequence": event.sequence,
+        "event_type": event.event_type,
+        "payload": payload,
+        "created_at": event.created_at.isoformat() if event.created_at else None,
+    }
+
+
+class OutboxPublisher:
+    """
+    Background task that drains the outbox in batches into a sink.
+
+    Delivery is at-least-once: a batch is marked as published only after the
+    sink accepted it, so a crash in between publishes the batch again. Each
+    batch is numbered for the change feed in the same transaction.
+
+    Numbering holds a lock every publisher waits on until the batch is
+    committed, so the sink gets `publish_timeout` seconds to accept it; a batch
+    it did not accept in time is rolled back and retried.
+    """
+
+    def __init__(self, session_factory: sessionmaker, sink: EventSink,
+                 batch_size: int = 100, poll_interval: float = 1.0, publish_timeout: float = 10.0):
+        self.session_factory = session_factory
+        self.sink = sink
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.publish_timeout = publish_timeout
+        self._task: Optional[asyncio.Task] = None
+
+    async def publish_batch(self) -> int:
+        """
+        Publishes one batch of pending events.
+
+        Returns:
+            int: The number of events published.
+        """
+        async with self.session_factory() as db:
+            events = await get_unpublished_events(db, self.batch_size)
+            if not events:
+                await db.rollback()
+                return 0
+            await assign_event_sequence(db, events)
+            await asyncio.wait_for(self.sink.publish([serialize_event(event) for event in events]),
+                                   self.publish_timeout)
+            await mark_events_published(db, [event.id for event in events])
+            await db.commit()
+            return len(events)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                published = await self.publish_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Publishing outbox events failed")
+                published = 0
+            if published < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self) -> asyncio.Task:
+        self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -0,0 +1,65 @@
+import asyncio
+import json
+from typing import List, Protocol
+
+
+class EventSink(Protocol):
+    """
+    Destination for published outbox events.
+
+    `publish` receives a whole batch and must raise if it could not be delivered,
+    in which case the batch stays in the outbox and is retried.
+    """
+
+    async def publish(self, events: List[dict]) -> None:
+        ...
+
+
+class QueueSink:
+    """
+    Publishes events to an in-process asyncio queue, one item per event.
+    """
+
+    def __init__(self, queue: asyncio.Queue = None):
+        self.queue = queue if queue is not None else asyncio.Queue()
+
+    async def publish(self, events: List[dict]) -> None:
+        for event in events:
+            await self.queue.put(event)
+
+
+class FileSink:
+    """
+    Appends events to a local file as JSON lines.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _write(self, lines: str) -> None:
+        with open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(lines)
+
+    async def publish(self, events: List[dict]) -> None:
+        lines = "".join(json.dumps(event) + "\n" for event in events)
+        await asyncio.to_thread(self._write, lines)
+
+
+def create_sink(spec: str) -> EventSink:
+    """
+    Builds a sink from its configuration string.
+
+    Args:
+        spec (str): "queue" for an in-process queue or "file:<path>" for a JSON lines file.
+
+    Raises:
+        ValueError: If the sink type is unknown.
+
+    Returns:
+        EventSink: The configured sink.
+    """
+    if spec == "queue":
+        return QueueSink()
+    if spec.startswith("file:"):
+        return FileSink(spec[len("file:"):])
+    raise ValueError(f"Unknown outbox sink: {spec}")
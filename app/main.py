@@ -1,25 +1,84 @@
-import logging
-
 from fastapi import FastAPI
 from starlette.middleware.wsgi import WSGIMiddleware
 from starlette.staticfiles import StaticFiles
 
-from app.configuration.admin import flask_app
-from app.configuration.logging_config import LOGGING_CONFIG
+from app.configuration.lifespan import admin_app, lifespan
+from app.configuration.logging_config import configure_logging
 from app.configuration.settings import settings
-from app.routes import cinema_room_controller
+from app.routes import (
+    analytics_controller, cinema_room_controller, event_controller, profiler_controller, schedule_controller,
+    waitlist_controller
+)
+from app.utils.compression import CompressedBodyCache, CompressionMiddleware
+from app.utils.constands import MEDIA_FOLDER
+from app.utils.load_shedding import LoadSheddingMiddleware, load_monitor
+from app.utils.profiler import ProfilingMiddleware, profiler
+from app.utils.rate_limit import BROWSE, RESERVE, RateLimitMiddleware, RateLimitRule, create_rate_limit_store
+from app.utils.tenancy import SiteMiddleware, site_registry
 
-logging.config.dictConfig(LOGGING_CONFIG)
+configure_logging()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.include_router(cinema_room_controller.router)
-app.mount("/", WSGIMiddleware(flask_app))
-app.mount("/media", StaticFiles(directory="./media"), name="media")
+app.include_router(event_controller.router)
+app.include_router(analytics_controller.router)
+app.include_router(schedule_controller.router)
+app.include_router(profiler_controller.router)
+app.include_router(waitlist_controller.router)
+
+# Added first so it is the innermost middleware and route profiles leave out the other middlewares
+if settings.profiler_settings.PROFILER_ENABLED:
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+if settings.site_settings.SITES_ENABLED:
+    app.add_middleware(SiteMiddleware, registry=site_registry)
+
+if settings.load_shedding_settings.LOAD_SHEDDING_ENABLED:
+    app.add_middleware(LoadSheddingMiddleware, monitor=load_monitor)
+
+compression_settings = settings.compression_settings
+if compression_settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=compression_settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=compression_settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=compression_settings.COMPRESSION_BROTLI_QUALITY,
+        cache=CompressedBodyCache(compression_settings.COMPRESSION_CACHE_BYTES)
+        if compression_settings.COMPRESSION_CACHE_BYTES > 0 else None,
+        offload_size=compression_settings.COMPRESSION_OFFLOAD_SIZE,
+    )
+
+# Added last so it runs first and rejects requests before any work is done
+rate_limit_settings = settings.rate_limit_settings
+if rate_limit_settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(
+        RateLimitMiddleware,
+        store=create_rate_limit_store(
+            rate_limit_settings.RATE_LIMIT_BACKEND,
+            shards=rate_limit_settings.RATE_LIMIT_SHARDS,
+            max_keys_per_shard=rate_limit_settings.RATE_LIMIT_MAX_KEYS_PER_SHARD,
+            redis_url=settings.app_settings.REDIS_URL,
+        ),
+        rules={
+            BROWSE: RateLimitRule(rate_limit_settings.RATE_LIMIT_BROWSE, rate_limit_settings.RATE_LIMIT_PERIOD),
+            RESERVE: RateLimitRule(rate_limit_settings.RATE_LIMIT_RESERVE, rate_limit_settings.RATE_LIMIT_PERIOD),
+        },
+        api_keys=[key.strip() for key in rate_limit_settings.RATE_LIMIT_API_KEYS.split(",")],
+    )
+
+
+@app.get("/health", include_in_schema=False)
+async def health():
+    return {"status": "ok"}
+
+
+app.mount("/media", StaticFiles(directory=MEDIA_FOLDER, check_dir=False), name="media")
+app.mount("/", WSGIMiddleware(admin_app))
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app",
+    uvicorn.run("app.main:app",
                 host=settings.app_settings.HOST,
                 port=settings.app_settings.PORT,
-                reload=True)
\ No newline at end of file
+                reload=settings.app_settings.RELOAD)
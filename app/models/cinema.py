@@ -1,17 +1,64 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Float, Time
-from sqlalchemy.orm import relationship, backref
+from sqlalchemy import (DDL, Column, Date, Integer, String, ForeignKey, Float, Time, DateTime, Index, LargeBinary,
+                        UniqueConstraint, event, func)
+from sqlalchemy.orm import declared_attr, relationship, backref
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
 
+# Existing data belongs to this site, and requests without a site resolve to it
+DEFAULT_SITE_ID = 1
 
-class CinemaRoom(Base):
+
+class Site(Base):
+    """
+    One cinema of a multi-site deployment, see app.utils.tenancy.
+
+    Requests are routed to a site by its `slug` in the X-Site header or by its
+    `hostname`. Rooms, movies and sessions belong to one site; showtimes are shared.
+    """
+    __tablename__ = 'sites'
+    id = Column(Integer, primary_key=True, index=True)
+    slug = Column(String(50), nullable=False, unique=True)
+    name = Column(String(100), nullable=False)
+    hostname = Column(String(255), nullable=True, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+# Mirrors the migration, so databases created from the models have the default site too
+event.listen(Site.__table__, 'after_create', DDL(
+    f"INSERT INTO sites (id, slug, name) VALUES ({DEFAULT_SITE_ID}, 'default', 'Default')"))
+event.listen(Site.__table__, 'after_create', DDL(
+    "SELECT setval(pg_get_serial_sequence('sites', 'id'), (SELECT max(id) FROM sites))"
+).execute_if(dialect='postgresql'))
+
+
+class SiteScoped:
+    """
+    Rows belonging to one site. Queries made while a site is set are filtered to
+    that site and new rows default to it, see app.utils.tenancy.
+    """
+
+    @declared_attr
+    def site_id(cls):
+        return Column(Integer, ForeignKey('sites.id'), nullable=False, index=True,
+                      default=DEFAULT_SITE_ID, server_default=str(DEFAULT_SITE_ID))
+
+    @declared_attr
+    def site(cls):
+        return relationship('Site')
+
+
+class CinemaRoom(SiteScoped, Base):
     __tablename__ = 'cinema_rooms'
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(50), nullable=False)
+    name = Column(String(50), nullable=False, index=True)
     column = Column(Integer, default=10)
     row = Column(Integer, default=10)
     seating = Column(String)
+    # One seat type code per seat in row-major order, see app.utils.room_layout
+    layout = Column(LargeBinary, nullable=True)
 
     def __str__(self):
         return self.name
@@ -26,42 +73,185 @@ class MoveTime(Base):
         return str(self.time)
 
 
-class Move(Base):
+class Move(SiteScoped, Base):
     __tablename__ = 'moves'
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
     move_time_length = Column(Float, nullable=False)
     movie_cover = Column(String)
 
+    # Trigram index for substring and fuzzy title search; the full-text index on
+    # to_tsvector('simple', name) is an expression index created by the migration only.
+    __table_args__ = (
+        Index('ix_moves_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
+
     def __str__(self):
         return self.name
 
 
-class Session(Base):
+class Session(SiteScoped, Base):
     __tablename__ = 'sessions'
     id = Column(Integer, primary_key=True, index=True)
     cinema_room_id = Column(Integer, ForeignKey('cinema_rooms.id'), nullable=False)
-    move_id = Column(Integer, ForeignKey('moves.id'), nullable=False)
-    move_time_id = Column(Integer, ForeignKey('move_times.id'), nullable=False)
+    move_id = Column(Integer, ForeignKey('moves.id'), nullable=False, index=True)
+    move_time_id = Column(Integer, ForeignKey('move_times.id'), nullable=False, index=True)
+    # The day of the screening; seats of sessions shown long enough ago are archived,
+    # see app.repositories.partition_repository. Sessions without one are kept.
+    show_date = Column(Date, nullable=True)
 
     cinema_room = relationship('CinemaRoom', backref='sessions')
     move = relationship('Move', backref='sessions')
     move_time = relationship('MoveTime', backref='sessions')
 
+    # Serves get_session_by_room_and_film and lookups by room; on PostgreSQL the
+    # remaining columns are included so the session is read from the index alone.
+    __table_args__ = (
+        Index('ix_sessions_room_move', 'cinema_room_id', 'move_id',
+              postgresql_include=['id', 'move_time_id', 'site_id', 'show_date']),
+    )
+
     def __str__(self):
         return f"{self.move.name} in {self.cinema_room.name} at {self.move_time.time}"
 
 
 class OccupiedSeat(Base):
+    # On PostgreSQL the table is range-partitioned by session_id, with a primary key
+    # of (id, session_id); the partitioning is created by the migration only, see
+    # app.repositories.partition_repository.
     __tablename__ = 'occupied_seats'
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey('sessions.id'), nullable=False)
     row = Column(Integer, nullable=False)
     column = Column(Integer, nullable=False)
+    # Issued with the reservation; cancelling the seat requires it, or the admin token.
+    # Seats reserved before tokens were issued have none.
+    token = Column(String(64), nullable=True)
 
     session = relationship('Session', backref=backref('occupied_seats', cascade='all, delete-orphan'))
 
+    # A seat can be reserved once per session, even by concurrent requests. The
+    # constraint's index also serves every lookup by session_id, so it needs no index of its own.
+    # IDs identify reservations, e.g. the seat held for a waitlist offer, so SQLite must not reuse them.
+    __table_args__ = (
+        UniqueConstraint('session_id', 'row', 'column', name='uq_occupied_seats_session_seat'),
+        {'sqlite_autoincrement': True},
+    )
+
     def __str__(self):
         return f"Seat at row {self.row}, column {self.column} for session {self.session_id}"
 
 
+# WaitlistEntry statuses
+WAITLIST_WAITING = 'waiting'
+WAITLIST_OFFERED = 'offered'
+WAITLIST_ACCEPTED = 'accepted'
+WAITLIST_EXPIRED = 'expired'
+WAITLIST_CANCELLED = 'cancelled'
+
+
+class WaitlistEntry(Base):
+    """
+    A place in the waitlist of a sold-out session, served in `id` order.
+
+    When seats of the session are released, each is reserved for the next
+    waiting entry, which becomes "offered" with the seat and a deadline to
+    accept it; an offer not accepted in time passes the seat on. `seat_id` is
+    the OccupiedSeat held for the offer, so only that reservation is released
+    with it. `token` authenticates the holder of the entry.
+    """
+    __tablename__ = 'waitlist_entries'
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey('sessions.id'), nullable=False)
+    contact = Column(String(255), nullable=False)
+    token = Column(String(64), nullable=False)
+    status = Column(String(16), nullable=False, default=WAITLIST_WAITING)
+    row = Column(Integer, nullable=True)
+    column = Column(Integer, nullable=True)
+    # No foreign key: occupied_seats is partitioned, with a composite primary key on PostgreSQL
+    seat_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    offer_expires_at = Column(DateTime, nullable=True)
+
+    session = relationship('Session', backref=backref('waitlist_entries', cascade='all, delete-orphan'))
+
+    # The queue of a session is read in order from the waiting entries only; expired
+    # offers are found through the deadlines of the offered ones.
+    __table_args__ = (
+        Index('ix_waitlist_entries_waiting', 'session_id', 'id',
+              postgresql_where=status == WAITLIST_WAITING, sqlite_where=status == WAITLIST_WAITING),
+        Index('ix_waitlist_entries_offered', 'offer_expires_at',
+              postgresql_where=status == WAITLIST_OFFERED, sqlite_where=status == WAITLIST_OFFERED),
+    )
+
+    def __str__(self):
+        return f"Waitlist #{self.id} for session {self.session_id} ({self.status})"
+
+
+class OccupancyRollup(SiteScoped, Base):
+    """
+    Incrementally maintained occupancy aggregate for one movie, room or showtime of a site.
+
+    `dimension` is one of "move", "cinema_room", "move_time" or "session" and
+    `key_id` the ID of the corresponding row. Showtimes are shared, so each site
+    has its own rollup of a showtime.
+    """
+    __tablename__ = 'occupancy_rollups'
+    # Part of the primary key, which also serves the lookups by site
+    site_id = Column(Integer, ForeignKey('sites.id'), primary_key=True,
+                     default=DEFAULT_SITE_ID, server_default=str(DEFAULT_SITE_ID))
+    dimension = Column(String(16), primary_key=True)
+    key_id = Column(Integer, primary_key=True)
+    capacity = Column(Integer, nullable=False, default=0)
+    occupied = Column(Integer, nullable=False, default=0)
+
+    def __str__(self):
+        return f"{self.dimension} {self.key_id}: {self.occupied}/{self.capacity}"
+
+
+class OutboxEvent(SiteScoped, Base):
+    """
+    Transactional outbox: events are inserted in the same transaction as the change
+    they describe and published asynchronously by app.events.publisher. Each
+    event belongs to the site of the session it describes.
+
+    `id` follows insertion, not commit, order; `sequence` is assigned by the
+    publisher one batch at a time after the events committed, so it only grows
+    in commit order and is the cursor of the change feed.
+    """
+    __tablename__ = 'outbox_events'
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(String(50), nullable=False)
+    payload = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    published_at = Column(DateTime, nullable=True)
+    sequence = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index('ix_outbox_events_unpublished', 'id',
+              postgresql_where=published_at.is_(None), sqlite_where=published_at.is_(None)),
+        UniqueConstraint('sequence', name='uq_outbox_events_sequence'),
+    )
+
+    def __str__(self):
+        return f"{self.event_type} #{self.id}"
+
+
+class BulkLayoutJobState(Base):
+    """
+    Progress of a bulk layout job of the admin, see app.utils.bulk_layouts.
+
+    Written by the worker running the job, so the admin of every worker can show it.
+    Times are Unix timestamps, as in the job's JSON.
+    """
+    __tablename__ = 'bulk_layout_jobs'
+    id = Column(String(12), primary_key=True)
+    status = Column(String(16), nullable=False)
+    total = Column(Integer, nullable=False, default=0)
+    done = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+    created_at = Column(Float, nullable=False, index=True)
+    finished_at = Column(Float, nullable=True)
+
+    def __str__(self):
+        return f"Bulk layout job {self.id} ({self.status})"
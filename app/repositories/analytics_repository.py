@@ -0,0 +1,208 @@
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import and_, case, delete, func, literal, select, text, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.cinema import CinemaRoom, Session, OccupiedSeat, OccupancyRollup
+from app.utils.room_layout import layout_cache
+from app.utils.tenancy import current_site_id
+
+# Makes one worker at a time reconcile the rollups
+OCCUPANCY_REFRESH_LOCK_ID = 0x0CC0FA11
+
+# Rollup dimension -> the sessions column it is keyed by
+DIMENSIONS = {
+    "move": Session.move_id,
+    "cinema_room": Session.cinema_room_id,
+    "move_time": Session.move_time_id,
+    # Per session, to tell when a session is sold out
+    "session": Session.id,
+}
+
+
+def _insert(db: AsyncSession):
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    return dialect.insert(OccupancyRollup)
+
+
+class OccupancyKeys(NamedTuple):
+    """
+    The rollups of a session: its site and its key in each dimension.
+    """
+    site_id: int
+    by_dimension: Dict[str, int]
+
+
+def occupancy_keys(session: Session) -> OccupancyKeys:
+    """
+    Returns the rollup keys of a session, to be read before the session is committed and expired.
+    """
+    return OccupancyKeys(session.site_id, {
+        "move": session.move_id,
+        "cinema_room": session.cinema_room_id,
+        "move_time": session.move_time_id,
+        "session": session.id,
+    })
+
+
+async def increment_occupancy(db: AsyncSession, keys: OccupancyKeys, occupied: int = 0, capacity: int = 0) -> int:
+    """
+    Adds to the rollups of a session's movie, room and showtime and of the session
+    itself. The caller commits.
+
+    Called in a transaction of its own, once the change it counts has committed,
+    and committed right away: the rows of a movie or room are shared by all of
+    its reservations, so they are locked for this one statement instead of for
+    the whole reservation transaction. They are
+    upserted in a fixed order so concurrent increments always lock them in the
+    same sequence. A change whose increment is lost, e.g. to a crash right after
+    its commit, is corrected by refresh_occupancy_rollups.
+
+    Args:
+        db (AsyncSession): The database session, with nothing left to commit.
+        keys (OccupancyKeys): The session's rollup keys, see occupancy_keys.
+        occupied (int): The change in occupied seats (negative for releases).
+        capacity (int): The change in seat capacity.
+
+    Returns:
+        int: The session's occupied seats after the change, including those of concurrent
+        increments that committed first.
+    """
+    stmt = _insert(db).values([
+        {"site_id": keys.site_id, "dimension": dimension, "key_id": key_id,
+         "occupied": occupied, "capacity": capacity}
+        for dimension, key_id in sorted(keys.by_dimension.items())
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[OccupancyRollup.site_id, OccupancyRollup.dimension, OccupancyRollup.key_id],
+        set_={
+            "occupied": OccupancyRollup.occupied + stmt.excluded.occupied,
+            "capacity": OccupancyRollup.capacity + stmt.excluded.capacity,
+        },
+    ).returning(OccupancyRollup.dimension, OccupancyRollup.occupied)
+    result = (await db.execute(stmt)).all()
+    return next(count for dimension, count in result if dimension == "session")
+
+
+async def get_occupancy(db: AsyncSession, dimension: str, key_id: int) -> Optional[OccupancyRollup]:
+    """
+    Fetches the current site's rollup of a single movie, room or showtime by primary key.
+
+    Args:
+        db (AsyncSession): The database session.
+        dimension (str): "move", "cinema_room", "move_time" or "session".
+        key_id (int): The ID of the movie, room or showtime.
+
+    Returns:
+        Optional[OccupancyRollup]: The rollup if any session references the key, else None.
+    """
+    return await db.get(OccupancyRollup, (current_site_id(), dimension, key_id))
+
+
+async def get_occupancy_by_dimension(db: AsyncSession, dimension: str) -> List[OccupancyRollup]:
+    """
+    Fetches all rollups of one dimension, of the current site when one is set.
+
+    Args:
+        db (AsyncSession): The database session.
+        dimension (str): "move", "cinema_room", "move_time" or "session".
+
+    Returns:
+        List[OccupancyRollup]: The rollups ordered by key.
+    """
+    result = await db.execute(
+        select(OccupancyRollup)
+        .where(OccupancyRollup.dimension == dimension)
+        .order_by(OccupancyRollup.key_id)
+    )
+    return result.scalars().all()
+
+
+async def refresh_occupancy_rollups(db: AsyncSession) -> int:
+    """
+    Reconciles the rollups with the sessions and occupied seats, and commits.
+
+    Picks up changes that bypass the incremental path, such as sessions created
+    or rooms resized in the admin panel, and increments that were lost. Each
+    rollup is corrected by the difference between its true value and its value
+    in the snapshot of the correcting statement, added to its current value, so
+    increments committed meanwhile are kept and reservations never wait for the
+    reconciliation. Increments still in flight when it runs are corrected by the
+    next one. Rollups are kept per site, as showtimes are shared between sites.
+    On PostgreSQL one worker reconciles at a time and the others skip their turn.
+
+    Args:
+        db (AsyncSession): The database session.
+
+    Returns:
+        int: The number of rollup rows corrected.
+    """
+    if db.bind.dialect.name == "postgresql":
+        locked = await db.scalar(text("SELECT pg_try_advisory_xact_lock(:lock_id)"),
+                                 {"lock_id": OCCUPANCY_REFRESH_LOCK_ID})
+        if not locked:
+            await db.rollback()
+            return 0
+
+    # Capacity comes from the room layouts, which are few and decoded in Python
+    rooms = await db.execute(select(CinemaRoom))
+    room_capacities = {room.id: layout_cache.get(room).capacity for room in rooms.scalars()}
+    session_capacity = (case(room_capacities, value=Session.cinema_room_id, else_=0)
+                        if room_capacities else literal(0))
+
+    corrected = 0
+    for dimension, column in DIMENSIONS.items():
+        capacities = (
+            select(Session.site_id, column.label("key_id"), func.sum(session_capacity).label("capacity"))
+            .group_by(Session.site_id, column)
+            .subquery()
+        )
+        occupied = (
+            select(Session.site_id, column.label("key_id"), func.count(OccupiedSeat.id).label("occupied"))
+            .join(Session, Session.id == OccupiedSeat.session_id)
+            .group_by(Session.site_id, column)
+            .subquery()
+        )
+        current = (
+            select(OccupancyRollup.site_id, OccupancyRollup.key_id,
+                   OccupancyRollup.capacity, OccupancyRollup.occupied)
+            .where(OccupancyRollup.dimension == dimension)
+            .subquery()
+        )
+        # The true values and the rollups are read in the snapshot of one statement
+        true_occupied = func.coalesce(occupied.c.occupied, 0)
+        deltas = (
+            select(capacities.c.site_id, literal(dimension), capacities.c.key_id,
+                   capacities.c.capacity - func.coalesce(current.c.capacity, 0),
+                   true_occupied - func.coalesce(current.c.occupied, 0))
+            .select_from(capacities)
+            .outerjoin(occupied, and_(occupied.c.site_id == capacities.c.site_id,
+                                      occupied.c.key_id == capacities.c.key_id))
+            .outerjoin(current, and_(current.c.site_id == capacities.c.site_id,
+                                     current.c.key_id == capacities.c.key_id))
+            .where((current.c.key_id.is_(None))
+                   | (current.c.capacity != capacities.c.capacity)
+                   | (current.c.occupied != true_occupied))
+        )
+        stmt = _insert(db).from_select(["site_id", "dimension", "key_id", "capacity", "occupied"], deltas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[OccupancyRollup.site_id, OccupancyRollup.dimension, OccupancyRollup.key_id],
+            set_={
+                "occupied": OccupancyRollup.occupied + stmt.excluded.occupied,
+                "capacity": OccupancyRollup.capacity + stmt.excluded.capacity,
+            },
+        )
+        corrected += (await db.execute(stmt)).rowcount
+
+        # Rollups of deleted sessions, movies, rooms or showtimes
+        stale = await db.execute(
+            delete(OccupancyRollup)
+            .where(OccupancyRollup.dimension == dimension)
+            .where(tuple_(OccupancyRollup.site_id, OccupancyRollup.key_id)
+                   .not_in(select(capacities.c.site_id, capacities.c.key_id)))
+            .execution_options(synchronize_session=False)
+        )
+        corrected += stale.rowcount
+    await db.commit()
+    return corrected
@@ -1,11 +1,28 @@
 import json
-from typing import Optional, List
+import secrets
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, List, Tuple, Dict, Iterable
 
-from sqlalchemy import select
+from sqlalchemy import select, delete, update, func, tuple_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, selectinload
 
-from app.models.cinema import CinemaRoom, Session, OccupiedSeat
+from app.models.cinema import (
+    DEFAULT_SITE_ID, WAITLIST_CANCELLED, WAITLIST_OFFERED, WAITLIST_WAITING, CinemaRoom, OccupancyRollup,
+    OccupiedSeat, Session, WaitlistEntry
+)
+from app.repositories.analytics_repository import increment_occupancy, occupancy_keys
+from app.repositories.filters import match_any
+from app.repositories.outbox_repository import (
+    add_outbox_event, SEAT_RESERVED, SEAT_RELEASED, SESSION_RELEASED, WAITLIST_SEAT_OFFERED
+)
+from app.repositories.partition_repository import ensure_session_partition
+from app.utils.room_layout import layout_cache
+from app.utils.sold_out import sold_out_sessions
+
+# How long a waitlisted user has to accept a released seat, unless the caller says otherwise
+DEFAULT_OFFER_TTL = timedelta(minutes=10)
 
 
 async def get_all_cinema_rooms(db: AsyncSession) -> List[CinemaRoom]:
@@ -35,6 +52,20 @@ async def get_cinema_room_by_id(db: AsyncSession, room_id: int) -> Optional[Cine
     result = await db.execute(select(CinemaRoom).where(CinemaRoom.id == room_id))
     return result.scalar_one_or_none()
 
+async def get_cinema_rooms_by_ids(db: AsyncSession, room_ids: Iterable[int]) -> List[CinemaRoom]:
+    """
+    Fetches the cinema rooms with the given IDs in one query.
+
+    Args:
+        db (AsyncSession): The database session.
+        room_ids (Iterable[int]): The IDs of the cinema rooms.
+
+    Returns:
+        List[CinemaRoom]: The cinema rooms found, in no particular order.
+    """
+    result = await db.execute(select(CinemaRoom).where(match_any(db, CinemaRoom.id, room_ids)))
+    return result.scalars().all()
+
 async def get_cinema_room_by_name(db: AsyncSession, name: str) -> Optional[CinemaRoom]:
     """
     Fetches a cinema room by its name.
@@ -76,28 +107,61 @@ async def get_session_by_id(db: AsyncSession, session_id: int) -> Optional[Sessi
     result = await db.execute(select(Session).where(Session.id == session_id))
     return result.scalar_one_or_none()
 
-async def create_session(db: AsyncSession, cinema_room_id: int, move_id: int, move_time_id: int) -> Session:
+async def get_sessions_by_ids(db: AsyncSession, session_ids: Iterable[int]) -> List[Session]:
+    """
+    Fetches the sessions with the given IDs in one query.
+
+    Args:
+        db (AsyncSession): The database session.
+        session_ids (Iterable[int]): The IDs of the sessions.
+
+    Returns:
+        List[Session]: The sessions found with their showtime, in no particular order.
+    """
+    result = await db.execute(
+        select(Session).options(joinedload(Session.move_time)).where(match_any(db, Session.id, session_ids))
+    )
+    return result.scalars().all()
+
+async def create_session(db: AsyncSession, cinema_room_id: int, move_id: int, move_time_id: int,
+                         show_date: Optional[date] = None) -> Session:
     """
-    Creates a new session linking a cinema room, movie, and showtime.
+    Creates a new session linking a cinema room, movie, and showtime, with the
+    partition for its seats if it has none yet, and adds the room's seats to the
+    occupancy rollups.
 
     Args:
         db (AsyncSession): The database session.
         cinema_room_id (int): The ID of the cinema room.
         move_id (int): The ID of the movie.
         move_time_id (int): The ID of the showtime.
+        show_date (Optional[date]): The day of the screening; None for a session shown every day.
 
     Returns:
         Session: The created session object.
     """
-    session = Session(cinema_room_id=cinema_room_id, move_id=move_id, move_time_id=move_time_id)
+    room = await db.get(CinemaRoom, cinema_room_id)
+    # A session belongs to the site of its room
+    session = Session(cinema_room_id=cinema_room_id, move_id=move_id, move_time_id=move_time_id,
+                      show_date=show_date, site_id=room.site_id if room is not None else DEFAULT_SITE_ID)
     db.add(session)
+    await db.flush()
+    # Sessions past the partitions made ahead could not take reservations until the next maintenance
+    await ensure_session_partition(db, session.id)
+    keys = occupancy_keys(session)
     await db.commit()
+    if room is not None:
+        await increment_occupancy(db, keys, capacity=layout_cache.get(room).capacity)
+        await db.commit()
     await db.refresh(session)
     return session
 
 async def create_occupied_seat(db: AsyncSession, session: Session, row: int, column: int) -> OccupiedSeat:
     """
-    Creates a record for an occupied seat within a session.
+    Creates a record for an occupied seat within a session and a matching
+    "seat.reserved" outbox event in the same transaction, then increments the
+    occupancy rollups. A reservation taking the last seat marks the session as
+    sold out in this worker, see app.utils.sold_out.
 
     Args:
         db (AsyncSession): The database session.
@@ -120,12 +184,277 @@ async def create_occupied_seat(db: AsyncSession, session: Session, row: int, col
     if occupied_seat.scalar_one_or_none():
         raise ValueError("This seat is already occupied.")
 
-    new_occupied_seat = OccupiedSeat(session=session, row=row, column=column)
+    new_occupied_seat = OccupiedSeat(session=session, row=row, column=column, token=secrets.token_urlsafe(24))
     db.add(new_occupied_seat)
+    try:
+        await db.flush()
+    except IntegrityError:
+        # A concurrent request reserved the seat after the check above
+        await db.rollback()
+        raise ValueError("This seat is already occupied.")
+    # Written in the same transaction, so the event exists if and only if the seat does
+    add_outbox_event(db, SEAT_RESERVED, {
+        "seat_id": new_occupied_seat.id,
+        "session_id": session.id,
+        "row": row,
+        "column": column,
+    }, site_id=session.site_id)
+    keys = occupancy_keys(session)
+    session_id, room_id = session.id, session.cinema_room_id
+    await db.commit()
+    occupied = await increment_occupancy(db, keys, occupied=1)
     await db.commit()
     await db.refresh(new_occupied_seat)
+    room = await db.get(CinemaRoom, room_id)
+    if room is not None and occupied >= layout_cache.get(room).capacity:
+        sold_out_sessions.get().mark(session_id)
     return new_occupied_seat
 
+async def is_session_sold_out(db: AsyncSession, session: Session) -> bool:
+    """
+    Whether every bookable seat of a session is taken, from its occupancy rollup,
+    and records the answer in this worker's sold-out set.
+
+    Args:
+        db (AsyncSession): The database session.
+        session (Session): The session object.
+
+    Returns:
+        bool: True if the session is sold out.
+    """
+    rollup = await db.get(OccupancyRollup, (session.site_id, "session", session.id), populate_existing=True)
+    room = await db.get(CinemaRoom, session.cinema_room_id)
+    sold_out = rollup is not None and room is not None and rollup.occupied >= layout_cache.get(room).capacity
+    if sold_out:
+        sold_out_sessions.get().mark(session.id)
+    else:
+        sold_out_sessions.get().discard(session.id)
+    return sold_out
+
+async def release_occupied_seats(db: AsyncSession, session: Session, seats: List[Tuple[int, int]],
+                                 offer_ttl: timedelta = DEFAULT_OFFER_TTL,
+                                 tokens: Optional[List[str]] = None) -> List[Tuple[int, int]]:
+    """
+    Releases reserved seats of a session and commits, see release_seats.
+
+    Args:
+        db (AsyncSession): The database session.
+        session (Session): The session object.
+        seats (List[Tuple[int, int]]): (row, column) pairs to release.
+        offer_ttl (timedelta): How long waitlisted users have to accept the seats offered to them.
+        tokens (Optional[List[str]]): The reservation token of each seat, see release_seats.
+
+    Returns:
+        List[Tuple[int, int]]: The (row, column) pairs that were actually reserved and are now released.
+    """
+    keys = occupancy_keys(session)
+    released, freed = await release_seats(db, session, seats, offer_ttl, tokens)
+    await db.commit()
+    if freed:
+        await increment_occupancy(db, keys, occupied=-freed)
+        await db.commit()
+    return released
+
+async def release_occupied_seats_by_id(db: AsyncSession, session: Session, seat_ids: List[int],
+                                       offer_ttl: timedelta = DEFAULT_OFFER_TTL) -> List[Tuple[int, int]]:
+    """
+    Releases reserved seats of a session by their IDs and commits, see release_seats_by_id.
+
+    Args:
+        db (AsyncSession): The database session.
+        session (Session): The session object.
+        seat_ids (List[int]): The IDs of the occupied seats to release.
+        offer_ttl (timedelta): How long waitlisted users have to accept the seats offered to them.
+
+    Returns:
+        List[Tuple[int, int]]: The (row, column) pairs that were actually reserved and are now released.
+    """
+    keys = occupancy_keys(session)
+    released, freed = await release_seats_by_id(db, session, seat_ids, offer_ttl)
+    await db.commit()
+    if freed:
+        await increment_occupancy(db, keys, occupied=-freed)
+        await db.commit()
+    return released
+
+async def release_seats(db: AsyncSession, session: Session, seats: List[Tuple[int, int]],
+                        offer_ttl: timedelta = DEFAULT_OFFER_TTL,
+                        tokens: Optional[List[str]] = None) -> Tuple[List[Tuple[int, int]], int]:
+    """
+    Releases reserved seats of a session with a single DELETE on the (session_id, row, column)
+    key, in the caller's transaction.
+
+    A "seat.released" outbox event per released seat is written. Released seats
+    are then offered to the session's waitlist in order (see offer_seats_to_waitlist).
+    The caller decrements the occupancy rollups by the seats left free once it committed.
+
+    Args:
+        db (AsyncSession): The database session.
+        session (Session): The session object.
+        seats (List[Tuple[int, int]]): (row, column) pairs to release.
+        offer_ttl (timedelta): How long waitlisted users have to accept the seats offered to them.
+        tokens (Optional[List[str]]): The reservation token of each seat. Seats reserved with another
+            token are not released; None releases the seats whoever reserved them.
+
+    Returns:
+        Tuple[List[Tuple[int, int]], int]: The (row, column) pairs that were actually reserved and
+        are now released, and how many of them were left free rather than offered.
+    """
+    if not seats:
+        return [], 0
+    if tokens is None:
+        owned = tuple_(OccupiedSeat.row, OccupiedSeat.column).in_(seats)
+    else:
+        # Checked by the DELETE itself, so a seat re-reserved by someone else in the meantime stays reserved
+        owned = tuple_(OccupiedSeat.row, OccupiedSeat.column, OccupiedSeat.token).in_(
+            [(row, column, token) for (row, column), token in zip(seats, tokens)]
+        )
+    return await _release_seats(db, session, owned, offer_ttl)
+
+async def release_seats_by_id(db: AsyncSession, session: Session, seat_ids: List[int],
+                              offer_ttl: timedelta = DEFAULT_OFFER_TTL) -> Tuple[List[Tuple[int, int]], int]:
+    """
+    Releases reserved seats of a session by their IDs, in the caller's transaction, see release_seats.
+
+    For seats whose reservation is known rather than their position, such as a
+    seat held for a waitlist offer or deleted in the admin panel: a seat reserved
+    again after the reservation ended has another ID and stays reserved.
+
+    Args:
+        db (AsyncSession): The database session.
+        session (Session): The session object.
+        seat_ids (List[int]): The IDs of the occupied seats to release.
+        offer_ttl (timedelta): How long waitlisted users have to accept the seats offered to them.
+
+    Returns:
+        Tuple[List[Tuple[int, int]], int]: The (row, column) pairs that were actually reserved and
+        are now released, and how many of them were left free rather than offered.
+    """
+    if not seat_ids:
+        return [], 0
+    return await _release_seats(db, session, OccupiedSeat.id.in_(seat_ids), offer_ttl)
+
+async def _release_seats(db: AsyncSession, session: Session, criterion,
+                         offer_ttl: timedelta) -> Tuple[List[Tuple[int, int]], int]:
+    result = await db.execute(
+        delete(OccupiedSeat)
+        .where(OccupiedSeat.session_id == session.id)
+        .where(criterion)
+        .returning(OccupiedSeat.id, OccupiedSeat.row, OccupiedSeat.column)
+        .execution_options(synchronize_session=False)
+    )
+    released = result.all()
+    for seat_id, row, column in released:
+        add_outbox_event(db, SEAT_RELEASED, {
+            "seat_id": seat_id,
+            "session_id": session.id,
+            "row": row,
+            "column": column,
+        }, site_id=session.site_id)
+    seats = [(row, column) for _, row, column in released]
+    offered = await offer_seats_to_waitlist(db, session, seats, offer_ttl)
+    freed = len(released) - len(offered)
+    if freed:
+        sold_out_sessions.get(session.site_id).discard(session.id)
+    return seats, freed
+
+async def offer_seats_to_waitlist(db: AsyncSession, session: Session, seats: List[Tuple[int, int]],
+                                  offer_ttl: timedelta = DEFAULT_OFFER_TTL) -> List[WaitlistEntry]:
+    """
+    Reserves free seats of a session for the first entries of its waitlist, in the caller's transaction.
+
+    Each seat is reserved again, with a "seat.reserved" event, and offered to the
+    next waiting entry with a "waitlist.offered" event for notifying its contact.
+    Entries locked by a concurrent offer are skipped, so no entry gets two seats.
+
+    Args:
+        db (AsyncSession): The database session.
+        session (Session): The session object.
+        seats (List[Tuple[int, int]]): Free (row, column) pairs, offered in this order.
+        offer_ttl (timedelta): How long the entries have to accept their seat.
+
+    Returns:
+        List[WaitlistEntry]: The entries offered a seat; seats beyond them stay free.
+    """
+    if not seats:
+        return []
+    result = await db.execute(
+        select(WaitlistEntry)
+        .where(WaitlistEntry.session_id == session.id, WaitlistEntry.status == WAITLIST_WAITING)
+        .order_by(WaitlistEntry.id)
+        .limit(len(seats))
+        .with_for_update(skip_locked=True)
+    )
+    entries = result.scalars().all()
+    if not entries:
+        return []
+
+    # Deadlines are stored without a time zone, in UTC
+    expires_at = datetime.now(timezone.utc).replace(tzinfo=None) + offer_ttl
+    held = [OccupiedSeat(session_id=session.id, row=row, column=column) for row, column in seats[:len(entries)]]
+    db.add_all(held)
+    await db.flush()
+    for entry, seat in zip(entries, held):
+        entry.status = WAITLIST_OFFERED
+        entry.row, entry.column = seat.row, seat.column
+        entry.seat_id = seat.id
+        entry.offer_expires_at = expires_at
+        add_outbox_event(db, SEAT_RESERVED, {
+            "seat_id": seat.id,
+            "session_id": session.id,
+            "row": seat.row,
+            "column": seat.column,
+            "waitlist_entry_id": entry.id,
+        }, site_id=session.site_id)
+        add_outbox_event(db, WAITLIST_SEAT_OFFERED, {
+            "waitlist_entry_id": entry.id,
+            "session_id": session.id,
+            "contact": entry.contact,
+            "row": seat.row,
+            "column": seat.column,
+            "expires_at": expires_at.isoformat(),
+        }, site_id=session.site_id)
+    return entries
+
+async def release_session_seats(db: AsyncSession, session: Session) -> int:
+    """
+    Releases every reserved seat of a session (e.g. a cancelled screening) in one set-based DELETE.
+
+    Instead of one event per seat, a single "session.released" outbox event with the
+    number of released seats is written; the rollups are decremented once committed. The
+    session's waitlist is cancelled, including offers not accepted yet.
+
+    Args:
+        db (AsyncSession): The database session.
+        session (Session): The session object.
+
+    Returns:
+        int: The number of released seats.
+    """
+    result = await db.execute(
+        delete(OccupiedSeat)
+        .where(OccupiedSeat.session_id == session.id)
+        .execution_options(synchronize_session=False)
+    )
+    released = result.rowcount
+    await db.execute(
+        update(WaitlistEntry)
+        .where(WaitlistEntry.session_id == session.id)
+        .where(WaitlistEntry.status.in_([WAITLIST_WAITING, WAITLIST_OFFERED]))
+        .values(status=WAITLIST_CANCELLED)
+        .execution_options(synchronize_session=False)
+    )
+    if released:
+        add_outbox_event(db, SESSION_RELEASED, {"session_id": session.id, "released": released},
+                         site_id=session.site_id)
+    session_id, keys = session.id, occupancy_keys(session)
+    await db.commit()
+    if released:
+        await increment_occupancy(db, keys, occupied=-released)
+        await db.commit()
+    sold_out_sessions.get().discard(session_id)
+    return released
+
 async def update_seating(seating: str, row: int, column: int) -> str:
     """
     Updates the seating matrix to mark a seat as reserved.
@@ -143,26 +472,97 @@ async def update_seating(seating: str, row: int, column: int) -> str:
     seating = json.dumps(seating)
     return seating
 
-async def get_session_by_room_and_film(db: AsyncSession, cinema_room_id: int, move_id: int) -> Optional[Session]:
+async def get_session_by_room_and_film(db: AsyncSession, cinema_room_id: int, move_id: int,
+                                       load_occupied_seats: bool = True) -> Optional[Session]:
     """
-    Fetches a session by room and film ID with preloaded occupied seats.
+    Fetches a session by room and film ID with its showtime, by default with preloaded occupied seats.
 
     Args:
         db (AsyncSession): The database session.
         cinema_room_id (int): The ID of the cinema room.
         move_id (int): The ID of the movie.
+        load_occupied_seats (bool): Whether to preload the occupied seat objects.
 
     Returns:
         Optional[Session]: The session object if found, else None.
     """
-    result = await db.execute(
+    query = (
         select(Session)
-        .options(selectinload(Session.occupied_seats))
+        .options(joinedload(Session.move_time))
         .where(Session.cinema_room_id == cinema_room_id)
         .where(Session.move_id == move_id)
     )
+    if load_occupied_seats:
+        query = query.options(selectinload(Session.occupied_seats))
+    result = await db.execute(query)
     return result.scalar_one_or_none()
 
+async def get_occupied_seat_coordinates(db: AsyncSession, session_id: int) -> Tuple[List[int], List[int]]:
+    """
+    Fetches the coordinates of the occupied seats of a session as two aligned lists,
+    without loading ORM objects.
+
+    On PostgreSQL both lists are aggregated in the database and arrive as one row.
+
+    Args:
+        db (AsyncSession): The database session.
+        session_id (int): The ID of the session.
+
+    Returns:
+        Tuple[List[int], List[int]]: The row numbers and the column numbers of the occupied seats.
+    """
+    if db.bind.dialect.name == "postgresql":
+        result = await db.execute(
+            select(func.array_agg(OccupiedSeat.row), func.array_agg(OccupiedSeat.column))
+            .where(OccupiedSeat.session_id == session_id)
+        )
+        rows, columns = result.one()
+        return rows or [], columns or []
+
+    result = await db.execute(
+        select(OccupiedSeat.row, OccupiedSeat.column).where(OccupiedSeat.session_id == session_id)
+    )
+    coordinates = result.all()
+    if not coordinates:
+        return [], []
+    rows, columns = zip(*coordinates)
+    return list(rows), list(columns)
+
+async def get_occupied_seat_coordinates_by_sessions(db: AsyncSession, session_ids: Iterable[int]
+                                                   ) -> Dict[int, Tuple[List[int], List[int]]]:
+    """
+    Fetches the occupied seat coordinates of several sessions in one query.
+
+    Args:
+        db (AsyncSession): The database session.
+        session_ids (Iterable[int]): The IDs of the sessions.
+
+    Returns:
+        Dict[int, Tuple[List[int], List[int]]]: The row numbers and the column numbers of the
+            occupied seats by session ID. Every requested session has an entry.
+    """
+    session_ids = list(session_ids)
+    coordinates = {session_id: ([], []) for session_id in session_ids}
+    if db.bind.dialect.name == "postgresql":
+        result = await db.execute(
+            select(OccupiedSeat.session_id, func.array_agg(OccupiedSeat.row), func.array_agg(OccupiedSeat.column))
+            .where(match_any(db, OccupiedSeat.session_id, session_ids))
+            .group_by(OccupiedSeat.session_id)
+        )
+        for session_id, rows, columns in result:
+            coordinates[session_id] = (rows, columns)
+        return coordinates
+
+    result = await db.execute(
+        select(OccupiedSeat.session_id, OccupiedSeat.row, OccupiedSeat.column)
+        .where(match_any(db, OccupiedSeat.session_id, session_ids))
+    )
+    for session_id, row, column in result:
+        rows, columns = coordinates[session_id]
+        rows.append(row)
+        columns.append(column)
+    return coordinates
+
 async def get_session_by_id(db: AsyncSession, session_id: int) -> Optional[Session]:
     """
     Fetches a session by its ID with preloaded related cinema room.
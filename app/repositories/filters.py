@@ -0,0 +1,27 @@
+from typing import Iterable
+
+from sqlalchemy import Integer, any_, literal
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def match_any(db: AsyncSession, column, ids: Iterable[int]):
+    """
+    Builds a `column IN ids` condition for batch lookups.
+
+    On PostgreSQL the IDs are sent as a single array parameter (`column = ANY($1)`),
+    so the statement text does not depend on the number of IDs and asyncpg reuses
+    one prepared statement for every batch size.
+
+    Args:
+        db (AsyncSession): The database session, used to pick the dialect.
+        column: The integer column to match.
+        ids (Iterable[int]): The IDs to look up.
+
+    Returns:
+        The SQL condition.
+    """
+    ids = list(ids)
+    if db.bind.dialect.name == "postgresql":
+        return column == any_(literal(ids, ARRAY(Integer)))
+    return column.in_(ids)
@@ -0,0 +1,32 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Iterable, List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.cinema_room_repository import (
+    get_cinema_rooms_by_ids, get_sessions_by_ids, get_occupied_seat_coordinates_by_sessions
+)
+from app.repositories.move_repository import get_moves_by_ids
+from app.utils.dataloader import DataLoader
+
+
+def _by_id(db: AsyncSession, fetch: Callable[[AsyncSession, Iterable[int]], Awaitable[List]]):
+    async def batch_load(ids: List[int]) -> Dict[int, object]:
+        return {obj.id: obj for obj in await fetch(db, ids)}
+    return batch_load
+
+
+class RequestLoaders:
+    """
+    The loaders of one request. Lookups issued concurrently during the request,
+    e.g. from `asyncio.gather`, are resolved with one query per loader.
+
+    All loaders share the request's session and therefore one lock.
+    """
+
+    def __init__(self, db: AsyncSession):
+        lock = asyncio.Lock()
+        self.rooms = DataLoader(_by_id(db, get_cinema_rooms_by_ids), lock)
+        self.moves = DataLoader(_by_id(db, get_moves_by_ids), lock)
+        self.sessions = DataLoader(_by_id(db, get_sessions_by_ids), lock)
+        self.occupied_seats = DataLoader(lambda ids: get_occupied_seat_coordinates_by_sessions(db, ids), lock)
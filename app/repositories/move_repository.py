@@ -1,9 +1,12 @@
-from typing import List
+from typing import List, Iterable
 
-from sqlalchemy import select
+from sqlalchemy import select, func, or_, literal_column
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.cinema import Move, CinemaRoom
+from app.repositories.filters import match_any
+
+SIMPLE_CONFIG = literal_column("'simple'::regconfig")
 
 
 async def get_all_moves(db: AsyncSession) -> List[Move]:
@@ -33,6 +36,20 @@ async def get_move_by_id(db: AsyncSession, move_id: int) -> Move:
     result = await db.execute(select(Move).where(Move.id == move_id))
     return result.scalar_one_or_none()
 
+async def get_moves_by_ids(db: AsyncSession, move_ids: Iterable[int]) -> List[Move]:
+    """
+    Fetches the movies with the given IDs in one query.
+
+    Args:
+        db (AsyncSession): The database session.
+        move_ids (Iterable[int]): The IDs of the movies.
+
+    Returns:
+        List[Move]: The movies found, in no particular order.
+    """
+    result = await db.execute(select(Move).where(match_any(db, Move.id, move_ids)))
+    return result.scalars().all()
+
 async def get_moves_by_cinema_room(db: AsyncSession, room_id: int) -> List[Move]:
     """
     Fetches all movies associated with a specific cinema room.
@@ -50,3 +67,38 @@ async def get_moves_by_cinema_room(db: AsyncSession, room_id: int) -> List[Move]
         .where(CinemaRoom.id == room_id)
     )
     return result.scalars().all()
+
+
+async def search_moves(db: AsyncSession, query: str, limit: int = 20) -> List[Move]:
+    """
+    Searches movies by title.
+
+    On PostgreSQL, titles matching the words of the query (full-text), containing
+    it, or similar to it (trigram) are returned, most similar first; both the
+    `ix_moves_name_fts` and `ix_moves_name_trgm` indexes serve the query. Other
+    databases fall back to a case-insensitive substring match.
+
+    Args:
+        db (AsyncSession): The database session.
+        query (str): The search text.
+        limit (int): The maximum number of movies to return.
+
+    Returns:
+        List[Move]: The matching movies.
+    """
+    pattern = "%" + query.replace("/", "//").replace("%", "/%").replace("_", "/_") + "%"
+    if db.bind.dialect.name == "postgresql":
+        statement = (
+            select(Move)
+            .where(or_(
+                # The configuration must be a literal for the expression index to match
+                func.to_tsvector(SIMPLE_CONFIG, Move.name).op("@@")(func.plainto_tsquery(SIMPLE_CONFIG, query)),
+                Move.name.ilike(pattern, escape="/"),
+                Move.name.op("%")(query),
+            ))
+            .order_by(func.similarity(Move.name, query).desc(), Move.name)
+        )
+    else:
+        statement = select(Move).where(Move.name.ilike(pattern, escape="/")).order_by(Move.name)
+    result = await db.execute(statement.limit(limit))
+    return result.scalars().all()
@@ -0,0 +1,122 @@
+import json
+from typing import List, Optional
+
+from sqlalchemy import select, text, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.cinema import OutboxEvent
+
+SEAT_RESERVED = "seat.reserved"
+SEAT_RELEASED = "seat.released"
+SESSION_RELEASED = "session.released"
+WAITLIST_SEAT_OFFERED = "waitlist.offered"
+
+# Serializes the assignment of feed sequence numbers between publishers
+OUTBOX_SEQUENCE_LOCK_ID = 0x0B0C5E9
+
+
+def add_outbox_event(db: AsyncSession, event_type: str, payload: dict, site_id: Optional[int] = None) -> OutboxEvent:
+    """
+    Adds an event to the outbox as part of the caller's transaction.
+
+    The event is not committed here; it becomes visible together with the
+    change it describes when the caller commits.
+
+    Args:
+        db (AsyncSession): The database session.
+        event_type (str): The type of the event, e.g. "seat.reserved".
+        payload (dict): JSON-serializable event data.
+        site_id (Optional[int]): The site the event belongs to; by default the current site.
+
+    Returns:
+        OutboxEvent: The pending outbox event.
+    """
+    event = OutboxEvent(event_type=event_type, payload=json.dumps(payload))
+    if site_id is not None:
+        event.site_id = site_id
+    db.add(event)
+    return event
+
+
+async def get_unpublished_events(db: AsyncSession, limit: int = 100) -> List[OutboxEvent]:
+    """
+    Fetches the oldest unpublished events and locks them for the current transaction.
+
+    Rows locked by another publisher are skipped, so several workers can drain
+    the outbox concurrently without publishing the same batch twice.
+
+    Args:
+        db (AsyncSession): The database session.
+        limit (int): The maximum number of events to fetch.
+
+    Returns:
+        List[OutboxEvent]: Unpublished events ordered by ID.
+    """
+    result = await db.execute(
+        select(OutboxEvent)
+        .where(OutboxEvent.published_at.is_(None))
+        .order_by(OutboxEvent.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return result.scalars().all()
+
+
+async def assign_event_sequence(db: AsyncSession, events: List[OutboxEvent]) -> None:
+    """
+    Numbers committed events for the change feed after the highest number given so far.
+
+    An advisory lock held until the caller commits makes publishers number their
+    batches one after another, so a number is only visible once every smaller
+    one is: a consumer paging on `sequence` never skips an event.
+
+    Args:
+        db (AsyncSession): The database session.
+        events (List[OutboxEvent]): Committed events without a sequence number, numbered in this order.
+    """
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": OUTBOX_SEQUENCE_LOCK_ID})
+    last = await db.scalar(select(func.max(OutboxEvent.sequence)))
+    for number, event in enumerate(events, start=(last or 0) + 1):
+        event.sequence = number
+    await db.flush()
+
+
+async def mark_events_published(db: AsyncSession, event_ids: List[int]) -> None:
+    """
+    Marks events as published. The caller commits the transaction.
+
+    Args:
+        db (AsyncSession): The database session.
+        event_ids (List[int]): The IDs of the published events.
+    """
+    await db.execute(
+        update(OutboxEvent)
+        .where(OutboxEvent.id.in_(event_ids))
+        .values(published_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def get_events_after(db: AsyncSession, after: int = 0, limit: int = 100) -> List[OutboxEvent]:
+    """
+    Reads the change feed: events with a sequence number greater than `after`, in commit order.
+
+    Only events numbered by the publisher are listed, see assign_event_sequence;
+    IDs are not used since a transaction can commit after one with higher IDs.
+
+    Args:
+        db (AsyncSession): The database session.
+        after (int): The last sequence number the consumer has seen.
+        limit (int): The maximum number of events to return.
+
+    Returns:
+        List[OutboxEvent]: The next page of events.
+    """
+    result = await db.execute(
+        select(OutboxEvent)
+        .where(OutboxEvent.sequence > after)
+        .order_by(OutboxEvent.sequence)
+        .limit(limit)
+    )
+    return result.scalars().all()
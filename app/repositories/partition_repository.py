@@ -0,0 +1,223 @@
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import List
+
+from sqlalchemy import func, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.cinema import Session
+
+# On PostgreSQL occupied_seats is range-partitioned by session_id (migration
+# b7c3f9a2d851), one partition per SESSIONS_PER_PARTITION sessions. Must match
+# the migration.
+SESSIONS_PER_PARTITION = 10_000
+PARTITION_PREFIX = "occupied_seats_p"
+ARCHIVE_PREFIX = "occupied_seats_archive_p"
+# Serializes partition maintenance between workers
+PARTITION_LOCK_ID = 0x0CC5EA75
+
+_PARTITION_NAME = re.compile(rf"^{PARTITION_PREFIX}(\d+)$")
+
+
+def partition_name(lower: int) -> str:
+    return f"{PARTITION_PREFIX}{lower}"
+
+
+def partition_lower(session_id: int) -> int:
+    """
+    Returns the lower bound of the partition holding the seats of a session.
+    """
+    return session_id - session_id % SESSIONS_PER_PARTITION
+
+
+def missing_partitions(existing: List[int], max_session_id: int, ahead: int) -> List[int]:
+    """
+    Lists the partitions to create so that the current and the next `ahead`
+    ranges of session IDs exist.
+
+    Args:
+        existing (List[int]): The lower bounds of the attached partitions.
+        max_session_id (int): The highest session ID in use.
+        ahead (int): The number of empty partitions to keep ready.
+
+    Returns:
+        List[int]: The lower bounds of the missing partitions, in order.
+    """
+    last = partition_lower(max_session_id) + ahead * SESSIONS_PER_PARTITION
+    first = min(existing, default=0)
+    existing = set(existing)
+    return [lower for lower in range(first, last + 1, SESSIONS_PER_PARTITION) if lower not in existing]
+
+
+def expired_partitions(existing: List[int], first_retained_session_id: int) -> List[int]:
+    """
+    Lists the partitions that only hold seats of sessions below the first
+    session whose seats are retained.
+
+    Args:
+        existing (List[int]): The lower bounds of the attached partitions.
+        first_retained_session_id (int): The lowest session ID whose seats stay attached.
+
+    Returns:
+        List[int]: The lower bounds of the partitions to detach, in order.
+    """
+    return sorted(lower for lower in existing if lower + SESSIONS_PER_PARTITION <= first_retained_session_id)
+
+
+async def get_occupied_seat_partitions(db: AsyncSession) -> List[int]:
+    """
+    Fetches the lower bounds of the partitions attached to occupied_seats.
+
+    Returns:
+        List[int]: The lower bounds in order; empty if the table is not partitioned.
+    """
+    if db.bind.dialect.name != "postgresql":
+        return []
+    result = await db.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = 'occupied_seats'"
+    ))
+    names = (_PARTITION_NAME.match(name) for name in result.scalars())
+    return sorted(int(match.group(1)) for match in names if match)
+
+
+async def _max_session_id(db: AsyncSession) -> int:
+    return (await db.execute(select(func.max(Session.id)))).scalar() or 0
+
+
+async def _first_retained_session_id(db: AsyncSession, cutoff: date) -> int:
+    # Sessions are not always created in show date order, so a single retained
+    # session keeps its whole partition and the later ones attached
+    result = await db.execute(
+        select(func.min(Session.id)).where(or_(Session.show_date.is_(None), Session.show_date >= cutoff))
+    )
+    first = result.scalar()
+    return first if first is not None else await _max_session_id(db) + 1
+
+
+async def _detach_pending_partitions(db: AsyncSession) -> List[str]:
+    # Partitions left half-detached by an interrupted DETACH ... CONCURRENTLY
+    result = await db.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = 'occupied_seats' AND pg_inherits.inhdetachpending"
+    ))
+    return [name for name in result.scalars() if _PARTITION_NAME.match(name)]
+
+
+async def ensure_occupied_seat_partitions(db: AsyncSession, ahead: int) -> List[int]:
+    """
+    Creates the partitions of occupied_seats for the current sessions and the
+    next `ahead` ranges of session IDs, in the caller's transaction.
+
+    Does nothing on databases where the table is not partitioned.
+
+    Args:
+        db (AsyncSession): The database session.
+        ahead (int): The number of empty partitions to keep ready.
+
+    Returns:
+        List[int]: The lower bounds of the created partitions.
+    """
+    if db.bind.dialect.name != "postgresql":
+        return []
+    await db.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": PARTITION_LOCK_ID})
+    existing = await get_occupied_seat_partitions(db)
+    if not existing:
+        return []
+    created = missing_partitions(existing, await _max_session_id(db), ahead)
+    for lower in created:
+        await db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(lower)} PARTITION OF occupied_seats "
+            f"FOR VALUES FROM ({lower}) TO ({lower + SESSIONS_PER_PARTITION})"
+        ))
+    return created
+
+
+async def ensure_session_partition(db: AsyncSession, session_id: int) -> bool:
+    """
+    Creates the partition of occupied_seats holding a session's seats if it does
+    not exist yet, in the caller's transaction.
+
+    Called when a session is created, so its seats can be reserved before the
+    partition maintenance runs. Does nothing on databases where the table is not
+    partitioned.
+
+    Args:
+        db (AsyncSession): The database session.
+        session_id (int): The ID of the session.
+
+    Returns:
+        bool: True if the partition was created.
+    """
+    if db.bind.dialect.name != "postgresql":
+        return False
+    lower = partition_lower(session_id)
+    existing = await get_occupied_seat_partitions(db)
+    if not existing or lower in existing:
+        return False
+    await db.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": PARTITION_LOCK_ID})
+    await db.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(lower)} PARTITION OF occupied_seats "
+        f"FOR VALUES FROM ({lower}) TO ({lower + SESSIONS_PER_PARTITION})"
+    ))
+    return True
+
+
+async def _archive_partition(db: AsyncSession, name: str) -> int:
+    lower = int(_PARTITION_NAME.match(name).group(1))
+    archive = f"{ARCHIVE_PREFIX}{lower}"
+    await db.execute(text(f"ALTER TABLE {name} RENAME TO {archive}"))
+    # The inherited foreign key would keep archived sessions from being deleted
+    foreign_keys = await db.execute(text(
+        "SELECT conname FROM pg_constraint WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'"
+    ), {"table": archive})
+    for constraint in foreign_keys.scalars().all():
+        await db.execute(text(f'ALTER TABLE {archive} DROP CONSTRAINT "{constraint}"'))
+    return lower
+
+
+async def detach_expired_occupied_seat_partitions(db: AsyncSession, retention: timedelta) -> List[int]:
+    """
+    Detaches the partitions of occupied_seats that only hold seats of sessions
+    shown longer than `retention` ago.
+
+    Runs outside of a transaction, so the session must not have begun one:
+    partitions are detached with DETACH PARTITION ... CONCURRENTLY, which does
+    not block reservations on the other partitions. A partition left half-detached
+    by an interrupted run is finalized first.
+
+    Detached partitions are kept as `occupied_seats_archive_p<lower>` tables
+    without their foreign key, to be dumped or dropped. Their seats disappear
+    from seat maps and the analytics rebuild.
+
+    Args:
+        db (AsyncSession): The database session.
+        retention (timedelta): How long after its show date the seats of a session stay attached.
+
+    Returns:
+        List[int]: The lower bounds of the detached partitions.
+    """
+    if db.bind.dialect.name != "postgresql":
+        return []
+    await db.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+    # Held for the session, since every statement commits on its own
+    if not (await db.execute(text("SELECT pg_try_advisory_lock(:lock_id)"), {"lock_id": PARTITION_LOCK_ID})).scalar():
+        return []
+    try:
+        detached = []
+        for name in await _detach_pending_partitions(db):
+            await db.execute(text(f"ALTER TABLE occupied_seats DETACH PARTITION {name} FINALIZE"))
+            detached.append(await _archive_partition(db, name))
+        cutoff = datetime.now(timezone.utc).date() - retention
+        existing = [lower for lower in await get_occupied_seat_partitions(db) if lower not in detached]
+        for lower in expired_partitions(existing, await _first_retained_session_id(db, cutoff)):
+            name = partition_name(lower)
+            await db.execute(text(f"ALTER TABLE occupied_seats DETACH PARTITION {name} CONCURRENTLY"))
+            detached.append(await _archive_partition(db, name))
+    finally:
+        await db.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": PARTITION_LOCK_ID})
+    return sorted(detached)
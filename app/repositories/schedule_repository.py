@@ -0,0 +1,56 @@
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.cinema import CinemaRoom, Move, MoveTime, OccupancyRollup, Session
+from app.utils.room_layout import layout_cache
+
+
+async def get_schedule_entries(db: AsyncSession, day: Optional[date] = None) -> List[dict]:
+    """
+    Fetches the sessions of a day with their movie, room, showtime and seats left, ordered by showtime.
+
+    Sessions without a show date run every day and are always included.
+
+    Two queries regardless of the number of sessions: the sessions joined with
+    their movie, room, showtime and occupancy rollup, and the room dimensions and
+    layouts for the capacities. Occupied seats are read from the per-session
+    rollups rather than counted, so the rebuild does not scan occupied_seats.
+
+    Args:
+        db (AsyncSession): The database session.
+        day (Optional[date]): The day, by default today in the server's time zone.
+
+    Returns:
+        List[dict]: One entry per session.
+    """
+    day = day or date.today()
+    sessions = await db.execute(
+        select(Session.id, MoveTime.time, Move.id, Move.name, Move.movie_cover, Move.move_time_length,
+               CinemaRoom.id, CinemaRoom.name, func.coalesce(OccupancyRollup.occupied, 0))
+        .join(MoveTime, MoveTime.id == Session.move_time_id)
+        .join(Move, Move.id == Session.move_id)
+        .join(CinemaRoom, CinemaRoom.id == Session.cinema_room_id)
+        .outerjoin(OccupancyRollup, and_(OccupancyRollup.site_id == Session.site_id,
+                                         OccupancyRollup.dimension == "session",
+                                         OccupancyRollup.key_id == Session.id))
+        .where(or_(Session.show_date == day, Session.show_date.is_(None)))
+        .order_by(MoveTime.time, CinemaRoom.name, Session.id)
+    )
+    rooms = await db.execute(select(CinemaRoom.id, CinemaRoom.row, CinemaRoom.column, CinemaRoom.layout))
+    capacities = {room.id: layout_cache.get(room).capacity for room in rooms}
+
+    entries = []
+    for session_id, time, move_id, move_name, movie_cover, length, room_id, room_name, occupied in sessions:
+        capacity = capacities.get(room_id, 0)
+        entries.append({
+            "session_id": session_id,
+            "time": time.strftime("%H:%M"),
+            "movie": {"id": move_id, "name": move_name, "movie_cover": movie_cover or "", "length": length},
+            "room": {"id": room_id, "name": room_name},
+            "capacity": capacity,
+            "seats_left": max(0, capacity - occupied),
+        })
+    return entries
@@ -0,0 +1,20 @@
+from typing import List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.cinema import Site
+
+
+async def get_all_sites(db: AsyncSession) -> List[Site]:
+    """
+    Fetches all sites.
+
+    Args:
+        db (AsyncSession): The database session.
+
+    Returns:
+        List[Site]: A list of all sites.
+    """
+    result = await db.execute(select(Site).order_by(Site.id))
+    return result.scalars().all()
@@ -0,0 +1,198 @@
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
+
+from app.models.cinema import (
+    WAITLIST_ACCEPTED, WAITLIST_CANCELLED, WAITLIST_EXPIRED, WAITLIST_OFFERED, WAITLIST_WAITING, OccupiedSeat,
+    Session, WaitlistEntry
+)
+from app.repositories.analytics_repository import increment_occupancy, occupancy_keys
+from app.repositories.cinema_room_repository import DEFAULT_OFFER_TTL, release_seats_by_id
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+async def _lock_entry(db: AsyncSession, entry: WaitlistEntry) -> None:
+    # Re-read under a row lock, so an offer expired or passed on meanwhile is seen as such
+    await db.execute(
+        select(WaitlistEntry)
+        .where(WaitlistEntry.id == entry.id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+
+
+async def join_waitlist(db: AsyncSession, session: Session, contact: str) -> WaitlistEntry:
+    """
+    Adds an entry at the end of a session's waitlist.
+
+    Args:
+        db (AsyncSession): The database session.
+        session (Session): The session object.
+        contact (str): Where to send the offer of a seat, e.g. an email address.
+
+    Returns:
+        WaitlistEntry: The created entry, with the token its holder authenticates with.
+    """
+    entry = WaitlistEntry(session_id=session.id, contact=contact, token=secrets.token_urlsafe(24),
+                          status=WAITLIST_WAITING)
+    db.add(entry)
+    await db.commit()
+    await db.refresh(entry)
+    return entry
+
+
+async def get_waitlist_entry(db: AsyncSession, entry_id: int) -> Optional[WaitlistEntry]:
+    """
+    Fetches a waitlist entry with its session.
+
+    Args:
+        db (AsyncSession): The database session.
+        entry_id (int): The ID of the entry.
+
+    Returns:
+        Optional[WaitlistEntry]: The entry if found, else None.
+    """
+    # Joined, so entries of sessions of other sites are not found
+    result = await db.execute(
+        select(WaitlistEntry)
+        .join(WaitlistEntry.session)
+        .options(contains_eager(WaitlistEntry.session))
+        .where(WaitlistEntry.id == entry_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def get_waitlist_position(db: AsyncSession, entry: WaitlistEntry) -> Optional[int]:
+    """
+    Returns the 1-based position of a waiting entry in its session's waitlist, or None if it is not waiting.
+    """
+    if entry.status != WAITLIST_WAITING:
+        return None
+    result = await db.execute(
+        select(func.count(WaitlistEntry.id))
+        .where(WaitlistEntry.session_id == entry.session_id)
+        .where(WaitlistEntry.status == WAITLIST_WAITING)
+        .where(WaitlistEntry.id <= entry.id)
+    )
+    return result.scalar_one()
+
+
+async def accept_offer(db: AsyncSession, entry: WaitlistEntry) -> WaitlistEntry:
+    """
+    Accepts the seat offered to a waitlist entry, which keeps it reserved. The
+    entry's token becomes the seat's reservation token, for cancelling it later.
+
+    Args:
+        db (AsyncSession): The database session.
+        entry (WaitlistEntry): The entry.
+
+    Raises:
+        ValueError: If the entry has no open offer.
+
+    Returns:
+        WaitlistEntry: The accepted entry.
+    """
+    await _lock_entry(db, entry)
+    if entry.status != WAITLIST_OFFERED or entry.offer_expires_at <= _utc_now():
+        raise ValueError("There is no open offer for this waitlist entry.")
+    entry.status = WAITLIST_ACCEPTED
+    await db.execute(
+        update(OccupiedSeat)
+        .where(OccupiedSeat.session_id == entry.session_id, OccupiedSeat.id == entry.seat_id)
+        .values(token=entry.token)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    await db.refresh(entry)
+    return entry
+
+
+async def leave_waitlist(db: AsyncSession, entry: WaitlistEntry,
+                         offer_ttl: timedelta = DEFAULT_OFFER_TTL) -> WaitlistEntry:
+    """
+    Removes an entry from its waitlist, declining its offer if it has one; the
+    seat held for the offer is offered to the next entry.
+
+    Args:
+        db (AsyncSession): The database session.
+        entry (WaitlistEntry): The entry.
+        offer_ttl (timedelta): How long the next entry has to accept the declined seat.
+
+    Raises:
+        ValueError: If the entry is neither waiting nor offered a seat.
+
+    Returns:
+        WaitlistEntry: The cancelled entry.
+    """
+    await _lock_entry(db, entry)
+    if entry.status not in (WAITLIST_WAITING, WAITLIST_OFFERED):
+        raise ValueError(f"The waitlist entry is already {entry.status}.")
+    offered = entry.status == WAITLIST_OFFERED
+    entry.status = WAITLIST_CANCELLED
+    keys, freed = occupancy_keys(entry.session), 0
+    if offered and entry.seat_id is not None:
+        await db.flush()
+        _, freed = await release_seats_by_id(db, entry.session, [entry.seat_id], offer_ttl)
+    await db.commit()
+    if freed:
+        await increment_occupancy(db, keys, occupied=-freed)
+        await db.commit()
+    await db.refresh(entry)
+    return entry
+
+
+async def expire_waitlist_offers(db: AsyncSession, offer_ttl: timedelta = DEFAULT_OFFER_TTL,
+                                 limit: int = 500) -> int:
+    """
+    Releases the seats of offers that were not accepted in time and offers them to
+    the next entries, then commits.
+
+    The expired entries are locked, and those locked by another worker skipped,
+    so concurrent runs do not release a seat twice. Only the seat held for each
+    offer is released, by its ID.
+
+    Args:
+        db (AsyncSession): The database session.
+        offer_ttl (timedelta): How long the next entries have to accept the released seats.
+        limit (int): The most offers expired in one call.
+
+    Returns:
+        int: The number of expired offers.
+    """
+    result = await db.execute(
+        select(WaitlistEntry)
+        .where(WaitlistEntry.status == WAITLIST_OFFERED)
+        .where(WaitlistEntry.offer_expires_at <= _utc_now())
+        .order_by(WaitlistEntry.offer_expires_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    entries = result.scalars().all()
+    if not entries:
+        return 0
+
+    seat_ids: Dict[int, List[int]] = {}
+    for entry in entries:
+        entry.status = WAITLIST_EXPIRED
+        if entry.seat_id is not None:
+            seat_ids.setdefault(entry.session_id, []).append(entry.seat_id)
+    await db.flush()
+    sessions = await db.execute(select(Session).where(Session.id.in_(seat_ids)))
+    freed_by_session = []
+    for session in sessions.scalars():
+        _, freed = await release_seats_by_id(db, session, seat_ids[session.id], offer_ttl)
+        if freed:
+            freed_by_session.append((occupancy_keys(session), freed))
+    expired = len(entries)
+    await db.commit()
+    for keys, freed in freed_by_session:
+        await increment_occupancy(db, keys, occupied=-freed)
+        await db.commit()
+    return expired
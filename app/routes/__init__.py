@@ -1,3 +1,13 @@
+from app.routes.analytics_controller import AnalyticsController
 from app.routes.cinema_room_controller import CinemaRoomController
+from app.routes.event_controller import EventController
+from app.routes.profiler_controller import ProfilerController
+from app.routes.schedule_controller import ScheduleController
+from app.routes.waitlist_controller import WaitlistController
 
+analytics_controller = AnalyticsController()
 cinema_room_controller = CinemaRoomController()
+event_controller = EventController()
+profiler_controller = ProfilerController()
+schedule_controller = ScheduleController()
+waitlist_controller = WaitlistController()
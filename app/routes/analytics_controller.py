@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.DTO.analytics import OccupancyDimension, OccupancyDTO
+from app.models.cinema import OccupancyRollup
+from app.repositories.analytics_repository import get_occupancy, get_occupancy_by_dimension
+from app.utils.depends import get_db
+
+
+def to_occupancy_dto(rollup: OccupancyRollup) -> OccupancyDTO:
+    return OccupancyDTO(
+        dimension=rollup.dimension,
+        key_id=rollup.key_id,
+        capacity=rollup.capacity,
+        occupied=rollup.occupied,
+        fill_rate=rollup.occupied / rollup.capacity if rollup.capacity else 0.0,
+    )
+
+
+class AnalyticsController:
+    def __init__(self):
+        self.router = APIRouter()
+        self.router.add_api_route("/analytics/occupancy/{dimension}", self.get_occupancy_by_dimension,
+                                  methods=["GET"], response_model=list[OccupancyDTO])
+        self.router.add_api_route("/analytics/occupancy/{dimension}/{key_id}", self.get_occupancy,
+                                  methods=["GET"], response_model=OccupancyDTO)
+
+    async def get_occupancy_by_dimension(self, dimension: OccupancyDimension, db: AsyncSession = Depends(get_db)):
+        """Fill rate of every movie, room, showtime or session, read from the rollups."""
+        rollups = await get_occupancy_by_dimension(db, dimension.value)
+        return [to_occupancy_dto(rollup) for rollup in rollups]
+
+    async def get_occupancy(self, dimension: OccupancyDimension, key_id: int, db: AsyncSession = Depends(get_db)):
+        """Fill rate of a single movie, room, showtime or session, read from the rollups by primary key."""
+        rollup = await get_occupancy(db, dimension.value, key_id)
+        if not rollup:
+            raise HTTPException(status_code=404, detail="No occupancy data found")
+        return to_occupancy_dto(rollup)
@@ -1,20 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from datetime import timedelta
+from typing import List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.configuration.settings import settings
 from app.DTO.cinema_room import (
     CinemaRoomsNamesDTO, CinemaRoomsNamesByIdDTO, CinemaRoomResponseDTO,
-    ReservationResponseDTO
+    ReservationResponseDTO, BookingCancellationDTO, CancellationResponseDTO
 )
 from app.DTO.move import MoveDTO
+from app.models.cinema import CinemaRoom, Session
 from app.repositories.cinema_room_repository import (
     get_all_cinema_rooms, get_cinema_room_by_id, get_session_by_id, create_occupied_seat,
-    get_session_by_room_and_film
+    get_session_by_room_and_film, get_occupied_seat_coordinates, release_occupied_seats, release_session_seats,
+    is_session_sold_out
 )
 from app.repositories.move_repository import (
-    get_move_by_id, get_all_moves, get_moves_by_cinema_room
+    get_move_by_id, get_all_moves, get_moves_by_cinema_room, search_moves
+)
+from app.repositories.loaders import RequestLoaders
+from app.utils.depends import (
+    get_db, get_idempotency_store, get_movie_search_index, get_loaders, get_pricing_engine, get_load_monitor,
+    is_admin_token, require_admin_token
 )
-from app.utils.depends import get_db
 from app.utils.helpers import process_cinema_room_and_film
+from app.utils.idempotency import IdempotencyStore, IdempotencyConflict
+from app.utils.load_shedding import LoadMonitor, seat_map_snapshots
+from app.utils.pricing import PricingEngine
+from app.utils.room_layout import layout_cache
+from app.utils.schedule import schedule_stores
+from app.utils.search_index import MovieSearchIndex
+from app.utils.sold_out import sold_out_sessions
+from app.utils.tenancy import current_site_id, scoped_key
+
+MAX_BATCH_SIZE = 100
+SOLD_OUT_DETAIL = "This session is sold out, join its waitlist to be offered a released seat."
+OWNERSHIP_DETAIL = "Cancelling requires the reservation token, the reservation's Idempotency-Key or the admin token"
+
+
+def batch_ids(ids: List[int]) -> List[int]:
+    """
+    Removes duplicate IDs keeping the requested order and enforces the batch size limit.
+    """
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} IDs can be requested at once")
+    return ids
+
+
+def waitlist_offer_ttl() -> timedelta:
+    return timedelta(seconds=settings.waitlist_settings.WAITLIST_OFFER_TTL)
 
 
 class CinemaRoomController:
@@ -22,10 +60,21 @@ class CinemaRoomController:
         self.router = APIRouter()
         self.router.add_api_route("/cinema_rooms/", self.get_cinema_rooms, methods=["GET"],
                                   response_model=list[CinemaRoomsNamesDTO])
+        # Batch routes are registered before the routes they would otherwise match as an ID
+        self.router.add_api_route("/cinema_rooms/batch", self.get_cinema_rooms_batch, methods=["GET"],
+                                  response_model=list[CinemaRoomsNamesByIdDTO])
+        self.router.add_api_route("/movies/batch", self.get_movies_batch, methods=["GET"],
+                                  response_model=list[MoveDTO])
+        self.router.add_api_route("/sessions/batch", self.get_sessions_batch, methods=["GET"],
+                                  response_model=list[CinemaRoomResponseDTO])
         self.router.add_api_route("/cinema_rooms/{room_id}", self.get_cinema_room_by_id, methods=["GET"],
                                   response_model=CinemaRoomsNamesByIdDTO)
         self.router.add_api_route("/movies/", self.get_all_movies, methods=["GET"],
                                   response_model=list[MoveDTO])
+        self.router.add_api_route("/movies/search", self.search_movies, methods=["GET"],
+                                  response_model=list[MoveDTO])
+        self.router.add_api_route("/movies/suggest", self.suggest_movies, methods=["GET"],
+                                  response_model=list[MoveDTO])
         self.router.add_api_route("/cinema_rooms/{room_id}/movies", self.get_movies_by_cinema_room, methods=["GET"],
                                   response_model=list[MoveDTO])
         self.router.add_api_route("/cinema_rooms/{room_id}/films/{film_id}", self.get_cinema_room_and_film,
@@ -33,6 +82,13 @@ class CinemaRoomController:
                                   response_model=CinemaRoomResponseDTO)
         self.router.add_api_route("/cinema_rooms/{room_id}/reserve", self.create_seat_reservation, methods=["POST"],
                                   response_model=ReservationResponseDTO)
+        self.router.add_api_route("/cinema_rooms/{room_id}/reserve", self.cancel_seat_reservation,
+                                  methods=["DELETE"], response_model=CancellationResponseDTO)
+        self.router.add_api_route("/cinema_rooms/{room_id}/reserve/cancel", self.cancel_booking, methods=["POST"],
+                                  response_model=CancellationResponseDTO)
+        self.router.add_api_route("/sessions/{session_id}/reservations", self.cancel_session_reservations,
+                                  methods=["DELETE"], response_model=CancellationResponseDTO,
+                                  dependencies=[Depends(require_admin_token)])
 
     async def get_cinema_rooms(self, db: AsyncSession = Depends(get_db)):
         return await get_all_cinema_rooms(db)
@@ -43,10 +99,67 @@ class CinemaRoomController:
             raise HTTPException(status_code=404, detail="Cinema room not found")
         return room
 
+    async def get_cinema_rooms_batch(self, ids: List[int] = Query(...),
+                                     loaders: RequestLoaders = Depends(get_loaders)):
+        """Get several cinema rooms at once; unknown IDs are left out."""
+        rooms = await loaders.rooms.load_many(batch_ids(ids))
+        return [room for room in rooms if room is not None]
+
+    async def get_movies_batch(self, ids: List[int] = Query(...), loaders: RequestLoaders = Depends(get_loaders)):
+        """Get several movies at once; unknown IDs are left out."""
+        movies = await loaders.moves.load_many(batch_ids(ids))
+        return [movie for movie in movies if movie is not None]
+
+    async def get_sessions_batch(self, ids: List[int] = Query(...), loaders: RequestLoaders = Depends(get_loaders),
+                                 pricing: Optional[PricingEngine] = Depends(get_pricing_engine)):
+        """Get the seat maps of several sessions at once; unknown IDs are left out."""
+        seat_maps = await asyncio.gather(*(self._session_seat_map(loaders, session_id, pricing)
+                                           for session_id in batch_ids(ids)))
+        return [seat_map for seat_map in seat_maps if seat_map is not None]
+
+    async def _session_seat_map(self, loaders: RequestLoaders, session_id: int,
+                                pricing: Optional[PricingEngine]) -> Optional[CinemaRoomResponseDTO]:
+        # Each step is batched with the same step of the other sessions of the request
+        session = await loaders.sessions.load(session_id)
+        if session is None:
+            return None
+        sold_out = sold_out_sessions.get().is_sold_out(session.id)
+        if sold_out:
+            room, film = await asyncio.gather(loaders.rooms.load(session.cinema_room_id),
+                                              loaders.moves.load(session.move_id))
+            occupied_seats = None
+        else:
+            room, film, occupied_seats = await asyncio.gather(
+                loaders.rooms.load(session.cinema_room_id),
+                loaders.moves.load(session.move_id),
+                loaders.occupied_seats.load(session.id),
+            )
+            sold_out = self._check_sold_out(session, room, occupied_seats)
+        return CinemaRoomResponseDTO(**process_cinema_room_and_film(room, session, film, occupied_seats,
+                                                                    pricing, session.move_time.time, sold_out))
+
+    @staticmethod
+    def _check_sold_out(session: Session, room: CinemaRoom, occupied_seats: Tuple[List[int], List[int]]) -> bool:
+        sold_out = len(occupied_seats[0]) >= layout_cache.get(room).capacity
+        if sold_out:
+            sold_out_sessions.get().mark(session.id)
+        return sold_out
+
     async def get_all_movies(self, db: AsyncSession = Depends(get_db)):
         movies = await get_all_moves(db)
         return movies
 
+    async def search_movies(self, q: str = Query(..., min_length=1, max_length=100),
+                            limit: int = Query(20, ge=1, le=100), db: AsyncSession = Depends(get_db)):
+        """Search movies by title."""
+        return await search_moves(db, q, limit)
+
+    async def suggest_movies(self, q: str = Query(..., min_length=1, max_length=100),
+                             limit: int = Query(10, ge=1, le=50),
+                             index: MovieSearchIndex = Depends(get_movie_search_index)):
+        """Typeahead suggestions for movie titles, answered from the in-memory index."""
+        return index.suggest(q, limit)
+
     async def get_movies_by_cinema_room(self, room_id: int, db: AsyncSession = Depends(get_db)):
         """Get all movies for a specific cinema room."""
         room = await get_cinema_room_by_id(db, room_id)
@@ -55,8 +168,42 @@ class CinemaRoomController:
         movies = await get_moves_by_cinema_room(db, room.id)
         return movies
 
-    async def get_cinema_room_and_film(self, room_id: int, film_id: int, db: AsyncSession = Depends(get_db)):
-        """Get cinema room and film details along with reserved seats for a specific session."""
+    async def get_cinema_room_and_film(self, room_id: int, film_id: int, response: Response,
+                                       db: AsyncSession = Depends(get_db),
+                                       pricing: Optional[PricingEngine] = Depends(get_pricing_engine),
+                                       load_monitor: LoadMonitor = Depends(get_load_monitor)):
+        """
+        Get cinema room and film details along with reserved seats for a specific session.
+
+        While the database is saturated the last seat map served is returned instead,
+        with its age in seconds in the `Age` header.
+        """
+        key = (current_site_id(), room_id, film_id)
+        if load_monitor.degraded:
+            stale = seat_map_snapshots.get(key)
+            if stale is not None:
+                return self._stale_seat_map(response, *stale)
+        try:
+            seat_map = await self._load_seat_map(db, room_id, film_id, pricing)
+        except PoolTimeoutError:
+            # No connection became free in time
+            load_monitor.trip()
+            stale = seat_map_snapshots.get(key)
+            if stale is None:
+                raise HTTPException(status_code=503, detail="Temporarily unavailable, please retry later",
+                                    headers={"Retry-After": str(load_monitor.retry_after)})
+            return self._stale_seat_map(response, *stale)
+        seat_map_snapshots.put(key, seat_map)
+        return seat_map
+
+    @staticmethod
+    def _stale_seat_map(response: Response, seat_map: CinemaRoomResponseDTO, age: float) -> CinemaRoomResponseDTO:
+        response.headers["Age"] = str(int(age))
+        response.headers["X-Degraded-Mode"] = "1"
+        return seat_map
+
+    async def _load_seat_map(self, db: AsyncSession, room_id: int, film_id: int,
+                             pricing: Optional[PricingEngine]) -> CinemaRoomResponseDTO:
         room = await get_cinema_room_by_id(db, room_id)
         if not room:
             raise HTTPException(status_code=404, detail="Cinema room not found")
@@ -66,17 +213,53 @@ class CinemaRoomController:
             raise HTTPException(status_code=404, detail="Film not found")
 
         # Get the session by room and film IDs
-        session = await get_session_by_room_and_film(db, room.id, film.id)
+        session = await get_session_by_room_and_film(db, room.id, film.id, load_occupied_seats=False)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found for the given room and film")
+        # A sold-out session is shown fully taken without reading its seats
+        occupied_seats = None
+        sold_out = sold_out_sessions.get().is_sold_out(session.id)
+        if not sold_out:
+            occupied_seats = await get_occupied_seat_coordinates(db, session.id)
+            sold_out = self._check_sold_out(session, room, occupied_seats)
 
         # Use helper to process cinema room and film data
-        response_data = process_cinema_room_and_film(room, session, film)
+        response_data = process_cinema_room_and_film(room, session, film, occupied_seats,
+                                                     pricing, session.move_time.time, sold_out)
 
         return CinemaRoomResponseDTO(**response_data)
 
-    async def create_seat_reservation(self, session_id: int, row: int, column: int, db: AsyncSession = Depends(get_db)):
-        """Reserve a seat for a specific session."""
+    async def create_seat_reservation(self, session_id: int, row: int, column: int,
+                                      idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+                                      db: AsyncSession = Depends(get_db),
+                                      idempotency_store: IdempotencyStore = Depends(get_idempotency_store)):
+        """Reserve a seat for a specific session; retries with the same Idempotency-Key replay the first response."""
+        if not idempotency_key:
+            return await self._reserve_seat(db, session_id, row, column)
+
+        key = scoped_key(f"reserve:{idempotency_key}")
+        fingerprint = f"{session_id}:{row}:{column}"
+        try:
+            stored = await idempotency_store.begin(key, fingerprint)
+        except IdempotencyConflict as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        if stored is not None:
+            return ReservationResponseDTO(**stored)
+
+        try:
+            response = await self._reserve_seat(db, session_id, row, column)
+        except BaseException:
+            # Failed attempts are not stored, so the client can retry them
+            await idempotency_store.discard(key)
+            raise
+        await idempotency_store.complete(key, fingerprint, response.model_dump())
+        return response
+
+    async def _reserve_seat(self, db: AsyncSession, session_id: int, row: int, column: int) -> ReservationResponseDTO:
+        # Requests for sessions this worker knows to be full are turned away without a query
+        if sold_out_sessions.get().is_sold_out(session_id):
+            raise HTTPException(status_code=409, detail=SOLD_OUT_DETAIL)
+
         # Fetch session by session_id
         session = await get_session_by_id(db, session_id)
         if not session:
@@ -84,19 +267,97 @@ class CinemaRoomController:
 
         # Validate seating boundaries based on the cinema room associated with the session
         room = session.cinema_room
-        if row > room.row or column > room.column:
+        if row < 1 or column < 1 or row > room.row or column > room.column:
             raise HTTPException(status_code=400, detail="Invalid row or column for reservation")
+        if not layout_cache.get(room).is_bookable(row, column):
+            raise HTTPException(status_code=400, detail="This seat is not available for reservation.")
 
         try:
             # Create an occupied seat for the session
             occupied_seat = await create_occupied_seat(db, session, row, column)
         except ValueError as e:
+            # Reloaded, since a failed insert rolls back and expires the session
+            session = await get_session_by_id(db, session_id)
+            if session is not None and await is_session_sold_out(db, session):
+                raise HTTPException(status_code=409, detail=SOLD_OUT_DETAIL)
             raise HTTPException(status_code=400, detail=str(e))
+        schedule_stores.get().notify()
 
         return ReservationResponseDTO(
             message="Reservation created successfully",
             reservation={
                 "row": occupied_seat.row,
                 "column": occupied_seat.column
-            }
+            },
+            token=occupied_seat.token
+        )
+
+    async def cancel_seat_reservation(self, session_id: int, row: int, column: int,
+                                      x_reservation_token: Optional[str] = Header(None),
+                                      idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+                                      x_admin_token: Optional[str] = Header(None),
+                                      db: AsyncSession = Depends(get_db),
+                                      idempotency_store: IdempotencyStore = Depends(get_idempotency_store)):
+        """
+        Cancel the reservation of a single seat. Send the token returned with the
+        reservation in X-Reservation-Token, or the Idempotency-Key it was made with.
+        """
+        tokens = None
+        if not is_admin_token(x_admin_token):
+            if not x_reservation_token and idempotency_key:
+                stored = await idempotency_store.get(scoped_key(f"reserve:{idempotency_key}"))
+                x_reservation_token = (stored or {}).get("token")
+            if not x_reservation_token:
+                raise HTTPException(status_code=403, detail=OWNERSHIP_DETAIL)
+            tokens = [x_reservation_token]
+
+        session = await get_session_by_id(db, session_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
+
+        # Seats reserved with another token are answered like free ones
+        released = await release_occupied_seats(db, session, [(row, column)], waitlist_offer_ttl(), tokens)
+        if not released:
+            raise HTTPException(status_code=404, detail="Reservation not found")
+        schedule_stores.get().notify()
+
+        return CancellationResponseDTO(
+            message="Reservation cancelled successfully",
+            released=len(released),
+            seats=[{"row": r, "column": c} for r, c in released]
         )
+
+    async def cancel_booking(self, booking: BookingCancellationDTO, x_admin_token: Optional[str] = Header(None),
+                             db: AsyncSession = Depends(get_db)):
+        """Cancel the reservations of several seats of one session at once, each with its reservation token."""
+        tokens = None
+        if not is_admin_token(x_admin_token):
+            if not all(seat.token for seat in booking.seats):
+                raise HTTPException(status_code=403, detail=OWNERSHIP_DETAIL)
+            tokens = [seat.token for seat in booking.seats]
+
+        session = await get_session_by_id(db, booking.session_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
+
+        seats = [(seat.row, seat.column) for seat in booking.seats]
+        released = await release_occupied_seats(db, session, seats, waitlist_offer_ttl(), tokens)
+        if not released:
+            raise HTTPException(status_code=404, detail="Reservation not found")
+        schedule_stores.get().notify()
+
+        return CancellationResponseDTO(
+            message="Booking cancelled successfully",
+            released=len(released),
+            seats=[{"row": r, "column": c} for r, c in released]
+        )
+
+    async def cancel_session_reservations(self, session_id: int, db: AsyncSession = Depends(get_db)):
+        """Release every reserved seat of a session, e.g. when a screening is cancelled."""
+        session = await get_session_by_id(db, session_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
+
+        released = await release_session_seats(db, session)
+        schedule_stores.get().notify()
+        return CancellationResponseDTO(message="Session reservations cancelled", released=released)
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.DTO.event import OutboxEventDTO
+from app.events.publisher import serialize_event
+from app.repositories.outbox_repository import get_events_after
+from app.utils.depends import get_db, require_admin_token
+
+
+class EventController:
+    def __init__(self):
+        self.router = APIRouter(dependencies=[Depends(require_admin_token)])
+        self.router.add_api_route("/events/", self.get_events, methods=["GET"],
+                                  response_model=list[OutboxEventDTO])
+
+    async def get_events(self, after: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000),
+                         db: AsyncSession = Depends(get_db)):
+        """
+        Change feed: published events with a `sequence` greater than `after`, in commit order.
+        Personal data such as waitlist contacts is left out.
+        """
+        events = await get_events_after(db, after, limit)
+        return [serialize_event(event, redact=True) for event in events]
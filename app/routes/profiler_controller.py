@@ -0,0 +1,44 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+
+from app.DTO.profiler import ProfileDTO, ProfilerStatusDTO
+from app.utils.depends import get_profiler, require_admin_token
+from app.utils.profiler import SamplingProfiler
+
+
+class ProfilerController:
+    def __init__(self):
+        self.router = APIRouter(prefix="/internal/profiler", dependencies=[Depends(require_admin_token)])
+        self.router.add_api_route("", self.get_status, methods=["GET"], response_model=ProfilerStatusDTO)
+        self.router.add_api_route("/start", self.start, methods=["POST"], response_model=ProfilerStatusDTO)
+        self.router.add_api_route("/stop", self.stop, methods=["POST"], response_model=ProfileDTO)
+
+    async def get_status(self, profiler: SamplingProfiler = Depends(get_profiler)):
+        """State of the profiler of the worker serving the request, and its last profile."""
+        return profiler.status()
+
+    async def start(self, request: Request, duration: float = Query(10, gt=0),
+                    route: Optional[str] = None, interval_ms: Optional[float] = Query(None, ge=1, le=1000),
+                    profiler: SamplingProfiler = Depends(get_profiler)):
+        """
+        Starts sampling the stacks of this worker for `duration` seconds.
+
+        With `route`, a path as declared such as `/cinema_rooms/{room_id}/films/{film_id}`,
+        only requests to that route are sampled. Other workers are not affected.
+        """
+        if route is not None and route not in {getattr(r, "path", None) for r in request.app.routes}:
+            raise HTTPException(status_code=400, detail=f"Unknown route {route}")
+        try:
+            profiler.start(duration, route=route, interval=interval_ms / 1000 if interval_ms else None)
+        except RuntimeError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        return profiler.status()
+
+    async def stop(self, profiler: SamplingProfiler = Depends(get_profiler)):
+        """Ends the running capture and returns where it was written."""
+        if not profiler.running:
+            raise HTTPException(status_code=409, detail="No profile is being captured")
+        # Waits for the sampler thread to write the profile
+        return await asyncio.to_thread(profiler.stop)
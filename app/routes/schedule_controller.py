@@ -0,0 +1,26 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, Response
+
+from app.utils.depends import get_schedule_snapshot
+from app.utils.schedule import ScheduleSnapshot
+
+
+class ScheduleController:
+    def __init__(self):
+        self.router = APIRouter()
+        self.router.add_api_route("/schedule", self.get_schedule, methods=["GET"])
+
+    async def get_schedule(self, movie_id: Optional[int] = None, room_id: Optional[int] = None,
+                           if_none_match: Optional[str] = Header(None),
+                           snapshot: ScheduleSnapshot = Depends(get_schedule_snapshot)):
+        """
+        Every session with its movie, room, time and seats left, optionally of one movie or room.
+
+        Served from the precomputed snapshot without querying the database; seats left
+        lag reservations by at most a few seconds.
+        """
+        headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+        if if_none_match == snapshot.etag:
+            return Response(status_code=304, headers=headers)
+        return Response(content=snapshot.select(movie_id, room_id), media_type="application/json", headers=headers)
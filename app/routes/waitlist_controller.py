@@ -0,0 +1,91 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.DTO.waitlist import WaitlistEntryDTO, WaitlistJoinDTO
+from app.models.cinema import WaitlistEntry
+from app.repositories.cinema_room_repository import get_session_by_id, is_session_sold_out
+from app.repositories.waitlist_repository import (
+    accept_offer, get_waitlist_entry, get_waitlist_position, join_waitlist, leave_waitlist
+)
+from app.routes.cinema_room_controller import waitlist_offer_ttl
+from app.utils.depends import get_db
+from app.utils.schedule import schedule_stores
+
+
+class WaitlistController:
+    def __init__(self):
+        self.router = APIRouter()
+        self.router.add_api_route("/sessions/{session_id}/waitlist", self.join, methods=["POST"],
+                                  response_model=WaitlistEntryDTO, status_code=201)
+        self.router.add_api_route("/waitlist/{entry_id}", self.get_entry, methods=["GET"],
+                                  response_model=WaitlistEntryDTO)
+        self.router.add_api_route("/waitlist/{entry_id}/accept", self.accept, methods=["POST"],
+                                  response_model=WaitlistEntryDTO)
+        self.router.add_api_route("/waitlist/{entry_id}", self.leave, methods=["DELETE"],
+                                  response_model=WaitlistEntryDTO)
+
+    async def join(self, session_id: int, body: WaitlistJoinDTO, db: AsyncSession = Depends(get_db)):
+        """
+        Join the waitlist of a sold-out session. Released seats are offered to the
+        waitlist in order; keep the returned token to follow and answer the offer.
+        """
+        session = await get_session_by_id(db, session_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
+        if not await is_session_sold_out(db, session):
+            raise HTTPException(status_code=409, detail="The session has free seats, reserve one instead")
+
+        entry = await join_waitlist(db, session, body.contact)
+        response = await self._entry_response(db, entry)
+        response.token = entry.token
+        return response
+
+    async def get_entry(self, entry_id: int, x_waitlist_token: Optional[str] = Header(None),
+                        db: AsyncSession = Depends(get_db)):
+        """Position in the waitlist, or the seat offered and until when it can be accepted."""
+        entry = await self._authorized_entry(db, entry_id, x_waitlist_token)
+        return await self._entry_response(db, entry)
+
+    async def accept(self, entry_id: int, x_waitlist_token: Optional[str] = Header(None),
+                     db: AsyncSession = Depends(get_db)):
+        """Accept the offered seat, which then stays reserved."""
+        entry = await self._authorized_entry(db, entry_id, x_waitlist_token)
+        try:
+            entry = await accept_offer(db, entry)
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        return await self._entry_response(db, entry)
+
+    async def leave(self, entry_id: int, x_waitlist_token: Optional[str] = Header(None),
+                    db: AsyncSession = Depends(get_db)):
+        """Leave the waitlist, declining the offered seat if any; it is offered to the next entry."""
+        entry = await self._authorized_entry(db, entry_id, x_waitlist_token)
+        try:
+            entry = await leave_waitlist(db, entry, waitlist_offer_ttl())
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        schedule_stores.get().notify()
+        return await self._entry_response(db, entry)
+
+    @staticmethod
+    async def _authorized_entry(db: AsyncSession, entry_id: int, token: Optional[str]) -> WaitlistEntry:
+        entry = await get_waitlist_entry(db, entry_id)
+        # Unknown entries and wrong tokens are answered alike
+        if entry is None or not token or not hmac.compare_digest(token.encode(), entry.token.encode()):
+            raise HTTPException(status_code=404, detail="Waitlist entry not found")
+        return entry
+
+    @staticmethod
+    async def _entry_response(db: AsyncSession, entry: WaitlistEntry) -> WaitlistEntryDTO:
+        return WaitlistEntryDTO(
+            id=entry.id,
+            session_id=entry.session_id,
+            status=entry.status,
+            position=await get_waitlist_position(db, entry),
+            row=entry.row,
+            column=entry.column,
+            offer_expires_at=entry.offer_expires_at,
+        )
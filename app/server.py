@@ -0,0 +1,182 @@
+"""
+Production entry point.
+
+Runs the application under uvicorn's multiprocess supervisor with uvloop and
+httptools. Each worker builds its own engine after it starts, and the
+instance-wide connection budget (DB_MAX_CONNECTIONS) is split between the
+workers before they are spawned. SIGTERM makes the supervisor stop every
+worker, which stops accepting connections, drains in-flight requests for up
+to GRACEFUL_SHUTDOWN_TIMEOUT seconds and then runs the lifespan shutdown.
+
+With `--server hypercorn` the workers are served by Hypercorn instead, which
+speaks HTTP/2: negotiated through ALPN when a certificate is given, otherwise
+as cleartext h2c for clients and proxies that use it, next to HTTP/1.1.
+
+Usage:
+    python -m app.server [--workers N] [--host 0.0.0.0] [--port 8000]
+                         [--server hypercorn [--certfile cert.pem --keyfile key.pem]]
+"""
+import argparse
+import logging
+import os
+
+import uvicorn
+
+from app.configuration.settings import settings
+from app.utils.idempotency import check_idempotency_backend
+
+logger = logging.getLogger(__name__)
+
+
+def available_cpus() -> int:
+    """
+    Returns the number of CPUs this process may run on (respects cgroup/affinity masks).
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def worker_count(requested: int = 0) -> int:
+    """
+    Resolves the number of worker processes.
+
+    Args:
+        requested (int): An explicit worker count; 0 sizes it to the CPU count.
+
+    Returns:
+        int: The number of workers to start.
+    """
+    return requested if requested > 0 else available_cpus()
+
+
+def admin_pool_connections() -> int:
+    """
+    Returns the connections the admin panel of one worker may open: pool_size plus max_overflow of get_sync_engine.
+    """
+    db_settings = settings.db_settings
+    return db_settings.DB_ADMIN_POOL_SIZE + db_settings.DB_ADMIN_MAX_OVERFLOW
+
+
+def check_pool_budget(workers: int, max_connections: int, pool_size: int, max_overflow: int) -> None:
+    """
+    Checks that workers with the given pools stay within the connection budget of one instance.
+
+    Raises:
+        ValueError: If the workers may open more than `max_connections` connections.
+    """
+    connections = workers * (pool_size + max_overflow + admin_pool_connections())
+    if connections > max_connections:
+        raise ValueError(f"DB_POOL_SIZE={pool_size} and DB_MAX_OVERFLOW={max_overflow} let {workers} workers open "
+                         f"{connections} connections, more than DB_MAX_CONNECTIONS={max_connections}")
+
+
+def worker_pool_sizes(workers: int, max_connections: int) -> dict:
+    """
+    Splits the connection budget of one instance between its workers.
+
+    Every worker also loads the admin panel, whose engine may open its pool plus
+    its overflow connections; those are taken from the budget first. Each
+    worker keeps two thirds of what remains of its share as persistent pool
+    connections and the rest as overflow.
+
+    Args:
+        workers (int): The number of worker processes.
+        max_connections (int): Total connections the instance may open.
+
+    Raises:
+        ValueError: If the budget left after the admin pools cannot give every worker a connection.
+
+    Returns:
+        dict: Environment variables configuring each worker's pools.
+    """
+    admin_connections = admin_pool_connections()
+    remaining = max_connections - workers * admin_connections
+    if remaining < workers:
+        raise ValueError(f"DB_MAX_CONNECTIONS={max_connections} cannot serve {workers} workers: their admin pools "
+                         f"take {workers * admin_connections} connections, leaving {remaining} for the application")
+    per_worker = remaining // workers
+    pool_size = max(1, per_worker * 2 // 3)
+    return {
+        "DB_POOL_SIZE": str(pool_size),
+        "DB_MAX_OVERFLOW": str(per_worker - pool_size),
+    }
+
+
+def hypercorn_config(host: str, port: int, workers: int, certfile: str = "", keyfile: str = ""):
+    """
+    Builds the Hypercorn configuration equivalent to the uvicorn setup.
+
+    Args:
+        host (str): The interface to bind.
+        port (int): The port to bind.
+        workers (int): The number of worker processes.
+        certfile (str): PEM certificate enabling TLS and HTTP/2 negotiation; empty for cleartext.
+        keyfile (str): PEM private key of the certificate.
+
+    Returns:
+        hypercorn.config.Config: The configuration.
+    """
+    from hypercorn.config import Config
+
+    config = Config()
+    config.application_path = "app.main:app"
+    config.bind = [f"{host}:{port}"]
+    config.workers = workers
+    config.worker_class = "uvloop"
+    config.graceful_timeout = settings.app_settings.GRACEFUL_SHUTDOWN_TIMEOUT
+    config.accesslog = None
+    if certfile:
+        config.certfile = certfile
+        config.keyfile = keyfile
+    return config
+
+
+def main():
+    app_settings = settings.app_settings
+    parser = argparse.ArgumentParser(description="Run the cinema application with multiple workers.")
+    parser.add_argument("--workers", type=int, default=app_settings.WORKERS)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=app_settings.PORT)
+    parser.add_argument("--server", choices=["uvicorn", "hypercorn"], default=app_settings.SERVER)
+    parser.add_argument("--certfile", default=app_settings.TLS_CERTFILE)
+    parser.add_argument("--keyfile", default=app_settings.TLS_KEYFILE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    workers = worker_count(args.workers)
+    # Workers are spawned as fresh interpreters and read their pool sizes and count from the environment.
+    max_connections = settings.db_settings.DB_MAX_CONNECTIONS
+    try:
+        check_idempotency_backend(settings.idempotency_settings.IDEMPOTENCY_BACKEND, workers)
+        pool_sizes = worker_pool_sizes(workers, max_connections)
+        # Sizes set in the environment win, within the budget too
+        pool_sizes = {name: os.environ.get(name, value) for name, value in pool_sizes.items()}
+        check_pool_budget(workers, max_connections, int(pool_sizes["DB_POOL_SIZE"]), int(pool_sizes["DB_MAX_OVERFLOW"]))
+    except ValueError as e:
+        parser.error(str(e))
+    os.environ.update(pool_sizes)
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    logger.info("Starting %d %s workers with pool_size=%s max_overflow=%s",
+                workers, args.server, os.environ["DB_POOL_SIZE"], os.environ["DB_MAX_OVERFLOW"])
+
+    if args.server == "hypercorn":
+        from hypercorn.run import run
+
+        raise SystemExit(run(hypercorn_config(args.host, args.port, workers, args.certfile, args.keyfile)))
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+        proxy_headers=True,
+        timeout_graceful_shutdown=settings.app_settings.GRACEFUL_SHUTDOWN_TIMEOUT,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+import logging
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.configuration.database import get_sync_session_factory
+from app.configuration.settings import settings
+from app.models.cinema import DEFAULT_SITE_ID, BulkLayoutJobState, CinemaRoom
+from app.utils.room_layout import RoomLayout, layout_cache
+from app.utils.seat_grid import SeatGrid
+
+logger = logging.getLogger(__name__)
+
+# (room id, rows, columns, whether the room is resized) of a room to generate
+RoomShape = Tuple[int, int, int, bool]
+
+
+def generate_room_layouts(rooms: Sequence[RoomShape], layout: Optional[bytes]) -> List[dict]:
+    """
+    Generates the seat maps of a chunk of rooms. Runs in a worker process, so it
+    only takes and returns plain data.
+
+    Args:
+        rooms (Sequence[RoomShape]): The rooms with their new dimensions.
+        layout (Optional[bytes]): The layout codes for every room, or None to keep the rooms' layouts.
+
+    Returns:
+        List[dict]: One row per room for a bulk UPDATE of cinema_rooms by primary key. Resized
+        rooms start over with an empty seating matrix and, without a new layout, a full
+        rectangle of standard seats, like an edit in the admin.
+    """
+    rows = []
+    for room_id, row_count, column_count, resized in rooms:
+        values = {"id": room_id, "row": row_count, "column": column_count}
+        if layout is not None or resized:
+            values["layout"] = layout
+        if resized:
+            values["seating"] = SeatGrid.empty(row_count, column_count).to_json()
+        rows.append(values)
+    return rows
+
+
+class BulkLayoutJob:
+    """
+    Progress of one bulk layout operation, as shown in the admin panel.
+    """
+
+    def __init__(self, room_ids: List[int], rows: Optional[int], columns: Optional[int], layout: Optional[RoomLayout]):
+        self.id = uuid.uuid4().hex[:12]
+        self.room_ids = room_ids
+        self.rows = rows
+        self.columns = columns
+        self.layout = layout
+        self.status = "queued"
+        self.total = len(room_ids)
+        self.done = 0
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @classmethod
+    def from_state(cls, state: BulkLayoutJobState) -> "BulkLayoutJob":
+        """
+        Rebuilds the progress of a job, possibly run by another worker, without its rooms.
+        """
+        job = cls([], None, None, None)
+        for name in ("id", "status", "total", "done", "error", "created_at", "finished_at"):
+            setattr(job, name, getattr(state, name))
+        return job
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("finished", "failed")
+
+    def to_state(self) -> BulkLayoutJobState:
+        return BulkLayoutJobState(id=self.id, status=self.status, total=self.total, done=self.done,
+                                  error=self.error, created_at=self.created_at, finished_at=self.finished_at)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "total": self.total,
+            "done": self.done,
+            "progress": round(self.done / self.total, 3) if self.total else 1.0,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class BulkLayoutRunner:
+    """
+    Generates and stores the seat maps of many rooms outside of the admin request.
+
+    Jobs run one at a time on a background thread. A job's rooms are split into
+    chunks of `chunk_size` which are generated in a pool of `processes` worker
+    processes, so large rooms do not hold the GIL of the serving process, and
+    every chunk is written back in batched UPDATEs and committed on its own.
+    With `processes=0` chunks are generated on the background thread.
+
+    Jobs run in the worker that received them, while the admin's requests reach
+    any worker, so progress is written to bulk_layout_jobs, in the transaction of
+    every chunk, and read back from it. It is kept for the last `keep_jobs` jobs.
+
+    The pool starts its processes with `spawn`, as forking a process running an
+    event loop and the admin's threads can copy locks held by other threads.
+    """
+
+    def __init__(self, session_factory_provider: Callable[[], sessionmaker], processes: int = 2,
+                 chunk_size: int = 50, keep_jobs: int = 20):
+        self.session_factory_provider = session_factory_provider
+        self.processes = processes
+        self.chunk_size = chunk_size
+        self.keep_jobs = keep_jobs
+        self._queue: List[BulkLayoutJob] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[Executor] = None
+
+    def submit(self, room_ids: Sequence[int], rows: Optional[int] = None, columns: Optional[int] = None,
+               layout: Optional[RoomLayout] = None) -> BulkLayoutJob:
+        """
+        Queues the seat maps of `room_ids` for generation.
+
+        Args:
+            room_ids (Sequence[int]): The rooms to update.
+            rows (Optional[int]): The new number of rows; rooms keep theirs if None.
+            columns (Optional[int]): The new number of columns; rooms keep theirs if None.
+            layout (Optional[RoomLayout]): The layout to give every room, which also sets the
+                dimensions if none are given. Without one, rooms keep theirs unless they are resized,
+                which gives them a full rectangle of standard seats.
+
+        Returns:
+            BulkLayoutJob: The queued job.
+
+        Raises:
+            ValueError: If the job changes nothing or the layout does not match the given dimensions.
+        """
+        if layout is None and (rows, columns) == (None, None):
+            raise ValueError("Give new dimensions or a layout.")
+        if layout is not None:
+            if (rows, columns) == (None, None):
+                rows, columns = layout.shape
+            if layout.shape != (rows, columns):
+                raise ValueError(f"The layout must have {rows} rows of {columns} seats.")
+        job = BulkLayoutJob(sorted(set(room_ids)), rows, columns, layout)
+        self._save(job)
+        with self._lock:
+            self._queue.append(job)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._work, name="bulk-layouts", daemon=True)
+                self._thread.start()
+        return job
+
+    def get(self, job_id: str) -> Optional[BulkLayoutJob]:
+        with self.session_factory_provider()() as db:
+            state = db.get(BulkLayoutJobState, job_id)
+            return BulkLayoutJob.from_state(state) if state is not None else None
+
+    def jobs(self) -> List[BulkLayoutJob]:
+        """
+        Returns the kept jobs of every worker, newest first.
+        """
+        with self.session_factory_provider()() as db:
+            states = db.scalars(
+                select(BulkLayoutJobState).order_by(BulkLayoutJobState.created_at.desc()).limit(self.keep_jobs)
+            )
+            return [BulkLayoutJob.from_state(state) for state in states]
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """
+        Waits for the queued jobs to finish.
+        """
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            dropped, self._queue = self._queue, []
+        for job in dropped:
+            job.status, job.error, job.finished_at = "failed", "Dropped by a shutdown.", time.time()
+            self._save(job)
+        self.wait()
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def _work(self) -> None:
+        while True:
+            with self._lock:
+                if not self._queue:
+                    self._thread = None
+                    return
+                job = self._queue.pop(0)
+            try:
+                self._run(job)
+                job.status = "finished"
+            except Exception as e:
+                logger.exception("Bulk layout job %s failed after %d of %d rooms", job.id, job.done, job.total)
+                job.status = "failed"
+                job.error = str(e)
+            job.finished_at = time.time()
+            try:
+                self._save(job, prune=True)
+            except Exception:
+                logger.exception("Saving the progress of bulk layout job %s failed", job.id)
+
+    def _run(self, job: BulkLayoutJob) -> None:
+        job.status = "running"
+        session_factory = self.session_factory_provider()
+        with session_factory() as db:
+            current = db.execute(
+                select(CinemaRoom.id, CinemaRoom.row, CinemaRoom.column).where(CinemaRoom.id.in_(job.room_ids))
+            ).all()
+        rooms = []
+        for room_id, row, column in current:
+            new_row, new_column = job.rows or row or 0, job.columns or column or 0
+            rooms.append((room_id, new_row, new_column, (new_row, new_column) != (row, column)))
+        job.total = len(rooms)
+        self._save(job)
+        layout = job.layout.to_bytes() if job.layout is not None else None
+        logger.info("Bulk layout job %s: %d rooms in chunks of %d", job.id, job.total, self.chunk_size)
+
+        chunks = [rooms[i:i + self.chunk_size] for i in range(0, len(rooms), self.chunk_size)]
+        for chunk in self._generate(chunks, layout):
+            job.done += len(chunk)
+            with session_factory() as db:
+                self._store(db, chunk)
+                db.merge(job.to_state())
+                db.commit()
+            for values in chunk:
+                layout_cache.invalidate(values["id"])
+
+    def _generate(self, chunks: List[List[RoomShape]], layout: Optional[bytes]) -> Iterator[List[dict]]:
+        if self.processes <= 0:
+            for chunk in chunks:
+                yield generate_room_layouts(chunk, layout)
+            return
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.processes,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        futures = [self._executor.submit(generate_room_layouts, chunk, layout) for chunk in chunks]
+        for future in as_completed(futures):
+            yield future.result()
+
+    def _save(self, job: BulkLayoutJob, prune: bool = False) -> None:
+        with self.session_factory_provider()() as db:
+            db.merge(job.to_state())
+            if prune:
+                kept = select(BulkLayoutJobState.id).order_by(BulkLayoutJobState.created_at.desc()).limit(self.keep_jobs)
+                db.execute(delete(BulkLayoutJobState).where(
+                    BulkLayoutJobState.finished_at.is_not(None), BulkLayoutJobState.id.not_in(kept)))
+            db.commit()
+
+    @staticmethod
+    def _store(db: Session, chunk: List[dict]) -> None:
+        # Rooms that keep their seating or layout are separate batches, as every row of an executemany
+        # sets the same columns
+        batches = {}
+        for values in chunk:
+            batches.setdefault(frozenset(values), []).append(values)
+        for batch in batches.values():
+            db.execute(update(CinemaRoom), batch)
+
+
+def create_rooms(db: Session, name_prefix: str, count: int, rows: int, columns: int,
+                 site_id: int = DEFAULT_SITE_ID) -> List[int]:
+    """
+    Creates `count` rooms named "<name_prefix> 1" to "<name_prefix> <count>" in one
+    statement, without seat maps; these are generated by a BulkLayoutRunner.
+
+    Returns:
+        List[int]: The ids of the new rooms.
+    """
+    values = [{"name": f"{name_prefix} {number}", "row": rows, "column": columns, "site_id": site_id}
+              for number in range(1, count + 1)]
+    return list(db.scalars(insert(CinemaRoom).returning(CinemaRoom.id), values))
+
+
+@lru_cache(maxsize=None)
+def get_bulk_layout_runner() -> BulkLayoutRunner:
+    """
+    Returns the process-wide runner, created on first use so the pool only exists where bulk jobs run.
+    """
+    bulk_settings = settings.bulk_layout_settings
+    return BulkLayoutRunner(get_sync_session_factory, processes=bulk_settings.BULK_LAYOUT_PROCESSES,
+                            chunk_size=bulk_settings.BULK_LAYOUT_CHUNK_SIZE)
@@ -0,0 +1,208 @@
+import asyncio
+import gzip
+import threading
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # Installed with requirements.txt; without it responses fall back to gzip
+    brotli = None
+
+GZIP = "gzip"
+BROTLI = "br"
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+
+
+def supported_encodings() -> List[str]:
+    """
+    Returns the encodings this process can produce, most preferred first.
+    """
+    return [BROTLI, GZIP] if brotli is not None else [GZIP]
+
+
+def negotiate_encoding(accept_encoding: str, available: List[str]) -> Optional[str]:
+    """
+    Picks the response encoding from an `Accept-Encoding` header.
+
+    The client's quality values decide; on a tie the server's order in
+    `available` wins. `*` matches any encoding not listed explicitly.
+
+    Args:
+        accept_encoding (str): The header value, e.g. "gzip, deflate, br;q=0.9".
+        available (List[str]): The encodings the server can produce, most preferred first.
+
+    Returns:
+        Optional[str]: The chosen encoding, or None to send the body as is.
+    """
+    qualities: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[name] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 5) -> bytes:
+    if encoding == BROTLI:
+        return brotli.compress(body, quality=brotli_quality)
+    # mtime=0 makes the output depend on the body only, so identical payloads compress identically
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class CompressedBodyCache:
+    """
+    LRU cache of compressed bodies keyed by encoding and BLAKE2b digest of the
+    uncompressed body, bounded by the total size of the cached bodies.
+
+    Keying by content means an entry does not go stale: a changed catalog gets
+    a new key, is compressed once and then served from the cache again. BLAKE2b
+    hashes at about 1 GB/s, a small fraction of the cost of compressing, and unlike
+    a checksum two different bodies do not end up with the same key.
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, bytes], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(body: bytes, encoding: str) -> Tuple[str, bytes]:
+        return encoding, blake2b(body, digest_size=16).digest()
+
+    def get(self, key: Tuple[str, bytes]) -> Optional[bytes]:
+        with self._lock:
+            compressed = self._entries.get(key)
+            if compressed is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return compressed
+
+    def put(self, key: Tuple[str, bytes], compressed: bytes) -> None:
+        if len(compressed) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = compressed
+            self.size += len(compressed)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _is_cacheable(method: str, status: int, headers: Dict[bytes, bytes]) -> bool:
+    if method not in ("GET", "HEAD") or status != 200:
+        return False
+    cache_control = headers.get(b"cache-control", b"").lower()
+    return b"no-store" not in cache_control and b"private" not in cache_control
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing response bodies with the best encoding the
+    client accepts (brotli if installed, else gzip).
+
+    Only single-message bodies of at least `minimum_size` bytes with a textual
+    content type are compressed; streamed responses (files, feeds) and already
+    encoded ones pass through untouched. Compressed bodies of cacheable
+    responses (successful GETs not marked `no-store` or `private`) are kept in
+    `cache`, so a popular payload such as the movie catalog is compressed once
+    and not on every hit. Bodies of at least `offload_size` bytes are hashed and
+    compressed in a thread, so they do not hold up the event loop.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5,
+                 cache: Optional[CompressedBodyCache] = None, offload_size: int = 64 * 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache = cache
+        self.encodings = supported_encodings()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = negotiate_encoding(accept_encoding, self.encodings) if accept_encoding else None
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Held back until the body shows whether it will be compressed
+                start_message = message
+                return
+            if start_message is None:
+                return await send(message)
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = dict(start.get("headers", []))
+            if (message.get("more_body", False) or len(body) < self.minimum_size
+                    or b"content-encoding" in headers
+                    or not headers.get(b"content-type", b"").decode("latin-1").startswith(COMPRESSIBLE_TYPES)):
+                await send(start)
+                return await send(message)
+
+            cacheable = _is_cacheable(scope["method"], start["status"], headers)
+            if len(body) >= self.offload_size:
+                compressed = await asyncio.to_thread(self._compress, body, encoding, cacheable)
+            else:
+                compressed = self._compress(body, encoding, cacheable)
+            headers = [(name, value) for name, value in start.get("headers", [])
+                       if name not in (b"content-length", b"vary")]
+            vary = [value for name, value in start.get("headers", []) if name == b"vary"]
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", b", ".join(vary + [b"Accept-Encoding"])),
+            ]
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compress(self, body: bytes, encoding: str, cacheable: bool) -> bytes:
+        if not cacheable or self.cache is None:
+            return compress(body, encoding, self.gzip_level, self.brotli_quality)
+        key = self.cache.key(body, encoding)
+        compressed = self.cache.get(key)
+        if compressed is None:
+            compressed = compress(body, encoding, self.gzip_level, self.brotli_quality)
+            self.cache.put(key, compressed)
+        return compressed
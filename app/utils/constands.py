@@ -2,6 +2,16 @@ import os
 
 from app.configuration.settings import settings
 
-MEDIA_FOLDER = os.path.join(os.path.dirname(__file__), '../../media')
-os.makedirs(MEDIA_FOLDER, exist_ok=True)
-MEDIA_URL = f"{settings.app_settings.DOMAIN}/media/media/"
\ No newline at end of file
+MEDIA_FOLDER = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../media'))
+MEDIA_URL = f"{settings.app_settings.DOMAIN}/media/media/"
+
+
+def ensure_media_folder() -> str:
+    """
+    Creates the media folder if it does not exist yet.
+
+    Returns:
+        str: The absolute path of the media folder.
+    """
+    os.makedirs(MEDIA_FOLDER, exist_ok=True)
+    return MEDIA_FOLDER
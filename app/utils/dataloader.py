@@ -0,0 +1,55 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class DataLoader(Generic[K, V]):
+    """
+    Coalesces the lookups issued during one iteration of the event loop into one batch call.
+
+    `load` queues the key and returns a future; once every task that is ready to
+    run has had its turn, `batch_load` is called with all queued keys and resolves
+    the futures. Results are memoized for the lifetime of the loader, so a loader
+    is meant to live for one request.
+
+    Loaders sharing an `AsyncSession` must share `lock`, because a session cannot
+    run two statements at the same time.
+    """
+
+    def __init__(self, batch_load: Callable[[List[K]], Awaitable[Dict[K, V]]], lock: Optional[asyncio.Lock] = None):
+        self.batch_load = batch_load
+        self.lock = lock if lock is not None else asyncio.Lock()
+        self._futures: Dict[K, asyncio.Future] = {}
+        self._queue: List[K] = []
+
+    def load(self, key: K) -> "asyncio.Future[Optional[V]]":
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._futures[key] = loop.create_future()
+            self._queue.append(key)
+            if len(self._queue) == 1:
+                # Runs after the tasks that are already scheduled have queued their keys
+                loop.call_soon(lambda: loop.create_task(self._dispatch()))
+        return future
+
+    async def load_many(self, keys: List[K]) -> List[Optional[V]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    async def _dispatch(self) -> None:
+        keys, self._queue = self._queue, []
+        try:
+            async with self.lock:
+                results = await self.batch_load(keys)
+        except Exception as e:
+            for key in keys:
+                future = self._futures.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key in keys:
+            future = self._futures[key]
+            if not future.done():
+                future.set_result(results.get(key))
@@ -1,11 +1,87 @@
+import asyncio
+import hmac
+from functools import lru_cache
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.configuration.database import SessionLocal
+from app.configuration.database import get_site_session_factory
+from app.configuration.settings import settings
+from app.repositories.loaders import RequestLoaders
+from app.repositories.move_repository import get_all_moves
+from app.utils.idempotency import IdempotencyStore, create_idempotency_store
+from app.utils.load_shedding import LoadMonitor, load_monitor
+from app.utils.pricing import PricingEngine, PricingRules
+from app.utils.profiler import SamplingProfiler, profiler
+from app.utils.schedule import ScheduleSnapshot, schedule_stores
+from app.utils.search_index import MovieSearchIndex, movie_search_indexes
 
 
 async def get_db() -> AsyncSession:
-    async with SessionLocal() as session:
+    async with get_site_session_factory()() as session:
         try:
             yield session
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+
+async def get_loaders(db: AsyncSession = Depends(get_db)) -> RequestLoaders:
+    return RequestLoaders(db)
+
+
+@lru_cache(maxsize=None)
+def get_idempotency_store() -> IdempotencyStore:
+    idempotency_settings = settings.idempotency_settings
+    return create_idempotency_store(
+        idempotency_settings.IDEMPOTENCY_BACKEND,
+        ttl=idempotency_settings.IDEMPOTENCY_TTL_SECONDS,
+        max_keys=idempotency_settings.IDEMPOTENCY_MAX_KEYS,
+        redis_url=settings.app_settings.REDIS_URL,
+        pending_ttl=idempotency_settings.IDEMPOTENCY_PENDING_TTL_SECONDS,
+        workers=settings.app_settings.WORKERS,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_pricing_engine() -> Optional[PricingEngine]:
+    pricing_settings = settings.pricing_settings
+    if not pricing_settings.PRICING_ENABLED:
+        return None
+    return PricingEngine(PricingRules.from_json(pricing_settings.PRICING_RULES),
+                         max_sessions=pricing_settings.PRICING_CACHE_SESSIONS)
+
+
+def get_load_monitor() -> LoadMonitor:
+    return load_monitor
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    admin_token = settings.app_settings.ADMIN_TOKEN
+    return bool(admin_token and token and hmac.compare_digest(token.encode(), admin_token.encode()))
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def get_profiler() -> SamplingProfiler:
+    if not settings.profiler_settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    return profiler
+
+
+async def get_movie_search_index(db: AsyncSession = Depends(get_db)) -> MovieSearchIndex:
+    index = movie_search_indexes.get()
+    # Also rebuilt once it is older than its max_age, to pick up edits made through the admin of other workers
+    if index.stale:
+        movies = await get_all_moves(db)
+        # Building the trie for a large catalog takes a while, keep it off the event loop
+        await asyncio.to_thread(index.rebuild, movies)
+    return index
+
+
+async def get_schedule_snapshot(db: AsyncSession = Depends(get_db)) -> ScheduleSnapshot:
+    # The session is only used if no snapshot has been built yet
+    return await schedule_stores.get().get(db)
@@ -1,11 +1,18 @@
-import json
+from datetime import time
+from typing import Optional, Sequence, Tuple
 
 from app.DTO.cinema_room import CinemaRoomDTO
 from app.DTO.move import MoveDTO
 from app.models.cinema import Session, CinemaRoom
+from app.utils.pricing import PricingEngine
+from app.utils.room_layout import layout_cache
+from app.utils.seat_grid import SeatGrid
 
 
-def process_cinema_room_and_film(room: CinemaRoom, session: Session, film) -> dict:
+def process_cinema_room_and_film(room: CinemaRoom, session: Session, film,
+                                 occupied_seats: Optional[Tuple[Sequence[int], Sequence[int]]] = None,
+                                 pricing: Optional[PricingEngine] = None, show_time: Optional[time] = None,
+                                 sold_out: bool = False) -> dict:
     """
     Processes cinema room and film data, including seating and occupied seats.
 
@@ -13,22 +20,32 @@ def process_cinema_room_and_film(room: CinemaRoom, session: Session, film) -> di
         room (CinemaRoom): The cinema room object.
         session (Session): The session object that contains occupied seats information.
         film: The movie object associated with the session.
+        occupied_seats (Optional[Tuple[Sequence[int], Sequence[int]]]): Row and column numbers of the
+            reserved seats. When omitted, they are read from `session.occupied_seats`.
+        pricing (Optional[PricingEngine]): The engine pricing the seats; without it the seat map has no prices.
+        show_time (Optional[time]): The session's showtime, used by the pricing rules.
+        sold_out (bool): Whether the session is known to be sold out, in which case every
+            seat is shown as taken and `occupied_seats` is not used.
 
     Returns:
         dict: A dictionary containing the processed data for cinema room and film.
     """
-    # Extract reserved seats from the session
-    occupied_seats = [{"row": seat.row, "column": seat.column} for seat in session.occupied_seats]
+    if sold_out:
+        grid = SeatGrid.full(room.row, room.column)
+    else:
+        if occupied_seats is None:
+            seats = session.occupied_seats
+            occupied_seats = ([seat.row for seat in seats], [seat.column for seat in seats])
 
-    # Process seating matrix for the cinema room
-    seating = json.loads(room.seating) if room.seating else []
-    # Mark reserved seats in the seating matrix
-    for seat in session.occupied_seats:
-        seating[seat.row - 1][seat.column - 1] = True  # Mark the seat as reserved
+        # Mark reserved seats in the seating matrix in one vectorized pass
+        grid = SeatGrid.from_seating(room.seating, room.row, room.column)
+        grid.mark_occupied(*occupied_seats)
+    # Merge with the room's cached seat types and blocked seats
+    layout = layout_cache.get(room)
+    prices = pricing.price_rows(session.id, show_time, layout, grid) if pricing is not None else None
 
     room_column = list(range(1, room.column + 1))
     room_row = list(range(1, room.row + 1))
-    data = [{'row': r, 'seats': s} for r, s in zip(room_row, seating)]
 
     # Prepare the response data with DTOs
     return {
@@ -42,7 +59,7 @@ def process_cinema_room_and_film(room: CinemaRoom, session: Session, film) -> di
             name=film.name,
             movie_cover=film.movie_cover
         ),
-        "data": data,
-        "occupied_seats": occupied_seats,
-        "session_id": session.id
+        "data": layout.merge(grid, prices),
+        "session_id": session.id,
+        "sold_out": sold_out
     }
@@ -0,0 +1,185 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Optional, Protocol
+
+PENDING = "pending"
+COMPLETED = "completed"
+
+
+class IdempotencyConflict(Exception):
+    """
+    Raised when a key is still being processed or was used with different request parameters.
+    """
+
+
+class IdempotencyStore(Protocol):
+    """
+    Stores the response of a request under its client-supplied Idempotency-Key.
+
+    `begin` either returns the stored response of a completed request, raises
+    IdempotencyConflict, or claims the key for the caller, who must then call
+    `complete` with the response or `discard` if the request failed. `get`
+    returns the stored response of a completed request without claiming the key.
+    """
+
+    async def begin(self, key: str, fingerprint: str) -> Optional[dict]:
+        ...
+
+    async def complete(self, key: str, fingerprint: str, response: dict) -> None:
+        ...
+
+    async def discard(self, key: str) -> None:
+        ...
+
+    async def get(self, key: str) -> Optional[dict]:
+        ...
+
+
+def _check(entry: dict, fingerprint: str) -> dict:
+    if entry["fingerprint"] != fingerprint:
+        raise IdempotencyConflict("Idempotency-Key was already used with different parameters")
+    if entry["state"] == PENDING:
+        raise IdempotencyConflict("A request with this Idempotency-Key is already being processed")
+    return entry["response"]
+
+
+class InMemoryIdempotencyStore:
+    """
+    Per-worker store bounded to `max_keys` entries that expire after `ttl` seconds.
+
+    Entries are kept in insertion order, so expired and overflowing entries are
+    evicted from the front in O(1) each. A claimed key expires after `pending_ttl`
+    seconds until the request completes, like in RedisIdempotencyStore; it may sit
+    behind longer-lived entries, so lookups also check the expiry of the entry found.
+    """
+
+    def __init__(self, ttl: float = 86400, max_keys: int = 100_000, pending_ttl: float = 30):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.pending_ttl = pending_ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def _evict(self, now: float) -> None:
+        while self._entries:
+            key, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now and len(self._entries) <= self.max_keys:
+                break
+            del self._entries[key]
+
+    def _store(self, key: str, entry: dict, ttl: float) -> None:
+        now = time.monotonic()
+        self._entries.pop(key, None)
+        self._entries[key] = (now + ttl, entry)
+        self._evict(now)
+
+    def _lookup(self, key: str) -> Optional[dict]:
+        now = time.monotonic()
+        self._evict(now)
+        stored = self._entries.get(key)
+        if stored is None or stored[0] <= now:
+            return None
+        return stored[1]
+
+    async def begin(self, key: str, fingerprint: str) -> Optional[dict]:
+        entry = self._lookup(key)
+        if entry is not None:
+            return _check(entry, fingerprint)
+        self._store(key, {"state": PENDING, "fingerprint": fingerprint, "response": None}, self.pending_ttl)
+        return None
+
+    async def complete(self, key: str, fingerprint: str, response: dict) -> None:
+        self._store(key, {"state": COMPLETED, "fingerprint": fingerprint, "response": response}, self.ttl)
+
+    async def discard(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    async def get(self, key: str) -> Optional[dict]:
+        entry = self._lookup(key)
+        if entry is None or entry["state"] != COMPLETED:
+            return None
+        return entry["response"]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisIdempotencyStore:
+    """
+    Store shared by all workers and nodes; Redis expires the keys after `ttl` seconds.
+
+    A claimed key expires after `pending_ttl` seconds until the request completes,
+    so a worker dying mid-request does not block retries with its key for the full `ttl`.
+    """
+
+    def __init__(self, redis_url: str, ttl: float = 86400, pending_ttl: float = 30, prefix: str = "idempotency:"):
+        from redis import asyncio as aioredis
+
+        self.redis = aioredis.from_url(redis_url)
+        self.ttl = int(ttl)
+        self.pending_ttl = max(1, int(pending_ttl))
+        self.prefix = prefix
+
+    async def begin(self, key: str, fingerprint: str) -> Optional[dict]:
+        entry = {"state": PENDING, "fingerprint": fingerprint, "response": None}
+        # SET NX claims the key atomically across nodes
+        if await self.redis.set(self.prefix + key, json.dumps(entry), nx=True, ex=self.pending_ttl):
+            return None
+        stored = await self.redis.get(self.prefix + key)
+        if stored is None:
+            return await self.begin(key, fingerprint)
+        return _check(json.loads(stored), fingerprint)
+
+    async def complete(self, key: str, fingerprint: str, response: dict) -> None:
+        entry = {"state": COMPLETED, "fingerprint": fingerprint, "response": response}
+        await self.redis.set(self.prefix + key, json.dumps(entry), ex=self.ttl)
+
+    async def discard(self, key: str) -> None:
+        await self.redis.delete(self.prefix + key)
+
+    async def get(self, key: str) -> Optional[dict]:
+        stored = await self.redis.get(self.prefix + key)
+        if stored is None:
+            return None
+        entry = json.loads(stored)
+        return entry["response"] if entry["state"] == COMPLETED else None
+
+
+def check_idempotency_backend(backend: str, workers: int) -> None:
+    """
+    Checks that the backend can serve `workers` worker processes.
+
+    Raises:
+        ValueError: If the backend is unknown, or keeps keys per worker while several workers run.
+    """
+    if backend not in ("memory", "redis"):
+        raise ValueError(f"Unknown idempotency backend: {backend}")
+    if backend == "memory" and workers > 1:
+        # A retry reaching another worker would reserve again
+        raise ValueError(f"IDEMPOTENCY_BACKEND=memory keeps keys per worker and cannot serve {workers} workers; "
+                         "set IDEMPOTENCY_BACKEND=redis")
+
+
+def create_idempotency_store(backend: str, ttl: float, max_keys: int, redis_url: str,
+                             pending_ttl: float = 30, workers: int = 1) -> IdempotencyStore:
+    """
+    Builds the configured store.
+
+    Args:
+        backend (str): "memory" or "redis".
+        ttl (float): Seconds a stored response is kept.
+        max_keys (int): Maximum number of keys kept by the in-memory store.
+        redis_url (str): Redis connection URL for the redis backend.
+        pending_ttl (float): Seconds a key claimed by a request that has not completed is kept.
+        workers (int): The number of worker processes sharing the keys.
+
+    Raises:
+        ValueError: If the backend is unknown or cannot serve that many workers.
+
+    Returns:
+        IdempotencyStore: The configured store.
+    """
+    check_idempotency_backend(backend, workers)
+    if backend == "memory":
+        return InMemoryIdempotencyStore(ttl=ttl, max_keys=max_keys, pending_ttl=pending_ttl)
+    return RedisIdempotencyStore(redis_url, ttl=ttl, pending_ttl=pending_ttl)
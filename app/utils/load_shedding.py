@@ -0,0 +1,192 @@
+import asyncio
+import json
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Browse routes answered from the database that clients can do without for a while. Seat maps,
+# the schedule, suggestions and everything changing reservations keep being served.
+LOW_PRIORITY_PATHS = ("/movies/", "/movies/search", "/movies/batch", "/cinema_rooms/", "/cinema_rooms/batch",
+                      "/events/")
+
+
+def is_low_priority(method: str, path: str) -> bool:
+    """
+    Whether a request is shed while the database is saturated.
+    """
+    if method != "GET":
+        return False
+    return (path in LOW_PRIORITY_PATHS or path.startswith("/analytics/")
+            or (path.startswith("/cinema_rooms/") and path.endswith("/movies")))
+
+
+class LoadMonitor:
+    """
+    Detects a saturated database from live signals and switches the worker into degraded mode.
+
+    Every `interval` seconds a probe checks a connection out of the pool and runs
+    `SELECT 1`, measuring the pool wait and the database latency as requests see
+    them. A probe over either threshold, or not finished within twice the
+    larger one, enters degraded mode at once. It is left after `recover_after`
+    consecutive probes under half the thresholds, so the mode does not flap
+    around them. Requests that time out waiting for a connection `trip` it too.
+    """
+
+    def __init__(self, pool_wait_threshold: float = 0.2, latency_threshold: float = 0.25,
+                 recover_after: int = 5, interval: float = 1.0):
+        self.pool_wait_threshold = pool_wait_threshold
+        self.latency_threshold = latency_threshold
+        self.recover_after = recover_after
+        self.interval = interval
+        self.degraded = False
+        self.degraded_since: Optional[float] = None
+        self.pool_wait = 0.0
+        self.latency = 0.0
+        self._calm_probes = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def retry_after(self) -> int:
+        """
+        Seconds after which a shed request is worth retrying: the shortest possible recovery.
+        """
+        return max(1, math.ceil(self.interval * self.recover_after))
+
+    async def _measure(self, engine: AsyncEngine) -> Tuple[float, float]:
+        started = time.perf_counter()
+        async with engine.connect() as connection:
+            acquired = time.perf_counter()
+            await connection.execute(text("SELECT 1"))
+        return acquired - started, time.perf_counter() - acquired
+
+    async def probe(self, engine: AsyncEngine) -> bool:
+        """
+        Measures the database once and updates the mode.
+
+        Returns:
+            bool: Whether the worker is degraded.
+        """
+        timeout = 2 * max(self.pool_wait_threshold, self.latency_threshold)
+        try:
+            pool_wait, latency = await asyncio.wait_for(self._measure(engine), timeout=timeout)
+        except asyncio.TimeoutError:
+            pool_wait = latency = timeout
+        except Exception:
+            logger.warning("Database probe failed", exc_info=True)
+            pool_wait = latency = timeout
+        return self.record(pool_wait, latency)
+
+    def record(self, pool_wait: float, latency: float) -> bool:
+        self.pool_wait, self.latency = pool_wait, latency
+        if pool_wait > self.pool_wait_threshold or latency > self.latency_threshold:
+            self.trip()
+        elif self.degraded:
+            calm = pool_wait <= self.pool_wait_threshold / 2 and latency <= self.latency_threshold / 2
+            self._calm_probes = self._calm_probes + 1 if calm else 0
+            if self._calm_probes >= self.recover_after:
+                logger.info("Database load back to normal after %.0fs, leaving degraded mode",
+                            time.monotonic() - self.degraded_since)
+                self.degraded = False
+                self.degraded_since = None
+        return self.degraded
+
+    def trip(self) -> None:
+        """
+        Enters degraded mode, or restarts the recovery count if already degraded.
+        """
+        self._calm_probes = 0
+        if not self.degraded:
+            logger.warning("Database saturated (pool wait %.0f ms, latency %.0f ms), entering degraded mode",
+                           self.pool_wait * 1000, self.latency * 1000)
+            self.degraded = True
+            self.degraded_since = time.monotonic()
+
+    async def run(self, engine: AsyncEngine) -> None:
+        while True:
+            await self.probe(engine)
+            await asyncio.sleep(self.interval)
+
+    def start(self, engine: AsyncEngine) -> asyncio.Task:
+        self._task = asyncio.create_task(self.run(engine), name="load-monitor")
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+class SnapshotCache:
+    """
+    The last response per key with the time it was taken, to serve while degraded.
+
+    Entries older than `max_age` seconds are not served; the least recently
+    stored entries are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, max_age: float = 60.0, max_entries: int = 10000):
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """
+        Returns:
+            Optional[Tuple[Any, float]]: The value and its age in seconds, or None if missing or too old.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        age = time.monotonic() - entry[0]
+        return (entry[1], age) if age <= self.max_age else None
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class LoadSheddingMiddleware:
+    """
+    ASGI middleware rejecting low-priority requests with `503 Service Unavailable`
+    and `Retry-After` while `monitor` reports a saturated database.
+    """
+
+    def __init__(self, app, monitor: LoadMonitor, shed: Callable[[str, str], bool] = is_low_priority):
+        self.app = app
+        self.monitor = monitor
+        self.shed = shed
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.monitor.degraded or not self.shed(scope["method"], scope["path"]):
+            return await self.app(scope, receive, send)
+        body = json.dumps({"detail": "Temporarily unavailable, please retry later"}).encode()
+        await send({"type": "http.response.start", "status": 503, "headers": [
+            (b"retry-after", str(self.monitor.retry_after).encode()),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ]})
+        await send({"type": "http.response.body", "body": body})
+
+
+load_monitor = LoadMonitor()
+seat_map_snapshots = SnapshotCache()
@@ -0,0 +1,188 @@
+import json
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.room_layout import SEAT_TYPE_NAMES, TYPE_MASK, RoomLayout, SeatType
+from app.utils.seat_grid import SeatGrid
+
+DEFAULT_RULES = {
+    "base": {"standard": 10.0, "vip": 15.0, "wheelchair": 10.0, "companion": 10.0},
+    "showtimes": [
+        {"from": "00:00", "to": "17:00", "multiplier": 0.8},
+        {"from": "19:00", "to": "23:00", "multiplier": 1.2},
+    ],
+    "fill": [
+        {"from": 0.5, "multiplier": 1.1},
+        {"from": 0.8, "multiplier": 1.25},
+    ],
+}
+
+
+def _parse_time(value: str) -> time:
+    try:
+        return time.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid time '{value}', expected HH:MM.")
+
+
+def _multiplier(rule: dict) -> float:
+    multiplier = float(rule.get("multiplier", 1.0))
+    if multiplier <= 0:
+        raise ValueError("Price multipliers must be positive.")
+    return multiplier
+
+
+class PricingRules:
+    """
+    Seat prices by seat category, adjusted by the showtime and the session's fill rate.
+
+    `base` maps seat categories to their price; categories left out cost the
+    standard price. `showtimes` are [from, to) time bands, the first band
+    containing the showtime applies and a band may wrap past midnight. `fill`
+    tiers apply from a fill rate (occupied / capacity) on, the highest reached
+    tier applies. Both multiply the base price.
+    """
+
+    __slots__ = ("base", "showtimes", "fill_thresholds", "fill_multipliers")
+
+    def __init__(self, base: Dict[str, float], showtimes: List[Tuple[time, time, float]],
+                 fill: List[Tuple[float, float]]):
+        if "standard" not in base:
+            raise ValueError("The pricing rules need a base price for standard seats.")
+        unknown = set(base) - {name for name in SEAT_TYPE_NAMES.values() if name}
+        if unknown:
+            raise ValueError(f"Unknown seat categories in the pricing rules: {', '.join(sorted(unknown))}.")
+        if any(price < 0 for price in base.values()):
+            raise ValueError("Base prices cannot be negative.")
+        self.base = base
+        self.showtimes = showtimes
+        fill = sorted(fill)
+        self.fill_thresholds = [threshold for threshold, _ in fill]
+        self.fill_multipliers = [1.0] + [multiplier for _, multiplier in fill]
+
+    @classmethod
+    def from_dict(cls, rules: dict) -> "PricingRules":
+        """
+        Builds the rules from their JSON form, see DEFAULT_RULES.
+
+        Raises:
+            ValueError: If a price, time or multiplier is invalid.
+        """
+        base = {name: float(price) for name, price in rules.get("base", {}).items()}
+        showtimes = [(_parse_time(band["from"]), _parse_time(band["to"]), _multiplier(band))
+                     for band in rules.get("showtimes", [])]
+        fill = [(float(tier["from"]), _multiplier(tier)) for tier in rules.get("fill", [])]
+        return cls(base, showtimes, fill)
+
+    @classmethod
+    def from_json(cls, text: str) -> "PricingRules":
+        return cls.from_dict(json.loads(text) if text.strip() else DEFAULT_RULES)
+
+    def showtime_multiplier(self, show_time: Optional[time]) -> float:
+        if show_time is None:
+            return 1.0
+        for start, end, multiplier in self.showtimes:
+            inside = start <= show_time < end if start <= end else (show_time >= start or show_time < end)
+            if inside:
+                return multiplier
+        return 1.0
+
+    def tier(self, occupied: int, capacity: int) -> int:
+        """
+        The index of the fill tier reached; 0 below the first tier.
+        """
+        if capacity <= 0:
+            return len(self.fill_thresholds)
+        return bisect_right(self.fill_thresholds, occupied / capacity)
+
+    def compile(self, show_time: Optional[time]) -> np.ndarray:
+        """
+        Compiles the prices of one showtime into a lookup table.
+
+        Returns:
+            np.ndarray: A (fill tiers x seat type codes) array of prices in cents,
+            NaN for codes that are not a seat.
+        """
+        standard = self.base["standard"]
+        base = np.full(TYPE_MASK + 1, np.nan)
+        for seat_type, name in SEAT_TYPE_NAMES.items():
+            if seat_type != SeatType.NONE:
+                base[seat_type] = self.base.get(name, standard) * 100
+        factors = np.asarray(self.fill_multipliers) * self.showtime_multiplier(show_time)
+        return np.rint(factors[:, None] * base[None, :])
+
+
+class _SessionPrices:
+    __slots__ = ("show_time", "layout", "table", "rows")
+
+    def __init__(self, show_time: Optional[time], layout: RoomLayout, table: np.ndarray):
+        self.show_time = show_time
+        self.layout = layout
+        self.table = table
+        # Evaluated price rows per fill tier
+        self.rows: Dict[int, List[list]] = {}
+
+
+class PricingEngine:
+    """
+    Prices every seat of a seat map in one vectorized pass.
+
+    The rules are compiled once per session into a lookup table from fill tier
+    and seat type code to price, and the prices of a whole room are a single
+    fancy-indexing operation on the room's layout codes. The evaluated rows are
+    kept per session and fill tier, so a seat map is re-priced only when its
+    occupancy crosses a tier, its room layout changes or it moves to another
+    showtime. Sessions are evicted least recently used first.
+    """
+
+    def __init__(self, rules: PricingRules, max_sessions: int = 4096):
+        self.rules = rules
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[int, _SessionPrices]" = OrderedDict()
+
+    def price_rows(self, session_id: int, show_time: Optional[time], layout: RoomLayout,
+                   grid: SeatGrid) -> List[list]:
+        """
+        Returns the seat prices of a session.
+
+        Args:
+            session_id (int): The ID of the session.
+            show_time (Optional[time]): The showtime of the session, None to ignore the showtime bands.
+            layout (RoomLayout): The room's layout, as returned by the layout cache.
+            grid (SeatGrid): The session's occupancy, which decides the fill tier.
+
+        Returns:
+            List[list]: One list of prices per row, None where there is no seat or it is blocked.
+        """
+        entry = self._sessions.get(session_id)
+        if entry is None or entry.show_time != show_time or entry.layout is not layout:
+            entry = _SessionPrices(show_time, layout, self.rules.compile(show_time))
+            self._sessions[session_id] = entry
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session_id)
+
+        if grid.occupied.shape == layout.codes.shape:
+            occupied = int(np.count_nonzero(grid.occupied & ~layout.unavailable))
+        else:
+            occupied = int(np.count_nonzero(grid.occupied))
+        tier = self.rules.tier(occupied, layout.capacity)
+        rows = entry.rows.get(tier)
+        if rows is None:
+            prices = (entry.table[tier][layout.codes & TYPE_MASK] / 100).astype(object)
+            prices[layout.unavailable] = None
+            rows = entry.rows[tier] = prices.tolist()
+        return rows
+
+    def invalidate(self, session_id: int) -> None:
+        self._sessions.pop(session_id, None)
+
+    def clear(self) -> None:
+        self._sessions.clear()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from types import CodeType, FrameType
+from typing import Dict, Optional, Set
+
+from starlette.routing import compile_path
+
+logger = logging.getLogger(__name__)
+
+# Deeper stacks are cut at the root end, which keeps the frames closest to the code running
+MAX_STACK_DEPTH = 128
+
+
+@dataclass
+class ProfileResult:
+    path: str
+    samples: int
+    started_at: float
+    duration: float
+    route: Optional[str]
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of this worker at a fixed wall-clock interval and
+    writes them in the collapsed stack format read by flamegraph.pl, speedscope
+    and inferno.
+
+    A background thread reads the current frame of every thread every `interval`
+    seconds, so the profiled code is not instrumented and the cost is one stack
+    walk per thread per sample. A capture lasts until `stop` or the end of its
+    window, then is written to `output_dir` as `profile-<pid>-<time>.folded`,
+    one `frame;frame;...;frame count` line per distinct stack.
+
+    With a `route`, only the event loop thread is sampled and only while it runs
+    the task of a request to that route, as tagged by ProfilingMiddleware. Work
+    the request hands to other threads is not attributed to it.
+    """
+
+    def __init__(self, output_dir: str = "profiles", interval: float = 0.01, max_duration: float = 60.0):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.max_duration = max_duration
+        self.route: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.duration: Optional[float] = None
+        self._capture_interval = interval
+        self.last_result: Optional[ProfileResult] = None
+        self._route_pattern: Optional[re.Pattern] = None
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._labels: Dict[CodeType, str] = {}
+        # Tasks of the requests being profiled, and the event loop of each thread serving requests
+        self._tasks: Set[asyncio.Task] = set()
+        self._loops: Dict[int, asyncio.AbstractEventLoop] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: float, route: Optional[str] = None, interval: Optional[float] = None) -> None:
+        """
+        Starts a capture.
+
+        Args:
+            duration (float): Seconds to sample for, at most `max_duration`.
+            route (Optional[str]): A route path as declared, e.g. "/cinema_rooms/{room_id}/films/{film_id}",
+                to only sample requests to it; None samples every thread.
+            interval (Optional[float]): Seconds between samples, instead of `interval`.
+
+        Raises:
+            RuntimeError: If a capture is already running.
+        """
+        with self._lock:
+            if self.running:
+                raise RuntimeError("A profile is already being captured")
+            self.route = route
+            self._route_pattern = compile_path(route)[0] if route else None
+            self.duration = min(duration, self.max_duration)
+            self._capture_interval = interval or self.interval
+            self._stacks = Counter()
+            self._samples = 0
+            self._stop.clear()
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        logger.info("Profiling %s for %.0fs every %.0f ms", route or "all threads", self.duration,
+                    self._capture_interval * 1000)
+
+    def stop(self) -> Optional[ProfileResult]:
+        """
+        Ends the running capture early and waits for it to be written.
+
+        Returns:
+            Optional[ProfileResult]: The written profile, or the last one if none was running.
+        """
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+        return self.last_result
+
+    def matches(self, path: str) -> bool:
+        pattern = self._route_pattern
+        return pattern is not None and pattern.match(path) is not None
+
+    def track(self, task: asyncio.Task) -> None:
+        """
+        Samples `task` while it runs, for captures limited to a route.
+        """
+        self._loops[threading.get_ident()] = task.get_loop()
+        self._tasks.add(task)
+
+    def untrack(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "pid": os.getpid(),
+            "route": self.route if self.running else None,
+            "started_at": self.started_at if self.running else None,
+            "duration": self.duration if self.running else None,
+            "samples": self._samples if self.running else None,
+            "last_profile": asdict(self.last_result) if self.last_result is not None else None,
+        }
+
+    def _run(self) -> None:
+        own_thread = threading.get_ident()
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        deadline = time.monotonic() + self.duration
+        started = time.monotonic()
+        while not self._stop.wait(self._capture_interval) and time.monotonic() < deadline:
+            frames = sys._current_frames()
+            if self._route_pattern is not None:
+                self._sample_tasks(frames)
+                continue
+            for thread_id, frame in frames.items():
+                if thread_id == own_thread:
+                    continue
+                if thread_id not in thread_names:
+                    thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+                self._record(thread_names.get(thread_id, str(thread_id)), frame)
+        self._tasks.clear()
+        self.last_result = self._write(time.monotonic() - started)
+
+    def _sample_tasks(self, frames: Dict[int, FrameType]) -> None:
+        for thread_id, loop in list(self._loops.items()):
+            # Reading another thread's current task is a dictionary lookup, safe under the GIL
+            task = asyncio.current_task(loop)
+            if task is not None and task in self._tasks and thread_id in frames:
+                self._record(self.route, frames[thread_id])
+
+    def _record(self, root: str, frame: Optional[FrameType]) -> None:
+        labels = []
+        while frame is not None and len(labels) < MAX_STACK_DEPTH:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.append(root)
+        self._stacks[";".join(reversed(labels))] += 1
+        self._samples += 1
+
+    def _label(self, code: CodeType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            # Semicolons separate the frames in the collapsed format
+            filename = code.co_filename.replace(";", ":")
+            label = self._labels[code] = f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+        return label
+
+    def _write(self, duration: float) -> ProfileResult:
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at)) + f"{self.started_at % 1:.3f}"[1:]
+        path = os.path.join(self.output_dir, f"profile-{os.getpid()}-{stamp}.folded")
+        with open(path, "w") as file:
+            for stack, count in self._stacks.most_common():
+                file.write(f"{stack} {count}\n")
+        logger.info("Wrote %d samples of %d stacks to %s", self._samples, len(self._stacks), path)
+        return ProfileResult(path=path, samples=self._samples, started_at=self.started_at,
+                             duration=round(duration, 3), route=self.route)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware tagging the tasks of requests to the route being profiled,
+    see SamplingProfiler. It only compares the path while a route is profiled.
+    """
+
+    def __init__(self, app, profiler: SamplingProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.running or not self.profiler.matches(scope["path"]):
+            return await self.app(scope, receive, send)
+        task = asyncio.current_task()
+        self.profiler.track(task)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.untrack(task)
+
+
+profiler = SamplingProfiler()
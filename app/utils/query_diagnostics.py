@@ -0,0 +1,219 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from greenlet import getcurrent
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+REPOSITORY_PACKAGE = "app.repositories."
+# Execution option marking the connection that runs the EXPLAINs, so they are not recorded
+SKIP_OPTION = "skip_query_diagnostics"
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PARAMETER = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<!:):(?!:)\w+|\?")
+_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """
+    Reduces a SQL statement to its shape: literals and parameters become `?`,
+    parameter lists of any length become `(?)` and whitespace is collapsed.
+    """
+    statement = _STRING.sub("?", statement)
+    statement = _PARAMETER.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _LIST.sub("(?)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def fingerprint_statement(statement: str) -> str:
+    """
+    Returns a stable identifier of a statement's shape, the same across requests,
+    workers and parameter values.
+    """
+    return hashlib.sha1(normalize_statement(statement).encode()).hexdigest()[:16]
+
+
+def find_repository_caller() -> Optional[str]:
+    """
+    Finds the repository function that issued the statement being executed.
+
+    With the async engine, the statement runs in a greenlet spawned by the
+    awaiting coroutine, so the search continues in the frames of the parent
+    greenlets, where the repository coroutine is suspended.
+
+    Returns:
+        Optional[str]: The qualified name of the repository function, or None.
+    """
+    current = getcurrent()
+    frame = sys._getframe(1)
+    while True:
+        while frame is not None:
+            module = frame.f_globals.get("__name__", "")
+            if module.startswith(REPOSITORY_PACKAGE):
+                return f"{module[len(REPOSITORY_PACKAGE):]}.{frame.f_code.co_name}"
+            frame = frame.f_back
+        current = current.parent
+        if current is None:
+            return None
+        frame = current.gr_frame
+
+
+class StatementStats:
+    def __init__(self, statement: str):
+        self.statement = statement
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.slow_calls = 0
+        self.repositories: Dict[str, int] = {}
+        self.plan: Optional[List[str]] = None
+
+    def to_dict(self, fingerprint: str) -> dict:
+        return {
+            "fingerprint": fingerprint,
+            "statement": self.statement,
+            "calls": self.calls,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "slow_calls": self.slow_calls,
+            "repositories": self.repositories,
+            "plan": self.plan,
+        }
+
+
+class QueryDiagnostics:
+    """
+    Opt-in recorder of the SQL emitted through an engine.
+
+    Every statement is timed, attributed to the repository function that issued
+    it and aggregated under its fingerprint. The first slow execution of each
+    SELECT is kept with its parameters; `explain_pending` later runs
+    `EXPLAIN (ANALYZE, BUFFERS)` for it on a separate connection, so requests do
+    not wait for the plan. `write_report` dumps the statistics, slowest first.
+    """
+
+    def __init__(self, slow_ms: float = 100.0, max_statements: int = 1000):
+        self.slow_ms = slow_ms
+        self.max_statements = max_statements
+        self.statements: Dict[str, StatementStats] = {}
+        self._pending: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def install(self, engine) -> None:
+        """
+        Starts recording the statements of a sync or async engine.
+        """
+        sync_engine = getattr(engine, "sync_engine", engine)
+        event.listen(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def uninstall(self, engine) -> None:
+        sync_engine = getattr(engine, "sync_engine", engine)
+        event.remove(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.remove(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if conn.get_execution_options().get(SKIP_OPTION) or context is None:
+            return
+        # Kept on the execution context, which is dropped with a statement that fails
+        context._diagnostics_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_diagnostics_started", None)
+        if started is None:
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.record(statement, elapsed_ms, find_repository_caller(), None if executemany else parameters)
+
+    def record(self, statement: str, elapsed_ms: float, repository: Optional[str] = None,
+               parameters=None) -> None:
+        fingerprint = fingerprint_statement(statement)
+        with self._lock:
+            stats = self.statements.get(fingerprint)
+            if stats is None:
+                if len(self.statements) >= self.max_statements:
+                    return
+                stats = self.statements[fingerprint] = StatementStats(normalize_statement(statement))
+            stats.calls += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            key = repository or "<other>"
+            stats.repositories[key] = stats.repositories.get(key, 0) + 1
+            if elapsed_ms >= self.slow_ms:
+                stats.slow_calls += 1
+                is_select = statement.lstrip().upper().startswith(("SELECT", "WITH"))
+                if is_select and stats.plan is None and parameters is not None:
+                    self._pending.setdefault(fingerprint, (statement, parameters))
+
+    async def explain_pending(self, engine) -> int:
+        """
+        Captures the plans of the slow statements recorded since the last call.
+
+        Each statement runs once more under `EXPLAIN (ANALYZE, BUFFERS)` (SQLite:
+        `EXPLAIN QUERY PLAN`) in a transaction that is rolled back. Only SELECTs
+        are explained, because ANALYZE executes the statement.
+
+        Args:
+            engine: The async engine the statements were recorded on.
+
+        Returns:
+            int: The number of plans captured.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) " if engine.dialect.name == "postgresql" else "EXPLAIN QUERY PLAN "
+        captured = 0
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(**{SKIP_OPTION: True})
+            for fingerprint, (statement, parameters) in pending.items():
+                try:
+                    result = await conn.exec_driver_sql(prefix + statement, parameters)
+                    plan = [" | ".join(str(value) for value in row) for row in result]
+                except Exception:
+                    logger.warning("Could not explain statement %s", fingerprint, exc_info=True)
+                    continue
+                finally:
+                    await conn.rollback()
+                with self._lock:
+                    self.statements[fingerprint].plan = plan
+                captured += 1
+        return captured
+
+    def report(self) -> dict:
+        with self._lock:
+            statements = sorted(self.statements.items(), key=lambda item: item[1].total_ms, reverse=True)
+            return {
+                "generated_at": datetime.now(timezone.utc).isoformat(),
+                "pid": os.getpid(),
+                "slow_ms": self.slow_ms,
+                "statements": [stats.to_dict(fingerprint) for fingerprint, stats in statements],
+            }
+
+    def write_report(self, path: str) -> None:
+        """
+        Writes the report as JSON, replacing the previous one atomically.
+        """
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as fh:
+            json.dump(self.report(), fh, indent=2)
+        os.replace(temporary, path)
+
+    async def flush(self, engine, path: str) -> None:
+        await self.explain_pending(engine)
+        self.write_report(path)
@@ -0,0 +1,279 @@
+import json
+import logging
+import math
+import time
+from hashlib import blake2b
+from typing import Callable, Dict, Iterable, Mapping, NamedTuple, Optional, Protocol
+
+logger = logging.getLogger(__name__)
+
+BROWSE = "browse"
+RESERVE = "reserve"
+
+
+class RateLimitRule(NamedTuple):
+    """
+    Allows bursts of up to `limit` requests, refilled at `limit` tokens per `period` seconds.
+    """
+    limit: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        return self.limit / self.period
+
+
+class RateLimitDecision(NamedTuple):
+    allowed: bool
+    remaining: int
+    # Seconds until the bucket is full again
+    reset: float
+    # Seconds until the next request would be allowed
+    retry_after: float
+
+
+def decide(rule: RateLimitRule, tokens: float, allowed: bool) -> RateLimitDecision:
+    rate = rule.rate
+    return RateLimitDecision(
+        allowed=allowed,
+        remaining=int(tokens),
+        reset=(rule.limit - tokens) / rate,
+        retry_after=0.0 if tokens >= 1 else (1 - tokens) / rate,
+    )
+
+
+class RateLimitStore(Protocol):
+    """
+    Keeps one token bucket per key and takes a token from it on every hit.
+    """
+
+    async def hit(self, key: str, rule: RateLimitRule) -> RateLimitDecision:
+        ...
+
+
+class InMemoryRateLimitStore:
+    """
+    Per-worker token buckets spread over `shards` dictionaries.
+
+    Buckets are refilled lazily on access, so a hit is O(1) and nothing runs in
+    the background. Each shard keeps its buckets in last-hit order and evicts
+    from the front: buckets that have refilled completely are equivalent to a
+    missing one, and a shard over `max_keys_per_shard` forgets its stalest client.
+    """
+
+    def __init__(self, shards: int = 16, max_keys_per_shard: int = 10_000, clock: Callable[[], float] = time.monotonic):
+        self.max_keys_per_shard = max_keys_per_shard
+        self.clock = clock
+        # Each bucket is (tokens, last hit, time the bucket is full again)
+        self._shards = [dict() for _ in range(shards)]
+
+    def _evict(self, shard: dict, now: float) -> None:
+        while shard:
+            key = next(iter(shard))
+            if shard[key][2] > now and len(shard) <= self.max_keys_per_shard:
+                break
+            del shard[key]
+
+    def take(self, key: str, rule: RateLimitRule) -> RateLimitDecision:
+        now = self.clock()
+        rate = rule.rate
+        shard = self._shards[hash(key) % len(self._shards)]
+        bucket = shard.pop(key, None)
+        if bucket is None:
+            tokens = float(rule.limit)
+        else:
+            tokens = min(rule.limit, bucket[0] + (now - bucket[1]) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        shard[key] = (tokens, now, now + (rule.limit - tokens) / rate)
+        self._evict(shard, now)
+        return decide(rule, tokens, allowed)
+
+    async def hit(self, key: str, rule: RateLimitRule) -> RateLimitDecision:
+        return self.take(key, rule)
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+
+# Refills and takes a token atomically on the Redis server, using the server
+# clock so that nodes with skewed clocks share the same buckets consistently.
+TOKEN_BUCKET_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or limit
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(limit, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((limit - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisRateLimitStore:
+    """
+    Token buckets shared by all workers and nodes.
+
+    If Redis cannot be reached the request is allowed, so an outage of the
+    limiter does not take the booking API down with it.
+    """
+
+    def __init__(self, redis_url: str, prefix: str = "ratelimit:"):
+        from redis import asyncio as aioredis
+
+        self.redis = aioredis.from_url(redis_url)
+        self.script = self.redis.register_script(TOKEN_BUCKET_SCRIPT)
+        self.prefix = prefix
+
+    async def hit(self, key: str, rule: RateLimitRule) -> RateLimitDecision:
+        try:
+            allowed, tokens = await self.script(keys=[self.prefix + key], args=[rule.limit, rule.rate])
+        except Exception:
+            logger.warning("Rate limit store unavailable, allowing request", exc_info=True)
+            return decide(rule, float(rule.limit), True)
+        return decide(rule, float(tokens), bool(allowed))
+
+
+def create_rate_limit_store(backend: str, shards: int, max_keys_per_shard: int, redis_url: str) -> RateLimitStore:
+    """
+    Builds the configured store.
+
+    Args:
+        backend (str): "memory" or "redis".
+        shards (int): Number of shards of the in-memory store.
+        max_keys_per_shard (int): Maximum number of buckets per shard of the in-memory store.
+        redis_url (str): Redis connection URL for the redis backend.
+
+    Raises:
+        ValueError: If the backend is unknown.
+
+    Returns:
+        RateLimitStore: The configured store.
+    """
+    if backend == "memory":
+        return InMemoryRateLimitStore(shards=shards, max_keys_per_shard=max_keys_per_shard)
+    if backend == "redis":
+        return RedisRateLimitStore(redis_url)
+    raise ValueError(f"Unknown rate limit backend: {backend}")
+
+
+def classify_route(method: str, path: str) -> Optional[str]:
+    """
+    Maps a request to its route class.
+
+    Changes to reservations are "reserve"; reading rooms, seat maps and movies is
+    "browse". Everything else (admin, media, health, feeds) is not limited.
+
+    Args:
+        method (str): The HTTP method.
+        path (str): The request path.
+
+    Returns:
+        Optional[str]: The route class, or None if the request is not limited.
+    """
+    if path.startswith("/cinema_rooms/"):
+        if "/reserve" in path:
+            return RESERVE
+        return BROWSE if method == "GET" else None
+    if path.startswith("/sessions/"):
+        return BROWSE if method == "GET" else RESERVE
+    if path.startswith("/movies/"):
+        return BROWSE
+    return None
+
+
+def hash_api_key(api_key: bytes) -> bytes:
+    return blake2b(api_key, digest_size=12).digest()
+
+
+def api_key_buckets(api_keys: Iterable[str]) -> Dict[bytes, str]:
+    """
+    Maps the hashes of the configured API keys to their bucket keys.
+
+    API keys are hashed so that they are not kept in memory or Redis in clear text.
+    """
+    return {hash_api_key(key.encode()): "key:" + hash_api_key(key.encode()).hex() for key in api_keys if key}
+
+
+def client_key(scope: dict, api_keys: Mapping[bytes, str]) -> str:
+    """
+    Identifies the client by its API key if it sends a configured one, otherwise by its IP address.
+
+    Unknown API keys are ignored, so clients cannot get a fresh bucket per request by
+    sending random keys.
+
+    Args:
+        scope (dict): The ASGI scope of the request.
+        api_keys (Mapping[bytes, str]): The configured API keys, see api_key_buckets.
+
+    Returns:
+        str: The client's bucket key.
+    """
+    for name, value in scope["headers"]:
+        if name == b"x-api-key":
+            bucket = api_keys.get(hash_api_key(value))
+            if bucket is not None:
+                return bucket
+            break
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware limiting every client to one token bucket per route class.
+
+    Allowed responses carry `RateLimit-Limit`, `RateLimit-Remaining` and
+    `RateLimit-Reset` headers; rejected requests get `429 Too Many Requests`
+    with `Retry-After`. Clients sending one of `api_keys` in `X-API-Key` get
+    a bucket of their own instead of their IP address's.
+    """
+
+    def __init__(self, app, store: RateLimitStore, rules: Dict[str, RateLimitRule],
+                 classify: Callable[[str, str], Optional[str]] = classify_route, api_keys: Iterable[str] = ()):
+        self.app = app
+        self.store = store
+        self.rules = rules
+        self.classify = classify
+        self.api_keys = api_key_buckets(api_keys)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        rule_name = self.classify(scope["method"], scope["path"])
+        rule = self.rules.get(rule_name) if rule_name else None
+        if rule is None:
+            return await self.app(scope, receive, send)
+
+        decision = await self.store.hit(f"{rule_name}:{client_key(scope, self.api_keys)}", rule)
+        headers = [
+            (b"ratelimit-limit", str(rule.limit).encode()),
+            (b"ratelimit-remaining", str(decision.remaining).encode()),
+            (b"ratelimit-reset", str(math.ceil(decision.reset)).encode()),
+        ]
+        if not decision.allowed:
+            body = json.dumps({"detail": "Too many requests"}).encode()
+            headers += [
+                (b"retry-after", str(math.ceil(decision.retry_after)).encode()),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ]
+            await send({"type": "http.response.start", "status": 429, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,199 @@
+from collections import OrderedDict
+from enum import IntEnum
+from typing import List, Optional
+
+import numpy as np
+
+from app.models.cinema import CinemaRoom
+from app.utils.seat_grid import SeatGrid
+
+
+class SeatType(IntEnum):
+    STANDARD = 0
+    VIP = 1
+    WHEELCHAIR = 2
+    COMPANION = 3
+    # No seat at this position: an aisle or a gap in the room's shape
+    NONE = 15
+
+
+# Layout codes are one byte per seat: the low nibble is the SeatType, the high bit marks a blocked seat.
+TYPE_MASK = 0x0F
+BLOCKED = 0x80
+
+SEAT_TYPE_NAMES = {
+    SeatType.STANDARD: "standard",
+    SeatType.VIP: "vip",
+    SeatType.WHEELCHAIR: "wheelchair",
+    SeatType.COMPANION: "companion",
+    SeatType.NONE: None,
+}
+
+# Text form used in the admin panel; blocked seats use the lowercase symbol.
+SEAT_TYPE_SYMBOLS = {
+    SeatType.STANDARD: "S",
+    SeatType.VIP: "V",
+    SeatType.WHEELCHAIR: "W",
+    SeatType.COMPANION: "C",
+    SeatType.NONE: ".",
+}
+SYMBOL_SEAT_TYPES = {symbol: seat_type for seat_type, symbol in SEAT_TYPE_SYMBOLS.items()}
+
+
+class RoomLayout:
+    """
+    Per-seat types and blocked flags of a room, stored as a rows x columns uint8 array.
+
+    Everything derived from the codes (the unavailable mask, the per-row type
+    names and the capacity) is computed once, so a cached layout can be merged
+    with a session's occupancy without further per-seat work.
+    """
+
+    __slots__ = ("codes", "unavailable", "type_rows", "capacity")
+
+    def __init__(self, codes: np.ndarray):
+        self.codes = codes
+        types = codes & TYPE_MASK
+        self.unavailable = (types == SeatType.NONE) | ((codes & BLOCKED) != 0)
+        self.capacity = int(self.unavailable.size - np.count_nonzero(self.unavailable))
+
+        names = np.array([SEAT_TYPE_NAMES.get(code) for code in range(TYPE_MASK + 1)], dtype=object)
+        labels = names[types]
+        labels[(codes & BLOCKED) != 0] = "blocked"
+        self.type_rows = labels.tolist()
+
+    @classmethod
+    def default(cls, rows: int, columns: int) -> "RoomLayout":
+        """
+        A full rectangle of standard seats, which is how rooms without a layout are treated.
+        """
+        return cls(np.zeros((rows, columns), dtype=np.uint8))
+
+    @classmethod
+    def from_bytes(cls, data: Optional[bytes], rows: int, columns: int) -> "RoomLayout":
+        """
+        Decodes the layout stored on a cinema room.
+
+        Args:
+            data (Optional[bytes]): One type code per seat in row-major order, or None.
+            rows (int): The number of rows of the room.
+            columns (int): The number of columns of the room.
+
+        Returns:
+            RoomLayout: The decoded layout, or the default one if `data` is missing or
+            does not match the room's dimensions.
+        """
+        if not data or len(data) != rows * columns:
+            return cls.default(rows, columns)
+        return cls(np.frombuffer(data, dtype=np.uint8).reshape(rows, columns))
+
+    @classmethod
+    def from_text(cls, text: str) -> "RoomLayout":
+        """
+        Parses the admin text form: one line per row, one symbol per seat
+        (S standard, V VIP, W wheelchair, C companion, . no seat; lowercase = blocked).
+
+        Raises:
+            ValueError: If a symbol is unknown or the rows have different lengths.
+        """
+        lines = [line.strip() for line in text.strip().splitlines() if line.strip()]
+        if not lines or len({len(line) for line in lines}) != 1:
+            raise ValueError("All layout rows must have the same number of seats.")
+
+        codes = np.zeros((len(lines), len(lines[0])), dtype=np.uint8)
+        for r, line in enumerate(lines):
+            for c, symbol in enumerate(line):
+                seat_type = SYMBOL_SEAT_TYPES.get(symbol.upper())
+                if seat_type is None:
+                    raise ValueError(f"Unknown seat symbol '{symbol}' in row {r + 1}.")
+                codes[r, c] = seat_type | (BLOCKED if symbol.islower() else 0)
+        return cls(codes)
+
+    @property
+    def shape(self) -> tuple:
+        return self.codes.shape
+
+    def to_bytes(self) -> bytes:
+        return self.codes.tobytes()
+
+    def to_text(self) -> str:
+        lines = []
+        for row in self.codes.tolist():
+            symbols = [SEAT_TYPE_SYMBOLS.get(code & TYPE_MASK, "S") for code in row]
+            lines.append("".join(s.lower() if code & BLOCKED else s for s, code in zip(symbols, row)))
+        return "\n".join(lines)
+
+    def is_bookable(self, row: int, column: int) -> bool:
+        """
+        Whether a seat exists at the 1-based position and is not blocked.
+        """
+        rows, columns = self.codes.shape
+        if not (1 <= row <= rows and 1 <= column <= columns):
+            return False
+        return not self.unavailable[row - 1, column - 1]
+
+    def merge(self, grid: SeatGrid, prices: Optional[List[list]] = None) -> List[dict]:
+        """
+        Combines the layout with a session's occupancy in one pass.
+
+        Args:
+            grid (SeatGrid): The session's occupancy.
+            prices (Optional[List[list]]): Per-row seat prices to include, see app.utils.pricing.
+
+        Returns:
+            List[dict]: One entry per row with `seats` (True when the seat cannot be
+            reserved: occupied, blocked or missing), `types` (the seat category,
+            "blocked", or None where there is no seat) and, if given, `prices`.
+        """
+        if grid.occupied.shape == self.codes.shape:
+            unavailable = (grid.occupied | self.unavailable).tolist()
+        else:
+            unavailable = grid.occupied.tolist()
+        if prices is not None:
+            return [{'row': r, 'seats': s, 'types': t, 'prices': p}
+                    for r, (s, t, p) in enumerate(zip(unavailable, self.type_rows, prices), start=1)]
+        return [{'row': r, 'seats': s, 'types': t}
+                for r, (s, t) in enumerate(zip(unavailable, self.type_rows), start=1)]
+
+
+class LayoutCache:
+    """
+    Per-worker cache of decoded room layouts.
+
+    Entries are validated against the room's dimensions and layout bytes, so an
+    edit made by another worker or process is picked up on the next request for
+    that room. The bytes are kept from when the layout was decoded: the rows of
+    one load share them and match by identity, and a row loaded again is
+    compared without hashing its layout.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+
+    @staticmethod
+    def _matches(entry: tuple, room: CinemaRoom) -> bool:
+        row, column, layout = entry[:3]
+        return row == room.row and column == room.column and (layout is room.layout or layout == room.layout)
+
+    def get(self, room: CinemaRoom) -> RoomLayout:
+        entry = self._entries.get(room.id)
+        if entry is not None and self._matches(entry, room):
+            self._entries.move_to_end(room.id)
+            return entry[3]
+
+        layout = RoomLayout.from_bytes(room.layout, room.row or 0, room.column or 0)
+        self._entries[room.id] = (room.row, room.column, room.layout, layout)
+        self._entries.move_to_end(room.id)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return layout
+
+    def invalidate(self, room_id: int) -> None:
+        self._entries.pop(room_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+layout_cache = LayoutCache()
@@ -0,0 +1,202 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+from hashlib import blake2b
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.models.cinema import DEFAULT_SITE_ID
+from app.repositories.schedule_repository import get_schedule_entries
+from app.utils.tenancy import SiteLocal
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(entries: List[dict], generated_at: str) -> bytes:
+    return _wrap(json.dumps(entries, separators=(",", ":")).encode(), generated_at)
+
+
+def _wrap(sessions: bytes, generated_at: str) -> bytes:
+    return b'{"generated_at":"' + generated_at.encode() + b'","sessions":' + sessions + b"}"
+
+
+class ScheduleSnapshot:
+    """
+    Immutable, pre-serialized schedule.
+
+    The whole schedule and its subsets per movie and per room are encoded once
+    when the snapshot is built, so serving any of them is a dictionary lookup.
+    """
+
+    __slots__ = ("generated_at", "body", "etag", "by_movie", "by_room", "sessions")
+
+    def __init__(self, entries: List[dict], generated_at: Optional[datetime] = None):
+        generated_at = (generated_at or datetime.now(timezone.utc)).isoformat()
+        by_movie: Dict[int, List[dict]] = {}
+        by_room: Dict[int, List[dict]] = {}
+        for entry in entries:
+            by_movie.setdefault(entry["movie"]["id"], []).append(entry)
+            by_room.setdefault(entry["room"]["id"], []).append(entry)
+
+        self.generated_at = generated_at
+        self.sessions = len(entries)
+        sessions = json.dumps(entries, separators=(",", ":")).encode()
+        self.body = _wrap(sessions, generated_at)
+        # The ETag covers the sessions only, so rebuilding an unchanged schedule keeps it
+        self.etag = '"' + blake2b(sessions, digest_size=12).hexdigest() + '"'
+        self.by_movie: Mapping[int, bytes] = MappingProxyType(
+            {key: _encode(subset, generated_at) for key, subset in by_movie.items()})
+        self.by_room: Mapping[int, bytes] = MappingProxyType(
+            {key: _encode(subset, generated_at) for key, subset in by_room.items()})
+
+    def select(self, movie_id: Optional[int] = None, room_id: Optional[int] = None) -> bytes:
+        """
+        Returns the encoded schedule, optionally of one movie or one room.
+        """
+        if movie_id is not None:
+            return self.by_movie.get(movie_id) or _encode([], self.generated_at)
+        if room_id is not None:
+            return self.by_room.get(room_id) or _encode([], self.generated_at)
+        return self.body
+
+
+class ScheduleStore:
+    """
+    Holds the current schedule snapshot and rebuilds it in the background.
+
+    The refresher rebuilds every `interval` seconds, or sooner when `notify`
+    is called after a change. Notifications are debounced: the rebuild waits
+    until they pause for `min_interval`, but no longer than `interval` after the
+    first one, so a burst of reservations costs one rebuild. A new snapshot
+    replaces the old one with a single reference assignment: readers get either
+    the old or the new snapshot, never a partial one, and never wait for a rebuild.
+    """
+
+    def __init__(self, interval: float = 5.0, min_interval: float = 0.5):
+        self.interval = interval
+        self.min_interval = min_interval
+        self.snapshot: Optional[ScheduleSnapshot] = None
+        self._wakeup = asyncio.Event()
+        self._rebuild_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def rebuild(self, db: AsyncSession) -> ScheduleSnapshot:
+        """
+        Builds a snapshot from the database and swaps it in.
+        """
+        entries = await get_schedule_entries(db)
+        # Encoding a large schedule takes a while, keep it off the event loop
+        self.snapshot = await asyncio.to_thread(ScheduleSnapshot, entries)
+        return self.snapshot
+
+    async def refresh(self, session_factory: sessionmaker) -> ScheduleSnapshot:
+        async with self._rebuild_lock:
+            async with session_factory() as db:
+                return await self.rebuild(db)
+
+    async def get(self, db: AsyncSession) -> ScheduleSnapshot:
+        """
+        Returns the current snapshot, building the first one with `db` if the refresher has not yet.
+        """
+        snapshot = self.snapshot
+        if snapshot is not None:
+            return snapshot
+        async with self._rebuild_lock:
+            return self.snapshot or await self.rebuild(db)
+
+    def notify(self) -> None:
+        """
+        Asks for a rebuild before the next interval, e.g. right after a reservation.
+        """
+        self._wakeup.set()
+
+    async def run(self, session_factory: sessionmaker) -> None:
+        while True:
+            try:
+                await self.refresh(session_factory)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Building the schedule snapshot failed")
+            await self._wait_for_changes()
+
+    async def _wait_for_changes(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+        except asyncio.TimeoutError:
+            return
+        deadline = loop.time() + self.interval
+        while True:
+            self._wakeup.clear()
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=min(self.min_interval, remaining))
+            except asyncio.TimeoutError:
+                return
+
+    def start(self, session_factory: sessionmaker) -> asyncio.Task:
+        self._task = asyncio.create_task(self.run(session_factory), name="schedule-snapshot")
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+class ScheduleStores(SiteLocal[ScheduleStore]):
+    """
+    The schedule store of every site.
+
+    Once started, the refresher of a site starts with the first use of its store
+    in that site's context, e.g. its first schedule request, so it reads the
+    site's data from the site's database.
+    """
+
+    def __init__(self):
+        super().__init__(ScheduleStore)
+        self.interval = 5.0
+        self.min_interval = 0.5
+        self._session_factory: Optional[Callable[[], sessionmaker]] = None
+
+    def get(self, site_id: Optional[int] = None) -> ScheduleStore:
+        store = super().get(site_id)
+        if site_id is None and self._session_factory is not None and store._task is None:
+            store.interval, store.min_interval = self.interval, self.min_interval
+            store.start(self._session_factory())
+        return store
+
+    def start(self, session_factory: Callable[[], sessionmaker]) -> None:
+        """
+        Starts the refresher of the current site and enables those of the other sites.
+
+        Args:
+            session_factory (Callable[[], sessionmaker]): Returns the session factory of the current site.
+        """
+        self._session_factory = session_factory
+        self.get()
+
+    def notify_all(self) -> None:
+        for _, store in self.items():
+            store.notify()
+
+    async def stop(self) -> None:
+        self._session_factory = None
+        for _, store in self.items():
+            await store.stop()
+
+
+schedule_stores = ScheduleStores()
+schedule_store = schedule_stores.get(DEFAULT_SITE_ID)
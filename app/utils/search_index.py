@@ -0,0 +1,205 @@
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.models.cinema import DEFAULT_SITE_ID, Move
+from app.utils.tenancy import SiteLocal
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.casefold())
+
+
+class _Node:
+    __slots__ = ("children", "ids", "ranked")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # Movies below this node, as a set for intersections and as
+        # (normalized title, ID) pairs in suggestion order
+        self.ids: Set[int] = set()
+        self.ranked: List[tuple] = []
+
+
+def _insert(root: _Node, path: str, key: tuple, in_order: bool = False) -> None:
+    node = root
+    for char in path:
+        node = node.children.setdefault(char, _Node())
+        node.ids.add(key[1])
+        if in_order:
+            node.ranked.append(key)
+        else:
+            insort(node.ranked, key)
+
+
+def _delete(root: _Node, path: str, key: tuple) -> None:
+    nodes = [root]
+    for char in path:
+        node = nodes[-1].children.get(char)
+        if node is None:
+            break
+        node.ids.discard(key[1])
+        position = bisect_left(node.ranked, key)
+        if position < len(node.ranked) and node.ranked[position] == key:
+            del node.ranked[position]
+        nodes.append(node)
+    # Prune the nodes no other title goes through
+    for parent, char in zip(reversed(nodes[:-1]), reversed(path[:len(nodes) - 1])):
+        if parent.children[char].ids:
+            break
+        del parent.children[char]
+
+
+def _find(root: _Node, path: str) -> Optional[_Node]:
+    node = root
+    for char in path:
+        node = node.children.get(char)
+        if node is None:
+            return None
+    return node
+
+
+class MovieSearchIndex:
+    """
+    Per-worker prefix trie over the words of movie titles, for typeahead.
+
+    Each trie node keeps its movies both as a set and as a list sorted in
+    suggestion order, so the best suggestions are read off the front of the
+    lists instead of ranking every candidate. Titles starting with the query
+    come first; they form a contiguous range of the sorted list of all titles.
+    The trie then fills up with titles having a word starting with every typed
+    word, walking the smallest candidate list and checking the others' sets.
+
+    The admin adds and removes movies as they change; `rebuild` replaces the
+    whole index to pick up changes made by other workers, which the index asks
+    for once it is older than `max_age` seconds. Mutations and lookups are
+    serialized by a lock because the admin runs in WSGI threads.
+    """
+
+    # Set from SEARCH_INDEX_REFRESH_INTERVAL by the lifespan; None keeps an index until it is invalidated
+    max_age: Optional[float] = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._words = _Node()
+        # (normalized title, ID) of all movies in suggestion order
+        self._titles: List[tuple] = []
+        # Movie ID -> (normalized title, movie)
+        self._movies: Dict[int, tuple] = {}
+        self.loaded = False
+        self._loaded_at = 0.0
+
+    @staticmethod
+    def _entry(movie: Move) -> tuple:
+        entry = {"id": movie.id, "name": movie.name, "movie_cover": movie.movie_cover or ""}
+        return " ".join(tokenize(movie.name)), entry
+
+    def _add(self, movie_id: int, normalized: str, in_order: bool = False) -> None:
+        key = (normalized, movie_id)
+        for word in set(normalized.split()):
+            _insert(self._words, word, key, in_order)
+        if in_order:
+            self._titles.append(key)
+        else:
+            insort(self._titles, key)
+
+    def _remove(self, movie_id: int, normalized: str) -> None:
+        key = (normalized, movie_id)
+        for word in set(normalized.split()):
+            _delete(self._words, word, key)
+        position = bisect_left(self._titles, key)
+        if position < len(self._titles) and self._titles[position] == key:
+            del self._titles[position]
+
+    def rebuild(self, movies: Iterable[Move]) -> None:
+        """
+        Replaces the index with the given movies.
+        """
+        index = MovieSearchIndex()
+        entries = sorted(((movie.id, self._entry(movie)) for movie in movies), key=lambda item: (item[1][0], item[0]))
+        # Inserting in suggestion order only ever appends to the ranked lists
+        for movie_id, entry in entries:
+            index._movies[movie_id] = entry
+            index._add(movie_id, entry[0], in_order=True)
+        with self._lock:
+            self._words, self._titles, self._movies = index._words, index._titles, index._movies
+            self.loaded = True
+            self._loaded_at = time.monotonic()
+
+    def add(self, movie: Move) -> None:
+        """
+        Adds a movie or updates the title of an indexed one.
+        """
+        entry = self._entry(movie)
+        with self._lock:
+            previous = self._movies.get(movie.id)
+            if previous is not None:
+                self._remove(movie.id, previous[0])
+            self._movies[movie.id] = entry
+            self._add(movie.id, entry[0])
+
+    def remove(self, movie_id: int) -> None:
+        with self._lock:
+            previous = self._movies.pop(movie_id, None)
+            if previous is not None:
+                self._remove(movie_id, previous[0])
+
+    def invalidate(self) -> None:
+        """
+        Makes the next lookup through `get_movie_search_index` rebuild the index.
+        """
+        self.loaded = False
+
+    @property
+    def stale(self) -> bool:
+        """
+        Whether the index must be rebuilt: it was never loaded, was invalidated or is older than `max_age`.
+        """
+        return not self.loaded or (self.max_age is not None and time.monotonic() - self._loaded_at >= self.max_age)
+
+    def suggest(self, query: str, limit: int = 10) -> List[dict]:
+        """
+        Finds the movies having a word starting with every word of the query.
+
+        Titles starting with the query rank first, then titles in alphabetical order.
+
+        Args:
+            query (str): The typed text.
+            limit (int): The maximum number of suggestions.
+
+        Returns:
+            List[dict]: The matching movies as `id`, `name` and `movie_cover`.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        with self._lock:
+            prefix = " ".join(words)
+            found = []
+            for position in range(bisect_left(self._titles, (prefix,)), len(self._titles)):
+                title, movie_id = self._titles[position]
+                if len(found) == limit or not title.startswith(prefix):
+                    break
+                found.append(movie_id)
+            nodes = [_find(self._words, word) for word in words]
+            if len(found) < limit and all(nodes):
+                nodes.sort(key=lambda node: len(node.ids))
+                seen = set(found)
+                for _, movie_id in nodes[0].ranked:
+                    if movie_id not in seen and all(movie_id in node.ids for node in nodes[1:]):
+                        found.append(movie_id)
+                        if len(found) == limit:
+                            break
+            return [self._movies[movie_id][1] for movie_id in found]
+
+    def __len__(self) -> int:
+        return len(self._movies)
+
+
+# Each site searches its own catalog
+movie_search_indexes: SiteLocal[MovieSearchIndex] = SiteLocal(MovieSearchIndex)
+movie_search_index = movie_search_indexes.get(DEFAULT_SITE_ID)
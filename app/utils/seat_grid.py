@@ -0,0 +1,125 @@
+import json
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+_TRUE = ord("t")
+_FALSE = ord("f")
+
+
+class SeatGrid:
+    """
+    Seat occupancy of a room as a rows x columns boolean NumPy array.
+
+    Rows and columns are 1-based in the public API, as in the database and the
+    response format, and 0-based in the underlying array.
+    """
+
+    __slots__ = ("occupied",)
+
+    def __init__(self, occupied: np.ndarray):
+        self.occupied = occupied
+
+    @classmethod
+    def empty(cls, rows: int, columns: int) -> "SeatGrid":
+        return cls(np.zeros((rows, columns), dtype=bool))
+
+    @classmethod
+    def full(cls, rows: int, columns: int) -> "SeatGrid":
+        return cls(np.ones((rows, columns), dtype=bool))
+
+    @classmethod
+    def from_seating(cls, seating: Optional[str], rows: int, columns: int) -> "SeatGrid":
+        """
+        Builds a grid from the JSON seating matrix stored on a cinema room.
+
+        A matrix of JSON booleans is decoded by scanning the raw bytes for the
+        't'/'f' of true/false, which avoids building nested Python lists; anything
+        else falls back to the JSON parser.
+
+        Args:
+            seating (Optional[str]): The seating matrix in JSON format, or None for an empty room.
+            rows (int): The number of rows, used when there is no seating matrix.
+            columns (int): The number of columns, used when there is no seating matrix.
+
+        Returns:
+            SeatGrid: The decoded grid.
+        """
+        if not seating:
+            return cls.empty(rows, columns)
+
+        raw = np.frombuffer(seating.encode(), dtype=np.uint8)
+        flags = raw[(raw == _TRUE) | (raw == _FALSE)]
+        if flags.size == rows * columns and seating.count("[") == rows + 1:
+            return cls((flags == _TRUE).reshape(rows, columns))
+
+        matrix = json.loads(seating)
+        if not matrix:
+            return cls.empty(rows, columns)
+        return cls(np.array(matrix, dtype=bool))
+
+    @property
+    def rows(self) -> int:
+        return self.occupied.shape[0]
+
+    @property
+    def columns(self) -> int:
+        return self.occupied.shape[1]
+
+    def mark_occupied(self, rows: Iterable[int], columns: Iterable[int]) -> "SeatGrid":
+        """
+        Marks seats as occupied from coordinate arrays in a single vectorized assignment.
+
+        Coordinates outside the grid are ignored.
+
+        Args:
+            rows (Iterable[int]): 1-based row numbers.
+            columns (Iterable[int]): 1-based column numbers, aligned with `rows`.
+
+        Returns:
+            SeatGrid: The grid itself, for chaining.
+        """
+        row_index = np.asarray(rows, dtype=np.intp) - 1
+        column_index = np.asarray(columns, dtype=np.intp) - 1
+        inside = ((row_index >= 0) & (row_index < self.rows)
+                  & (column_index >= 0) & (column_index < self.columns))
+        self.occupied[row_index[inside], column_index[inside]] = True
+        return self
+
+    def mark_occupied_seats(self, seats: Iterable[Tuple[int, int]]) -> "SeatGrid":
+        """
+        Marks seats as occupied from (row, column) pairs.
+        """
+        coordinates = np.array(list(seats), dtype=np.intp).reshape(-1, 2)
+        return self.mark_occupied(coordinates[:, 0], coordinates[:, 1])
+
+    def free_counts(self) -> np.ndarray:
+        """
+        Returns the number of free seats in every row.
+        """
+        return self.columns - np.count_nonzero(self.occupied, axis=1)
+
+    def longest_free_runs(self) -> np.ndarray:
+        """
+        Returns the length of the longest block of adjacent free seats in every row.
+        """
+        padded = np.zeros((self.rows, self.columns + 2), dtype=np.int8)
+        padded[:, 1:-1] = ~self.occupied
+        edges = np.diff(padded, axis=1)
+        start_rows, start_columns = np.nonzero(edges == 1)
+        _, end_columns = np.nonzero(edges == -1)
+        runs = np.zeros(self.rows, dtype=np.intp)
+        np.maximum.at(runs, start_rows, end_columns - start_columns)
+        return runs
+
+    def to_rows(self) -> List[dict]:
+        """
+        Converts the grid to the response format: [{'row': 1, 'seats': [False, True, ...]}, ...].
+        """
+        return [{'row': r, 'seats': s} for r, s in enumerate(self.occupied.tolist(), start=1)]
+
+    def to_json(self) -> str:
+        """
+        Serializes the grid to the JSON seating matrix stored on cinema rooms.
+        """
+        return json.dumps(self.occupied.tolist())
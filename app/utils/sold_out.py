@@ -0,0 +1,48 @@
+import time
+from collections import OrderedDict
+
+from app.configuration.settings import settings
+from app.utils.tenancy import SiteLocal
+
+
+class SoldOutCache:
+    """
+    Per-worker set of sessions known to be sold out, so requests for them are
+    answered without reading their seats.
+
+    A session is marked by the reservation taking its last seat, or when a
+    reservation or seat map finds it full, and unmarked when seats are released
+    to the public. Releases made by other workers arrive as change notifications
+    (see app.events.invalidation); entries older than `max_age` seconds are
+    dropped, which bounds how long a missed release goes unnoticed.
+    """
+
+    def __init__(self, max_age: float = 10.0, max_entries: int = 10000):
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._marked: "OrderedDict[int, float]" = OrderedDict()
+
+    def mark(self, session_id: int) -> None:
+        self._marked[session_id] = time.monotonic()
+        self._marked.move_to_end(session_id)
+        if len(self._marked) > self.max_entries:
+            self._marked.popitem(last=False)
+
+    def discard(self, session_id: int) -> None:
+        self._marked.pop(session_id, None)
+
+    def is_sold_out(self, session_id: int) -> bool:
+        marked = self._marked.get(session_id)
+        if marked is None:
+            return False
+        if time.monotonic() - marked > self.max_age:
+            self.discard(session_id)
+            return False
+        return True
+
+    def clear(self) -> None:
+        self._marked.clear()
+
+
+# Session IDs of sites with their own database overlap, so every site has its own set
+sold_out_sessions = SiteLocal(lambda: SoldOutCache(max_age=settings.waitlist_settings.SOLD_OUT_CACHE_SECONDS))
@@ -0,0 +1,227 @@
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Generic, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session as OrmSession, with_loader_criteria
+
+from app.models.cinema import DEFAULT_SITE_ID, Site, SiteScoped
+
+T = TypeVar("T")
+
+SITE_HEADER = b"x-site"
+
+
+class SiteContext:
+    """
+    The site a request or background task works for.
+
+    `database_url` is set for sites whose data lives in a database of their own.
+    """
+
+    __slots__ = ("id", "slug", "hostname", "database_url")
+
+    def __init__(self, id: int, slug: str, hostname: Optional[str] = None, database_url: Optional[str] = None):
+        self.id = id
+        self.slug = slug
+        self.hostname = hostname
+        self.database_url = database_url
+
+    def __repr__(self) -> str:
+        return f"SiteContext({self.id}, {self.slug!r})"
+
+
+DEFAULT_SITE = SiteContext(DEFAULT_SITE_ID, "default")
+
+_current_site: ContextVar[Optional[SiteContext]] = ContextVar("current_site", default=None)
+
+
+def current_site() -> Optional[SiteContext]:
+    """
+    Returns the site of the running request or task, None outside of any site.
+    """
+    return _current_site.get()
+
+
+def current_site_id() -> int:
+    site = _current_site.get()
+    return site.id if site is not None else DEFAULT_SITE_ID
+
+
+@contextmanager
+def site_scope(site: Optional[SiteContext]) -> Iterator[Optional[SiteContext]]:
+    """
+    Runs the block, and the tasks it creates, for `site`; None lifts the scoping.
+    """
+    token = _current_site.set(site)
+    try:
+        yield site
+    finally:
+        _current_site.reset(token)
+
+
+def clear_current_site() -> None:
+    """
+    Lifts the site scoping for the rest of the current context, e.g. a WSGI request run in a copied context.
+    """
+    _current_site.set(None)
+
+
+def scoped_key(key: str) -> str:
+    """
+    Prefixes a key of a shared store (idempotency keys, ...) with the current site.
+    """
+    site = _current_site.get()
+    return key if site is None else f"{site.slug}:{key}"
+
+
+@event.listens_for(OrmSession, "do_orm_execute")
+def _scope_to_site(execute_state: ORMExecuteState) -> None:
+    # Every ORM select, update and delete of site-scoped models made while a site is set
+    # only sees that site's rows, including relationship loads and joined entities.
+    site = _current_site.get()
+    if site is None or execute_state.is_column_load or execute_state.is_relationship_load:
+        return
+    if execute_state.is_select or execute_state.is_update or execute_state.is_delete:
+        site_id = site.id
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(SiteScoped, lambda cls: cls.site_id == site_id, include_aliases=True)
+        )
+
+
+@event.listens_for(SiteScoped, "init", propagate=True)
+def _default_to_current_site(target, args, kwargs) -> None:
+    if "site_id" not in kwargs and "site" not in kwargs:
+        target.site_id = current_site_id()
+
+
+class SiteLocal(Generic[T]):
+    """
+    One instance of a per-worker cache per site, created on first use, so the
+    data of one site never ends up in another site's cache.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self.factory = factory
+        self._instances: Dict[int, T] = {}
+
+    def get(self, site_id: Optional[int] = None) -> T:
+        """
+        Returns the instance of `site_id`, by default of the current site.
+        """
+        if site_id is None:
+            site_id = current_site_id()
+        instance = self._instances.get(site_id)
+        if instance is None:
+            instance = self._instances[site_id] = self.factory()
+        return instance
+
+    def items(self) -> List[Tuple[int, T]]:
+        return list(self._instances.items())
+
+    def discard(self, site_id: int) -> None:
+        self._instances.pop(site_id, None)
+
+
+class SiteRegistry:
+    """
+    Per-worker copy of the sites table, used to resolve requests without a query.
+
+    `database_urls` maps site slugs to the URL of their own database; the other
+    sites share the default database. Until the sites are loaded every request
+    resolves to the default site.
+    """
+
+    def __init__(self, database_urls: Optional[Dict[str, str]] = None):
+        self.database_urls = database_urls or {}
+        self.default = DEFAULT_SITE
+        self._by_id: Dict[int, SiteContext] = {DEFAULT_SITE_ID: DEFAULT_SITE}
+        self._by_slug: Dict[str, SiteContext] = {DEFAULT_SITE.slug: DEFAULT_SITE}
+        self._by_hostname: Dict[str, SiteContext] = {}
+
+    @staticmethod
+    def parse_database_urls(text: str) -> Dict[str, str]:
+        """
+        Parses the SITE_DATABASE_URLS setting, a JSON object of site slug to database URL.
+
+        Raises:
+            ValueError: If the setting is not such an object.
+        """
+        urls = json.loads(text) if text.strip() else {}
+        if not isinstance(urls, dict) or not all(isinstance(url, str) for url in urls.values()):
+            raise ValueError("SITE_DATABASE_URLS must be a JSON object of site slugs to database URLs.")
+        return urls
+
+    def load(self, sites: Iterable[Site]) -> None:
+        """
+        Replaces the known sites.
+        """
+        contexts = [SiteContext(site.id, site.slug, site.hostname, self.database_urls.get(site.slug))
+                    for site in sites]
+        by_id = {site.id: site for site in contexts}
+        # Swapped in whole, so concurrent lookups see either the old or the new sites
+        self.default = by_id.get(DEFAULT_SITE_ID, DEFAULT_SITE)
+        by_id.setdefault(DEFAULT_SITE_ID, self.default)
+        self._by_slug = {site.slug: site for site in by_id.values()}
+        self._by_hostname = {site.hostname.lower(): site for site in by_id.values() if site.hostname}
+        self._by_id = by_id
+
+    def get(self, site_id: int) -> Optional[SiteContext]:
+        return self._by_id.get(site_id)
+
+    def resolve(self, slug: Optional[str] = None, host: Optional[str] = None) -> Optional[SiteContext]:
+        """
+        Resolves a request's site by slug, else by host name, else to the default site.
+
+        Returns:
+            Optional[SiteContext]: The site, or None if the requested slug is unknown.
+        """
+        if slug:
+            return self._by_slug.get(slug)
+        if host:
+            site = self._by_hostname.get(host.rsplit(":", 1)[0].lower())
+            if site is not None:
+                return site
+        return self.default
+
+    def __iter__(self) -> Iterator[SiteContext]:
+        return iter(list(self._by_id.values()))
+
+
+class SiteMiddleware:
+    """
+    ASGI middleware running every request in the context of its site.
+
+    The site is taken from the `X-Site` header (a slug) or the `Host` header;
+    requests naming an unknown site get `404 Not Found`.
+    """
+
+    def __init__(self, app, registry: SiteRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        slug = host = None
+        for name, value in scope["headers"]:
+            if name == SITE_HEADER:
+                slug = value.decode("latin-1").strip()
+            elif name == b"host":
+                host = value.decode("latin-1")
+        site = self.registry.resolve(slug, host)
+        if site is None:
+            body = json.dumps({"detail": "Unknown site"}).encode()
+            await send({"type": "http.response.start", "status": 404, "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        with site_scope(site):
+            await self.app(scope, receive, send)
+
+
+site_registry = SiteRegistry()
@@ -0,0 +1,209 @@
+"""
+Compression and HTTP/2 benchmark.
+
+Part one runs in-process: it serves a movie catalog and the seat map of a
+large room through the compression middleware and reports the body size and
+the CPU time per response for every encoding, with and without the
+compressed body cache.
+
+Part two starts `python -m app.server --server hypercorn` behind a byte
+counting TCP proxy and reports the bytes on the wire (headers and framing
+included) and the server CPU time for HTTP/1.1 and HTTP/2, without and with
+compression. It requests endpoints that need no database by default; pass
+`--path /movies/` with a configured database to measure the catalog.
+
+Usage:
+    python benchmarks/compression.py [--movies 2000] [--seats 60x40] [--repeat 200]
+                                     [--requests 200] [--path /openapi.json] [--skip-server]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+from app.utils.compression import CompressedBodyCache, CompressionMiddleware, supported_encodings  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_payloads(movies: int, rows: int, columns: int) -> dict:
+    catalog = [{"id": i, "name": f"Movie title number {i}", "movie_cover": f"media/covers/movie_{i}.png"}
+               for i in range(1, movies + 1)]
+    seat_map = {
+        "room_id": 1, "room_name": "IMAX", "film_id": 1, "film_name": "Movie title number 1",
+        "session_id": 1, "rows": rows, "columns": columns,
+        "occupied": [[(row * columns + column) % 7 == 0 for column in range(columns)] for row in range(rows)],
+        "types": [["S" if 2 < row < rows - 3 else "V" for _ in range(columns)] for row in range(rows)],
+    }
+    return {"catalog": json.dumps(catalog).encode(), "seat map": json.dumps(seat_map).encode()}
+
+
+async def payload_app(scope, receive, send):
+    body = scope["payload"]
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def serve_once(middleware, payload: bytes, encoding: str) -> bytes:
+    scope = {"type": "http", "method": "GET", "path": "/", "payload": payload,
+             "headers": [(b"accept-encoding", encoding.encode())]}
+    body = []
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.append(message["body"])
+
+    await middleware(scope, None, send)
+    return b"".join(body)
+
+
+def in_process(payloads: dict, repeat: int) -> None:
+    print(f"{'payload':<10} {'encoding':<9} {'cache':<6} {'bytes':>9} {'cpu us/response':>16}")
+    for name, payload in payloads.items():
+        for encoding in ["identity"] + supported_encodings():
+            for cached in (False, True):
+                middleware = CompressionMiddleware(payload_app, cache=CompressedBodyCache() if cached else None)
+                body = asyncio.run(serve_once(middleware, payload, encoding))
+
+                async def run():
+                    for _ in range(repeat):
+                        await serve_once(middleware, payload, encoding)
+
+                started = time.process_time()
+                asyncio.run(run())
+                cpu = (time.process_time() - started) / repeat * 1e6
+                print(f"{name:<10} {encoding:<9} {'yes' if cached else 'no':<6} {len(body):>9} {cpu:>16.1f}")
+                if encoding == "identity":
+                    break
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _process_cpu(pid: int) -> float:
+    """
+    CPU seconds used by a process and its children so far (Linux only).
+    """
+    total = 0.0
+    try:
+        with open(f"/proc/{pid}/stat") as fh:
+            fields = fh.read().rsplit(")", 1)[1].split()
+        total += (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        with open(f"/proc/{pid}/task/{pid}/children") as fh:
+            children = [int(child) for child in fh.read().split()]
+    except OSError:
+        return total
+    return total + sum(_process_cpu(child) for child in children)
+
+
+class CountingProxy:
+    """
+    TCP proxy counting the bytes sent by the server to the client.
+    """
+
+    def __init__(self, target_port: int):
+        self.target_port = target_port
+        self.downstream_bytes = 0
+
+    async def _pipe(self, reader, writer, count: bool):
+        try:
+            while data := await reader.read(65536):
+                if count:
+                    self.downstream_bytes += len(data)
+                writer.write(data)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def _handle(self, client_reader, client_writer):
+        server_reader, server_writer = await asyncio.open_connection("127.0.0.1", self.target_port)
+        await asyncio.gather(self._pipe(client_reader, server_writer, False),
+                             self._pipe(server_reader, client_writer, True), return_exceptions=True)
+
+    async def start(self) -> int:
+        server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return server.sockets[0].getsockname()[1]
+
+
+async def drive(proxy_port: int, path: str, requests: int, http2: bool) -> None:
+    async with httpx.AsyncClient(http1=not http2, http2=http2) as client:
+        for _ in range(requests):
+            response = await client.get(f"http://127.0.0.1:{proxy_port}{path}",
+                                        headers={"Accept-Encoding": ", ".join(supported_encodings())})
+            assert response.status_code == 200, f"{path} returned {response.status_code}"
+            assert response.http_version == ("HTTP/2" if http2 else "HTTP/1.1")
+
+
+def start_server(port: int, compression: bool) -> subprocess.Popen:
+    env = {**os.environ, "RATE_LIMIT_ENABLED": "0", "COMPRESSION_ENABLED": "1" if compression else "0"}
+    proc = subprocess.Popen([sys.executable, "-m", "app.server", "--server", "hypercorn", "--workers", "1",
+                             "--host", "127.0.0.1", "--port", str(port)],
+                            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.perf_counter() + 30
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return proc
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise TimeoutError("The server did not start")
+
+
+def over_the_wire(paths: list, requests: int) -> None:
+    print(f"\n{'path':<16} {'protocol':<9} {'compression':<12} {'bytes/response':>15} {'server cpu us/req':>18}")
+    for compression in (False, True):
+        port = _free_port()
+        proc = start_server(port, compression)
+        try:
+            for path in paths:
+                for http2 in (False, True):
+                    async def measure():
+                        proxy = CountingProxy(port)
+                        proxy_port = await proxy.start()
+                        await drive(proxy_port, path, 5, http2)
+                        proxy.downstream_bytes = 0
+                        cpu = _process_cpu(proc.pid)
+                        await drive(proxy_port, path, requests, http2)
+                        # Let the proxy forward the last frames
+                        await asyncio.sleep(0.1)
+                        return proxy.downstream_bytes, _process_cpu(proc.pid) - cpu
+
+                    wire_bytes, cpu = asyncio.run(measure())
+                    print(f"{path:<16} {'HTTP/2' if http2 else 'HTTP/1.1':<9} {'on' if compression else 'off':<12} "
+                          f"{wire_bytes / requests:>15.0f} {cpu / requests * 1e6:>18.0f}")
+        finally:
+            proc.terminate()
+            proc.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--movies", type=int, default=2000)
+    parser.add_argument("--seats", default="60x40", help="Rows x columns of the seat map")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--path", action="append", help="Paths to request from the server")
+    parser.add_argument("--skip-server", action="store_true")
+    args = parser.parse_args()
+
+    rows, columns = (int(value) for value in args.seats.split("x"))
+    in_process(make_payloads(args.movies, rows, columns), args.repeat)
+    if not args.skip_server:
+        over_the_wire(args.path or ["/openapi.json", "/docs"], args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Rate limiter overhead benchmark.
+
+Measures the time RateLimitMiddleware adds to a request by driving an ASGI
+app that answers immediately, with and without the middleware, using the
+in-memory store and a population of distinct clients. Fails when the added
+time per request exceeds --budget microseconds.
+
+Usage:
+    python benchmarks/rate_limit.py [--requests 100000] [--clients 10000] [--budget 50]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.rate_limit import (BROWSE, RESERVE, InMemoryRateLimitStore, RateLimitMiddleware,  # noqa: E402
+                                  RateLimitRule)
+
+
+async def endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+def make_scopes(count: int, clients: int) -> list:
+    return [{
+        "type": "http",
+        "method": "GET",
+        "path": "/cinema_rooms/1/films/1",
+        "headers": [(b"host", b"cinema"), (b"accept", b"application/json")],
+        "client": (f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}", 50000),
+    } for i in (n % clients for n in range(count))]
+
+
+async def run(app, scopes: list) -> float:
+    start = time.perf_counter()
+    for scope in scopes:
+        await app(scope, receive, send)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--clients", type=int, default=10_000)
+    parser.add_argument("--budget", type=float, default=50.0, help="Allowed overhead per request in microseconds")
+    args = parser.parse_args()
+
+    scopes = make_scopes(args.requests, args.clients)
+    limited = RateLimitMiddleware(endpoint, store=InMemoryRateLimitStore(), rules={
+        BROWSE: RateLimitRule(limit=120, period=60),
+        RESERVE: RateLimitRule(limit=10, period=60),
+    })
+
+    baseline = min(asyncio.run(run(endpoint, scopes)) for _ in range(3))
+    with_limit = min(asyncio.run(run(limited, scopes)) for _ in range(3))
+    overhead_us = (with_limit - baseline) / args.requests * 1e6
+
+    print(f"{args.requests} requests from {args.clients} clients")
+    print(f"baseline      {baseline / args.requests * 1e6:8.2f} us/request")
+    print(f"rate limited  {with_limit / args.requests * 1e6:8.2f} us/request")
+    print(f"overhead      {overhead_us:8.2f} us/request (budget {args.budget:.0f} us)")
+    if overhead_us > args.budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Typeahead benchmark.
+
+Builds the in-memory movie search index over a synthetic catalog and reports
+the latency of suggestions for prefixes of increasing length.
+
+Usage:
+    python benchmarks/search_index.py [--movies 100000] [--repeat 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.cinema import Move  # noqa: E402
+from app.utils.search_index import MovieSearchIndex  # noqa: E402
+
+WORDS = ["the", "last", "night", "dark", "star", "river", "city", "lost", "king", "queen", "shadow", "return",
+         "summer", "winter", "dream", "storm", "silent", "golden", "iron", "empire", "secret", "garden",
+         "matrix", "wild", "road", "blue", "house", "island", "moon", "ocean"]
+
+
+def make_catalog(count: int) -> list:
+    rng = random.Random(42)
+    return [Move(id=i, name=" ".join(rng.sample(WORDS, rng.randint(1, 4))) + f" {i}", movie_cover="")
+            for i in range(1, count + 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--movies", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    movies = make_catalog(args.movies)
+    index = MovieSearchIndex()
+    start = time.perf_counter()
+    index.rebuild(movies)
+    print(f"built index of {args.movies} movies in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    for query in ["sha", "shadow", "shadow ga", "golden river 12"]:
+        best = min(timeit.repeat(lambda: index.suggest(query), number=1, repeat=args.repeat)) * 1e6
+        print(f"{query!r:20} {len(index.suggest(query)):3} results  {best:9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Seat map benchmark.
+
+Compares the previous list-based seat map construction (JSON decode, walk the
+session's OccupiedSeat objects to mark a nested list, zip rows into dicts) and
+seating matrix generation with the NumPy-backed SeatGrid fed with the
+coordinate lists returned by get_occupied_seat_coordinates, for venue sizes up
+to stadium scale. Loading the OccupiedSeat objects themselves, which the new
+path avoids entirely, is not included in the legacy timings.
+
+Usage:
+    python benchmarks/seat_grid.py [--occupancy 0.5] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.cinema import OccupiedSeat  # noqa: E402
+from app.utils.seat_grid import SeatGrid  # noqa: E402
+
+VENUES = [(10, 10), (50, 100), (100, 200)]
+
+
+def legacy_seat_map(seating: str, rows: int, columns: int, occupied_seats: list) -> list:
+    # Previous implementation of process_cinema_room_and_film's seating part
+    seating = json.loads(seating) if seating else []
+    for seat in occupied_seats:
+        seating[seat.row - 1][seat.column - 1] = True
+    room_row = list(range(1, rows + 1))
+    return [{'row': r, 'seats': s} for r, s in zip(room_row, seating)]
+
+
+def grid_seat_map(seating: str, rows: int, columns: int, occupied_rows: list, occupied_columns: list) -> list:
+    grid = SeatGrid.from_seating(seating, rows, columns)
+    grid.mark_occupied(occupied_rows, occupied_columns)
+    return grid.to_rows()
+
+
+def legacy_new_room(rows: int, columns: int) -> str:
+    return json.dumps([[False] * columns for _ in range(rows)])
+
+
+def grid_new_room(rows: int, columns: int) -> str:
+    return SeatGrid.empty(rows, columns).to_json()
+
+
+def best_of(func, repeat: int) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--occupancy", type=float, default=0.5)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(42)
+    print(f"{'seats':>7} {'case':<12} {'legacy ms':>10} {'grid ms':>9} {'speedup':>8}")
+    for rows, columns in VENUES:
+        seats = [(r, c) for r in range(1, rows + 1) for c in range(1, columns + 1)]
+        occupied = random.sample(seats, int(len(seats) * args.occupancy))
+        orm_seats = [OccupiedSeat(session_id=1, row=r, column=c) for r, c in occupied]
+        occupied_rows, occupied_columns = [r for r, _ in occupied], [c for _, c in occupied]
+        seating = legacy_new_room(rows, columns)
+        assert legacy_seat_map(seating, rows, columns, orm_seats) == \
+            grid_seat_map(seating, rows, columns, occupied_rows, occupied_columns)
+
+        cases = [
+            ("seat map", lambda: legacy_seat_map(seating, rows, columns, orm_seats),
+             lambda: grid_seat_map(seating, rows, columns, occupied_rows, occupied_columns)),
+            ("new room", lambda: legacy_new_room(rows, columns), lambda: grid_new_room(rows, columns)),
+        ]
+        for name, legacy, vectorized in cases:
+            legacy_ms, grid_ms = best_of(legacy, args.repeat), best_of(vectorized, args.repeat)
+            print(f"{rows * columns:>7} {name:<12} {legacy_ms:>10.3f} {grid_ms:>9.3f} {legacy_ms / grid_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
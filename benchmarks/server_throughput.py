@@ -0,0 +1,108 @@
+"""
+Server throughput benchmark.
+
+Compares the previous single-process ``uvicorn --reload`` setup with the
+production launcher (``python -m app.server``) by driving ``/health`` with a
+fixed number of concurrent keep-alive clients and reporting requests per
+second and latency percentiles.
+
+Usage:
+    python benchmarks/server_throughput.py [--duration 10] [--concurrency 64] [--workers N]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_serving(url: str, timeout: float = 30.0) -> None:
+    deadline = time.perf_counter() + timeout
+    with httpx.Client() as client:
+        while time.perf_counter() < deadline:
+            try:
+                if client.get(url).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            time.sleep(0.05)
+    raise TimeoutError(f"{url} did not respond within {timeout}s")
+
+
+async def _drive(url: str, duration: float, concurrency: int) -> list:
+    latencies = []
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits) as client:
+        async def user():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get(url)
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+    return latencies
+
+
+def run_case(name: str, command: list, port: int, duration: float, concurrency: int) -> dict:
+    url = f"http://127.0.0.1:{port}/health"
+    proc = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_until_serving(url)
+        latencies = sorted(asyncio.run(_drive(url, duration, concurrency)))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=60)
+
+    count = len(latencies)
+    return {
+        "name": name,
+        "requests": count,
+        "rps": count / duration,
+        "p50_ms": latencies[count // 2] * 1000 if count else float("nan"),
+        "p99_ms": latencies[int(count * 0.99)] * 1000 if count else float("nan"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=0, help="Workers for app.server; 0 uses the CPU count.")
+    args = parser.parse_args()
+
+    current_port, launcher_port = _free_port(), _free_port()
+    cases = [
+        ("uvicorn --reload (current)",
+         [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(current_port),
+          "--reload", "--log-level", "warning"],
+         current_port),
+        ("python -m app.server",
+         [sys.executable, "-m", "app.server", "--host", "127.0.0.1", "--port", str(launcher_port),
+          "--workers", str(args.workers)],
+         launcher_port),
+    ]
+
+    print(f"{'setup':<30} {'requests':>9} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, command, port in cases:
+        result = run_case(name, command, port, args.duration, args.concurrency)
+        print(f"{result['name']:<30} {result['requests']:>9} {result['rps']:>10.0f} "
+              f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
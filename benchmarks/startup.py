@@ -0,0 +1,132 @@
+"""
+Startup benchmark.
+
+Measures two things for the FastAPI application:
+
+* import cost of ``app.main``, parsed from ``python -X importtime`` output and
+  reported as the slowest top-level imports;
+* time to serve, i.e. wall time from spawning a uvicorn worker until
+  ``/health`` answers, checked against a budget.
+
+Usage:
+    python benchmarks/startup.py [--budget 3.0] [--top 15] [--json results.json]
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def profile_imports(module: str = "app.main", top: int = 15) -> dict:
+    """
+    Runs ``python -X importtime -c 'import <module>'`` and aggregates the report.
+
+    Args:
+        module (str): The module to import.
+        top (int): How many of the most expensive imports to keep.
+
+    Returns:
+        dict: Total import time and the slowest imports in microseconds.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append({
+            "module": name.strip(),
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            "depth": depth,
+        })
+    total = next(e["cumulative_us"] for e in entries if e["module"] == module)
+    top_level = sorted((e for e in entries if e["depth"] <= 1), key=lambda e: e["cumulative_us"], reverse=True)
+    return {
+        "module": module,
+        "total_us": total,
+        "slowest": top_level[:top],
+        "heavy_modules_loaded": sorted(
+            {e["module"] for e in entries} & {"asyncpg", "psycopg2", "flask", "flask_admin", "wtforms"}
+        ),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_serve(timeout: float = 30.0) -> float:
+    """
+    Starts a single uvicorn worker and waits until ``/health`` responds.
+
+    Args:
+        timeout (float): Seconds to wait before giving up.
+
+    Returns:
+        float: Seconds from process spawn to the first successful response.
+    """
+    port = _free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client() as client:
+            while time.perf_counter() - started < timeout:
+                try:
+                    if client.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                        return time.perf_counter() - started
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+        raise TimeoutError(f"Worker did not serve within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=float(os.environ.get("STARTUP_BUDGET_SECONDS", "3.0")),
+                        help="Maximum allowed seconds from spawn to first served request.")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    imports = profile_imports(top=args.top)
+    print(f"import app.main: {imports['total_us'] / 1000:.1f} ms")
+    for entry in imports["slowest"]:
+        print(f"  {entry['cumulative_us'] / 1000:8.1f} ms  {entry['module']}")
+    if imports["heavy_modules_loaded"]:
+        print(f"  eagerly imported: {', '.join(imports['heavy_modules_loaded'])}")
+
+    serve_seconds = time_to_serve()
+    within_budget = serve_seconds <= args.budget
+    print(f"time to serve: {serve_seconds:.3f} s (budget {args.budget:.3f} s) -> "
+          f"{'OK' if within_budget else 'OVER BUDGET'}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump({"imports": imports, "time_to_serve_s": serve_seconds, "budget_s": args.budget}, fh, indent=2)
+    sys.exit(0 if within_budget else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
-echo "Running tests..."
-pytest tests --asyncio-mode=auto
+if [ "${RUN_TESTS_ON_START:-0}" = "1" ]; then
+  echo "Running tests..."
+  pytest || exit 1
+fi
 
 echo "Applying database migrations..."
 alembic upgrade head
 
 echo "Starting the server..."
 HOST_PORT=${HOST_PORT:-8000}
-exec uvicorn app.main:app --host 0.0.0.0 --port $HOST_PORT --reload
+exec python -m app.server --host 0.0.0.0 --port $HOST_PORT
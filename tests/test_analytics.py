@@ -0,0 +1,84 @@
+import json
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.cinema import CinemaRoom, Move, OccupiedSeat, Session
+from app.repositories.analytics_repository import get_occupancy, refresh_occupancy_rollups
+from app.repositories.cinema_room_repository import create_session, create_occupied_seat
+
+
+async def create_room(db_session: AsyncSession, name: str, rows: int, columns: int) -> CinemaRoom:
+    room = CinemaRoom(name=name, column=columns, row=rows,
+                      seating=json.dumps([[False] * columns for _ in range(rows)]))
+    db_session.add(room)
+    await db_session.commit()
+    return room
+
+
+@pytest.mark.asyncio
+async def test_rollups_follow_sessions_and_reservations(db_session: AsyncSession, movie, show_times):
+    """
+    Creating sessions adds capacity and reserving seats adds occupancy to the
+    movie, room and showtime rollups.
+    """
+    room = await create_room(db_session, "Rollup Room", rows=2, columns=5)
+    session1 = await create_session(db_session, cinema_room_id=room.id, move_id=movie.id, move_time_id=show_times[0].id)
+    session2 = await create_session(db_session, cinema_room_id=room.id, move_id=movie.id, move_time_id=show_times[1].id)
+
+    await create_occupied_seat(db_session, session1, row=1, column=1)
+    await create_occupied_seat(db_session, session1, row=1, column=2)
+    await create_occupied_seat(db_session, session2, row=2, column=5)
+
+    movie_rollup = await get_occupancy(db_session, "move", movie.id)
+    assert (movie_rollup.capacity, movie_rollup.occupied) == (20, 3)
+
+    showtime = await get_occupancy(db_session, "move_time", show_times[0].id)
+    assert (showtime.capacity, showtime.occupied) == (10, 2)
+
+    cinema_room = await get_occupancy(db_session, "cinema_room", room.id)
+    assert (cinema_room.capacity, cinema_room.occupied) == (20, 3)
+
+
+@pytest.mark.asyncio
+async def test_refresh_rebuilds_rollups(db_session: AsyncSession, movie, show_times):
+    """
+    The refresh job picks up sessions and seats written without going through the repositories.
+    """
+    room = await create_room(db_session, "Refresh Room", rows=3, columns=3)
+    session = Session(cinema_room_id=room.id, move_id=movie.id, move_time_id=show_times[0].id)
+    db_session.add(session)
+    await db_session.commit()
+    db_session.add_all([OccupiedSeat(session_id=session.id, row=1, column=c) for c in (1, 2, 3)])
+    await db_session.commit()
+
+    assert await get_occupancy(db_session, "move", movie.id) is None
+
+    await refresh_occupancy_rollups(db_session)
+
+    movie_rollup = await get_occupancy(db_session, "move", movie.id)
+    assert (movie_rollup.capacity, movie_rollup.occupied) == (9, 3)
+
+
+@pytest.mark.asyncio
+async def test_occupancy_endpoint(client, db_session: AsyncSession, show_times):
+    """
+    The analytics API returns fill rates from the rollups and 404 for unknown keys.
+    """
+    room = await create_room(db_session, "API Room", rows=2, columns=2)
+    movie = Move(name="Analytics Movie", move_time_length=90, movie_cover="cover.png")
+    db_session.add(movie)
+    await db_session.commit()
+    session = await create_session(db_session, cinema_room_id=room.id, move_id=movie.id,
+                                   move_time_id=show_times[0].id)
+    await create_occupied_seat(db_session, session, row=1, column=1)
+
+    response = await client.get(f"/analytics/occupancy/move/{movie.id}")
+    assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+    assert response.json()["fill_rate"] == 0.25
+
+    response = await client.get("/analytics/occupancy/cinema_room")
+    assert [item["key_id"] for item in response.json()] == [room.id]
+
+    response = await client.get("/analytics/occupancy/move/999")
+    assert response.status_code == 404, f"Expected status code 404, got {response.status_code}"
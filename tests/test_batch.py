@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.cinema import CinemaRoom, Move
+from app.repositories.cinema_room_repository import create_session, create_occupied_seat
+from app.utils.dataloader import DataLoader
+from app.utils.seat_grid import SeatGrid
+from tests.conftest import engine
+
+
+@pytest.mark.asyncio
+async def test_dataloader_coalesces_concurrent_loads():
+    """
+    Loads issued in the same event loop iteration are resolved by one batch call, duplicates included.
+    """
+    calls = []
+
+    async def batch_load(keys):
+        calls.append(keys)
+        return {key: key * 10 for key in keys if key != 3}
+
+    loader = DataLoader(batch_load)
+    assert await asyncio.gather(loader.load(1), loader.load(2), loader.load(1), loader.load(3)) == [10, 20, 10, None]
+    assert calls == [[1, 2, 3]]
+
+    assert await loader.load_many([2, 4]) == [20, 40]
+    assert calls == [[1, 2, 3], [4]], "Loaded keys are memoized"
+
+
+@pytest.mark.asyncio
+async def test_dataloader_propagates_errors():
+    async def batch_load(keys):
+        raise RuntimeError("database unavailable")
+
+    loader = DataLoader(batch_load)
+    with pytest.raises(RuntimeError):
+        await loader.load_many([1, 2])
+
+
+@pytest.mark.asyncio
+async def test_batch_endpoints(client, db_session: AsyncSession, show_times):
+    """
+    Batch endpoints return the requested objects in order and resolve each kind with one query.
+    """
+    rooms = [CinemaRoom(name=f"Batch Room {i}", column=4, row=4, seating=SeatGrid.empty(4, 4).to_json())
+             for i in range(3)]
+    movies = [Move(name=f"Batch Movie {i}", move_time_length=90, movie_cover="cover.png") for i in range(3)]
+    db_session.add_all(rooms + movies)
+    await db_session.commit()
+    sessions = [await create_session(db_session, cinema_room_id=room.id, move_id=movie.id,
+                                     move_time_id=show_times[0].id)
+                for room, movie in zip(rooms, movies)]
+    await create_occupied_seat(db_session, sessions[1], row=2, column=3)
+
+    response = await client.get("/cinema_rooms/batch", params={"ids": [rooms[2].id, rooms[0].id, 999, rooms[2].id]})
+    assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+    assert [room["name"] for room in response.json()] == ["Batch Room 2", "Batch Room 0"]
+
+    response = await client.get("/movies/batch", params={"ids": [movie.id for movie in movies]})
+    assert [movie["name"] for movie in response.json()] == ["Batch Movie 0", "Batch Movie 1", "Batch Movie 2"]
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        response = await client.get("/sessions/batch", params={"ids": [session.id for session in sessions]})
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", listener)
+    assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+    seat_maps = response.json()
+    assert [seat_map["session_id"] for seat_map in seat_maps] == [session.id for session in sessions]
+    assert seat_maps[1]["film"]["name"] == "Batch Movie 1"
+    assert seat_maps[1]["data"][1]["seats"] == [False, False, True, False]
+    assert len(statements) == 4, "Sessions, rooms, movies and occupied seats take one query each"
+
+    response = await client.get("/sessions/batch", params={"ids": list(range(1, 102))})
+    assert response.status_code == 400, f"Expected status code 400, got {response.status_code}"
@@ -0,0 +1,98 @@
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models.cinema import Base, CinemaRoom
+from app.utils.bulk_layouts import BulkLayoutRunner, create_rooms
+from app.utils.room_layout import RoomLayout
+from app.utils.seat_grid import SeatGrid
+
+
+@pytest.fixture
+def sync_session_factory(tmp_path):
+    sync_engine = create_engine(f"sqlite:///{tmp_path / 'rooms.db'}")
+    Base.metadata.create_all(sync_engine)
+    yield sessionmaker(bind=sync_engine)
+    sync_engine.dispose()
+
+
+def load_rooms(session_factory):
+    with session_factory() as db:
+        return {room.id: room for room in db.scalars(select(CinemaRoom))}
+
+
+@pytest.mark.parametrize("processes", [0, 2])
+def test_creates_rooms_and_generates_their_seat_maps_in_chunks(sync_session_factory, processes):
+    runner = BulkLayoutRunner(lambda: sync_session_factory, processes=processes, chunk_size=4)
+    layout = RoomLayout.from_text("SSVV\nS..S\nWCss")
+    with sync_session_factory() as db:
+        room_ids = create_rooms(db, "Hall", 10, 3, 4)
+        db.commit()
+
+    job = runner.submit(room_ids, layout=layout)
+    runner.wait(timeout=60)
+    runner.shutdown()
+
+    assert job.to_dict()["status"] == "finished" and (job.done, job.total) == (10, 10)
+    rooms = load_rooms(sync_session_factory)
+    assert sorted(room.name for room in rooms.values())[:2] == ["Hall 1", "Hall 10"]
+    for room in rooms.values():
+        assert room.layout == layout.to_bytes()
+        assert room.seating is None, "Rooms created with their final dimensions keep their seating"
+
+
+def test_resizes_rooms_and_resets_only_their_seating(sync_session_factory):
+    runner = BulkLayoutRunner(lambda: sync_session_factory, processes=0, chunk_size=2)
+    occupied = SeatGrid.empty(2, 2).mark_occupied_seats([(1, 1)]).to_json()
+    with sync_session_factory() as db:
+        db.add_all([
+            CinemaRoom(name="Small", row=2, column=2, seating=occupied, layout=b"\x01\x01\x00\x00"),
+            CinemaRoom(name="Large", row=3, column=5, seating=SeatGrid.empty(3, 5).to_json()),
+        ])
+        db.commit()
+    rooms = load_rooms(sync_session_factory)
+
+    job = runner.submit([*rooms, 999], rows=3, columns=5)
+    runner.wait(timeout=60)
+
+    assert job.status == "finished" and job.total == 2, "Missing rooms are skipped"
+    small, large = sorted(load_rooms(sync_session_factory).values(), key=lambda room: room.name, reverse=True)
+    assert (small.row, small.column, small.layout) == (3, 5, None)
+    assert small.seating == SeatGrid.empty(3, 5).to_json()
+    assert large.seating == SeatGrid.empty(3, 5).to_json() and large.layout is None
+    with pytest.raises(ValueError):
+        runner.submit([small.id], rows=2, columns=2, layout=RoomLayout.default(3, 5))
+
+
+def test_keeps_the_layouts_of_rooms_that_are_not_resized(sync_session_factory):
+    runner = BulkLayoutRunner(lambda: sync_session_factory, processes=0)
+    custom = RoomLayout.from_text("SV\n.S").to_bytes()
+    with sync_session_factory() as db:
+        db.add_all([CinemaRoom(name="Kept", row=2, column=2, layout=custom),
+                    CinemaRoom(name="Resized", row=3, column=3, layout=RoomLayout.default(3, 3).to_bytes())])
+        db.commit()
+    rooms = load_rooms(sync_session_factory)
+
+    runner.submit(list(rooms), rows=2, columns=2)
+    runner.wait(timeout=60)
+
+    kept, resized = sorted(load_rooms(sync_session_factory).values(), key=lambda room: room.name)
+    assert kept.layout == custom
+    assert (resized.row, resized.column, resized.layout) == (2, 2, None)
+    with pytest.raises(ValueError):
+        runner.submit(list(rooms))
+
+
+def test_job_progress_is_shared_between_workers(sync_session_factory):
+    runner = BulkLayoutRunner(lambda: sync_session_factory, processes=0, keep_jobs=2)
+    other_worker = BulkLayoutRunner(lambda: sync_session_factory, processes=0, keep_jobs=2)
+    with sync_session_factory() as db:
+        room_ids = create_rooms(db, "Hall", 3, 2, 2)
+        db.commit()
+
+    jobs = [runner.submit(room_ids, layout=RoomLayout.default(2, 2)) for _ in range(3)]
+    runner.wait(timeout=60)
+
+    assert other_worker.get(jobs[-1].id).to_dict() == jobs[-1].to_dict()
+    assert [job.id for job in other_worker.jobs()] == [jobs[2].id, jobs[1].id]
+    assert other_worker.get(jobs[0].id) is None, "Only the last jobs are kept"
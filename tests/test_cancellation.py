@@ -0,0 +1,110 @@
+from datetime import time
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.configuration.settings import settings
+from app.models.cinema import CinemaRoom, Move, MoveTime, OccupiedSeat, OutboxEvent
+from app.repositories.analytics_repository import get_occupancy
+from app.repositories.cinema_room_repository import (create_session, create_occupied_seat, release_occupied_seats,
+                                                     release_session_seats)
+from app.utils.seat_grid import SeatGrid
+
+
+async def create_booked_session(db_session: AsyncSession, seats):
+    movie = Move(name="Cancel Movie", move_time_length=90, movie_cover="cover.png")
+    show_time = MoveTime(time=time(20, 0))
+    db_session.add_all([movie, show_time])
+    room = CinemaRoom(name="Cancel Room", column=5, row=5, seating=SeatGrid.empty(5, 5).to_json())
+    db_session.add(room)
+    await db_session.commit()
+    session = await create_session(db_session, cinema_room_id=room.id, move_id=movie.id, move_time_id=show_time.id)
+    for row, column in seats:
+        await create_occupied_seat(db_session, session, row=row, column=column)
+    return session
+
+
+async def remaining_seats(db_session: AsyncSession, session_id: int):
+    result = await db_session.execute(
+        select(OccupiedSeat.row, OccupiedSeat.column).where(OccupiedSeat.session_id == session_id)
+    )
+    return sorted(result.all())
+
+
+@pytest.mark.asyncio
+async def test_release_occupied_seats(db_session: AsyncSession):
+    """
+    Releasing seats deletes only reserved seats, emits events and updates the rollups.
+    """
+    session = await create_booked_session(db_session, [(1, 1), (1, 2), (2, 2)])
+
+    released = await release_occupied_seats(db_session, session, [(1, 1), (2, 2), (4, 4)])
+
+    assert sorted(released) == [(1, 1), (2, 2)], "Seats that were not reserved must not be reported"
+    assert await remaining_seats(db_session, session.id) == [(1, 2)]
+    assert (await get_occupancy(db_session, "move", session.move_id)).occupied == 1
+
+    events = (await db_session.execute(
+        select(OutboxEvent.event_type).where(OutboxEvent.event_type == "seat.released")
+    )).scalars().all()
+    assert len(events) == 2
+
+
+@pytest.mark.asyncio
+async def test_release_session_seats(db_session: AsyncSession):
+    """
+    Cancelling a screening releases all of its seats in one statement.
+    """
+    session = await create_booked_session(db_session, [(1, 1), (3, 3), (5, 5)])
+
+    assert await release_session_seats(db_session, session) == 3
+    assert await remaining_seats(db_session, session.id) == []
+    assert (await get_occupancy(db_session, "cinema_room", session.cinema_room_id)).occupied == 0
+
+
+@pytest.mark.asyncio
+async def test_cancellation_endpoints(client, db_session: AsyncSession, monkeypatch):
+    """
+    Single-seat, booking and session cancellation endpoints, each proving ownership of the seats.
+    """
+    monkeypatch.setattr(settings.app_settings, "ADMIN_TOKEN", "secret")
+    session = await create_booked_session(db_session, [(2, 1)])
+    room_id = session.cinema_room_id
+    url = f"/cinema_rooms/{room_id}/reserve"
+    tokens = {}
+    for column in (1, 2, 3):
+        response = await client.post(url, params={"session_id": session.id, "row": 1, "column": column},
+                                     headers={"Idempotency-Key": f"booking-{column}"})
+        tokens[column] = response.json()["token"]
+    params = {"session_id": session.id, "row": 1, "column": 1}
+
+    response = await client.delete(url, params=params)
+    assert response.status_code == 403, f"Expected status code 403, got {response.status_code}"
+    response = await client.delete(url, params=params, headers={"X-Reservation-Token": tokens[2]})
+    assert response.status_code == 404, "Another seat's token must not cancel the seat"
+
+    response = await client.delete(url, params=params, headers={"X-Reservation-Token": tokens[1]})
+    assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+    assert response.json()["released"] == 1
+
+    response = await client.delete(url, params=params, headers={"X-Reservation-Token": tokens[1]})
+    assert response.status_code == 404, f"Expected status code 404, got {response.status_code}"
+
+    response = await client.delete(url, params={**params, "column": 2}, headers={"Idempotency-Key": "booking-2"})
+    assert response.status_code == 200, "The Idempotency-Key of the reservation proves ownership too"
+
+    booking = {"session_id": session.id, "seats": [{"row": 1, "column": 3}, {"row": 2, "column": 1}]}
+    response = await client.post(f"{url}/cancel", json=booking)
+    assert response.status_code == 403, f"Expected status code 403, got {response.status_code}"
+    booking["seats"] = [{"row": 1, "column": 3, "token": tokens[3]}]
+    response = await client.post(f"{url}/cancel", json=booking)
+    assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+    assert response.json()["released"] == 1
+
+    response = await client.delete(f"/sessions/{session.id}/reservations")
+    assert response.status_code == 403, f"Expected status code 403, got {response.status_code}"
+    response = await client.delete(f"/sessions/{session.id}/reservations", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+    assert response.json()["released"] == 1
+    assert await remaining_seats(db_session, session.id) == []
@@ -3,12 +3,12 @@ from app.models.cinema import CinemaRoom
 
 # Test fetching all cinema rooms
 @pytest.mark.asyncio
-async def test_get_cinema_rooms(test_app):
+async def test_get_cinema_rooms(client):
     """
     Test to fetch all cinema rooms.
     Verifies that the endpoint returns a list of rooms.
     """
-    response = test_app.get("/cinema_rooms/")
+    response = await client.get("/cinema_rooms/")
 
     # Check that the response status is 200 OK
     assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
@@ -18,7 +18,7 @@ async def test_get_cinema_rooms(test_app):
 
 
 @pytest.mark.asyncio
-async def test_get_cinema_room_by_id(test_app, db_session):
+async def test_get_cinema_room_by_id(client, db_session):
     """
     Test to fetch a specific cinema room by its ID.
     Creates a room, retrieves it by ID, and checks the response.
@@ -30,7 +30,7 @@ async def test_get_cinema_room_by_id(test_app, db_session):
     await db_session.refresh(new_room)
 
     # Request the created room by its ID
-    response = test_app.get(f"/cinema_rooms/{new_room.id}")
+    response = await client.get(f"/cinema_rooms/{new_room.id}")
 
     # Check that the response status is 200 OK
     assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
@@ -41,12 +41,12 @@ async def test_get_cinema_room_by_id(test_app, db_session):
 
 # Test fetching a non-existent cinema room
 @pytest.mark.asyncio
-async def test_get_nonexistent_cinema_room(test_app):
+async def test_get_nonexistent_cinema_room(client):
     """
     Test to ensure a 404 error is returned when trying to fetch a non-existent cinema room.
     """
     # Attempt to fetch a cinema room with an ID that does not exist
-    response = test_app.get("/cinema_rooms/999")
+    response = await client.get("/cinema_rooms/999")
 
     # Check that the response status is 404 Not Found
     assert response.status_code == 404, f"Expected status code 404, got {response.status_code}"
@@ -68,27 +68,27 @@ async def test_get_cinema_room_by_name(db_session: AsyncSession):
 
 
 @pytest.mark.asyncio
-async def test_create_session(db_session: AsyncSession):
+async def test_create_session(db_session: AsyncSession, movie, show_times):
     # Create test data with seating initialized
     room = CinemaRoom(name="Session Room", column=10, row=10, seating=generate_seating(10, 10))
     db_session.add(room)
     await db_session.commit()
 
     # Create a session
-    session = await create_session(db_session, cinema_room_id=room.id, move_id=1, move_time_id=1)
+    session = await create_session(db_session, cinema_room_id=room.id, move_id=movie.id, move_time_id=show_times[0].id)
     assert session is not None
     assert session.cinema_room_id == room.id
 
 
 @pytest.mark.asyncio
-async def test_create_occupied_seat(db_session: AsyncSession):
+async def test_create_occupied_seat(db_session: AsyncSession, movie, show_times):
     # Create a cinema room with seating initialized
     room = CinemaRoom(name="Occupied Room", column=10, row=10, seating=generate_seating(10, 10))
     db_session.add(room)
     await db_session.commit()
 
     # Create a session linked to the created room
-    session = Session(cinema_room_id=room.id, move_id=1, move_time_id=1)
+    session = Session(cinema_room_id=room.id, move_id=movie.id, move_time_id=show_times[0].id)
     db_session.add(session)
     await db_session.commit()
 
@@ -113,28 +113,31 @@ async def test_update_seating():
 
 
 @pytest.mark.asyncio
-async def test_get_session_by_room_and_film(db_session: AsyncSession):
+async def test_get_session_by_room_and_film(db_session: AsyncSession, movie, show_times):
     # Create a cinema room with seating initialized
     room = CinemaRoom(name="Session Test Room", column=10, row=10, seating=generate_seating(10, 10))
     db_session.add(room)
     await db_session.commit()
 
     # Create a session linked to the created room
-    session = Session(cinema_room_id=room.id, move_id=1, move_time_id=1)
+    session = Session(cinema_room_id=room.id, move_id=movie.id, move_time_id=show_times[0].id)
     db_session.add(session)
     await db_session.commit()
 
     # Fetch the session by room and film
-    fetched_session = await get_session_by_room_and_film(db_session, cinema_room_id=room.id, move_id=1)
+    fetched_session = await get_session_by_room_and_film(db_session, cinema_room_id=room.id, move_id=movie.id)
     assert fetched_session is not None
     assert fetched_session.cinema_room_id == room.id
-    assert fetched_session.move_id == 1
+    assert fetched_session.move_id == movie.id
 
 
 @pytest.mark.asyncio
-async def test_get_session_by_id(db_session: AsyncSession):
+async def test_get_session_by_id(db_session: AsyncSession, movie, show_times):
     # Create test data
-    session = Session(cinema_room_id=1, move_id=1, move_time_id=1)
+    room = CinemaRoom(name="Lookup Room", column=2, row=2, seating=generate_seating(2, 2))
+    db_session.add(room)
+    await db_session.commit()
+    session = Session(cinema_room_id=room.id, move_id=movie.id, move_time_id=show_times[0].id)
     db_session.add(session)
     await db_session.commit()
 
@@ -0,0 +1,97 @@
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.utils.compression import GZIP, BROTLI, CompressedBodyCache, CompressionMiddleware, negotiate_encoding
+
+CATALOG = [{"id": i, "name": f"Movie {i}", "movie_cover": f"media/cover_{i}.png"} for i in range(200)]
+
+
+def create_compressed_app(cache, offload_size=64 * 1024):
+    app = FastAPI()
+
+    @app.get("/movies/")
+    async def movies():
+        return CATALOG
+
+    @app.get("/private")
+    async def private(response: Response):
+        response.headers["Cache-Control"] = "private"
+        return CATALOG
+
+    @app.get("/small")
+    async def small():
+        return {"status": "ok"}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(3):
+                yield b"x" * 2048
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024, cache=cache, offload_size=offload_size)
+    return app
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding("gzip, deflate, br", [BROTLI, GZIP]) == BROTLI
+    assert negotiate_encoding("gzip, deflate, br", [GZIP]) == GZIP
+    assert negotiate_encoding("br;q=0.5, gzip", [BROTLI, GZIP]) == GZIP
+    assert negotiate_encoding("gzip;q=0, *", [GZIP]) is None
+    assert negotiate_encoding("*", [BROTLI, GZIP]) == BROTLI
+    assert negotiate_encoding("identity", [GZIP]) is None
+
+
+def test_large_json_is_gzipped_and_cached():
+    cache = CompressedBodyCache()
+    client = TestClient(create_compressed_app(cache))
+
+    for _ in range(3):
+        response = client.get("/movies/", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert response.json() == CATALOG
+    assert len(cache) == 1
+    assert (cache.misses, cache.hits) == (1, 2), "The catalog is compressed once"
+
+    response = client.get("/private", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(cache) == 1, "Private responses are not cached"
+
+
+def test_large_bodies_are_compressed_off_the_event_loop(monkeypatch):
+    offloaded = []
+
+    async def to_thread(func, *args):
+        offloaded.append(len(args[0]))
+        return func(*args)
+
+    monkeypatch.setattr("app.utils.compression.asyncio.to_thread", to_thread)
+    client = TestClient(create_compressed_app(CompressedBodyCache(), offload_size=4096))
+
+    assert client.get("/movies/", headers={"Accept-Encoding": "gzip"}).json() == CATALOG
+    assert client.get("/small", headers={"Accept-Encoding": "gzip"}).json() == {"status": "ok"}
+    assert len(offloaded) == 1 and offloaded[0] >= 4096, "Only the catalog is compressed in a thread"
+
+
+def test_small_streamed_and_unaccepted_responses_pass_through():
+    client = TestClient(create_compressed_app(CompressedBodyCache()))
+
+    assert "Content-Encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert response.content == b"x" * 6144
+    assert "Content-Encoding" not in client.get("/movies/", headers={"Accept-Encoding": "identity"}).headers
+
+
+def test_cache_evicts_least_recently_used_bodies():
+    cache = CompressedBodyCache(max_bytes=100)
+    first, second, third = (cache.key(body, GZIP) for body in (b"a", b"b", b"c"))
+    cache.put(first, b"1" * 40)
+    cache.put(second, b"2" * 40)
+    assert cache.get(first) == b"1" * 40
+    cache.put(third, b"3" * 40)
+    assert cache.get(second) is None
+    assert cache.size == 80
@@ -0,0 +1,84 @@
+import asyncio
+from collections import Counter
+from datetime import time
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.main import app
+from app.models.cinema import CinemaRoom, Move, MoveTime, OccupiedSeat, OutboxEvent, Session
+from app.repositories.analytics_repository import get_occupancy
+from app.repositories.cinema_room_repository import create_session
+from app.utils.depends import get_db
+from app.utils.seat_grid import SeatGrid
+
+REQUESTS = 300
+SEATS = [(row, column) for row in range(1, 4) for column in range(1, 11)]
+
+
+async def create_screening(db: AsyncSession) -> Session:
+    room = CinemaRoom(name="Rush Room", column=10, row=10, seating=SeatGrid.empty(10, 10).to_json())
+    movie = Move(name="Premiere", move_time_length=120, movie_cover="cover.png")
+    show_time = MoveTime(time=time(20, 0))
+    db.add_all([room, movie, show_time])
+    await db.commit()
+    return await create_session(db, cinema_room_id=room.id, move_id=movie.id, move_time_id=show_time.id)
+
+
+@pytest.mark.asyncio
+async def test_unique_seat_constraint(db_session: AsyncSession, movie, show_times):
+    """
+    The database rejects a second reservation of a seat, whatever the application checks.
+    """
+    room = CinemaRoom(name="Constraint Room", column=2, row=2, seating=SeatGrid.empty(2, 2).to_json())
+    db_session.add(room)
+    await db_session.commit()
+    session = Session(cinema_room_id=room.id, move_id=movie.id, move_time_id=show_times[0].id)
+    db_session.add(session)
+    await db_session.commit()
+
+    db_session.add_all([OccupiedSeat(session_id=session.id, row=1, column=1) for _ in range(2)])
+    with pytest.raises(IntegrityError):
+        await db_session.commit()
+    await db_session.rollback()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reservations_never_double_book(concurrent_session_factory):
+    """
+    Hundreds of simultaneous reservations for the same few seats, each request with its own
+    session and connection: every seat is sold exactly once and the losers get a clean 400.
+    """
+    async with concurrent_session_factory() as db:
+        session = await create_screening(db)
+
+    async def get_concurrent_db():
+        async with concurrent_session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = get_concurrent_db
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            responses = await asyncio.gather(*(
+                client.post(f"/cinema_rooms/{session.cinema_room_id}/reserve", params={
+                    "session_id": session.id, "row": SEATS[i % len(SEATS)][0], "column": SEATS[i % len(SEATS)][1],
+                })
+                for i in range(REQUESTS)
+            ))
+    finally:
+        app.dependency_overrides.pop(get_db)
+
+    statuses = Counter(response.status_code for response in responses)
+    assert statuses == {200: len(SEATS), 400: REQUESTS - len(SEATS)}, statuses
+
+    async with concurrent_session_factory() as db:
+        seats = (await db.execute(
+            select(OccupiedSeat.row, OccupiedSeat.column).where(OccupiedSeat.session_id == session.id)
+        )).all()
+        assert sorted(seats) == SEATS
+        events = await db.scalar(select(func.count(OutboxEvent.id)).where(OutboxEvent.event_type == "seat.reserved"))
+        assert events == len(SEATS), "Rejected reservations must not leave events behind"
+        assert (await get_occupancy(db, "move", session.move_id)).occupied == len(SEATS)
@@ -0,0 +1,130 @@
+import pytest
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.main import app
+from app.models.cinema import CinemaRoom, OccupiedSeat
+from app.repositories.cinema_room_repository import create_session
+from app.utils.depends import get_idempotency_store
+from app.utils.idempotency import (
+    InMemoryIdempotencyStore, IdempotencyConflict, RedisIdempotencyStore, create_idempotency_store
+)
+from app.utils.seat_grid import SeatGrid
+
+
+@pytest.fixture
+def idempotency_store():
+    store = InMemoryIdempotencyStore(ttl=60, max_keys=100)
+    app.dependency_overrides[get_idempotency_store] = lambda: store
+    yield store
+    app.dependency_overrides.pop(get_idempotency_store, None)
+
+
+@pytest.mark.asyncio
+async def test_in_memory_store_is_bounded_and_expires():
+    """
+    The store keeps at most `max_keys` entries and forgets entries after the TTL.
+    """
+    store = InMemoryIdempotencyStore(ttl=60, max_keys=2)
+    for key in ("a", "b", "c"):
+        assert await store.begin(key, "fp") is None
+        await store.complete(key, "fp", {"key": key})
+    assert len(store) == 2
+    assert await store.begin("a", "fp") is None, "The oldest key must have been evicted"
+    assert await store.begin("c", "fp") == {"key": "c"}
+
+    with pytest.raises(IdempotencyConflict):
+        await store.begin("c", "other-fp")
+    with pytest.raises(IdempotencyConflict):
+        await store.begin("a", "fp")  # still pending
+
+    expired = InMemoryIdempotencyStore(ttl=0, max_keys=10)
+    await expired.begin("x", "fp")
+    await expired.complete("x", "fp", {})
+    assert await expired.begin("x", "fp") is None
+
+
+@pytest.mark.asyncio
+async def test_in_memory_store_keeps_pending_keys_briefly():
+    """
+    A key claimed by a request that never completes can be used again after the pending TTL.
+    """
+    store = InMemoryIdempotencyStore(ttl=60, max_keys=10, pending_ttl=0)
+    await store.begin("done", "fp")
+    await store.complete("done", "fp", {"ok": True})
+    assert await store.begin("k", "fp") is None
+    assert await store.begin("k", "fp") is None, "The abandoned claim has expired"
+    assert await store.begin("done", "fp") == {"ok": True}
+
+
+def test_in_memory_store_requires_a_single_worker():
+    with pytest.raises(ValueError, match="IDEMPOTENCY_BACKEND=redis"):
+        create_idempotency_store("memory", ttl=60, max_keys=10, redis_url="", workers=4)
+    assert isinstance(create_idempotency_store("memory", ttl=60, max_keys=10, redis_url="", workers=1),
+                      InMemoryIdempotencyStore)
+
+
+class RecordingRedis:
+    """Keeps the values and expiries set, enough of the Redis client for the store."""
+
+    def __init__(self):
+        self.values, self.expiries = {}, {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key], self.expiries[key] = value, ex
+        return True
+
+    async def get(self, key):
+        return self.values.get(key)
+
+
+@pytest.mark.asyncio
+async def test_redis_store_keeps_pending_keys_briefly():
+    """
+    A claimed key expires after the pending TTL, and only a completed response is kept for the full TTL.
+    """
+    store = RedisIdempotencyStore("redis://localhost:6379/0", ttl=86400, pending_ttl=30)
+    store.redis = RecordingRedis()
+
+    assert await store.begin("k", "fp") is None
+    assert store.redis.expiries["idempotency:k"] == 30
+    with pytest.raises(IdempotencyConflict):
+        await store.begin("k", "fp")
+    await store.complete("k", "fp", {"ok": True})
+    assert store.redis.expiries["idempotency:k"] == 86400
+    assert await store.begin("k", "fp") == {"ok": True}
+
+
+@pytest.mark.asyncio
+async def test_retried_reservation_replays_response(client, db_session: AsyncSession, idempotency_store, movie,
+                                                   show_times):
+    """
+    A retry with the same Idempotency-Key returns the original response without reserving again,
+    and reusing the key with other parameters is rejected.
+    """
+    room = CinemaRoom(name="Retry Room", column=5, row=5, seating=SeatGrid.empty(5, 5).to_json())
+    db_session.add(room)
+    await db_session.commit()
+    session = await create_session(db_session, cinema_room_id=room.id, move_id=movie.id, move_time_id=show_times[0].id)
+
+    url = f"/cinema_rooms/{room.id}/reserve"
+    params = {"session_id": session.id, "row": 2, "column": 2}
+    headers = {"Idempotency-Key": "3c6f6a2e-retry"}
+
+    first = await client.post(url, params=params, headers=headers)
+    retry = await client.post(url, params=params, headers=headers)
+    assert first.status_code == 200, f"Expected status code 200, got {first.status_code}"
+    assert retry.status_code == 200, f"Expected the retry to succeed, got {retry.status_code}"
+    assert retry.json() == first.json()
+
+    count = await db_session.scalar(select(func.count(OccupiedSeat.id)))
+    assert count == 1, "The retry must not create another reservation"
+
+    conflict = await client.post(url, params={**params, "column": 3}, headers=headers)
+    assert conflict.status_code == 409, f"Expected status code 409, got {conflict.status_code}"
+
+    # Without a key the duplicate is still reported as occupied
+    duplicate = await client.post(url, params=params)
+    assert duplicate.status_code == 400, f"Expected status code 400, got {duplicate.status_code}"
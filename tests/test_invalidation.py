@@ -0,0 +1,106 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.events.invalidation import CacheInvalidator, parse_notification
+from app.models.cinema import DEFAULT_SITE_ID, CinemaRoom, Move
+from app.utils.room_layout import RoomLayout, layout_cache
+from app.utils.schedule import schedule_store
+from app.utils.search_index import movie_search_index
+from app.utils.sold_out import sold_out_sessions
+
+
+@pytest.fixture
+def clean_caches():
+    yield
+    layout_cache.clear()
+    movie_search_index.invalidate()
+    schedule_store._wakeup.clear()
+
+
+def names(results):
+    return [movie["name"] for movie in results]
+
+
+def test_parse_notification():
+    assert parse_notification("cinema_rooms:12") == ("cinema_rooms", 12, None, None)
+    assert parse_notification("occupied_seats:7:DELETE:2") == ("occupied_seats", 7, "DELETE", 2)
+    assert parse_notification("moves:3:UPDATE") == ("moves", 3, "UPDATE", None)
+    assert parse_notification("cinema_rooms:") is None
+    assert parse_notification("garbage") is None
+
+
+def test_room_change_evicts_its_layout(session_factory, clean_caches):
+    rooms = [CinemaRoom(id=room_id, name=f"Room {room_id}", row=2, column=2,
+                        layout=RoomLayout.from_text("SS\nSS").to_bytes()) for room_id in (1, 2)]
+    cached = [layout_cache.get(room) for room in rooms]
+    invalidator = CacheInvalidator(session_factory)
+
+    invalidator.handle("cinema_rooms", 1)
+
+    assert layout_cache.get(rooms[0]) is not cached[0], "The changed room is decoded again"
+    assert layout_cache.get(rooms[1]) is cached[1], "Other rooms stay cached"
+    assert schedule_store._wakeup.is_set(), "A room change refreshes the schedule"
+
+
+def test_released_seats_unmark_sold_out_session_of_their_site(session_factory, clean_caches):
+    other_site = sold_out_sessions.get(2)
+    for sold_out in (sold_out_sessions.get(), other_site):
+        sold_out.mark(3)
+        sold_out.mark(4)
+    invalidator = CacheInvalidator(session_factory)
+
+    try:
+        invalidator.handle("occupied_seats", 4, "INSERT", DEFAULT_SITE_ID)
+        assert sold_out_sessions.get().is_sold_out(4), "Reserved seats do not free the session"
+        invalidator.handle("occupied_seats", 3, "DELETE", DEFAULT_SITE_ID)
+
+        assert not sold_out_sessions.get().is_sold_out(3), "Seats of the session were released"
+        assert sold_out_sessions.get().is_sold_out(4)
+        assert other_site.is_sold_out(3), "Session 3 of another site is unaffected"
+        assert schedule_store._wakeup.is_set()
+    finally:
+        # The sold-out sets outlive the test
+        for sold_out in (sold_out_sessions.get(), other_site):
+            sold_out.clear()
+
+
+def test_unrelated_tables_are_ignored(session_factory, clean_caches):
+    invalidator = CacheInvalidator(session_factory)
+
+    invalidator.handle("move_times", 1)
+
+    assert not schedule_store._wakeup.is_set()
+
+
+@pytest.mark.asyncio
+async def test_movie_changes_are_reloaded_into_the_search_index(db_session: AsyncSession, session_factory,
+                                                                clean_caches):
+    movies = [Move(name=name, move_time_length=100, movie_cover="cover.png") for name in ("Inception", "Interstellar")]
+    db_session.add_all(movies)
+    await db_session.commit()
+    movie_search_index.rebuild(movies)
+    invalidator = CacheInvalidator(session_factory)
+
+    movies[0].name = "Tenet"
+    await db_session.delete(movies[1])
+    await db_session.commit()
+    invalidator.handle("moves", movies[0].id)
+    invalidator.handle("moves", movies[1].id)
+
+    assert await invalidator.reload_movies() == 2
+    assert names(movie_search_index.suggest("in")) == []
+    assert names(movie_search_index.suggest("ten")) == ["Tenet"]
+    assert await invalidator.reload_movies() == 0, "Each change is reloaded once"
+
+
+def test_reset_drops_every_cache(session_factory, clean_caches):
+    room = CinemaRoom(id=1, name="Room", row=1, column=1, layout=RoomLayout.from_text("S").to_bytes())
+    cached = layout_cache.get(room)
+    movie_search_index.rebuild([Move(id=1, name="Dune", move_time_length=100, movie_cover="cover.png")])
+    invalidator = CacheInvalidator(session_factory)
+
+    invalidator.reset()
+
+    assert layout_cache.get(room) is not cached
+    assert not movie_search_index.loaded, "The search index is rebuilt on the next suggestion"
+    assert schedule_store._wakeup.is_set()
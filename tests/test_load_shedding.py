@@ -0,0 +1,118 @@
+import asyncio
+from datetime import time
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.util import await_only
+
+from app.main import app
+from app.models.cinema import Base, CinemaRoom, Move, MoveTime
+from app.repositories.cinema_room_repository import create_session
+from app.utils.depends import get_db, get_load_monitor
+from app.utils.load_shedding import LoadMonitor, LoadSheddingMiddleware, is_low_priority, seat_map_snapshots
+from app.utils.seat_grid import SeatGrid
+from tests.conftest import configure_sqlite
+
+
+def test_hysteresis():
+    monitor = LoadMonitor(pool_wait_threshold=0.2, latency_threshold=0.2, recover_after=2)
+
+    assert monitor.record(0.01, 0.3), "One slow probe degrades"
+    assert monitor.record(0.01, 0.15), "Under the threshold but not under half of it"
+    assert monitor.record(0.01, 0.05)
+    assert monitor.record(0.15, 0.05), "The recovery count restarts"
+    assert monitor.record(0.01, 0.05)
+    assert not monitor.record(0.01, 0.05), "Recovered after two calm probes in a row"
+    assert monitor.retry_after == 2
+
+
+def test_low_priority_routes():
+    assert is_low_priority("GET", "/movies/")
+    assert is_low_priority("GET", "/cinema_rooms/3/movies")
+    assert is_low_priority("GET", "/analytics/occupancy/move")
+    assert not is_low_priority("GET", "/cinema_rooms/3/films/4")
+    assert not is_low_priority("POST", "/cinema_rooms/3/reserve")
+    assert not is_low_priority("GET", "/schedule")
+
+
+class Chaos:
+    """Adds `delay` seconds to every statement while holding the connection, like a saturated database."""
+
+    def __init__(self):
+        self.delay = 0.0
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.delay:
+            await_only(asyncio.sleep(self.delay))
+
+
+@pytest.fixture
+async def slow_database(tmp_path):
+    chaos = Chaos()
+    slow_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'slow.db'}",
+                                      poolclass=AsyncAdaptedQueuePool, pool_size=2, max_overflow=0)
+    configure_sqlite(slow_engine, begin="BEGIN IMMEDIATE")
+    async with slow_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    event.listen(slow_engine.sync_engine, "before_cursor_execute", chaos.before_cursor_execute)
+    yield slow_engine, chaos
+    await slow_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_degrades_under_a_slow_database_and_recovers(slow_database):
+    slow_engine, chaos = slow_database
+    factory = sessionmaker(bind=slow_engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as db:
+        room = CinemaRoom(name="Premiere Room", row=2, column=2, seating=SeatGrid.empty(2, 2).to_json())
+        movie = Move(name="Premiere", move_time_length=150, movie_cover="cover.png")
+        show_time = MoveTime(time=time(20, 0))
+        db.add_all([room, movie, show_time])
+        await db.commit()
+        session = await create_session(db, cinema_room_id=room.id, move_id=movie.id, move_time_id=show_time.id)
+
+    async def get_slow_db():
+        async with factory() as db:
+            yield db
+
+    monitor = LoadMonitor(pool_wait_threshold=0.05, latency_threshold=0.05, recover_after=2, interval=0.01)
+    app.dependency_overrides[get_db] = get_slow_db
+    app.dependency_overrides[get_load_monitor] = lambda: monitor
+    seat_map_snapshots.clear()
+    seat_map_url = f"/cinema_rooms/{room.id}/films/{movie.id}"
+    try:
+        async with AsyncClient(transport=ASGITransport(app=LoadSheddingMiddleware(app, monitor)),
+                               base_url="http://test") as client:
+            assert not await monitor.probe(slow_engine)
+            response = await client.get(seat_map_url)
+            assert response.status_code == 200 and "Age" not in response.headers
+
+            chaos.delay = 0.2
+            assert await monitor.probe(slow_engine), "A slow database degrades the worker"
+
+            response = await client.get(seat_map_url)
+            assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+            assert response.headers["X-Degraded-Mode"] == "1" and int(response.headers["Age"]) >= 0
+            response = await client.get("/movies/")
+            assert response.status_code == 503, f"Expected status code 503, got {response.status_code}"
+            assert response.headers["Retry-After"] == "1"
+            response = await client.post(f"/cinema_rooms/{room.id}/reserve",
+                                         params={"session_id": session.id, "row": 1, "column": 1})
+            assert response.status_code == 200, "Reservations keep flowing"
+
+            chaos.delay = 0
+            assert await monitor.probe(slow_engine), "One calm probe is not enough to recover"
+            assert not await monitor.probe(slow_engine)
+            response = await client.get("/movies/")
+            assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+            response = await client.get(seat_map_url)
+            assert "Age" not in response.headers
+            assert response.json()["data"][0]["seats"][0] is True, "Fresh seat maps show the new reservation"
+    finally:
+        app.dependency_overrides[get_db] = get_db
+        app.dependency_overrides.pop(get_load_monitor, None)
+        seat_map_snapshots.clear()
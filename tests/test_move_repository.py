@@ -51,7 +51,7 @@ async def test_get_move_by_id(db_session: AsyncSession):
 
 
 @pytest.mark.asyncio
-async def test_get_moves_by_cinema_room(db_session: AsyncSession):
+async def test_get_moves_by_cinema_room(db_session: AsyncSession, show_times):
     """
     Test fetching movies associated with a specific cinema room.
     Verifies that movies linked to the specified cinema room are returned.
@@ -69,8 +69,10 @@ async def test_get_moves_by_cinema_room(db_session: AsyncSession):
     await db_session.commit()
 
     # Associate the movies with the cinema room using session creation
-    session1 = await create_session(db_session, cinema_room_id=room.id, move_id=movie1.id, move_time_id=1)
-    session2 = await create_session(db_session, cinema_room_id=room.id, move_id=movie2.id, move_time_id=2)
+    session1 = await create_session(db_session, cinema_room_id=room.id, move_id=movie1.id,
+                                    move_time_id=show_times[0].id)
+    session2 = await create_session(db_session, cinema_room_id=room.id, move_id=movie2.id,
+                                    move_time_id=show_times[1].id)
 
     # Fetch movies associated with the cinema room
     movies = await get_moves_by_cinema_room(db_session, room_id=room.id)
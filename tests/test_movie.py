@@ -3,7 +3,7 @@ from app.models.cinema import Move
 
 # Test fetching all movies
 @pytest.mark.asyncio
-async def test_get_all_movies(test_app, db_session):
+async def test_get_all_movies(client, db_session):
     """
     Test to fetch all movies.
     Creates a movie in the database, then retrieves all movies via the API.
@@ -15,7 +15,7 @@ async def test_get_all_movies(test_app, db_session):
     await db_session.refresh(new_movie)
 
     # Fetch all movies through the API
-    response = test_app.get("/movies/")
+    response = await client.get("/movies/")
 
     # Check that the response status is 200 OK
     assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
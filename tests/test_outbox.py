@@ -0,0 +1,134 @@
+import asyncio
+import json
+from datetime import time
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.configuration.settings import settings
+from app.events.publisher import OutboxPublisher
+from app.events.sinks import QueueSink, FileSink
+from app.models.cinema import CinemaRoom, Move, MoveTime, Session, OutboxEvent
+from app.repositories.cinema_room_repository import create_occupied_seat
+from app.repositories.outbox_repository import WAITLIST_SEAT_OFFERED, add_outbox_event
+
+
+async def create_session_with_seat(db_session: AsyncSession) -> Session:
+    movie = Move(name="Outbox Movie", move_time_length=90, movie_cover="cover.png")
+    show_time = MoveTime(time=time(20, 0))
+    db_session.add_all([movie, show_time])
+    room = CinemaRoom(name="Outbox Room", column=5, row=5, seating=json.dumps([[False] * 5 for _ in range(5)]))
+    db_session.add(room)
+    await db_session.commit()
+
+    session = Session(cinema_room_id=room.id, move_id=movie.id, move_time_id=show_time.id)
+    db_session.add(session)
+    await db_session.commit()
+
+    await create_occupied_seat(db_session, session, row=2, column=3)
+    return session
+
+
+@pytest.mark.asyncio
+async def test_reservation_writes_outbox_event(db_session: AsyncSession):
+    """
+    Creating an occupied seat must insert a "seat.reserved" event in the same transaction.
+    """
+    session = await create_session_with_seat(db_session)
+
+    events = (await db_session.execute(select(OutboxEvent))).scalars().all()
+    assert len(events) == 1
+    assert events[0].event_type == "seat.reserved"
+    assert events[0].published_at is None
+    payload = json.loads(events[0].payload)
+    assert payload["session_id"] == session.id
+    assert (payload["row"], payload["column"]) == (2, 3)
+
+
+@pytest.mark.asyncio
+async def test_publisher_drains_outbox_into_queue(db_session: AsyncSession, session_factory):
+    """
+    The publisher delivers pending events to the sink and marks them as published.
+    """
+    await create_session_with_seat(db_session)
+    sink = QueueSink()
+    publisher = OutboxPublisher(session_factory, sink, batch_size=10)
+
+    assert await publisher.publish_batch() == 1
+    assert await publisher.publish_batch() == 0, "Published events must not be delivered twice"
+
+    event = sink.queue.get_nowait()
+    assert event["event_type"] == "seat.reserved"
+    assert event["payload"]["row"] == 2
+
+    db_session.expire_all()
+    pending = (await db_session.execute(select(OutboxEvent).where(OutboxEvent.published_at.is_(None)))).all()
+    assert pending == []
+
+
+@pytest.mark.asyncio
+async def test_publisher_retries_batches_the_sink_did_not_accept_in_time(db_session: AsyncSession, session_factory):
+    """
+    A sink that hangs does not hold the batch, and the numbering lock, forever.
+    """
+    class HangingSink:
+        async def publish(self, events):
+            await asyncio.sleep(60)
+
+    await create_session_with_seat(db_session)
+    publisher = OutboxPublisher(session_factory, HangingSink(), batch_size=10, publish_timeout=0.05)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await publisher.publish_batch()
+
+    publisher.sink = QueueSink()
+    assert await publisher.publish_batch() == 1, "The batch is retried"
+    assert publisher.sink.queue.get_nowait()["sequence"] == 1
+
+
+@pytest.mark.asyncio
+async def test_file_sink_writes_json_lines(tmp_path):
+    """
+    The file sink appends one JSON document per event.
+    """
+    path = tmp_path / "events.jsonl"
+    sink = FileSink(str(path))
+    await sink.publish([{"id": 1}, {"id": 2}])
+    await sink.publish([{"id": 3}])
+
+    lines = path.read_text().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_change_feed(client, db_session: AsyncSession, session_factory, monkeypatch):
+    """
+    The change feed returns published events in the order they were numbered, without personal data.
+    """
+    monkeypatch.setattr(settings.app_settings, "ADMIN_TOKEN", "secret")
+    headers = {"X-Admin-Token": "secret"}
+    session = await create_session_with_seat(db_session)
+    publisher = OutboxPublisher(session_factory, QueueSink(), batch_size=10)
+
+    response = await client.get("/events/")
+    assert response.status_code == 403, f"Expected status code 403, got {response.status_code}"
+    response = await client.get("/events/", headers=headers)
+    assert response.json() == [], "Events are listed once the publisher numbered them"
+
+    await publisher.publish_batch()
+    add_outbox_event(db_session, WAITLIST_SEAT_OFFERED, {"session_id": session.id, "contact": "a@example.com"})
+    await db_session.commit()
+    await publisher.publish_batch()
+
+    response = await client.get("/events/", params={"after": 0}, headers=headers)
+    assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+    events = response.json()
+    assert [(event["sequence"], event["event_type"]) for event in events] == [(1, "seat.reserved"),
+                                                                              (2, "waitlist.offered")]
+    assert events[1]["payload"] == {"session_id": session.id}
+    assert publisher.sink.queue.get_nowait()["payload"]["row"] == 2
+    assert publisher.sink.queue.get_nowait()["payload"]["contact"] == "a@example.com", "Sinks get the contact"
+
+    response = await client.get("/events/", params={"after": events[-1]["sequence"]}, headers=headers)
+    assert response.json() == []
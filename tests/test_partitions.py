@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.partition_repository import (
+    SESSIONS_PER_PARTITION, partition_lower, partition_name, missing_partitions, expired_partitions,
+    ensure_occupied_seat_partitions, detach_expired_occupied_seat_partitions
+)
+
+SIZE = SESSIONS_PER_PARTITION
+
+
+def test_partition_bounds():
+    assert partition_lower(1) == 0
+    assert partition_lower(SIZE - 1) == 0
+    assert partition_lower(SIZE) == SIZE
+    assert partition_name(2 * SIZE) == f"occupied_seats_p{2 * SIZE}"
+
+
+def test_missing_partitions_cover_current_sessions_and_lookahead():
+    assert missing_partitions([0, SIZE], max_session_id=SIZE + 5, ahead=2) == [2 * SIZE, 3 * SIZE]
+    assert missing_partitions([0, SIZE, 2 * SIZE, 3 * SIZE], max_session_id=SIZE + 5, ahead=2) == []
+    assert missing_partitions([SIZE, 3 * SIZE], max_session_id=3 * SIZE, ahead=0) == [2 * SIZE], \
+        "Gaps are filled, archived ranges below the first partition are not recreated"
+
+
+def test_expired_partitions_only_hold_older_sessions():
+    existing = [0, SIZE, 2 * SIZE, 3 * SIZE]
+    assert expired_partitions(existing, first_retained_session_id=2 * SIZE - 1) == [0]
+    assert expired_partitions(existing, first_retained_session_id=2 * SIZE) == [0, SIZE]
+    assert expired_partitions(existing, first_retained_session_id=5) == []
+
+
+@pytest.mark.asyncio
+async def test_maintenance_is_a_no_op_without_partitioning(db_session: AsyncSession):
+    assert await ensure_occupied_seat_partitions(db_session, ahead=2) == []
+    assert await detach_expired_occupied_seat_partitions(db_session, timedelta(days=30)) == []
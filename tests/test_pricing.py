@@ -0,0 +1,78 @@
+from datetime import time
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.cinema import CinemaRoom, Move
+from app.repositories.cinema_room_repository import create_session, create_occupied_seat
+from app.utils.depends import get_pricing_engine
+from app.utils.pricing import DEFAULT_RULES, PricingEngine, PricingRules
+from app.utils.room_layout import RoomLayout
+from app.utils.seat_grid import SeatGrid
+
+RULES = {
+    "base": {"standard": 10, "vip": 15},
+    "showtimes": [{"from": "22:00", "to": "02:00", "multiplier": 0.5}, {"from": "19:00", "to": "23:00", "multiplier": 2}],
+    "fill": [{"from": 0.8, "multiplier": 1.5}, {"from": 0.5, "multiplier": 1.2}],
+}
+
+
+def test_rules_combine_category_showtime_and_fill_rate():
+    rules = PricingRules.from_dict(RULES)
+    layout = RoomLayout.from_text("VW.\nSsC")
+
+    table = rules.compile(time(23, 30))
+    prices = table[rules.tier(occupied=2, capacity=4)][layout.codes & 0x0F]
+
+    assert prices.tolist()[0][:2] == [900.0, 600.0], "Wheelchair seats default to the standard price"
+    assert rules.showtime_multiplier(time(1, 0)) == 0.5, "Bands may wrap past midnight"
+    assert rules.showtime_multiplier(time(20, 0)) == 2
+    assert rules.showtime_multiplier(time(12, 0)) == 1
+    assert [rules.tier(occupied, 10) for occupied in (4, 5, 8, 10)] == [0, 1, 2, 2]
+
+
+@pytest.mark.parametrize("rules", [
+    {"base": {"vip": 15}},
+    {"base": {"standard": 10, "balcony": 12}},
+    {"base": {"standard": 10}, "fill": [{"from": 0.5, "multiplier": 0}]},
+    {"base": {"standard": 10}, "showtimes": [{"from": "7pm", "to": "23:00", "multiplier": 1}]},
+])
+def test_invalid_rules_are_rejected(rules):
+    with pytest.raises(ValueError):
+        PricingRules.from_dict(rules)
+
+
+def test_prices_are_reevaluated_only_when_crossing_a_tier():
+    engine = PricingEngine(PricingRules.from_dict(DEFAULT_RULES))
+    layout = RoomLayout.from_text("SSSS")
+    grid = SeatGrid.empty(1, 4)
+
+    empty = engine.price_rows(1, time(18, 0), layout, grid)
+    grid.mark_occupied([1], [1])
+    assert engine.price_rows(1, time(18, 0), layout, grid) is empty, "25% full is still in the first tier"
+    assert empty == [[10.0, 10.0, 10.0, 10.0]]
+
+    grid.mark_occupied([1], [2])
+    assert engine.price_rows(1, time(18, 0), layout, grid) == [[11.0, 11.0, 11.0, 11.0]]
+    assert engine.price_rows(1, time(20, 0), layout, grid) == [[13.2, 13.2, 13.2, 13.2]], "A new showtime recompiles"
+
+
+@pytest.mark.asyncio
+async def test_seat_map_includes_prices(client, db_session: AsyncSession, show_times):
+    room = CinemaRoom(name="Pricing Room", row=2, column=3, seating=SeatGrid.empty(2, 3).to_json(),
+                      layout=RoomLayout.from_text("VVS\nSs.").to_bytes())
+    movie = Move(name="Pricing Movie", move_time_length=100, movie_cover="cover.png")
+    db_session.add_all([room, movie])
+    await db_session.commit()
+    session = await create_session(db_session, cinema_room_id=room.id, move_id=movie.id,
+                                   move_time_id=show_times[0].id)
+    get_pricing_engine().clear()
+
+    response = await client.get(f"/cinema_rooms/{room.id}/films/{movie.id}")
+    assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+    assert [row["prices"] for row in response.json()["data"]] == [[15.0, 15.0, 10.0], [10.0, None, None]]
+
+    await create_occupied_seat(db_session, session, row=1, column=1)
+    await create_occupied_seat(db_session, session, row=1, column=2)
+    response = await client.get("/sessions/batch", params={"ids": [session.id]})
+    assert response.json()[0]["data"][0]["prices"] == [16.5, 16.5, 11.0], "Half full reaches the first fill tier"
@@ -0,0 +1,99 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.configuration.settings import settings
+from app.main import app
+from app.models.cinema import CinemaRoom
+from app.repositories.cinema_room_repository import create_session
+from app.utils.depends import get_pricing_engine
+from app.utils.profiler import ProfilingMiddleware, SamplingProfiler, profiler
+
+SEAT_MAP_ROUTE = "/cinema_rooms/{room_id}/films/{film_id}"
+
+
+@pytest.fixture
+async def seat_map(db_session, movie, show_times):
+    room = CinemaRoom(name="Profiled Room", row=3, column=3)
+    db_session.add(room)
+    await db_session.commit()
+    await create_session(db_session, cinema_room_id=room.id, move_id=movie.id, move_time_id=show_times[0].id)
+    return f"/cinema_rooms/{room.id}/films/{movie.id}"
+
+
+def spin(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_samples_every_thread_into_collapsed_stacks(tmp_path):
+    sampler = SamplingProfiler(output_dir=str(tmp_path), interval=0.002)
+    worker = threading.Thread(target=spin, args=(0.3,), name="spinner")
+
+    sampler.start(duration=10)
+    worker.start()
+    worker.join()
+    result = sampler.stop()
+
+    assert not sampler.running and result.samples > 0 and result.duration < 10
+    lines = Path(result.path).read_text().splitlines()
+    spinner = [line for line in lines if line.startswith("spinner;")]
+    assert spinner and all(int(line.rsplit(" ", 1)[1]) > 0 for line in lines)
+    assert any(";spin (" in line for line in spinner), "Stacks go from the thread down to the running function"
+
+
+@pytest.mark.asyncio
+async def test_profiles_requests_to_one_route(tmp_path, monkeypatch, seat_map):
+    monkeypatch.setattr(settings.app_settings, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(settings.profiler_settings, "PROFILER_ENABLED", True)
+    monkeypatch.setattr(profiler, "output_dir", str(tmp_path))
+
+    async def slow_pricing():
+        # Runs on the event loop in the request's task, like the handler itself
+        spin(0.05)
+
+    app.dependency_overrides[get_pricing_engine] = slow_pricing
+    headers = {"X-Admin-Token": "secret"}
+    try:
+        async with AsyncClient(transport=ASGITransport(app=ProfilingMiddleware(app, profiler)),
+                               base_url="http://test") as client:
+            response = await client.post("/internal/profiler/start", headers={"X-Admin-Token": "wrong"})
+            assert response.status_code == 403, f"Expected status code 403, got {response.status_code}"
+            response = await client.post("/internal/profiler/start", params={"route": "/missing"}, headers=headers)
+            assert response.status_code == 400, f"Expected status code 400, got {response.status_code}"
+
+            response = await client.post("/internal/profiler/start", headers=headers,
+                                         params={"route": SEAT_MAP_ROUTE, "duration": 30, "interval_ms": 2})
+            assert response.json()["running"] and response.json()["route"] == SEAT_MAP_ROUTE
+            response = await client.post("/internal/profiler/start", headers=headers)
+            assert response.status_code == 409, "One capture at a time"
+
+            for _ in range(3):
+                response = await client.get(seat_map)
+                assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+            response = await client.post("/internal/profiler/stop", headers=headers)
+            assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+            profile = response.json()
+
+            response = await client.get("/internal/profiler", headers=headers)
+            assert not response.json()["running"] and response.json()["last_profile"] == profile
+    finally:
+        app.dependency_overrides.pop(get_pricing_engine, None)
+        profiler.stop()
+
+    assert profile["samples"] > 0 and profile["route"] == SEAT_MAP_ROUTE
+    lines = Path(profile["path"]).read_text().splitlines()
+    assert all(line.startswith(SEAT_MAP_ROUTE + ";") for line in lines), "Only the route's requests are sampled"
+    assert any("slow_pricing" in line for line in lines)
+
+
+@pytest.mark.asyncio
+async def test_profiler_is_opt_in(client, monkeypatch):
+    monkeypatch.setattr(settings.app_settings, "ADMIN_TOKEN", "secret")
+
+    response = await client.get("/internal/profiler", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 404, f"Expected status code 404, got {response.status_code}"
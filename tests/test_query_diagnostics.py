@@ -0,0 +1,85 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.models.cinema import Base, CinemaRoom
+from app.repositories.cinema_room_repository import create_session, get_session_by_room_and_film
+from app.utils.query_diagnostics import QueryDiagnostics, fingerprint_statement, normalize_statement
+from app.utils.seat_grid import SeatGrid
+from tests.conftest import engine
+
+
+def test_fingerprint_ignores_literals_and_list_lengths():
+    first = "SELECT * FROM sessions WHERE id IN ($1, $2, $3) AND name = 'Room 1'"
+    second = "SELECT *   FROM sessions\nWHERE id IN ($1) AND name = 'It''s'"
+    assert normalize_statement(first) == "SELECT * FROM sessions WHERE id IN (?) AND name = ?"
+    assert fingerprint_statement(first) == fingerprint_statement(second)
+    assert fingerprint_statement("SELECT * FROM moves WHERE id = 1") != fingerprint_statement(first)
+    assert normalize_statement("SELECT x::INTEGER[] FROM t1 WHERE y = :y_1") == "SELECT x::INTEGER[] FROM t1 WHERE y = ?"
+
+
+@pytest.mark.asyncio
+async def test_statements_are_attributed_to_repository_functions(db_session: AsyncSession, movie, show_times):
+    room = CinemaRoom(name="Diagnostics Room", column=4, row=4, seating=SeatGrid.empty(4, 4).to_json())
+    db_session.add(room)
+    await db_session.commit()
+    await create_session(db_session, cinema_room_id=room.id, move_id=movie.id, move_time_id=show_times[0].id)
+
+    diagnostics = QueryDiagnostics(slow_ms=0)
+    diagnostics.install(engine)
+    try:
+        for _ in range(3):
+            await get_session_by_room_and_film(db_session, room.id, movie.id)
+    finally:
+        diagnostics.uninstall(engine)
+
+    # The session and its preloaded occupied seats, each aggregated over the three calls
+    statements = diagnostics.report()["statements"]
+    assert len(statements) == 2
+    for stats in statements:
+        assert stats["calls"] == 3 and stats["slow_calls"] == 3
+        assert stats["repositories"] == {"cinema_room_repository.get_session_by_room_and_film": 3}
+
+
+def test_failing_statements_are_not_recorded():
+    sync_engine = create_engine("sqlite://")
+    diagnostics = QueryDiagnostics(slow_ms=1000)
+    diagnostics.install(sync_engine)
+    with sync_engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+        conn.execute(text("SELECT 1"))
+
+    statements = diagnostics.report()["statements"]
+    assert [(stats["statement"], stats["calls"]) for stats in statements] == [("SELECT ?", 1)]
+    assert statements[0]["max_ms"] < 1000, "Timed from its own start"
+
+
+@pytest.mark.asyncio
+async def test_slow_selects_get_their_plan_in_the_report(tmp_path):
+    diagnostics_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'diagnostics.db'}")
+    async with diagnostics_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    diagnostics = QueryDiagnostics(slow_ms=50)
+    diagnostics.record("SELECT * FROM sessions WHERE cinema_room_id = ?", 120.0, "cinema_room_repository.x", (1,))
+    diagnostics.record("SELECT * FROM sessions WHERE cinema_room_id = ?", 10.0, "cinema_room_repository.x", (2,))
+    diagnostics.record("DELETE FROM sessions WHERE id = ?", 500.0, "cinema_room_repository.y", (1,))
+
+    report_path = tmp_path / "slow_queries.json"
+    try:
+        await diagnostics.flush(diagnostics_engine, str(report_path))
+    finally:
+        await diagnostics_engine.dispose()
+
+    report = json.loads(report_path.read_text())
+    delete, select = report["statements"]
+    assert delete["plan"] is None, "Only SELECTs are explained"
+    assert select["calls"] == 2 and select["slow_calls"] == 1
+    assert select["max_ms"] == 120.0
+    assert any("sessions" in line for line in select["plan"])
+    assert await diagnostics.explain_pending(diagnostics_engine) == 0, "Each statement is explained once"
@@ -0,0 +1,113 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils.rate_limit import (BROWSE, RESERVE, InMemoryRateLimitStore, RateLimitMiddleware, RateLimitRule,
+                                  classify_route)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def create_limited_app(store):
+    app = FastAPI()
+
+    @app.get("/cinema_rooms/{room_id}")
+    async def room(room_id: int):
+        return {"id": room_id}
+
+    @app.post("/cinema_rooms/{room_id}/reserve")
+    async def reserve(room_id: int):
+        return {"message": "Seat reserved successfully"}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    app.add_middleware(RateLimitMiddleware, store=store, rules={
+        BROWSE: RateLimitRule(limit=5, period=5),
+        RESERVE: RateLimitRule(limit=2, period=10),
+    }, api_keys=["partner"])
+    return app
+
+
+def test_classify_route():
+    assert classify_route("GET", "/cinema_rooms/1/films/2") == BROWSE
+    assert classify_route("GET", "/movies/") == BROWSE
+    assert classify_route("POST", "/cinema_rooms/1/reserve") == RESERVE
+    assert classify_route("DELETE", "/sessions/1/reservations") == RESERVE
+    assert classify_route("GET", "/sessions/batch") == BROWSE
+    assert classify_route("GET", "/health") is None
+    assert classify_route("GET", "/admin/") is None
+
+
+def test_token_bucket_refills_lazily():
+    """
+    A bucket allows a burst of `limit` requests and then one request per refilled token.
+    """
+    clock = FakeClock()
+    store = InMemoryRateLimitStore(clock=clock)
+    rule = RateLimitRule(limit=3, period=3)
+
+    assert [store.take("client", rule).allowed for _ in range(4)] == [True, True, True, False]
+    denied = store.take("client", rule)
+    assert denied.retry_after == 1.0
+    assert denied.reset == 3.0
+
+    clock.now += 1
+    assert store.take("client", rule).allowed
+    assert not store.take("client", rule).allowed
+    assert store.take("other", rule).allowed, "Buckets are per key"
+
+
+def test_store_evicts_refilled_and_stale_buckets():
+    clock = FakeClock()
+    store = InMemoryRateLimitStore(shards=1, max_keys_per_shard=2, clock=clock)
+    rule = RateLimitRule(limit=2, period=2)
+
+    for key in ("a", "b", "c"):
+        store.take(key, rule)
+    assert len(store) == 2
+
+    clock.now += 1
+    store.take("d", rule)
+    assert len(store) == 1, "Buckets that have refilled are dropped"
+
+
+def test_middleware_limits_per_client_and_route_class():
+    """
+    Exhausting the reserve bucket returns 429 while browsing and other clients are unaffected.
+    """
+    clock = FakeClock()
+    client = TestClient(create_limited_app(InMemoryRateLimitStore(clock=clock)))
+
+    for remaining in ("1", "0"):
+        response = client.post("/cinema_rooms/1/reserve")
+        assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+        assert response.headers["RateLimit-Limit"] == "2"
+        assert response.headers["RateLimit-Remaining"] == remaining
+
+    response = client.post("/cinema_rooms/1/reserve")
+    assert response.status_code == 429, f"Expected status code 429, got {response.status_code}"
+    assert response.headers["Retry-After"] == "5"
+    assert response.headers["RateLimit-Reset"] == "10"
+
+    response = client.get("/cinema_rooms/1")
+    assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+    assert response.headers["RateLimit-Remaining"] == "4"
+
+    response = client.post("/cinema_rooms/1/reserve", headers={"X-API-Key": "partner"})
+    assert response.status_code == 200, "API keys get their own bucket"
+    response = client.post("/cinema_rooms/1/reserve", headers={"X-API-Key": "made-up"})
+    assert response.status_code == 429, "Unknown API keys are limited by IP address"
+
+    response = client.get("/health")
+    assert "RateLimit-Limit" not in response.headers
+
+    clock.now += 5
+    response = client.post("/cinema_rooms/1/reserve")
+    assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.cinema import CinemaRoom, Move
+from app.repositories.cinema_room_repository import create_session, create_occupied_seat
+from app.utils.room_layout import RoomLayout, LayoutCache, SeatType, BLOCKED
+from app.utils.seat_grid import SeatGrid
+
+LAYOUT_TEXT = "VV.VV\nSS.SS\nWc.SS"
+
+
+def test_layout_text_and_bytes_round_trip():
+    """
+    The admin text form and the stored byte form describe the same layout.
+    """
+    layout = RoomLayout.from_text(LAYOUT_TEXT)
+    assert layout.shape == (3, 5)
+    assert layout.codes[0, 0] == SeatType.VIP
+    assert layout.codes[2, 1] == SeatType.COMPANION | BLOCKED
+    assert layout.to_text() == LAYOUT_TEXT
+    assert RoomLayout.from_bytes(layout.to_bytes(), 3, 5).to_text() == LAYOUT_TEXT
+
+    # Three aisle positions and one blocked seat are not bookable
+    assert layout.capacity == 11
+    assert not layout.is_bookable(1, 3)
+    assert not layout.is_bookable(3, 2)
+    assert layout.is_bookable(3, 1)
+
+    with pytest.raises(ValueError):
+        RoomLayout.from_text("SS\nSSS")
+
+
+def test_merge_with_occupancy():
+    """
+    Merging marks occupied, blocked and missing seats as unavailable and reports seat types.
+    """
+    layout = RoomLayout.from_text(LAYOUT_TEXT)
+    grid = SeatGrid.empty(3, 5).mark_occupied([2], [5])
+
+    rows = layout.merge(grid)
+    assert rows[0] == {"row": 1, "seats": [False, False, True, False, False],
+                       "types": ["vip", "vip", None, "vip", "vip"]}
+    assert rows[1]["seats"] == [False, False, True, False, True]
+    assert rows[2]["types"] == ["wheelchair", "blocked", None, "standard", "standard"]
+
+
+def test_layout_cache_revalidates_on_change():
+    """
+    The cache returns the same decoded layout until the room's layout bytes change.
+    """
+    cache = LayoutCache()
+    room = CinemaRoom(id=1, name="Cached", row=3, column=5, layout=RoomLayout.from_text(LAYOUT_TEXT).to_bytes())
+
+    first = cache.get(room)
+    assert cache.get(room) is first
+
+    reloaded = CinemaRoom(id=1, name="Cached", row=3, column=5, layout=bytes(bytearray(room.layout)))
+    assert cache.get(reloaded) is first, "A copy of the same version is a hit"
+
+    room.layout = RoomLayout.default(3, 5).to_bytes()
+    assert cache.get(room) is not first
+    assert cache.get(room).capacity == 15
+
+
+@pytest.mark.asyncio
+async def test_blocked_seat_cannot_be_reserved(client, db_session: AsyncSession, show_times):
+    """
+    Reserving a blocked seat or an aisle is rejected; regular seats can be reserved.
+    """
+    room = CinemaRoom(name="Layout Room", column=5, row=3, seating=SeatGrid.empty(3, 5).to_json(),
+                      layout=RoomLayout.from_text(LAYOUT_TEXT).to_bytes())
+    movie = Move(name="Layout Movie", move_time_length=100, movie_cover="cover.png")
+    db_session.add_all([room, movie])
+    await db_session.commit()
+    session = await create_session(db_session, cinema_room_id=room.id, move_id=movie.id,
+                                   move_time_id=show_times[0].id)
+    await create_occupied_seat(db_session, session, row=1, column=1)
+
+    for row, column in [(3, 2), (2, 3)]:
+        response = await client.post(f"/cinema_rooms/{room.id}/reserve",
+                                 params={"session_id": session.id, "row": row, "column": column})
+        assert response.status_code == 400, f"Expected status code 400, got {response.status_code}"
+
+    response = await client.post(f"/cinema_rooms/{room.id}/reserve",
+                             params={"session_id": session.id, "row": 3, "column": 1})
+    assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+
+    response = await client.get(f"/cinema_rooms/{room.id}/films/{movie.id}")
+    data = response.json()["data"]
+    assert data[0]["seats"][0] is True
+    assert data[2]["types"][:2] == ["wheelchair", "blocked"]
@@ -0,0 +1,111 @@
+import asyncio
+import json
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.cinema import CinemaRoom, Move
+from app.repositories.cinema_room_repository import create_session, create_occupied_seat
+from app.utils.room_layout import RoomLayout
+from app.repositories.schedule_repository import get_schedule_entries
+from app.utils.schedule import ScheduleSnapshot, ScheduleStore, schedule_store
+from app.utils.seat_grid import SeatGrid
+from tests.conftest import engine
+
+
+@pytest.fixture
+def empty_schedule():
+    schedule_store.snapshot = None
+    yield schedule_store
+    schedule_store.snapshot = None
+
+
+def test_snapshot_indexes_sessions_by_movie_and_room():
+    entries = [
+        {"session_id": 1, "time": "18:00", "movie": {"id": 1}, "room": {"id": 10}, "capacity": 5, "seats_left": 5},
+        {"session_id": 2, "time": "18:00", "movie": {"id": 2}, "room": {"id": 10}, "capacity": 5, "seats_left": 4},
+        {"session_id": 3, "time": "21:00", "movie": {"id": 1}, "room": {"id": 11}, "capacity": 5, "seats_left": 0},
+    ]
+    snapshot = ScheduleSnapshot(entries)
+
+    assert json.loads(snapshot.body)["sessions"] == entries
+    assert [entry["session_id"] for entry in json.loads(snapshot.select(movie_id=1))["sessions"]] == [1, 3]
+    assert [entry["session_id"] for entry in json.loads(snapshot.select(room_id=10))["sessions"]] == [1, 2]
+    assert json.loads(snapshot.select(movie_id=99))["sessions"] == []
+    assert ScheduleSnapshot(entries).etag == snapshot.etag, "The ETag depends on the content only"
+
+
+@pytest.mark.asyncio
+async def test_rebuilds_wait_for_a_pause_in_notifications():
+    store = ScheduleStore(interval=5, min_interval=0.1)
+    waiting = asyncio.ensure_future(store._wait_for_changes())
+    for _ in range(5):
+        store.notify()
+        await asyncio.sleep(0.05)
+        assert not waiting.done(), "A burst of reservations is rebuilt once it is over"
+    await asyncio.wait_for(waiting, timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_schedule_is_served_from_the_snapshot(client, db_session: AsyncSession, show_times, empty_schedule):
+    layout = RoomLayout.from_text("SS.\nSSS")
+    room = CinemaRoom(name="Schedule Room", row=2, column=3, seating=SeatGrid.empty(2, 3).to_json(),
+                      layout=layout.to_bytes())
+    movies = [Move(name=f"Schedule Movie {i}", move_time_length=100, movie_cover="cover.png") for i in range(2)]
+    db_session.add_all([room] + movies)
+    await db_session.commit()
+    late = await create_session(db_session, cinema_room_id=room.id, move_id=movies[0].id,
+                                move_time_id=show_times[1].id)
+    early = await create_session(db_session, cinema_room_id=room.id, move_id=movies[1].id,
+                                 move_time_id=show_times[0].id)
+    await create_occupied_seat(db_session, late, row=1, column=1)
+
+    response = await client.get("/schedule")
+    assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+    sessions = response.json()["sessions"]
+    assert [(entry["session_id"], entry["time"]) for entry in sessions] == [(early.id, "18:00"), (late.id, "21:00")]
+    assert sessions[1]["movie"]["name"] == "Schedule Movie 0"
+    assert sessions[1]["room"] == {"id": room.id, "name": "Schedule Room"}
+    assert (sessions[1]["capacity"], sessions[1]["seats_left"]) == (5, 4)
+
+    statements = []
+
+    def count(*args):
+        statements.append(args)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        response = await client.get("/schedule", params={"movie_id": movies[1].id})
+        assert [entry["session_id"] for entry in response.json()["sessions"]] == [early.id]
+        revalidated = await client.get("/schedule", headers={"If-None-Match": response.headers["ETag"]})
+        assert revalidated.status_code == 304, f"Expected status code 304, got {revalidated.status_code}"
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+    assert statements == [], "The snapshot is served without querying the database"
+
+    reservation = await client.post(f"/cinema_rooms/{room.id}/reserve",
+                                    params={"session_id": early.id, "row": 2, "column": 1})
+    assert reservation.status_code == 200, f"Expected status code 200, got {reservation.status_code}"
+    await schedule_store.rebuild(db_session)
+    response = await client.get("/schedule", params={"room_id": room.id})
+    assert [entry["seats_left"] for entry in response.json()["sessions"]] == [4, 4]
+
+
+@pytest.mark.asyncio
+async def test_schedule_lists_the_sessions_of_the_day(db_session: AsyncSession, movie, show_times):
+    room = CinemaRoom(name="Dated Room", row=1, column=1)
+    db_session.add(room)
+    await db_session.commit()
+    today = date.today()
+    sessions = {}
+    for name, show_date in (("past", today - timedelta(days=1)), ("today", today),
+                            ("future", today + timedelta(days=1)), ("undated", None)):
+        sessions[name] = await create_session(db_session, cinema_room_id=room.id, move_id=movie.id,
+                                              move_time_id=show_times[0].id, show_date=show_date)
+
+    listed = {entry["session_id"] for entry in await get_schedule_entries(db_session)}
+    assert listed == {sessions["today"].id, sessions["undated"].id}
+    listed = {entry["session_id"] for entry in await get_schedule_entries(db_session, today + timedelta(days=1))}
+    assert listed == {sessions["future"].id, sessions["undated"].id}
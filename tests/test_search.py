@@ -0,0 +1,90 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.cinema import Move
+from app.utils.search_index import MovieSearchIndex, movie_search_index
+
+TITLES = ["The Matrix", "The Matrix Reloaded", "Mad Max: Fury Road", "Matilda", "Spirited Away"]
+
+
+def create_movies():
+    return [Move(id=i, name=name, move_time_length=120, movie_cover=f"{i}.png") for i, name in enumerate(TITLES, 1)]
+
+
+def names(results):
+    return [movie["name"] for movie in results]
+
+
+def test_suggest_by_word_prefix():
+    """
+    Every typed word must prefix a word of the title; titles starting with the query rank first.
+    """
+    index = MovieSearchIndex()
+    index.rebuild(create_movies())
+
+    assert names(index.suggest("mat")) == ["Matilda", "The Matrix", "The Matrix Reloaded"]
+    assert names(index.suggest("matrix rel")) == ["The Matrix Reloaded"]
+    assert names(index.suggest("FURY")) == ["Mad Max: Fury Road"]
+    assert names(index.suggest("ma", limit=2)) == ["Mad Max: Fury Road", "Matilda"]
+    assert index.suggest("xyz") == []
+    assert index.suggest("  ") == []
+
+
+def test_incremental_updates():
+    """
+    Adding, renaming and removing movies updates the trie without a rebuild.
+    """
+    index = MovieSearchIndex()
+    movies = create_movies()
+    index.rebuild(movies)
+
+    index.add(Move(id=6, name="Matrix Resurrections", movie_cover="6.png"))
+    assert names(index.suggest("matrix res")) == ["Matrix Resurrections"]
+
+    movies[3].name = "Amelie"
+    index.add(movies[3])
+    assert "Matilda" not in names(index.suggest("mat"))
+    assert names(index.suggest("ame")) == ["Amelie"]
+
+    index.remove(5)
+    assert index.suggest("spirited") == []
+    assert "s" not in index._words.children, "Unused trie nodes are pruned"
+    assert len(index) == 5
+
+
+def test_index_goes_stale_after_its_max_age(monkeypatch):
+    """
+    Without change notifications, an index is rebuilt on its first lookup after `max_age`.
+    """
+    index = MovieSearchIndex()
+    assert index.stale, "Never loaded"
+    index.rebuild(create_movies())
+    assert not index.stale, "Kept until invalidated by default"
+
+    monkeypatch.setattr(MovieSearchIndex, "max_age", 0)
+    assert index.stale
+
+
+@pytest.mark.asyncio
+async def test_search_endpoints(client, db_session: AsyncSession):
+    """
+    /movies/search queries the database and /movies/suggest loads the in-memory index on first use.
+    """
+    movie_search_index.invalidate()
+    db_session.add_all([Move(name=name, move_time_length=120, movie_cover="cover.png") for name in TITLES])
+    await db_session.commit()
+
+    response = await client.get("/movies/search", params={"q": "matrix"})
+    assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+    assert [movie["name"] for movie in response.json()] == ["The Matrix", "The Matrix Reloaded"]
+
+    response = await client.get("/movies/search", params={"q": "100%"})
+    assert response.json() == []
+
+    response = await client.get("/movies/suggest", params={"q": "spi"})
+    assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+    assert [movie["name"] for movie in response.json()] == ["Spirited Away"]
+
+    response = await client.get("/movies/suggest", params={"q": ""})
+    assert response.status_code == 422, f"Expected status code 422, got {response.status_code}"
+    movie_search_index.invalidate()
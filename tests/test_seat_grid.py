@@ -0,0 +1,65 @@
+import json
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.cinema import CinemaRoom, Move
+from app.repositories.cinema_room_repository import create_session, create_occupied_seat
+from app.utils.seat_grid import SeatGrid
+
+
+def test_from_seating_matches_json():
+    """
+    The byte-scanning decoder must agree with the JSON parser.
+    """
+    matrix = [[False, True, False], [True, True, False]]
+    grid = SeatGrid.from_seating(json.dumps(matrix), rows=2, columns=3)
+    assert grid.occupied.tolist() == matrix
+
+    # Missing seating yields an empty room of the given size
+    assert SeatGrid.from_seating(None, rows=2, columns=4).occupied.shape == (2, 4)
+
+
+def test_mark_occupied_and_row_summaries():
+    """
+    Marking seats from coordinate arrays updates free counts and the longest free runs.
+    """
+    grid = SeatGrid.empty(rows=3, columns=6)
+    grid.mark_occupied([1, 1, 2, 3, 9], [2, 5, 1, 6, 9])  # (9, 9) is outside the room
+
+    assert grid.occupied.sum() == 4
+    assert grid.free_counts().tolist() == [4, 5, 5]
+    assert grid.longest_free_runs().tolist() == [2, 5, 5]
+
+    grid.mark_occupied_seats([(2, c) for c in range(2, 7)])
+    assert grid.free_counts()[1] == 0
+    assert grid.longest_free_runs()[1] == 0
+
+
+def test_to_rows_and_json_round_trip():
+    """
+    The grid converts to the response format and back to the stored seating matrix.
+    """
+    grid = SeatGrid.empty(rows=2, columns=2).mark_occupied([2], [1])
+    assert grid.to_rows() == [{'row': 1, 'seats': [False, False]}, {'row': 2, 'seats': [True, False]}]
+    assert SeatGrid.from_seating(grid.to_json(), 2, 2).occupied.tolist() == grid.occupied.tolist()
+
+
+@pytest.mark.asyncio
+async def test_get_cinema_room_and_film(client, db_session: AsyncSession, show_times):
+    """
+    The seat map endpoint marks reserved seats in the room's seating matrix.
+    """
+    room = CinemaRoom(name="Map Room", column=3, row=2, seating=SeatGrid.empty(2, 3).to_json())
+    movie = Move(name="Map Movie", move_time_length=100, movie_cover="cover.png")
+    db_session.add_all([room, movie])
+    await db_session.commit()
+    session = await create_session(db_session, cinema_room_id=room.id, move_id=movie.id,
+                                   move_time_id=show_times[0].id)
+    await create_occupied_seat(db_session, session, row=2, column=3)
+
+    response = await client.get(f"/cinema_rooms/{room.id}/films/{movie.id}")
+    assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+    body = response.json()
+    assert body["session_id"] == session.id
+    assert [row["seats"] for row in body["data"]] == [[False, False, False], [False, False, True]]
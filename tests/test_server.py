@@ -0,0 +1,41 @@
+import pytest
+
+from app.server import check_pool_budget, worker_count, worker_pool_sizes
+
+
+def test_worker_count_defaults_to_cpus():
+    """
+    An explicit worker count wins; 0 sizes the pool of workers to the CPU count.
+    """
+    assert worker_count(3) == 3
+    assert worker_count(0) >= 1
+
+
+def test_worker_pool_sizes_stay_within_budget():
+    """
+    The connections opened by all workers must not exceed the instance budget.
+    """
+    for workers in (1, 2, 4, 8):
+        sizes = worker_pool_sizes(workers, max_connections=60)
+        per_worker = int(sizes["DB_POOL_SIZE"]) + int(sizes["DB_MAX_OVERFLOW"]) + 2 * 2
+        assert int(sizes["DB_POOL_SIZE"]) >= 1
+        assert per_worker * workers <= 60, f"{workers} workers would open {per_worker * workers} connections"
+
+
+def test_worker_pool_sizes_reject_a_budget_too_small():
+    """
+    A budget the admin pools would use up fails instead of being exceeded.
+    """
+    assert worker_pool_sizes(12, max_connections=60) == {"DB_POOL_SIZE": "1", "DB_MAX_OVERFLOW": "0"}
+    with pytest.raises(ValueError):
+        worker_pool_sizes(13, max_connections=60)
+
+
+def test_pool_sizes_from_the_environment_must_fit_the_budget():
+    """
+    Pool sizes set by hand are checked against the budget like computed ones.
+    """
+    sizes = worker_pool_sizes(4, max_connections=60)
+    check_pool_budget(4, 60, int(sizes["DB_POOL_SIZE"]), int(sizes["DB_MAX_OVERFLOW"]))
+    with pytest.raises(ValueError):
+        check_pool_budget(4, 60, 20, 10)
@@ -0,0 +1,20 @@
+import subprocess
+import sys
+
+
+def test_import_does_not_initialize_subsystems():
+    """
+    Importing the application must not build engines or the admin panel.
+    Database drivers and Flask are only imported during the lifespan startup.
+    """
+    code = (
+        "import sys, app.main\n"
+        "from app.configuration.database import get_engine, get_sync_engine\n"
+        "print(get_engine.cache_info().currsize, get_sync_engine.cache_info().currsize)\n"
+        "print(sorted(m for m in ('asyncpg', 'psycopg2', 'flask', 'flask_admin') if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    engines, heavy_modules = result.stdout.splitlines()
+
+    assert engines == "0 0", f"Expected no engines after import, got {engines}"
+    assert heavy_modules == "[]", f"Expected no eager driver/admin imports, got {heavy_modules}"
@@ -0,0 +1,128 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.main import app
+from app.models.cinema import DEFAULT_SITE_ID, CinemaRoom, Move, OutboxEvent, Site
+from app.repositories.analytics_repository import get_occupancy, refresh_occupancy_rollups
+from app.repositories.cinema_room_repository import create_occupied_seat, create_session, get_all_cinema_rooms
+from app.repositories.move_repository import get_all_moves
+from app.utils.search_index import movie_search_index, movie_search_indexes
+from app.utils.tenancy import SiteContext, SiteMiddleware, SiteRegistry, scoped_key, site_scope
+
+
+def create_registry(*sites: Site) -> SiteRegistry:
+    registry = SiteRegistry({"second": "postgresql+asyncpg://cinema@db-second/cinema"})
+    registry.load([Site(id=DEFAULT_SITE_ID, slug="default", name="Default"), *sites])
+    return registry
+
+
+@pytest.fixture
+async def second_site(db_session: AsyncSession):
+    site = Site(slug="second", name="Second Cinema", hostname="second.example.com")
+    db_session.add(site)
+    await db_session.commit()
+    movie_search_index.invalidate()
+    yield site
+    movie_search_indexes.discard(site.id)
+    movie_search_index.invalidate()
+
+
+def test_registry_resolves_by_slug_then_host():
+    registry = create_registry(Site(id=2, slug="second", name="Second", hostname="Second.example.com"))
+
+    assert registry.resolve(slug="second").id == 2
+    assert registry.resolve(slug="second").database_url == "postgresql+asyncpg://cinema@db-second/cinema"
+    assert registry.resolve(host="second.example.com:8443").id == 2
+    assert registry.resolve(host="other.example.com").id == DEFAULT_SITE_ID, "Unknown hosts use the default site"
+    assert registry.resolve(slug="missing", host="second.example.com") is None
+    assert registry.get(DEFAULT_SITE_ID).database_url is None
+
+
+def test_scoped_keys():
+    assert scoped_key("reserve:abc") == "reserve:abc"
+    with site_scope(SiteContext(2, "second")):
+        assert scoped_key("reserve:abc") == "second:reserve:abc"
+
+
+@pytest.mark.asyncio
+async def test_queries_and_new_rows_are_scoped_to_the_current_site(db_session: AsyncSession, second_site, show_times):
+    db_session.add(CinemaRoom(name="Default Room", row=2, column=2))
+    await db_session.commit()
+    site = SiteContext(second_site.id, second_site.slug)
+
+    with site_scope(site):
+        room = CinemaRoom(name="Second Room", row=2, column=2)
+        movie = Move(name="Second Movie", move_time_length=90, movie_cover="cover.png")
+        db_session.add_all([room, movie])
+        await db_session.commit()
+        session = await create_session(db_session, cinema_room_id=room.id, move_id=movie.id,
+                                       move_time_id=show_times[0].id)
+        assert [room.name for room in await get_all_cinema_rooms(db_session)] == ["Second Room"]
+        assert [movie.name for movie in await get_all_moves(db_session)] == ["Second Movie"]
+
+    assert (room.site_id, movie.site_id, session.site_id) == (second_site.id,) * 3
+    with site_scope(SiteContext(DEFAULT_SITE_ID, "default")):
+        assert [room.name for room in await get_all_cinema_rooms(db_session)] == ["Default Room"]
+        assert await db_session.get(CinemaRoom, room.id, populate_existing=True) is None
+    assert len(await get_all_cinema_rooms(db_session)) == 2, "Outside of a site nothing is filtered"
+
+
+@pytest.mark.asyncio
+async def test_rollups_and_events_are_kept_per_site(db_session: AsyncSession, second_site, show_times):
+    """
+    A showtime shared by both sites has a rollup per site, and each site sees only its own events.
+    """
+    sessions = {}
+    for site in (SiteContext(DEFAULT_SITE_ID, "default"), SiteContext(second_site.id, second_site.slug)):
+        with site_scope(site):
+            room = CinemaRoom(name=f"{site.slug} room", row=2, column=2)
+            movie = Move(name=f"{site.slug} movie", move_time_length=90, movie_cover="cover.png")
+            db_session.add_all([room, movie])
+            await db_session.commit()
+            sessions[site] = await create_session(db_session, cinema_room_id=room.id, move_id=movie.id,
+                                                  move_time_id=show_times[0].id)
+    default, second = sessions
+    await create_occupied_seat(db_session, sessions[second], row=1, column=1)
+    await refresh_occupancy_rollups(db_session)
+
+    for site, occupied in ((default, 0), (second, 1)):
+        with site_scope(site):
+            rollup = await get_occupancy(db_session, "move_time", show_times[0].id)
+            assert (rollup.capacity, rollup.occupied) == (4, occupied)
+            events = (await db_session.execute(select(OutboxEvent.event_type))).scalars().all()
+            assert events == (["seat.reserved"] if occupied else [])
+
+
+@pytest.mark.asyncio
+async def test_requests_are_routed_to_their_site(db_session: AsyncSession, second_site):
+    db_session.add_all([
+        Move(name="Matrix", move_time_length=120, movie_cover="cover.png"),
+        Move(name="Mad Max", move_time_length=120, movie_cover="cover.png", site_id=second_site.id),
+    ])
+    await db_session.commit()
+    sited_app = SiteMiddleware(app, create_registry(second_site))
+
+    async with AsyncClient(transport=ASGITransport(app=sited_app), base_url="http://test") as client:
+        response = await client.get("/movies/suggest", params={"q": "ma"})
+        assert [movie["name"] for movie in response.json()] == ["Matrix"]
+        response = await client.get("/movies/suggest", params={"q": "ma"}, headers={"X-Site": "second"})
+        assert [movie["name"] for movie in response.json()] == ["Mad Max"], "Each site has its own search index"
+        response = await client.get("/movies/", headers={"Host": "second.example.com"})
+        assert [movie["name"] for movie in response.json()] == ["Mad Max"]
+        response = await client.get("/movies/", headers={"X-Site": "missing"})
+        assert response.status_code == 404, f"Expected status code 404, got {response.status_code}"
+
+
+def test_background_jobs_cover_every_site_database(monkeypatch):
+    from app.configuration import lifespan
+
+    monkeypatch.setattr(lifespan.site_registry, "database_urls", {
+        "second": "postgresql+asyncpg://cinema:pw@db-second/cinema",
+        "third": "postgresql+asyncpg://cinema:pw@db-second/cinema",
+    })
+
+    assert lifespan._database_urls() == [None, "postgresql+asyncpg://cinema:pw@db-second/cinema"]
+    assert lifespan._asyncpg_dsn("postgresql+asyncpg://cinema:pw@db-second/cinema") == \
+        "postgresql://cinema:pw@db-second/cinema"
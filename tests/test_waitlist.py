@@ -0,0 +1,165 @@
+import importlib
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.configuration.settings import settings
+from app.models.cinema import CinemaRoom, OccupiedSeat, OutboxEvent
+from app.repositories.analytics_repository import get_occupancy
+from app.repositories.cinema_room_repository import create_occupied_seat, create_session, release_occupied_seats
+from app.repositories.waitlist_repository import expire_waitlist_offers
+from app.utils.sold_out import SoldOutCache, sold_out_sessions
+
+# The package exports the controller instance under the module's name
+controller_module = importlib.import_module("app.routes.cinema_room_controller")
+SEATS = [(1, 1), (1, 2), (2, 1), (2, 2)]
+
+
+@pytest.fixture
+async def full_session(db_session: AsyncSession, movie, show_times):
+    room = CinemaRoom(name="Small Room", row=2, column=2)
+    db_session.add(room)
+    await db_session.commit()
+    session = await create_session(db_session, cinema_room_id=room.id, move_id=movie.id, move_time_id=show_times[0].id)
+    for row, column in SEATS:
+        await create_occupied_seat(db_session, session, row=row, column=column)
+    return session
+
+
+async def join(client, session_id: int, contact: str) -> dict:
+    response = await client.post(f"/sessions/{session_id}/waitlist", json={"contact": contact})
+    assert response.status_code == 201, f"Expected status code 201, got {response.status_code}"
+    return response.json()
+
+
+async def get_entry(client, entry: dict) -> dict:
+    response = await client.get(f"/waitlist/{entry['id']}", headers={"X-Waitlist-Token": entry["token"]})
+    assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+    return response.json()
+
+
+def test_sold_out_cache_forgets_old_entries(monkeypatch):
+    cache = SoldOutCache(max_age=10, max_entries=2)
+    now = [100.0]
+    monkeypatch.setattr("app.utils.sold_out.time.monotonic", lambda: now[0])
+
+    for session_id in (1, 2, 3):
+        cache.mark(session_id)
+    assert not cache.is_sold_out(1), "The oldest entry is evicted past max_entries"
+    now[0] += 11
+    assert not cache.is_sold_out(3), "Entries expire after max_age"
+
+
+@pytest.mark.asyncio
+async def test_sold_out_session_is_answered_without_reading_its_seats(client, db_session, full_session,
+                                                                      monkeypatch):
+    url = f"/cinema_rooms/{full_session.cinema_room_id}"
+    params = {"session_id": full_session.id, "row": 1, "column": 1}
+    assert sold_out_sessions.get().is_sold_out(full_session.id), "Taking the last seat marks the session"
+
+    async def unexpected(*args, **kwargs):
+        raise AssertionError("The seats of a sold-out session are not read")
+
+    monkeypatch.setattr(controller_module, "get_occupied_seat_coordinates", unexpected)
+    response = await client.post(f"{url}/reserve", params=params)
+    assert response.status_code == 409 and "waitlist" in response.json()["detail"]
+    response = await client.get(f"{url}/films/{full_session.move_id}")
+    assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+    assert response.json()["sold_out"] and all(all(row["seats"]) for row in response.json()["data"])
+    monkeypatch.undo()
+
+    # Another worker does not know yet, and learns it from the failed reservation
+    sold_out_sessions.get().clear()
+    response = await client.post(f"{url}/reserve", params=params)
+    assert response.status_code == 409, f"Expected status code 409, got {response.status_code}"
+    assert sold_out_sessions.get().is_sold_out(full_session.id)
+
+    await release_occupied_seats(db_session, full_session, [(1, 1)])
+    assert not sold_out_sessions.get().is_sold_out(full_session.id)
+    response = await client.get(f"{url}/films/{full_session.move_id}")
+    assert not response.json()["sold_out"] and response.json()["data"][0]["seats"] == [False, True]
+    response = await client.post(f"/sessions/{full_session.id}/waitlist", json={"contact": "a@example.com"})
+    assert response.status_code == 409, "Only sold-out sessions have a waitlist"
+
+
+@pytest.mark.asyncio
+async def test_released_seats_are_offered_in_order(client, db_session, full_session, monkeypatch):
+    monkeypatch.setattr(settings.app_settings, "ADMIN_TOKEN", "secret")
+    admin = {"X-Admin-Token": "secret"}
+    url = f"/cinema_rooms/{full_session.cinema_room_id}/reserve"
+    first = await join(client, full_session.id, "first@example.com")
+    second = await join(client, full_session.id, "second@example.com")
+    assert (first["position"], second["position"]) == (1, 2)
+    response = await client.get(f"/waitlist/{first['id']}", headers={"X-Waitlist-Token": second["token"]})
+    assert response.status_code == 404, f"Expected status code 404, got {response.status_code}"
+
+    response = await client.delete(url, params={"session_id": full_session.id, "row": 2, "column": 1},
+                                   headers=admin)
+    assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+
+    offered, waiting = await get_entry(client, first), await get_entry(client, second)
+    assert (offered["status"], offered["row"], offered["column"]) == ("offered", 2, 1)
+    assert offered["offer_expires_at"] is not None and waiting["position"] == 1
+    seats = (await db_session.execute(select(OccupiedSeat.row, OccupiedSeat.column)
+                                      .where(OccupiedSeat.session_id == full_session.id))).all()
+    assert len(seats) == 4, "The offered seat stays reserved for the waitlist"
+    assert (await get_occupancy(db_session, "session", full_session.id)).occupied == 4
+    offers = (await db_session.execute(select(OutboxEvent.payload)
+                                       .where(OutboxEvent.event_type == "waitlist.offered"))).scalars().all()
+    assert len(offers) == 1 and "first@example.com" in offers[0]
+
+    response = await client.post(f"/waitlist/{first['id']}/accept", headers={"X-Waitlist-Token": first["token"]})
+    assert response.status_code == 200 and response.json()["status"] == "accepted"
+
+    await client.delete(url, params={"session_id": full_session.id, "row": 1, "column": 2}, headers=admin)
+    assert (await get_entry(client, second))["status"] == "offered"
+    # Declined with nobody left waiting, so the seat goes back on sale
+    response = await client.delete(f"/waitlist/{second['id']}", headers={"X-Waitlist-Token": second["token"]})
+    assert response.status_code == 200 and response.json()["status"] == "cancelled"
+    assert (await get_occupancy(db_session, "session", full_session.id)).occupied == 3
+    response = await client.post(url, params={"session_id": full_session.id, "row": 1, "column": 2})
+    assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+
+    # The accepted seat is cancelled with the waitlist token
+    response = await client.delete(url, params={"session_id": full_session.id, "row": 2, "column": 1},
+                                   headers={"X-Reservation-Token": first["token"]})
+    assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+
+@pytest.mark.asyncio
+async def test_expired_offers_pass_to_the_next_entry(client, db_session, full_session):
+    first = await join(client, full_session.id, "first@example.com")
+    second = await join(client, full_session.id, "second@example.com")
+
+    await release_occupied_seats(db_session, full_session, [(1, 1)], offer_ttl=timedelta(0))
+    assert await expire_waitlist_offers(db_session) == 1
+    assert await expire_waitlist_offers(db_session) == 0
+
+    expired, offered = await get_entry(client, first), await get_entry(client, second)
+    assert expired["status"] == "expired"
+    assert (offered["status"], offered["row"], offered["column"]) == ("offered", 1, 1)
+    response = await client.post(f"/waitlist/{first['id']}/accept", headers={"X-Waitlist-Token": first["token"]})
+    assert response.status_code == 409, f"Expected status code 409, got {response.status_code}"
+    assert (await get_occupancy(db_session, "session", full_session.id)).occupied == 4
+
+
+@pytest.mark.asyncio
+async def test_ended_offers_release_only_the_seat_held_for_them(client, db_session, full_session):
+    """
+    A seat freed while it was still offered and passed on to the next entry stays with that entry.
+    """
+    first = await join(client, full_session.id, "first@example.com")
+    second = await join(client, full_session.id, "second@example.com")
+
+    await release_occupied_seats(db_session, full_session, [(1, 1)], offer_ttl=timedelta(0))
+    # Cancelled by the admin while offered to the first entry, so it is offered to the second one
+    await release_occupied_seats(db_session, full_session, [(1, 1)])
+    assert await expire_waitlist_offers(db_session) == 1
+
+    offered = await get_entry(client, second)
+    assert (offered["status"], offered["row"], offered["column"]) == ("offered", 1, 1)
+    assert (await get_entry(client, first))["status"] == "expired"
+    seats = (await db_session.execute(select(OccupiedSeat.id).where(OccupiedSeat.session_id == full_session.id)))
+    assert len(seats.all()) == len(SEATS), "The seat held for the second entry must stay reserved"
+    assert (await get_occupancy(db_session, "session", full_session.id)).occupied == len(SEATS)